@@ -7,7 +7,6 @@ from drf_spectacular.openapi import OpenApiResponse, OpenApiExample
 from rest_framework.permissions import IsAdminUser
 from rest_framework.decorators import api_view, permission_classes
 from django.utils import timezone
-from django.core.cache import cache
 from drf_spectacular.utils import extend_schema
 import asyncio
 
@@ -31,22 +30,14 @@ class MonitoringDashboardView(APIView):
     def get(self, request):
         """Get monitoring dashboard data"""
         
-        async def get_dashboard_data():
-            """Get all dashboard data"""
-            # Get latest metrics
-            metrics = await monitoring_engine.collect_all_metrics()
-            
-            # Get alert summary
-            alert_summary = monitoring_engine.get_alert_summary()
-            
-            return metrics, alert_summary
-        
         try:
-            # Run async function
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            metrics, alert_summary = loop.run_until_complete(get_dashboard_data())
-            loop.close()
+            # Collectors run in the background; only a cold cache falls back to a live run
+            snapshot = monitoring_engine.get_metrics_snapshot()
+            metrics = dict(snapshot.get('metrics') or monitoring_engine.refresh_metrics_snapshot())
+            observability_summary = monitoring_engine.get_observability_summary()
+            if observability_summary:
+                metrics['observability'] = observability_summary
+            alert_summary = monitoring_engine.get_alert_summary()
             
             # Calculate health scores
             health_scores = self._calculate_health_scores(metrics)
@@ -62,6 +53,7 @@ class MonitoringDashboardView(APIView):
                 'monitoring_status': {
                     'is_running': monitoring_engine.is_running,
                     'last_updated': timezone.now().isoformat(),
+                    'metrics_collected_at': snapshot.get('collected_at'),
                     'rules_count': len(monitoring_engine.monitoring_rules),
                     'active_rules': len([r for r in monitoring_engine.monitoring_rules if r.enabled])
                 }
@@ -230,22 +222,18 @@ def monitoring_metrics(request):
     """Get latest monitoring metrics"""
     try:
         # Get cached metrics
-        metrics = cache.get('latest_monitoring_metrics', {})
+        snapshot = monitoring_engine.get_metrics_snapshot()
+        metrics = snapshot.get('metrics')
         
         if not metrics:
             # If no cached metrics, collect new ones
-            async def collect_metrics():
-                return await monitoring_engine.collect_all_metrics()
-            
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            metrics = loop.run_until_complete(collect_metrics())
-            loop.close()
+            metrics = monitoring_engine.refresh_metrics_snapshot()
         
         return StandardResponse.success({
             'metrics': metrics,
             'timestamp': timezone.now().isoformat(),
-            'cached': bool(cache.get('latest_monitoring_metrics'))
+            'cached': bool(snapshot),
+            'collected_at': snapshot.get('collected_at'),
         }, "Monitoring metrics retrieved")
         
     except Exception as e:
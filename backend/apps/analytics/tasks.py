@@ -3,12 +3,16 @@ Analytics tasks for Watch Party Backend
 """
 
 from celery import shared_task
+from django.conf import settings
 from django.utils import timezone
 from django.contrib.auth import get_user_model
-from django.db.models import Count, Avg, Sum, F
+from django.db import transaction
+from django.db.models import Count, Avg, Sum, F, Case, When, Value, IntegerField, FloatField
+from collections import defaultdict
 from datetime import datetime, timedelta
-import json
+from itertools import islice
 import logging
+import uuid
 
 from .models import AnalyticsEvent, UserSession, WatchTime, PartyAnalytics
 from apps.parties.models import WatchParty
@@ -29,27 +33,22 @@ def process_analytics_events():
         events = AnalyticsEvent.objects.filter(
             processed=False,
             timestamp__gte=one_hour_ago
+        ).order_by('timestamp').only(
+            'id', 'event_type', 'event_data', 'user_id', 'timestamp', 'ip_address', 'user_agent'
         )
 
         tags = {"worker": "analytics.pipeline", "window": "1h"}
+        batch_size = getattr(settings, 'ANALYTICS_BATCH_SIZE', 1000)
 
         with observability.span("analytics.pipeline.events", tags=tags):
             processed_count = 0
 
-            for event in events:
-                try:
-                    process_single_event(event)
-                    event.processed = True
-                    event.save()
-                    processed_count += 1
-                except Exception as exc:
-                    logger.error(f"Error processing event {event.id}: {str(exc)}")
-                    observability.record_event(
-                        "analytics.pipeline.event_error",
-                        f"Failed to process event {event.id}",
-                        severity="error",
-                        tags={**tags, "event_type": event.event_type, "event_id": str(event.id)},
-                    )
+            stream = events.iterator(chunk_size=batch_size)
+            while True:
+                chunk = list(islice(stream, batch_size))
+                if not chunk:
+                    break
+                processed_count += _process_chunk(chunk, tags)
 
             observability.record_metric(
                 "analytics.pipeline.events_processed", processed_count, tags=tags
@@ -81,157 +80,215 @@ def process_analytics_events():
         return f"Error: {str(e)}"
 
 
-def process_single_event(event):
-    """Process a single analytics event"""
-    event_data = json.loads(event.event_data) if event.event_data else {}
-    
-    if event.event_type == 'video_play':
-        _process_video_play_event(event, event_data)
-    elif event.event_type == 'video_pause':
-        _process_video_pause_event(event, event_data)
-    elif event.event_type == 'party_join':
-        _process_party_join_event(event, event_data)
-    elif event.event_type == 'party_leave':
-        _process_party_leave_event(event, event_data)
-    elif event.event_type == 'chat_message':
-        _process_chat_message_event(event, event_data)
-    elif event.event_type == 'user_login':
-        _process_user_login_event(event, event_data)
-    elif event.event_type == 'user_logout':
-        _process_user_logout_event(event, event_data)
-
-
-def _process_video_play_event(event, data):
-    """Process video play event"""
-    video_id = data.get('video_id')
-    party_id = data.get('party_id')
-    position = data.get('position', 0)
-    
-    if video_id:
-        # Update or create watch time record
-        WatchTime.objects.update_or_create(
-            user_id=event.user_id,
-            video_id=video_id,
-            party_id=party_id,
-            defaults={
-                'last_position': position,
-                'updated_at': timezone.now()
-            }
+def _process_chunk(events, tags):
+    """
+    Process ``events`` as one batch; when it fails, split it in halves until
+    the bad events are isolated so the valid ones are still applied. A bad
+    event is logged and left unprocessed.
+    """
+    try:
+        return process_event_batch(events)
+    except Exception as exc:
+        if len(events) > 1:
+            middle = len(events) // 2
+            return _process_chunk(events[:middle], tags) + _process_chunk(events[middle:], tags)
+
+        event = events[0]
+        logger.error(f"Error processing event {event.id}: {str(exc)}")
+        observability.record_event(
+            "analytics.pipeline.event_error",
+            f"Failed to process event {event.id}",
+            severity="error",
+            tags={**tags, "event_type": event.event_type, "event_id": str(event.id)},
+        )
+        return 0
+
+
+def process_event_batch(events):
+    """
+    Fold a time-ordered chunk of events into watch times, party analytics and
+    sessions with a fixed number of queries, then mark the chunk processed.
+    Events referring to rows that no longer exist stay unprocessed.
+    """
+    watch_times = {}
+    parties = defaultdict(list)
+    logins = {}
+    logouts = {}
+    skipped = set()
+
+    video_ids = _uuids(event.event_data.get('video_id') for event in events)
+    party_ids = _uuids(event.event_data.get('party_id') for event in events)
+    known_videos = {str(pk) for pk in Video.objects.filter(id__in=video_ids).order_by().values_list('id', flat=True)}
+    known_parties = {str(pk) for pk in WatchParty.objects.filter(id__in=party_ids).order_by().values_list('id', flat=True)}
+
+    for event in events:
+        data = event.event_data or {}
+        video_id = data.get('video_id')
+        party_id = data.get('party_id')
+
+        if event.event_type in ('video_play', 'video_pause') and video_id:
+            if event.user_id is None or str(video_id) not in known_videos or (
+                    party_id and str(party_id) not in known_parties):
+                skipped.add(event.id)
+                continue
+            watch_duration = data.get('watch_duration', 0)
+            if event.event_type == 'video_pause' and not watch_duration > 0:
+                continue
+            key = (event.user_id, str(video_id), str(party_id) if party_id else None)
+            entry = watch_times.setdefault(key, {'position': 0, 'added': 0})
+            entry['position'] = data.get('position', 0)
+            if event.event_type == 'video_pause':
+                entry['added'] += watch_duration
+
+        elif event.event_type in ('party_join', 'party_leave', 'chat_message') and party_id:
+            if str(party_id) not in known_parties:
+                skipped.add(event.id)
+                continue
+            parties[str(party_id)].append((event.event_type, data.get('session_duration', 0)))
+
+        elif event.event_type == 'user_login' and data.get('session_id'):
+            logins[data['session_id']] = event
+
+        elif event.event_type == 'user_logout' and data.get('session_id'):
+            logouts[data['session_id']] = event
+
+    with transaction.atomic():
+        _apply_watch_times(watch_times)
+        _apply_party_analytics(parties)
+        _apply_sessions(logins, logouts)
+        processed_ids = [event.id for event in events if event.id not in skipped]
+        AnalyticsEvent.objects.filter(id__in=processed_ids).update(processed=True)
+
+    if skipped:
+        logger.warning(f"Left {len(skipped)} analytics events referring to missing rows unprocessed")
+    return len(processed_ids)
+
+
+def _apply_watch_times(watch_times):
+    """Add watched seconds and move playback positions, creating missing rows in one insert"""
+    if not watch_times:
+        return
+
+    now = timezone.now()
+    existing = {}
+    rows = WatchTime.objects.filter(
+        user_id__in={key[0] for key in watch_times},
+        video_id__in={key[1] for key in watch_times},
+    ).values_list('id', 'user_id', 'video_id', 'party_id')
+    for pk, user_id, video_id, party_id in rows:
+        existing[(user_id, str(video_id), str(party_id) if party_id else None)] = pk
+
+    updates = {existing[key]: entry for key, entry in watch_times.items() if key in existing}
+    if updates:
+        WatchTime.objects.filter(id__in=updates).update(
+            total_watch_time=F('total_watch_time') + _case_by_pk(updates, 'added', IntegerField()),
+            last_position=_case_by_pk(updates, 'position', IntegerField()),
+            updated_at=now,
         )
 
+    WatchTime.objects.bulk_create([
+        WatchTime(user_id=user_id, video_id=video_id, party_id=party_id,
+                  total_watch_time=entry['added'], last_position=entry['position'])
+        for (user_id, video_id, party_id), entry in watch_times.items()
+        if (user_id, video_id, party_id) not in existing
+    ])
 
-def _process_video_pause_event(event, data):
-    """Process video pause event"""
-    video_id = data.get('video_id')
-    party_id = data.get('party_id')
-    position = data.get('position', 0)
-    watch_duration = data.get('watch_duration', 0)
-    
-    if video_id and watch_duration > 0:
-        # Update watch time record
-        try:
-            watch_time = WatchTime.objects.get(
-                user_id=event.user_id,
-                video_id=video_id,
-                party_id=party_id
-            )
-            watch_time.total_watch_time += watch_duration
-            watch_time.last_position = position
-            watch_time.updated_at = timezone.now()
-            watch_time.save()
-        except WatchTime.DoesNotExist:
-            WatchTime.objects.create(
-                user_id=event.user_id,
-                video_id=video_id,
-                party_id=party_id,
-                total_watch_time=watch_duration,
-                last_position=position
-            )
 
+def _apply_party_analytics(parties):
+    """Apply join, leave and chat events per party as counter deltas plus the running session average"""
+    if not parties:
+        return
 
-def _process_party_join_event(event, data):
-    """Process party join event"""
-    party_id = data.get('party_id')
-    
-    if party_id:
-        # Update party analytics
-        analytics, created = PartyAnalytics.objects.get_or_create(
-            party_id=party_id,
-            defaults={'total_participants': 0}
-        )
-        
-        analytics.total_participants = F('total_participants') + 1
-        analytics.save()
+    # Joins and chat messages create the row; a leave alone does not
+    creating = [party_id for party_id, actions in parties.items()
+                if any(action != 'party_leave' for action, _ in actions)]
+    PartyAnalytics.objects.bulk_create(
+        [PartyAnalytics(party_id=party_id) for party_id in creating], ignore_conflicts=True
+    )
 
+    current = {
+        str(row['party_id']): row for row in PartyAnalytics.objects.filter(party_id__in=parties).values(
+            'party_id', 'total_participants', 'avg_session_duration'
+        )
+    }
 
-def _process_party_leave_event(event, data):
-    """Process party leave event"""
-    party_id = data.get('party_id')
-    session_duration = data.get('session_duration', 0)
-    
-    if party_id:
-        # Update party analytics with session duration
-        try:
-            analytics = PartyAnalytics.objects.get(party_id=party_id)
-            if session_duration > 0:
-                if analytics.avg_session_duration:
-                    # Calculate new average
-                    total_duration = analytics.avg_session_duration * analytics.total_participants
-                    analytics.avg_session_duration = (total_duration + session_duration) / (analytics.total_participants + 1)
+    deltas = {}
+    for party_id, actions in parties.items():
+        if party_id not in current:
+            continue
+        participants = current[party_id]['total_participants']
+        average = current[party_id]['avg_session_duration']
+        joins = messages = 0
+        for action, session_duration in actions:
+            if action == 'party_join':
+                joins += 1
+                participants += 1
+            elif action == 'chat_message':
+                messages += 1
+            elif session_duration > 0:
+                if average:
+                    average = (average * participants + session_duration) / (participants + 1)
                 else:
-                    analytics.avg_session_duration = session_duration
-                analytics.save()
-        except PartyAnalytics.DoesNotExist:
-            pass
+                    average = session_duration
+        deltas[party_id] = {'joins': joins, 'messages': messages, 'average': average}
+
+    if deltas:
+        PartyAnalytics.objects.filter(party_id__in=deltas).update(
+            total_participants=F('total_participants') + _case_by_party(deltas, 'joins', IntegerField()),
+            total_messages=F('total_messages') + _case_by_party(deltas, 'messages', IntegerField()),
+            avg_session_duration=_case_by_party(deltas, 'average', FloatField()),
+            updated_at=timezone.now(),
+        )
 
 
-def _process_chat_message_event(event, data):
-    """Process chat message event"""
-    party_id = data.get('party_id')
-    
-    if party_id:
-        # Update party analytics
+def _apply_sessions(logins, logouts):
+    """Upsert sessions from logins, then close the ones logged out"""
+    if logins:
+        existing = {
+            session.session_id: session
+            for session in UserSession.objects.filter(session_id__in=logins)
+        }
+        changed = []
+        for session_id, event in logins.items():
+            session = existing.get(session_id) or UserSession(session_id=session_id)
+            session.user_id = event.user_id
+            session.start_time = event.timestamp
+            session.ip_address = event.ip_address
+            session.user_agent = event.user_agent
+            changed.append(session)
+        UserSession.objects.bulk_update(
+            [session for session in changed if session.session_id in existing],
+            ['user_id', 'start_time', 'ip_address', 'user_agent'],
+        )
+        UserSession.objects.bulk_create([session for session in changed if session.session_id not in existing])
+
+    if logouts:
+        sessions = list(UserSession.objects.filter(session_id__in=logouts))
+        for session in sessions:
+            session.end_time = logouts[session.session_id].timestamp
+            session.duration = int((session.end_time - session.start_time).total_seconds())
+        UserSession.objects.bulk_update(sessions, ['end_time', 'duration'])
+
+
+def _uuids(values):
+    """Distinct well-formed UUIDs among ``values``; anything else cannot match a row"""
+    result = set()
+    for value in values:
         try:
-            analytics = PartyAnalytics.objects.get(party_id=party_id)
-            analytics.total_messages = F('total_messages') + 1
-            analytics.save()
-        except PartyAnalytics.DoesNotExist:
-            PartyAnalytics.objects.create(
-                party_id=party_id,
-                total_messages=1
-            )
+            result.add(uuid.UUID(str(value)))
+        except ValueError:
+            continue
+    return result
 
 
-def _process_user_login_event(event, data):
-    """Process user login event"""
-    session_id = data.get('session_id')
-    
-    if session_id:
-        # Create or update user session
-        UserSession.objects.update_or_create(
-            session_id=session_id,
-            defaults={
-                'user_id': event.user_id,
-                'start_time': event.timestamp,
-                'ip_address': event.ip_address,
-                'user_agent': event.user_agent
-            }
-        )
+def _case_by_pk(values, field, output_field):
+    return Case(*[When(pk=pk, then=Value(entry[field])) for pk, entry in values.items()],
+                output_field=output_field)
 
 
-def _process_user_logout_event(event, data):
-    """Process user logout event"""
-    session_id = data.get('session_id')
-    
-    if session_id:
-        # Update user session with end time
-        try:
-            session = UserSession.objects.get(session_id=session_id)
-            session.end_time = event.timestamp
-            session.duration = int((session.end_time - session.start_time).total_seconds())
-            session.save()
-        except UserSession.DoesNotExist:
-            pass
+def _case_by_party(values, field, output_field):
+    return Case(*[When(party_id=party_id, then=Value(entry[field])) for party_id, entry in values.items()],
+                output_field=output_field)
 
 
 @shared_task
@@ -11,4 +11,6 @@ class AuthenticationConfig(AppConfig):
     verbose_name = 'Authentication'
 
     def ready(self):
-        pass
+        """Keep cached WebSocket user cards in sync with user updates"""
+        from shared.services.user_card_service import connect_user_card_signals
+        connect_user_card_signals()
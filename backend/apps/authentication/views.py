@@ -21,7 +21,7 @@ import io
 import base64
 import requests
 
-from apps.integrations.services.google_drive import GoogleDriveService
+from apps.integrations.services.google_drive import GoogleDriveService, drive_client_pool
 
 from .models import User, EmailVerification, PasswordReset, TwoFactorAuth, UserSession
 from .services.email_verification import (
@@ -709,6 +709,7 @@ class GoogleDriveDisconnectView(APIView):
                 profile.google_drive_connected = False
                 profile.google_drive_folder_id = ''
                 profile.save()
+            drive_client_pool.evict(user.pk)
             
             return Response({
                 'success': True,
@@ -9,14 +9,21 @@ from channels.db import database_sync_to_async
 from django.contrib.auth.models import AnonymousUser
 from django.contrib.auth import get_user_model
 from django.utils import timezone
+from rest_framework import serializers
+
+from shared.services.chat_buffer_service import chat_message_buffer
+from shared.services.party_access_service import party_access_service
+from shared.services.presence_service import presence_service
+from shared.services.user_card_service import user_card_service
+from shared.websocket_broadcast import BatchedBroadcastMixin, party_broadcaster
 from .models import ChatRoom, ChatMessage
-from .serializers import ChatMessageSerializer, UserBasicSerializer
+from .serializers import UserBasicSerializer
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
 
 
-class ChatConsumer(AsyncWebsocketConsumer):
+class ChatConsumer(BatchedBroadcastMixin, AsyncWebsocketConsumer):
     """WebSocket consumer for chat functionality"""
     
     def __init__(self, *args, **kwargs):
@@ -27,6 +34,8 @@ class ChatConsumer(AsyncWebsocketConsumer):
         self.room = None
         self.typing_users = set()
         self.last_message_time = None
+        self.presence_joined = False
+        self.presence_task = None
         
     async def connect(self):
         """Accept WebSocket connection"""
@@ -42,15 +51,14 @@ class ChatConsumer(AsyncWebsocketConsumer):
         try:
             # Verify room exists and user has access
             self.room = await self.get_chat_room(self.room_id)
-            has_access = await self.check_user_access(self.user, self.room)
+            access = await self.get_user_access(self.user, self.room)
             
-            if not has_access:
+            if not access.allows():
                 await self.close(code=4003)
                 return
                 
             # Check if user is banned
-            is_banned = await self.check_user_banned(self.user, self.room)
-            if is_banned:
+            if access.is_banned:
                 await self.close(code=4004)
                 return
             
@@ -63,8 +71,10 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 self.channel_name
             )
             
-            # Add user to active users list
-            await self.add_user_to_room(self.user, self.room)
+            # Register presence (Redis) instead of writing the M2M table
+            user_count = presence_service.join('chat', self.room.id, self.user.id)
+            self.presence_joined = True
+            self.presence_task = presence_service.start_keepalive('chat', self.room.id, self.user.id)
             
             # Send user joined notification to room
             await self.channel_layer.group_send(
@@ -73,7 +83,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
                     'type': 'user_joined',
                     'user': await self.get_user_data(self.user),
                     'timestamp': timezone.now().isoformat(),
-                    'user_count': await self.get_active_user_count(self.room)
+                    'user_count': user_count
                 }
             )
             
@@ -87,23 +97,28 @@ class ChatConsumer(AsyncWebsocketConsumer):
         """Handle WebSocket disconnection"""
         if self.room_group_name and self.user:
             try:
-                # Remove user from active users list
-                await self.remove_user_from_room(self.user, self.room)
-                
-                # Stop typing if user was typing
-                if self.user.id in self.typing_users:
-                    await self.handle_stop_typing()
+                if self.presence_task:
+                    self.presence_task.cancel()
                 
-                # Send user left notification to room
-                await self.channel_layer.group_send(
-                    self.room_group_name,
-                    {
-                        'type': 'user_left',
-                        'user': await self.get_user_data(self.user),
-                        'timestamp': timezone.now().isoformat(),
-                        'user_count': await self.get_active_user_count(self.room)
-                    }
-                )
+                # Sockets rejected before joining hold no presence; leaving would drop the user's other tabs
+                if self.presence_joined:
+                    self.presence_joined = False
+                    user_count = presence_service.leave('chat', self.room.id, self.user.id)
+                    
+                    # Stop typing if user was typing
+                    if self.user.id in self.typing_users:
+                        await self.handle_stop_typing()
+                    
+                    # Send user left notification to room
+                    await self.channel_layer.group_send(
+                        self.room_group_name,
+                        {
+                            'type': 'user_left',
+                            'user': await self.get_user_data(self.user),
+                            'timestamp': timezone.now().isoformat(),
+                            'user_count': user_count
+                        }
+                    )
                 
                 # Leave room group
                 await self.channel_layer.group_discard(
@@ -172,17 +187,19 @@ class ChatConsumer(AsyncWebsocketConsumer):
             return
         
         try:
-            # Create message in database
             reply_to_message = None
             if reply_to_id:
                 reply_to_message = await self.get_chat_message(reply_to_id)
             
-            message = await self.create_chat_message(
-                self.user, self.room, content, message_type, reply_to_message
+            # Buffer the message; it is persisted in batches by the write-behind flusher
+            record = chat_message_buffer.append(
+                self.room.id, self.user.id, content, message_type,
+                reply_to_message.id if reply_to_message else None
             )
+            await chat_message_buffer.schedule_flush()
             
             # Send message to room group
-            message_data = await self.get_message_data(message)
+            message_data = await self.get_message_data(record, reply_to_message)
             await self.channel_layer.group_send(
                 self.room_group_name,
                 {
@@ -210,29 +227,35 @@ class ChatConsumer(AsyncWebsocketConsumer):
         else:
             self.typing_users.discard(self.user.id)
         
-        # Broadcast typing status to room
-        await self.channel_layer.group_send(
+        # Broadcast typing status to room, coalesced per user
+        await party_broadcaster.publish(
+            self.channel_layer,
             self.room_group_name,
             {
                 'type': 'typing_indicator',
                 'user': await self.get_user_data(self.user),
                 'is_typing': is_typing,
                 'timestamp': timezone.now().isoformat()
-            }
+            },
+            ephemeral=True,
+            coalesce_key=f"typing:{self.user.id}",
         )
     
     async def handle_stop_typing(self):
         """Handle stop typing"""
         if self.user.id in self.typing_users:
             self.typing_users.discard(self.user.id)
-            await self.channel_layer.group_send(
+            await party_broadcaster.publish(
+                self.channel_layer,
                 self.room_group_name,
                 {
                     'type': 'typing_indicator',
                     'user': await self.get_user_data(self.user),
                     'is_typing': False,
                     'timestamp': timezone.now().isoformat()
-                }
+                },
+                ephemeral=True,
+                coalesce_key=f"typing:{self.user.id}",
             )
     
     async def handle_reaction(self, data):
@@ -243,19 +266,22 @@ class ChatConsumer(AsyncWebsocketConsumer):
         if not emoji:
             return
         
-        # Broadcast reaction to room
-        await self.channel_layer.group_send(
+        # Broadcast reaction to room (batched fan-out)
+        await party_broadcaster.publish(
+            self.channel_layer,
             self.room_group_name,
             {
                 'type': 'reaction_broadcast',
                 'user': await self.get_user_data(self.user),
                 'emoji': emoji,
                 'timestamp': timestamp or timezone.now().isoformat()
-            }
+            },
+            ephemeral=True,
         )
     
     async def handle_ping(self):
         """Handle ping/heartbeat"""
+        presence_service.touch('chat', self.room.id, self.user.id)
         await self.send(text_data=json.dumps({
             'type': 'pong',
             'timestamp': timezone.now().isoformat()
@@ -332,65 +358,57 @@ class ChatConsumer(AsyncWebsocketConsumer):
         return ChatRoom.objects.select_related('party').get(id=room_id)
     
     @database_sync_to_async
-    def check_user_access(self, user, room):
-        """Check if user has access to the chat room"""
-        party = room.party
-        return (
-            party.host == user or 
-            party.participants.filter(id=user.id).exists() or
-            party.visibility == 'public'
-        )
-    
-    @database_sync_to_async
-    def check_user_banned(self, user, room):
-        """Check if user is banned from the chat room"""
-        return room.banned_users.filter(user=user, is_active=True).exists()
-    
-    @database_sync_to_async
-    def add_user_to_room(self, user, room):
-        """Add user to active users list"""
-        room.add_user(user)
-    
-    @database_sync_to_async
-    def remove_user_from_room(self, user, room):
-        """Remove user from active users list"""
-        room.remove_user(user)
-    
-    @database_sync_to_async
-    def get_active_user_count(self, room):
-        """Get count of active users in room"""
-        return room.active_user_count
-    
-    @database_sync_to_async
-    def create_chat_message(self, user, room, content, message_type, reply_to):
-        """Create chat message in database"""
-        return ChatMessage.objects.create(
-            user=user,
-            room=room,
-            content=content,
-            message_type=message_type,
-            reply_to=reply_to
-        )
+    def get_user_access(self, user, room):
+        """Get the user's cached access and ban standing for the chat room"""
+        return party_access_service.lookup(room.party_id, user.id)
     
     @database_sync_to_async
     def get_chat_message(self, message_id):
-        """Get chat message by ID"""
+        """Get chat message by ID, including messages not yet flushed from the buffer"""
+        record = chat_message_buffer.get(self.room.id, message_id)
+        if record is not None:
+            return chat_message_buffer.to_instance(record)
         try:
             return ChatMessage.objects.get(id=message_id)
         except ChatMessage.DoesNotExist:
             return None
     
-    @database_sync_to_async
-    def get_user_data(self, user):
-        """Get serialized user data"""
-        serializer = UserBasicSerializer(user)
-        return serializer.data
+    async def get_user_data(self, user):
+        """Get serialized user data (UserBasicSerializer shape) from the cached user card"""
+        return await user_card_service.aget_card(user, UserBasicSerializer.Meta.fields)
+    
+    async def get_message_data(self, record, reply_to_message=None):
+        """Get message data in ChatMessageSerializer shape for a buffered record"""
+        created_at = serializers.DateTimeField().to_representation(
+            chat_message_buffer.to_instance(record).created_at
+        )
+        return {
+            'id': record['id'],
+            'room': record['room_id'],
+            'user': await self.get_user_data(self.user),
+            'content': record['content'],
+            'message_type': record['message_type'],
+            'reply_to': record['reply_to_id'],
+            'reply_to_message': await self.get_reply_preview(reply_to_message) if reply_to_message else None,
+            'reply_count': 0,
+            'moderation_status': 'active',
+            'is_visible': True,
+            'metadata': record['metadata'],
+            'created_at': created_at,
+            'updated_at': created_at,
+        }
     
     @database_sync_to_async
-    def get_message_data(self, message):
-        """Get serialized message data"""
-        serializer = ChatMessageSerializer(message)
-        return serializer.data
+    def get_reply_preview(self, message):
+        """Get the reply_to_message preview for a message being replied to"""
+        if not message.is_visible:
+            return None
+        return {
+            'id': str(message.id),
+            'user': UserBasicSerializer(message.user).data if message.user_id else None,
+            'content': message.content[:100],
+            'created_at': serializers.DateTimeField().to_representation(message.created_at),
+        }
 
 
 class NotificationConsumer(AsyncWebsocketConsumer):
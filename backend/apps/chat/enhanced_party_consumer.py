@@ -11,11 +11,23 @@ from channels.db import database_sync_to_async
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 
+from shared.services.chat_buffer_service import chat_message_buffer
+from shared.services.party_access_service import party_access_service
+from shared.services.party_clock_service import party_clock_service
+from shared.services.presence_service import presence_service
+from shared.services.user_card_service import user_card_service
+from shared.websocket_broadcast import (
+    BatchedBroadcastMixin,
+    encode_frame,
+    frame_event,
+    party_broadcaster,
+)
+
 User = get_user_model()
 logger = logging.getLogger(__name__)
 
 
-class EnhancedPartyConsumer(AsyncWebsocketConsumer):
+class EnhancedPartyConsumer(BatchedBroadcastMixin, AsyncWebsocketConsumer):
     """
     Enhanced WebSocket consumer for comprehensive party real-time features
     Compatible with frontend message format expectations
@@ -24,13 +36,17 @@ class EnhancedPartyConsumer(AsyncWebsocketConsumer):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.party_id = None
+        self.chat_room_id = None
         self.user = None
+        self.user_card = None
         self.is_host = False
         self.party_group_name = None
         self.user_channel_name = None
         self.typing_users = set()
         self.voice_participants = set()
         self.screen_share_active = False
+        self.presence_joined = False
+        self.presence_task = None
         
         # Video sync state
         self.video_state = {
@@ -69,9 +85,13 @@ class EnhancedPartyConsumer(AsyncWebsocketConsumer):
             
             # Check if user is host
             self.is_host = await self.is_user_party_host(party, self.user)
+            self.user_card = await user_card_service.aget_card(self.user, self.USER_CARD_FIELDS)
             
             # Accept connection
             await self.accept()
+            presence_service.join('party', self.party_id, self.user.id)
+            self.presence_joined = True
+            self.presence_task = presence_service.start_keepalive('party', self.party_id, self.user.id)
             
             # Join party group
             await self.channel_layer.group_add(
@@ -108,7 +128,7 @@ class EnhancedPartyConsumer(AsyncWebsocketConsumer):
                     'is_host': self.is_host,
                     'participant_count': await self.get_participant_count()
                 }
-            }, exclude_self=True)
+            }, exclude_self=True, ephemeral=True)
             
             logger.info(f"Enhanced party connection: User {self.user.username} joined party {self.party_id}")
             
@@ -127,6 +147,13 @@ class EnhancedPartyConsumer(AsyncWebsocketConsumer):
                 if self.user.id in self.voice_participants:
                     await self.handle_leave_voice_chat()
                 
+                if self.presence_task:
+                    self.presence_task.cancel()
+                # Sockets rejected before joining hold no presence; leaving would drop the user's other tabs
+                if self.presence_joined:
+                    self.presence_joined = False
+                    presence_service.leave('party', self.party_id, self.user.id)
+                
                 # Leave groups
                 await self.channel_layer.group_discard(
                     self.party_group_name,
@@ -146,7 +173,7 @@ class EnhancedPartyConsumer(AsyncWebsocketConsumer):
                         'user': await self.serialize_user(self.user),
                         'participant_count': await self.get_participant_count()
                     }
-                })
+                }, ephemeral=True)
                 
                 logger.info(f"Enhanced party disconnect: User {self.user.username} left party {self.party_id}")
                 
@@ -222,27 +249,31 @@ class EnhancedPartyConsumer(AsyncWebsocketConsumer):
             return
         
         action = data.get('action')
-        current_time = data.get('current_time', 0)
+        current_time = data.get('current_time')
         video_id = data.get('video_id')
         
-        # Update video state
+        # Update video state on the shared party clock; without a client position
+        # the clock keeps (and play/pause re-anchor) its own extrapolated one
+        clock_changes = {}
         if action == 'play':
-            self.video_state['is_playing'] = True
+            clock_changes['is_playing'] = True
         elif action == 'pause':
-            self.video_state['is_playing'] = False
-        elif action == 'seek':
-            self.video_state['current_time'] = current_time
+            clock_changes['is_playing'] = False
+        if action in ('play', 'pause', 'seek') and current_time is not None:
+            clock_changes['position'] = current_time
+        if video_id:
+            clock_changes['video_id'] = video_id
         
+        if clock_changes:
+            self.apply_clock_state(party_clock_service.update(self.party_id, **clock_changes))
         self.video_state['last_update'] = timestamp
-        if video_id:
-            self.video_state['video_id'] = video_id
         
         # Broadcast to all party members
         await self.broadcast_to_party({
             'type': 'video_control',
             'data': {
                 'action': action,
-                'current_time': current_time,
+                'current_time': self.video_state['current_time'],
                 'is_playing': self.video_state['is_playing'],
                 'video_id': video_id,
                 'controlled_by': await self.serialize_user(self.user),
@@ -254,7 +285,7 @@ class EnhancedPartyConsumer(AsyncWebsocketConsumer):
         """Handle video play action"""
         await self.handle_video_control({
             'action': 'play',
-            'current_time': data.get('current_time', self.video_state['current_time']),
+            'current_time': data.get('current_time'),
             'video_id': data.get('video_id', self.video_state['video_id'])
         }, timestamp)
     
@@ -262,7 +293,7 @@ class EnhancedPartyConsumer(AsyncWebsocketConsumer):
         """Handle video pause action"""
         await self.handle_video_control({
             'action': 'pause',
-            'current_time': data.get('current_time', self.video_state['current_time']),
+            'current_time': data.get('current_time'),
             'video_id': data.get('video_id', self.video_state['video_id'])
         }, timestamp)
     
@@ -270,7 +301,7 @@ class EnhancedPartyConsumer(AsyncWebsocketConsumer):
         """Handle video seek action"""
         await self.handle_video_control({
             'action': 'seek',
-            'current_time': data.get('current_time', 0),
+            'current_time': data.get('current_time'),
             'video_id': data.get('video_id', self.video_state['video_id'])
         }, timestamp)
     
@@ -286,12 +317,10 @@ class EnhancedPartyConsumer(AsyncWebsocketConsumer):
             await self.send_error("Invalid video or insufficient access")
             return
         
-        self.video_state.update({
-            'video_id': video_id,
-            'current_time': 0,
-            'is_playing': False,
-            'last_update': timestamp
-        })
+        self.apply_clock_state(party_clock_service.update(
+            self.party_id, video_id=str(video_id), position=0, is_playing=False
+        ))
+        self.video_state['last_update'] = timestamp
         
         await self.broadcast_to_party({
             'type': 'video_change',
@@ -310,17 +339,17 @@ class EnhancedPartyConsumer(AsyncWebsocketConsumer):
             await self.send_error("Invalid message content")
             return
         
-        # Save message to database
+        # Buffer message; the write-behind flusher persists it in batches
         message = await self.save_chat_message(content)
         
         # Broadcast to party
         await self.broadcast_to_party({
             'type': 'chat_message',
             'data': {
-                'message_id': str(message.id),
+                'message_id': message['id'],
                 'content': content,
                 'user': await self.serialize_user(self.user),
-                'timestamp': message.created_at.isoformat(),
+                'timestamp': message['created_at'],
                 'server_timestamp': timezone.now().isoformat()
             }
         })
@@ -336,7 +365,7 @@ class EnhancedPartyConsumer(AsyncWebsocketConsumer):
                 'is_typing': True,
                 'server_timestamp': timezone.now().isoformat()
             }
-        }, exclude_self=True)
+        }, exclude_self=True, ephemeral=True, coalesce_key=f"typing:{self.user.id}")
         
         # Auto-stop typing after timeout
         asyncio.create_task(self.auto_stop_typing())
@@ -353,7 +382,7 @@ class EnhancedPartyConsumer(AsyncWebsocketConsumer):
                     'is_typing': False,
                     'server_timestamp': timezone.now().isoformat()
                 }
-            }, exclude_self=True)
+            }, exclude_self=True, ephemeral=True, coalesce_key=f"typing:{self.user.id}")
     
     # Interactive Features
     async def handle_reaction(self, data, timestamp):
@@ -371,7 +400,7 @@ class EnhancedPartyConsumer(AsyncWebsocketConsumer):
                 'timestamp': timestamp,
                 'server_timestamp': timezone.now().isoformat()
             }
-        })
+        }, ephemeral=True)
     
     # Voice Chat Handlers
     async def handle_join_voice_chat(self, data, timestamp):
@@ -437,6 +466,7 @@ class EnhancedPartyConsumer(AsyncWebsocketConsumer):
     # System Handlers
     async def handle_heartbeat(self, data, timestamp):
         """Handle heartbeat/keepalive"""
+        presence_service.touch('party', self.party_id, self.user.id)
         await self.send_message({
             'type': 'heartbeat_response',
             'data': {
@@ -462,7 +492,7 @@ class EnhancedPartyConsumer(AsyncWebsocketConsumer):
     # Helper Methods
     async def send_message(self, message):
         """Send message to this client"""
-        await self.send(text_data=json.dumps({
+        await self.send(text_data=encode_frame({
             **message,
             'timestamp': timezone.now().isoformat()
         }))
@@ -476,29 +506,43 @@ class EnhancedPartyConsumer(AsyncWebsocketConsumer):
             }
         })
     
-    async def broadcast_to_party(self, message, exclude_self=False):
-        """Broadcast message to all party members"""
+    async def broadcast_to_party(self, message, exclude_self=False, ephemeral=False, coalesce_key=None):
+        """
+        Broadcast message to all party members
+        
+        Ephemeral messages (reactions, typing, presence) are coalesced into
+        batched fan-out; control messages are sent immediately. The frame is
+        encoded once here and forwarded verbatim by every recipient.
+        """
+        event = frame_event('party_message', {
+            **message,
+            'timestamp': timezone.now().isoformat()
+        })
         if exclude_self:
             # Send to all except current user
-            await self.channel_layer.group_send(
-                self.party_group_name,
-                {
-                    'type': 'party_message',
-                    'message': message,
-                    'exclude_channel': self.channel_name
-                }
-            )
-        else:
-            await self.channel_layer.group_send(
-                self.party_group_name,
-                {
-                    'type': 'party_message',
-                    'message': message
-                }
-            )
+            event['exclude_channel'] = self.channel_name
+        
+        await party_broadcaster.publish(
+            self.channel_layer,
+            self.party_group_name,
+            event,
+            ephemeral=ephemeral,
+            coalesce_key=coalesce_key,
+        )
+    
+    def apply_clock_state(self, clock):
+        """Mirror the shared party clock into this connection's video state"""
+        self.video_state.update({
+            'current_time': clock.position_at(),
+            'is_playing': clock.is_playing,
+            'video_id': clock.video_id,
+            'playback_rate': clock.rate,
+            'quality': clock.quality,
+        })
     
     async def send_initial_party_state(self):
         """Send current party state to newly connected user"""
+        self.apply_clock_state(party_clock_service.get(self.party_id))
         party_state = await self.get_current_party_state()
         await self.send_message({
             'type': 'party_state',
@@ -514,14 +558,13 @@ class EnhancedPartyConsumer(AsyncWebsocketConsumer):
     # Group message handlers
     async def party_message(self, event):
         """Handle messages broadcast to party group"""
-        message = event['message']
         exclude_channel = event.get('exclude_channel')
         
         # Skip if this channel should be excluded
         if exclude_channel and exclude_channel == self.channel_name:
             return
         
-        await self.send_message(message)
+        await self.send(text_data=event['frame'])
     
     # Database Operations
     @database_sync_to_async
@@ -536,43 +579,40 @@ class EnhancedPartyConsumer(AsyncWebsocketConsumer):
     @database_sync_to_async
     def user_has_party_access(self, party, user):
         """Check if user has access to party"""
-        # Check if party is public or user is member/host
-        if party.is_public:
-            return True
-        return party.participants.filter(id=user.id).exists() or party.host == user
+        return party_access_service.lookup(party.id, user.id).allows()
     
     @database_sync_to_async
     def is_user_party_host(self, party, user):
         """Check if user is party host"""
         return party.host == user
     
-    @database_sync_to_async
-    def serialize_user(self, user):
-        """Serialize user data for WebSocket messages"""
-        return {
-            'id': str(user.id),
-            'username': user.username,
-            'full_name': user.full_name,
-            'avatar': user.avatar.url if user.avatar else None,
-            'is_premium': getattr(user, 'is_premium', False)
-        }
+    USER_CARD_FIELDS = ('id', 'username', 'full_name', 'avatar', 'is_premium')
+    
+    async def serialize_user(self, user):
+        """Serialize user data for WebSocket messages from the cached user card"""
+        if user is self.user and self.user_card:
+            return self.user_card
+        return await user_card_service.aget_card(user, self.USER_CARD_FIELDS)
+    
+    async def save_chat_message(self, content):
+        """Append chat message to the write-behind buffer"""
+        if self.chat_room_id is None:
+            self.chat_room_id = await self.get_chat_room_id()
+        
+        message = chat_message_buffer.append(self.chat_room_id, self.user.id, content)
+        await chat_message_buffer.schedule_flush()
+        return message
     
     @database_sync_to_async
-    def save_chat_message(self, content):
-        """Save chat message to database"""
-        from apps.chat.models import ChatMessage, ChatRoom
+    def get_chat_room_id(self):
+        """Get or create the party chat room once per connection"""
+        from apps.chat.models import ChatRoom
         
-        # Get or create party chat room
         room, created = ChatRoom.objects.get_or_create(
             party_id=self.party_id,
             defaults={'name': f'Party {self.party_id} Chat'}
         )
-        
-        return ChatMessage.objects.create(
-            room=room,
-            user=self.user,
-            content=content
-        )
+        return room.id
     
     @database_sync_to_async
     def verify_video_access(self, video_id):
@@ -585,12 +625,9 @@ class EnhancedPartyConsumer(AsyncWebsocketConsumer):
         except Video.DoesNotExist:
             return False
     
-    @database_sync_to_async
-    def get_participant_count(self):
-        """Get current participant count"""
-        # This should query active WebSocket connections
-        # For now, return a placeholder
-        return len(self.typing_users) + len(self.voice_participants) + 1
+    async def get_participant_count(self):
+        """Get current participant count from the presence registry"""
+        return presence_service.count('party', self.party_id)
     
     @database_sync_to_async
     def get_current_party_state(self):
@@ -600,7 +637,7 @@ class EnhancedPartyConsumer(AsyncWebsocketConsumer):
             'voice_participants': len(self.voice_participants),
             'screen_share_active': self.screen_share_active,
             'typing_users': list(self.typing_users),
-            'participant_count': self.get_participant_count()
+            'participant_count': presence_service.count('party', self.party_id)
         }
     
     @database_sync_to_async
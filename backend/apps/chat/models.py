@@ -29,7 +29,8 @@ class ChatRoom(models.Model):
     created_at = models.DateTimeField(default=timezone.now, verbose_name='Created At')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Updated At')
     
-    # Active users (many-to-many relationship)
+    # Active users snapshot for analytics; live presence is tracked by
+    # shared.services.presence_service and reconciled here periodically
     active_users = models.ManyToManyField(User, blank=True, related_name='active_chat_rooms')
     
     class Meta:
@@ -42,12 +43,14 @@ class ChatRoom(models.Model):
     
     @property
     def active_user_count(self):
-        """Get count of currently active users"""
-        return self.active_users.count()
+        """Get count of currently connected users from the presence registry"""
+        from shared.services.presence_service import presence_service
+        return presence_service.count('chat', self.id)
     
     def is_user_active(self, user):
-        """Check if user is currently active in this room"""
-        return self.active_users.filter(id=user.id).exists()
+        """Check if user is currently connected to this room"""
+        from shared.services.presence_service import presence_service
+        return str(user.id) in presence_service.members('chat', self.id)
     
     def add_user(self, user):
         """Add user to active users list"""
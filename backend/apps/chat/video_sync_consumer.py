@@ -8,7 +8,11 @@ import logging
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.utils import timezone
-from django.core.cache import cache
+
+from shared.services.party_access_service import party_access_service
+from shared.services.party_clock_service import PartyClockState, party_clock_service
+from shared.services.user_card_service import user_card_service
+from shared.websocket_broadcast import frame_event
 
 logger = logging.getLogger(__name__)
 
@@ -34,17 +38,14 @@ class VideoSyncConsumer(AsyncWebsocketConsumer):
             "at ws/party/<party_id>/enhanced/ for comprehensive features."
         )
         self.party_code = None
+        self.party_id = None
         self.user = None
+        self.user_card = None
         self.is_host = False
         self.party_group_name = None
-        self.sync_data = {
-            'current_time': 0,
-            'is_playing': False,
-            'last_update': None,
-            'video_duration': 0,
-            'playback_rate': 1.0,
-            'quality': 'auto'
-        }
+        # Last snapshot of the shared party clock; the authoritative copy lives
+        # in party_clock_service so every worker agrees on position and rate.
+        self.clock_state = PartyClockState()
     
     async def connect(self):
         """Handle WebSocket connection"""
@@ -66,6 +67,9 @@ class VideoSyncConsumer(AsyncWebsocketConsumer):
                 await self.close(code=4003)
                 return
             
+            self.party_id = str(party.id)
+            self.user_card = await user_card_service.aget_card(self.user)
+            
             # Check if user is host
             self.is_host = await self.is_user_host(party, self.user)
             
@@ -83,12 +87,12 @@ class VideoSyncConsumer(AsyncWebsocketConsumer):
             # Notify others of user joining
             await self.channel_layer.group_send(
                 self.party_group_name,
-                {
+                frame_event('user_joined', {
                     'type': 'user_joined',
                     'user': await self.serialize_user(self.user),
                     'is_host': self.is_host,
                     'timestamp': timezone.now().isoformat()
-                }
+                })
             )
             
             logger.info(f"User {self.user.username} connected to party {self.party_code}")
@@ -109,11 +113,11 @@ class VideoSyncConsumer(AsyncWebsocketConsumer):
             if self.user:
                 await self.channel_layer.group_send(
                     self.party_group_name,
-                    {
+                    frame_event('user_left', {
                         'type': 'user_left',
                         'user': await self.serialize_user(self.user),
                         'timestamp': timezone.now().isoformat()
-                    }
+                    })
                 )
             
             logger.info(f"User {self.user.username if self.user else 'Unknown'} disconnected from party {self.party_code}")
@@ -157,28 +161,24 @@ class VideoSyncConsumer(AsyncWebsocketConsumer):
         is_playing = data.get('is_playing', False)
         playback_rate = data.get('playback_rate', 1.0)
         
-        # Update sync data
-        self.sync_data.update({
-            'current_time': current_time,
-            'is_playing': is_playing,
-            'playback_rate': playback_rate,
-            'last_update': timezone.now(),
-        })
-        
-        # Cache sync data for persistence
-        await self.cache_sync_data()
+        # Update the shared party clock
+        await self.update_clock(
+            position=current_time,
+            is_playing=is_playing,
+            rate=playback_rate,
+        )
         
         # Broadcast to all clients
         await self.channel_layer.group_send(
             self.party_group_name,
-            {
-                'type': 'sync_update_broadcast',
+            frame_event('sync_update_broadcast', {
+                'type': 'sync_update',
                 'current_time': current_time,
                 'is_playing': is_playing,
                 'playback_rate': playback_rate,
                 'timestamp': timezone.now().isoformat(),
                 'sender': await self.serialize_user(self.user)
-            }
+            })
         )
     
     async def handle_play(self, data):
@@ -186,50 +186,42 @@ class VideoSyncConsumer(AsyncWebsocketConsumer):
         if not self.can_control_playback():
             return
         
-        current_time = data.get('current_time', self.sync_data['current_time'])
+        current_time = data.get('current_time')
+        if current_time is None:
+            current_time = await self.get_expected_time()
         
         await self.channel_layer.group_send(
             self.party_group_name,
-            {
-                'type': 'play_command',
+            frame_event('play_command', {
+                'type': 'play',
                 'current_time': current_time,
                 'timestamp': timezone.now().isoformat(),
                 'sender': await self.serialize_user(self.user)
-            }
+            })
         )
         
-        # Update sync data
-        self.sync_data.update({
-            'current_time': current_time,
-            'is_playing': True,
-            'last_update': timezone.now()
-        })
-        await self.cache_sync_data()
+        await self.update_clock(position=current_time, is_playing=True)
     
     async def handle_pause(self, data):
         """Handle pause command"""
         if not self.can_control_playback():
             return
         
-        current_time = data.get('current_time', self.sync_data['current_time'])
+        current_time = data.get('current_time')
+        if current_time is None:
+            current_time = await self.get_expected_time()
         
         await self.channel_layer.group_send(
             self.party_group_name,
-            {
-                'type': 'pause_command',
+            frame_event('pause_command', {
+                'type': 'pause',
                 'current_time': current_time,
                 'timestamp': timezone.now().isoformat(),
                 'sender': await self.serialize_user(self.user)
-            }
+            })
         )
         
-        # Update sync data
-        self.sync_data.update({
-            'current_time': current_time,
-            'is_playing': False,
-            'last_update': timezone.now()
-        })
-        await self.cache_sync_data()
+        await self.update_clock(position=current_time, is_playing=False)
     
     async def handle_seek(self, data):
         """Handle seek command"""
@@ -237,25 +229,21 @@ class VideoSyncConsumer(AsyncWebsocketConsumer):
             return
         
         seek_time = data.get('seek_time', 0)
-        was_playing = self.sync_data.get('is_playing', False)
+        await self.load_clock()
+        was_playing = self.clock_state.is_playing
         
         await self.channel_layer.group_send(
             self.party_group_name,
-            {
-                'type': 'seek_command',
+            frame_event('seek_command', {
+                'type': 'seek',
                 'seek_time': seek_time,
                 'was_playing': was_playing,
                 'timestamp': timezone.now().isoformat(),
                 'sender': await self.serialize_user(self.user)
-            }
+            })
         )
         
-        # Update sync data
-        self.sync_data.update({
-            'current_time': seek_time,
-            'last_update': timezone.now()
-        })
-        await self.cache_sync_data()
+        await self.update_clock(position=seek_time)
     
     async def handle_playback_rate(self, data):
         """Handle playback rate change"""
@@ -268,16 +256,15 @@ class VideoSyncConsumer(AsyncWebsocketConsumer):
         
         await self.channel_layer.group_send(
             self.party_group_name,
-            {
-                'type': 'playback_rate_change',
+            frame_event('playback_rate_change', {
+                'type': 'playback_rate',
                 'rate': rate,
                 'timestamp': timezone.now().isoformat(),
                 'sender': await self.serialize_user(self.user)
-            }
+            })
         )
         
-        self.sync_data['playback_rate'] = rate
-        await self.cache_sync_data()
+        await self.update_clock(rate=rate)
     
     async def handle_quality_change(self, data):
         """Handle video quality change"""
@@ -286,12 +273,12 @@ class VideoSyncConsumer(AsyncWebsocketConsumer):
         # Notify others of quality change (for adaptive streaming)
         await self.channel_layer.group_send(
             self.party_group_name,
-            {
-                'type': 'quality_change_notification',
+            frame_event('quality_change_notification', {
+                'type': 'quality_change',
                 'quality': quality,
                 'user': await self.serialize_user(self.user),
                 'timestamp': timezone.now().isoformat()
-            }
+            })
         )
     
     async def handle_heartbeat(self, data):
@@ -299,15 +286,15 @@ class VideoSyncConsumer(AsyncWebsocketConsumer):
         client_time = data.get('client_time', 0)
         data.get('is_playing', False)
         
-        # Calculate drift and send correction if needed
-        server_time = self.calculate_expected_time()
+        # Calculate drift against the shared clock and send correction if needed
+        server_time = await self.get_expected_time()
         drift = abs(client_time - server_time)
         
         if drift > 2.0:  # More than 2 seconds drift
             await self.send(text_data=json.dumps({
                 'type': 'sync_correction',
                 'correct_time': server_time,
-                'is_playing': self.sync_data.get('is_playing', False),
+                'is_playing': self.clock_state.is_playing,
                 'drift': drift,
                 'timestamp': timezone.now().isoformat()
             }))
@@ -317,109 +304,44 @@ class VideoSyncConsumer(AsyncWebsocketConsumer):
         await self.send_sync_state()
     
     # Group message handlers
-    async def sync_update_broadcast(self, event):
-        """Broadcast sync update to client"""
-        await self.send(text_data=json.dumps({
-            'type': 'sync_update',
-            'current_time': event['current_time'],
-            'is_playing': event['is_playing'],
-            'playback_rate': event['playback_rate'],
-            'timestamp': event['timestamp'],
-            'sender': event['sender']
-        }))
+    # Payloads are encoded once by the sender; handlers forward the frame as-is.
+    async def forward_frame(self, event):
+        """Forward a pre-encoded broadcast frame to the client"""
+        await self.send(text_data=event['frame'])
     
-    async def play_command(self, event):
-        """Send play command to client"""
-        await self.send(text_data=json.dumps({
-            'type': 'play',
-            'current_time': event['current_time'],
-            'timestamp': event['timestamp'],
-            'sender': event['sender']
-        }))
-    
-    async def pause_command(self, event):
-        """Send pause command to client"""
-        await self.send(text_data=json.dumps({
-            'type': 'pause',
-            'current_time': event['current_time'],
-            'timestamp': event['timestamp'],
-            'sender': event['sender']
-        }))
-    
-    async def seek_command(self, event):
-        """Send seek command to client"""
-        await self.send(text_data=json.dumps({
-            'type': 'seek',
-            'seek_time': event['seek_time'],
-            'was_playing': event['was_playing'],
-            'timestamp': event['timestamp'],
-            'sender': event['sender']
-        }))
-    
-    async def playback_rate_change(self, event):
-        """Send playback rate change to client"""
-        await self.send(text_data=json.dumps({
-            'type': 'playback_rate',
-            'rate': event['rate'],
-            'timestamp': event['timestamp'],
-            'sender': event['sender']
-        }))
-    
-    async def user_joined(self, event):
-        """Notify client of user joining"""
-        await self.send(text_data=json.dumps({
-            'type': 'user_joined',
-            'user': event['user'],
-            'is_host': event['is_host'],
-            'timestamp': event['timestamp']
-        }))
-    
-    async def user_left(self, event):
-        """Notify client of user leaving"""
-        await self.send(text_data=json.dumps({
-            'type': 'user_left',
-            'user': event['user'],
-            'timestamp': event['timestamp']
-        }))
+    sync_update_broadcast = forward_frame
+    play_command = forward_frame
+    pause_command = forward_frame
+    seek_command = forward_frame
+    playback_rate_change = forward_frame
+    quality_change_notification = forward_frame
+    user_joined = forward_frame
+    user_left = forward_frame
     
     # Helper methods
     async def send_sync_state(self):
         """Send current sync state to client"""
-        # Get cached sync data
-        await self.load_sync_data()
-        
-        current_time = self.calculate_expected_time()
+        current_time = await self.get_expected_time()
         
         await self.send(text_data=json.dumps({
             'type': 'sync_state',
             'current_time': current_time,
-            'is_playing': self.sync_data.get('is_playing', False),
-            'playback_rate': self.sync_data.get('playback_rate', 1.0),
-            'video_duration': self.sync_data.get('video_duration', 0),
-            'quality': self.sync_data.get('quality', 'auto'),
+            'is_playing': self.clock_state.is_playing,
+            'playback_rate': self.clock_state.rate,
+            'video_duration': self.clock_state.duration,
+            'quality': self.clock_state.quality,
+            'sequence': self.clock_state.seq,
             'timestamp': timezone.now().isoformat()
         }))
     
+    async def get_expected_time(self):
+        """Refresh the shared clock and return the expected playback position"""
+        await self.load_clock()
+        return self.calculate_expected_time()
+    
     def calculate_expected_time(self):
-        """Calculate expected current time based on sync data"""
-        if not self.sync_data.get('last_update'):
-            return self.sync_data.get('current_time', 0)
-        
-        if not self.sync_data.get('is_playing'):
-            return self.sync_data.get('current_time', 0)
-        
-        # Calculate elapsed time since last update
-        elapsed = (timezone.now() - self.sync_data['last_update']).total_seconds()
-        playback_rate = self.sync_data.get('playback_rate', 1.0)
-        
-        expected_time = self.sync_data.get('current_time', 0) + (elapsed * playback_rate)
-        
-        # Ensure we don't go beyond video duration
-        duration = self.sync_data.get('video_duration', 0)
-        if duration > 0:
-            expected_time = min(expected_time, duration)
-        
-        return expected_time
+        """Calculate expected current time from the last party clock snapshot"""
+        return self.clock_state.position_at()
     
     def can_control_playback(self):
         """Check if user can control playback"""
@@ -437,18 +359,13 @@ class VideoSyncConsumer(AsyncWebsocketConsumer):
         # For now, only accept from host
         return False
     
-    async def cache_sync_data(self):
-        """Cache sync data for persistence"""
-        cache_key = f"party_sync_{self.party_code}"
-        cache.set(cache_key, self.sync_data, timeout=3600)  # 1 hour
+    async def update_clock(self, **changes):
+        """Apply changes to the shared party clock with compare-and-set"""
+        self.clock_state = party_clock_service.update(self.party_id, **changes)
     
-    async def load_sync_data(self):
-        """Load sync data from cache"""
-        cache_key = f"party_sync_{self.party_code}"
-        cached_data = cache.get(cache_key)
-        
-        if cached_data:
-            self.sync_data.update(cached_data)
+    async def load_clock(self):
+        """Read the shared party clock in one round trip"""
+        self.clock_state = party_clock_service.get(self.party_id)
     
     # Database operations
     @database_sync_to_async
@@ -463,23 +380,19 @@ class VideoSyncConsumer(AsyncWebsocketConsumer):
     @database_sync_to_async
     def user_has_access(self, party, user):
         """Check if user has access to party"""
-        return (
-            party.host == user or
-            party.participants.filter(id=user.id).exists() or
-            party.visibility == 'public'
-        )
+        return party_access_service.lookup(party.id, user.id).allows()
     
     @database_sync_to_async
     def is_user_host(self, party, user):
         """Check if user is party host"""
         return party.host == user
     
-    @database_sync_to_async
-    def serialize_user(self, user):
-        """Serialize user for JSON response"""
+    async def serialize_user(self, user):
+        """Serialize user for JSON response from the cached user card"""
+        card = self.user_card if user is self.user and self.user_card else await user_card_service.aget_card(user)
         return {
-            'id': str(user.id),
-            'username': user.username,
-            'first_name': user.first_name,
-            'avatar_url': user.avatar.url if user.avatar else None,
+            'id': card['id'],
+            'username': card['username'],
+            'first_name': card['first_name'],
+            'avatar_url': card['avatar'],
         }
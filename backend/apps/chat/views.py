@@ -14,6 +14,10 @@ from .serializers import (
     ChatBanSerializer, ChatModerationLogSerializer, ModerateChatSerializer, 
     UnbanUserSerializer, ChatStatsRequestSerializer, ChatRoomStatsSerializer
 )
+from shared.pagination import ChatMessagePagination
+from shared.services.chat_buffer_service import chat_message_buffer
+from shared.services.party_access_service import party_access_service
+from shared.services.presence_service import presence_service
 
 User = get_user_model()
 
@@ -23,6 +27,7 @@ class ChatHistoryView(generics.ListAPIView):
     
     serializer_class = ChatMessageSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = ChatMessagePagination
     
     def get_room(self):
         """Get or create the chat room for the party"""
@@ -62,14 +67,15 @@ class ChatHistoryView(generics.ListAPIView):
                 party.visibility == 'public'):
             return ChatMessage.objects.none()
         
-        # Get recent messages (last 100 by default)
-        limit = min(int(self.request.GET.get('limit', 100)), 500)  # Max 500 messages
+        # Read through the write-behind buffer so just-sent messages are included
+        chat_message_buffer.flush_room(room.id)
         
+        # Newest first; ChatMessagePagination pages back with (created_at, id) cursors
         return room.messages.filter(
             moderation_status='active'
         ).select_related(
             'user', 'reply_to__user'
-        ).order_by('-created_at')[:limit]
+        ).order_by('-created_at', '-id')
     
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -170,6 +176,10 @@ class ModerateChatView(generics.GenericAPIView):
         target_user_id = request.data.get('target_user_id')
         reason = request.data.get('reason', '')
         
+        if message_id:
+            # The message may still be waiting in the write-behind buffer
+            chat_message_buffer.flush_room(room.id)
+        
         if action == 'hide_message' and message_id:
             return self._hide_message(room, message_id, user, reason)
         elif action == 'delete_message' and message_id:
@@ -265,6 +275,7 @@ class ModerateChatView(generics.GenericAPIView):
                 reason=reason,
                 expires_at=expires_at
             )
+            party_access_service.ban(room.party_id, target_user.id, expires_at)
             
             # Remove user from active users
             room.remove_user(target_user)
@@ -359,6 +370,7 @@ class BanUserView(generics.CreateAPIView):
             user=target_user,
             banned_by=user
         )
+        party_access_service.ban(room.party_id, target_user.id, ban.expires_at)
         
         # Remove user from active users
         room.remove_user(target_user)
@@ -404,6 +416,7 @@ class UnbanUserView(generics.GenericAPIView):
         try:
             ban = room.banned_users.get(user_id=target_user_id, is_active=True)
             ban.lift_ban()
+            party_access_service.unban(room.party_id, ban.user_id)
             
             # Log the action
             ChatModerationLog.objects.create(
@@ -486,12 +499,13 @@ def get_active_users(request, room_id):
         )
     
     from .serializers import UserBasicSerializer
-    active_users = room.active_users.all()
+    present_ids = presence_service.members('chat', room.id)
+    active_users = User.objects.filter(id__in=present_ids)
     serializer = UserBasicSerializer(active_users, many=True)
     
     return Response({
         'active_users': serializer.data,
-        'count': active_users.count()
+        'count': len(present_ids)
     })
 
 
@@ -1,8 +1,10 @@
 """Integration service layer entrypoints."""
 
 from .aws_s3 import AWSS3Service
+from .drive_metadata_cache import drive_metadata_cache
 from .google_drive import (
 	GoogleDriveService,
+	drive_client_pool,
 	get_drive_service,
 	get_drive_service_for_user,
 )
@@ -10,6 +12,8 @@ from .google_drive import (
 __all__ = [
 	"AWSS3Service",
 	"GoogleDriveService",
+	"drive_client_pool",
+	"drive_metadata_cache",
 	"get_drive_service",
 	"get_drive_service_for_user",
 ]
\ No newline at end of file
@@ -0,0 +1,162 @@
+"""Shared cache of Google Drive file metadata and folder listings."""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'drive_meta'
+
+
+class DriveMetadataCache:
+    """
+    Read-through cache for Drive ``files.get`` and ``files.list`` results.
+
+    Entries are scoped per user, since what a Drive file looks like depends
+    on whose credentials read it. Each process keeps a small LRU in front of
+    the shared cache (Redis in deployment) so repeated lookups within
+    ``DRIVE_METADATA_LOCAL_TTL`` seconds skip the network entirely.
+
+    Shared entries are invalidated from Drive's ``changes`` feed rather than
+    by polling files: ``poll_drive_changes`` reads every change since the
+    user's stored page token in one call, drops the changed files and bumps
+    the user's listing version. A token that cannot be resumed bumps the
+    user's generation, which discards everything cached for them. Only users
+    who hit the cache within ``DRIVE_METADATA_CACHE_TTL`` are polled.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._local: 'OrderedDict[Tuple[Hashable, ...], Tuple[float, Any]]' = OrderedDict()
+
+    @property
+    def ttl(self) -> int:
+        return getattr(settings, 'DRIVE_METADATA_CACHE_TTL', 3600)
+
+    @property
+    def local_ttl(self) -> float:
+        return getattr(settings, 'DRIVE_METADATA_LOCAL_TTL', 15)
+
+    @property
+    def local_size(self) -> int:
+        return getattr(settings, 'DRIVE_METADATA_LOCAL_SIZE', 2048)
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+    def get_file(self, scope: Any, file_id: str, loader: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """Metadata for ``file_id`` as seen by ``scope``, calling ``loader`` on a miss."""
+        return self._get(scope, ('file', file_id), lambda generation, _listing: f'{generation}:file:{file_id}', loader)
+
+    def get_listing(self, scope: Any, query: Dict[str, Any], loader: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """A ``files.list`` result for ``query`` as seen by ``scope``, calling ``loader`` on a miss."""
+        digest = hashlib.sha1(json.dumps(query, sort_keys=True).encode()).hexdigest()
+        return self._get(
+            scope, ('list', digest), lambda generation, listing: f'{generation}:list:{listing}:{digest}', loader
+        )
+
+    def _get(self, scope, local_id, shared_suffix, loader):
+        local_key = (scope,) + local_id
+        value = self._get_local(local_key)
+        if value is not None:
+            return value
+
+        versions = cache.get_many([self._key(scope, 'generation'), self._key(scope, 'listing')])
+        shared_key = self._key(scope, shared_suffix(
+            versions.get(self._key(scope, 'generation'), 0),
+            versions.get(self._key(scope, 'listing'), 0),
+        ))
+        value = cache.get(shared_key)
+        if value is None:
+            value = loader()
+            cache.set_many({shared_key: value, self._key(scope, 'active'): time.time()}, timeout=self.ttl)
+        self._set_local(local_key, value)
+        return value
+
+    # ------------------------------------------------------------------
+    # Invalidation
+    # ------------------------------------------------------------------
+    def invalidate_files(self, scope: Any, file_ids: Iterable[str]) -> None:
+        """Forget changed files and every listing of ``scope`` (a change may move, add or remove files)."""
+        file_ids = list(file_ids)
+        generation = cache.get(self._key(scope, 'generation'), 0)
+        if file_ids:
+            cache.delete_many([self._key(scope, f'{generation}:file:{file_id}') for file_id in file_ids])
+        self._bump(self._key(scope, 'listing'))
+        self._drop_local(scope, lambda kind, ident: kind == 'list' or ident in file_ids)
+
+    def invalidate_scope(self, scope: Any) -> None:
+        """Forget everything cached for ``scope``."""
+        self._bump(self._key(scope, 'generation'))
+        self._drop_local(scope, lambda kind, ident: True)
+
+    @staticmethod
+    def _bump(key: str) -> None:
+        # Versions never expire: an expired counter would restart at 0 and revive old entries
+        cache.add(key, 0, timeout=None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+
+    # ------------------------------------------------------------------
+    # Change tracking
+    # ------------------------------------------------------------------
+    def active_scopes(self, scopes: Iterable[Any]) -> List[Any]:
+        """Those of ``scopes`` that used the cache within the entry TTL."""
+        scopes = list(scopes)
+        found = cache.get_many([self._key(scope, 'active') for scope in scopes])
+        return [scope for scope in scopes if self._key(scope, 'active') in found]
+
+    def get_page_token(self, scope: Any) -> Optional[str]:
+        return cache.get(self._key(scope, 'page_token'))
+
+    def set_page_token(self, scope: Any, token: str) -> None:
+        cache.set(self._key(scope, 'page_token'), token, timeout=None)
+
+    def forget(self, scope: Any) -> None:
+        """Drop all state for ``scope``, e.g. after Drive is disconnected."""
+        self.invalidate_scope(scope)
+        cache.delete_many([self._key(scope, 'page_token'), self._key(scope, 'active')])
+
+    # ------------------------------------------------------------------
+    # Process-local LRU
+    # ------------------------------------------------------------------
+    def _get_local(self, key):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return entry[1]
+
+    def _set_local(self, key, value) -> None:
+        with self._lock:
+            self._local[key] = (time.monotonic() + self.local_ttl, value)
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+    def _drop_local(self, scope, predicate) -> None:
+        with self._lock:
+            for key in [key for key in self._local if key[0] == scope and predicate(key[1], key[2])]:
+                del self._local[key]
+
+    @staticmethod
+    def _key(scope: Any, suffix: str) -> str:
+        return f'{KEY_PREFIX}:{scope}:{suffix}'
+
+
+# Global cache instance
+drive_metadata_cache = DriveMetadataCache()
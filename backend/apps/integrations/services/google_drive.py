@@ -1,21 +1,29 @@
 """Google Drive integration service."""
 
+import json
 import logging
 import mimetypes
 import os
+import threading
+import time
+from dataclasses import dataclass, field
 from datetime import timedelta
 from http import HTTPStatus
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+import requests
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
 from django.utils import timezone
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build_from_document
 from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaFileUpload
 
+from .drive_metadata_cache import drive_metadata_cache
+
 
 class GoogleDriveServiceError(Exception):
     """Raised when an interaction with Google Drive fails."""
@@ -26,6 +34,30 @@ class GoogleDriveServiceError(Exception):
 
 logger = logging.getLogger(__name__)
 
+# Keep-alive connections for media range requests and token refreshes
+_http_session = requests.Session()
+
+_discovery_lock = threading.Lock()
+
+# Every file field any caller reads, so one cached resource serves them all
+FILE_FIELDS = (
+    "id,name,mimeType,size,md5Checksum,modifiedTime,createdTime,thumbnailLink,"
+    "videoMediaMetadata,webContentLink,webViewLink,parents"
+)
+LIST_FIELDS = "files(id,name,mimeType,size,thumbnailLink,createdTime,modifiedTime,videoMediaMetadata)"
+CHANGE_FIELDS = "nextPageToken,newStartPageToken,changes(fileId)"
+_discovery_document: Optional[Dict[str, Any]] = None
+
+
+def _drive_discovery_document() -> Dict[str, Any]:
+    """Bundled Drive v3 discovery document, parsed once per process."""
+    global _discovery_document
+    if _discovery_document is None:
+        with _discovery_lock:
+            if _discovery_document is None:
+                _discovery_document = json.loads(discovery_cache.get_static_doc('drive', 'v3'))
+    return _discovery_document
+
 
 class GoogleDriveService:
     """Service for interacting with Google Drive API."""
@@ -37,10 +69,17 @@ class GoogleDriveService:
         token_expiry = None,
         on_credentials_updated: Optional[Callable] = None,
         drive_service=None,
-        credentials=None
+        credentials=None,
+        refresh_lock: Optional[threading.Lock] = None,
+        cache_scope: Any = None,
     ):
-        """Initialize Google Drive service."""
+        """
+        Initialize Google Drive service. Metadata reads go through the shared
+        metadata cache when ``cache_scope`` (the owning user's id) is given.
+        """
         self.on_credentials_updated = on_credentials_updated
+        self.cache_scope = cache_scope
+        self._refresh_lock = refresh_lock or threading.Lock()
 
         scopes = getattr(
             settings,
@@ -55,33 +94,45 @@ class GoogleDriveService:
             self.drive_service = drive_service
             self.credentials = credentials
         else:
-            # Create credentials from tokens
-            self.credentials = Credentials(
-                token=access_token,
-                refresh_token=refresh_token,
-                token_uri='https://oauth2.googleapis.com/token',
-                client_id=getattr(settings, 'GOOGLE_DRIVE_CLIENT_ID', ''),
-                client_secret=getattr(settings, 'GOOGLE_DRIVE_CLIENT_SECRET', ''),
-                scopes=scopes
-            )
-            
-            if token_expiry:
-                # Google's Credentials.expired compares against datetime.utcnow() (naive)
-                # So we need to convert timezone-aware datetime to naive UTC
-                if timezone.is_aware(token_expiry):
-                    # Convert to UTC then strip timezone info for Google library compatibility
-                    import datetime as dt
-                    token_expiry = token_expiry.astimezone(dt.timezone.utc).replace(tzinfo=None)
-                self.credentials.expiry = token_expiry
+            if credentials is None:
+                # Create credentials from tokens
+                credentials = Credentials(
+                    token=access_token,
+                    refresh_token=refresh_token,
+                    token_uri='https://oauth2.googleapis.com/token',
+                    client_id=getattr(settings, 'GOOGLE_DRIVE_CLIENT_ID', ''),
+                    client_secret=getattr(settings, 'GOOGLE_DRIVE_CLIENT_SECRET', ''),
+                    scopes=scopes
+                )
+                
+                if token_expiry:
+                    # Google's Credentials.expired compares against datetime.utcnow() (naive)
+                    # So we need to convert timezone-aware datetime to naive UTC
+                    if timezone.is_aware(token_expiry):
+                        # Convert to UTC then strip timezone info for Google library compatibility
+                        import datetime as dt
+                        token_expiry = token_expiry.astimezone(dt.timezone.utc).replace(tzinfo=None)
+                    credentials.expiry = token_expiry
+            self.credentials = credentials
                 
             self._refresh_credentials_if_needed()
-            self.drive_service = build('drive', 'v3', credentials=self.credentials)
+            self.drive_service = build_from_document(_drive_discovery_document(), credentials=self.credentials)
     
     def _refresh_credentials_if_needed(self):
         """Refresh credentials if they are expired."""
         if self.credentials and self.credentials.expired and self.credentials.refresh_token:
+            self.refresh_credentials(stale_token=self.credentials.token)
+
+    def refresh_credentials(self, stale_token: Optional[str] = None):
+        """
+        Refresh the access token. Clients sharing credentials share the lock,
+        so concurrent callers that saw the same ``stale_token`` refresh once.
+        """
+        with self._refresh_lock:
+            if stale_token is not None and self.credentials.token != stale_token:
+                return
             try:
-                self.credentials.refresh(Request())
+                self.credentials.refresh(Request(session=_http_session))
                 if self.on_credentials_updated:
                     self.on_credentials_updated(self.credentials)
                 logger.info("Google Drive credentials refreshed successfully")
@@ -140,11 +191,17 @@ class GoogleDriveService:
     def _fetch_file_metadata(self, file_id: str, fields: Optional[str] = None) -> Dict[str, Any]:
         """Retrieve file metadata from Drive for subsequent processing."""
 
-        metadata_fields = fields or "id,name,mimeType,size,webContentLink,webViewLink"
+        if self.cache_scope is not None and (fields is None or set(fields.split(',')) <= set(FILE_FIELDS.split(','))):
+            return drive_metadata_cache.get_file(
+                self.cache_scope, file_id, lambda: self._request_file_metadata(file_id, FILE_FIELDS)
+            )
+        return self._request_file_metadata(file_id, fields or "id,name,mimeType,size,webContentLink,webViewLink")
+
+    def _request_file_metadata(self, file_id: str, fields: str) -> Dict[str, Any]:
         try:
             request = self.drive_service.files().get(
                 fileId=file_id,
-                fields=metadata_fields,
+                fields=fields,
             )
             return request.execute()
         except Exception as exc:  # pragma: no cover - defensive logging
@@ -188,13 +245,13 @@ class GoogleDriveService:
                 query_parts.append(f"mimeType='{mime_type}'")
             
         query = " and ".join(query_parts)
-        
-        results = self.drive_service.files().list(
-            q=query,
-            fields="files(id,name,mimeType,size,thumbnailLink,createdTime,modifiedTime,videoMediaMetadata)"
-        ).execute()
-        
-        return results
+
+        def load():
+            return self.drive_service.files().list(q=query, fields=LIST_FIELDS).execute()
+
+        if self.cache_scope is not None:
+            return drive_metadata_cache.get_listing(self.cache_scope, {'q': query, 'fields': LIST_FIELDS}, load)
+        return load()
     
     def list_videos(self, folder_id: str = None) -> List[Dict[str, Any]]:
         """List video files with formatted metadata."""
@@ -227,13 +284,10 @@ class GoogleDriveService:
     def get_file_info(self, file_id: str) -> Dict[str, Any]:
         """Get file information."""
         self._refresh_credentials_if_needed()
-        file_info = self.drive_service.files().get(
-            fileId=file_id,
-            fields=(
-                "id,name,mimeType,size,thumbnailLink,videoMediaMetadata,"
-                "webContentLink,webViewLink"
-            )
-        ).execute()
+        file_info = self._fetch_file_metadata(
+            file_id,
+            fields="id,name,mimeType,size,thumbnailLink,videoMediaMetadata,webContentLink,webViewLink",
+        )
 
         download_url = file_info.get('webContentLink')
         if not download_url:
@@ -252,6 +306,78 @@ class GoogleDriveService:
             'video_metadata': video_metadata,
         }
 
+    def get_media_info(self, file_id: str) -> Dict[str, Any]:
+        """Size, MIME type and content version of a file, as needed to proxy it."""
+        file_info = self._fetch_file_metadata(file_id, fields="id,mimeType,size,md5Checksum,modifiedTime")
+        return {
+            'size': int(file_info.get('size', 0) or 0),
+            'mime_type': file_info.get('mimeType') or 'video/mp4',
+            'version': file_info.get('md5Checksum') or file_info.get('modifiedTime') or '',
+        }
+
+    def fetch_range(self, file_id: str, start: int, end: int) -> bytes:
+        """Download bytes ``start``-``end`` (inclusive) of a file with one ranged request."""
+        self._refresh_credentials_if_needed()
+        url = f"https://www.googleapis.com/drive/v3/files/{file_id}?alt=media"
+
+        for attempt in range(2):
+            token = self.credentials.token
+            headers = {'Range': f'bytes={start}-{end}'}
+            self.credentials.apply(headers)
+            response = _http_session.get(url, headers=headers, timeout=30)
+
+            if response.status_code == HTTPStatus.UNAUTHORIZED and attempt == 0 and self.credentials.refresh_token:
+                logger.info("Google Drive token rejected, refreshing before retrying file %s", file_id)
+                self.refresh_credentials(stale_token=token)
+                continue
+
+            if response.status_code == HTTPStatus.PARTIAL_CONTENT:
+                return response.content
+            if response.status_code == HTTPStatus.OK:
+                # Upstream ignored the range and sent the whole file
+                return response.content[start:end + 1]
+            raise GoogleDriveServiceError(
+                f"Google Drive returned HTTP {response.status_code} for file '{file_id}'",
+                status_code=response.status_code,
+            )
+
+        raise GoogleDriveServiceError(
+            f"Google Drive rejected refreshed credentials for file '{file_id}'",
+            status_code=HTTPStatus.UNAUTHORIZED,
+        )
+
+    def get_start_page_token(self) -> str:
+        """Token from which ``list_changes`` reports later changes."""
+        self._refresh_credentials_if_needed()
+        return self.drive_service.changes().getStartPageToken().execute()['startPageToken']
+
+    def list_changes(self, page_token: str) -> Tuple[List[str], str]:
+        """
+        Ids of files changed since ``page_token`` and the token to resume from.
+        Raises ``GoogleDriveServiceError`` when the token can no longer be used.
+        """
+        self._refresh_credentials_if_needed()
+        file_ids = []
+        while True:
+            try:
+                response = self.drive_service.changes().list(
+                    pageToken=page_token,
+                    fields=CHANGE_FIELDS,
+                    pageSize=1000,
+                    includeRemoved=True,
+                    spaces='drive',
+                ).execute()
+            except Exception as exc:
+                raise GoogleDriveServiceError(
+                    "Unable to list Google Drive changes",
+                    status_code=self._extract_status_code(exc),
+                ) from exc
+
+            file_ids.extend(change['fileId'] for change in response.get('changes', []) if change.get('fileId'))
+            if 'newStartPageToken' in response:
+                return file_ids, response['newStartPageToken']
+            page_token = response['nextPageToken']
+
     def get_download_url(self, file_id: str) -> str:
         """Get download URL for a file (legacy - not for streaming)."""
         return f"https://drive.google.com/uc?export=download&id={file_id}"
@@ -351,6 +477,8 @@ class GoogleDriveService:
                 status_code=HTTPStatus.BAD_GATEWAY,
             )
 
+        if self.cache_scope is not None:
+            drive_metadata_cache.invalidate_files(self.cache_scope, [file_id])
         metadata = self._fetch_file_metadata(file_id)
         return self._build_file_payload(metadata)
 
@@ -367,6 +495,8 @@ class GoogleDriveService:
                 f"Failed to delete Google Drive file '{file_id}'",
                 status_code=status_code,
             ) from exc
+        if self.cache_scope is not None:
+            drive_metadata_cache.invalidate_files(self.cache_scope, [file_id])
 
         payload = self._build_file_payload(metadata)
         payload['deleted'] = True
@@ -375,13 +505,7 @@ class GoogleDriveService:
     def generate_streaming_url(self, file_id: str, force_refresh: bool = False) -> Dict[str, Any]:
         """Generate a streaming URL for a file."""
         if force_refresh and self.credentials and self.credentials.refresh_token:
-            try:
-                self.credentials.refresh(Request())
-                if self.on_credentials_updated:
-                    self.on_credentials_updated(self.credentials)
-            except Exception as exc:  # pragma: no cover - defensive logging
-                logger.error("Forced refresh of Google Drive credentials failed: %s", exc)
-                raise
+            self.refresh_credentials()
 
         self._refresh_credentials_if_needed()
 
@@ -400,8 +524,109 @@ class GoogleDriveService:
         return self._build_file_payload(metadata, streaming_url=streaming_url)
 
 
+@dataclass
+class _PooledDriveUser:
+    """Credentials shared by one user's clients, plus one built client per thread."""
+
+    refresh_token: str
+    credentials: Any = None
+    refresh_lock: threading.Lock = field(default_factory=threading.Lock)
+    clients: threading.local = field(default_factory=threading.local)
+    last_used: float = 0.0
+
+
+class DriveClientPool:
+    """
+    Process-wide reuse of Google Drive clients.
+
+    Building a client parses the discovery document and opens a new
+    transport, so clients are kept per user and handed out again. A user's
+    clients share one ``Credentials`` object and refresh lock, so concurrent
+    requests refresh an expired token once. The httplib2 transport behind a
+    built client is not thread-safe, so each thread gets its own client (and
+    keep-alive connections). Users idle for ``GOOGLE_DRIVE_CLIENT_IDLE_TTL``
+    seconds are evicted, as are the least recently used beyond
+    ``GOOGLE_DRIVE_CLIENT_POOL_SIZE``.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._users: Dict[Any, _PooledDriveUser] = {}
+        self._last_sweep = 0.0
+
+    @property
+    def idle_ttl(self) -> float:
+        return getattr(settings, 'GOOGLE_DRIVE_CLIENT_IDLE_TTL', 600)
+
+    @property
+    def max_users(self) -> int:
+        return getattr(settings, 'GOOGLE_DRIVE_CLIENT_POOL_SIZE', 1000)
+
+    def get(
+        self,
+        user_id: Any,
+        access_token: str,
+        refresh_token: str,
+        token_expiry=None,
+        on_credentials_updated: Optional[Callable] = None,
+    ) -> GoogleDriveService:
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now)
+            pooled = self._users.get(user_id)
+            if pooled is None or pooled.refresh_token != refresh_token:
+                # First use, or the user reconnected Drive with new tokens
+                pooled = _PooledDriveUser(refresh_token=refresh_token)
+                self._users[user_id] = pooled
+            pooled.last_used = now
+
+        def credentials_updated(credentials):
+            pooled.refresh_token = credentials.refresh_token
+            if on_credentials_updated:
+                on_credentials_updated(credentials)
+
+        service = getattr(pooled.clients, 'service', None)
+        if service is not None:
+            service.on_credentials_updated = credentials_updated
+            service._refresh_credentials_if_needed()
+            return service
+
+        service = GoogleDriveService(
+            access_token=access_token,
+            refresh_token=refresh_token,
+            token_expiry=token_expiry,
+            on_credentials_updated=credentials_updated,
+            credentials=pooled.credentials,
+            refresh_lock=pooled.refresh_lock,
+            cache_scope=user_id,
+        )
+        if pooled.credentials is None:
+            pooled.credentials = service.credentials
+        pooled.clients.service = service
+        return service
+
+    def evict(self, user_id: Any) -> None:
+        """Forget a user's clients and cached metadata, e.g. after Drive is disconnected."""
+        with self._lock:
+            self._users.pop(user_id, None)
+        drive_metadata_cache.forget(user_id)
+
+    def _sweep(self, now: float) -> None:
+        if now - self._last_sweep < 60 and len(self._users) <= self.max_users:
+            return
+        self._last_sweep = now
+        cutoff = now - self.idle_ttl
+        self._users = {user_id: pooled for user_id, pooled in self._users.items() if pooled.last_used >= cutoff}
+        if len(self._users) > self.max_users:
+            recent = sorted(self._users.items(), key=lambda item: item[1].last_used)[-self.max_users:]
+            self._users = dict(recent)
+
+
+drive_client_pool = DriveClientPool()
+
+
 def get_drive_service_for_user(user) -> GoogleDriveService:
-    """Get Google Drive service instance for a user."""
+    """Get a pooled Google Drive service instance for a user."""
     try:
         profile = user.profile
     except ObjectDoesNotExist as exc:
@@ -424,13 +649,16 @@ def get_drive_service_for_user(user) -> GoogleDriveService:
             if timezone.is_naive(expiry):
                 expiry = timezone.make_aware(expiry, timezone=dt.timezone.utc)
             profile.google_drive_token_expires_at = expiry
-        profile.save()
+        profile.save(update_fields=[
+            'google_drive_token', 'google_drive_refresh_token', 'google_drive_token_expires_at',
+        ])
     
-    return GoogleDriveService(
+    return drive_client_pool.get(
+        user.pk,
         access_token=profile.google_drive_token,
         refresh_token=profile.google_drive_refresh_token,
         token_expiry=profile.google_drive_token_expires_at,
-        on_credentials_updated=on_credentials_updated
+        on_credentials_updated=on_credentials_updated,
     )
 
 
@@ -0,0 +1,61 @@
+"""
+Celery tasks for the integrations app
+"""
+
+from http import HTTPStatus
+import logging
+
+from celery import shared_task
+from django.contrib.auth import get_user_model
+
+from shared.observability import observability
+from .services.drive_metadata_cache import drive_metadata_cache
+from .services.google_drive import GoogleDriveServiceError, get_drive_service_for_user
+
+logger = logging.getLogger(__name__)
+
+# Statuses Drive answers with for a page token it will not resume from
+EXPIRED_TOKEN_STATUSES = {HTTPStatus.BAD_REQUEST, HTTPStatus.NOT_FOUND, HTTPStatus.GONE}
+
+
+@shared_task(bind=True, max_retries=3)
+def poll_drive_changes(self):
+    """Invalidate cached Drive metadata from each active user's changes feed"""
+    User = get_user_model()
+    user_ids = User.objects.filter(profile__google_drive_connected=True).values_list('pk', flat=True)
+    active = drive_metadata_cache.active_scopes(user_ids.iterator())
+
+    changed = 0
+    for user in User.objects.filter(pk__in=active).select_related('profile'):
+        try:
+            with observability.span("drive.changes.poll"):
+                changed += sync_drive_changes(user)
+        except Exception as exc:
+            logger.warning(f"Failed to poll Google Drive changes for user {user.pk}: {exc}")
+
+    observability.record_metric("drive.changes.changed_files", changed)
+    return {'users': len(active), 'changed_files': changed}
+
+
+def sync_drive_changes(user) -> int:
+    """Apply one user's Drive changes to the metadata cache; returns the number of changed files"""
+    drive_service = get_drive_service_for_user(user)
+    page_token = drive_metadata_cache.get_page_token(user.pk)
+
+    if page_token is not None:
+        try:
+            file_ids, next_token = drive_service.list_changes(page_token)
+        except GoogleDriveServiceError as exc:
+            if exc.status_code not in EXPIRED_TOKEN_STATUSES:
+                raise
+            logger.info(f"Google Drive page token for user {user.pk} expired, resetting: {exc}")
+        else:
+            if file_ids:
+                drive_metadata_cache.invalidate_files(user.pk, file_ids)
+            drive_metadata_cache.set_page_token(user.pk, next_token)
+            return len(file_ids)
+
+    # Nothing cached so far is covered by a token, so start over from the current one
+    drive_metadata_cache.set_page_token(user.pk, drive_service.get_start_page_token())
+    drive_metadata_cache.invalidate_scope(user.pk)
+    return 0
@@ -0,0 +1,74 @@
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from apps.integrations.services.drive_metadata_cache import DriveMetadataCache
+from apps.integrations.services.google_drive import GoogleDriveService, GoogleDriveServiceError
+from apps.integrations.tasks import sync_drive_changes
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'drive-meta-tests'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class DriveMetadataCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.metadata_cache = DriveMetadataCache()
+
+    def test_service_reads_file_metadata_once_across_processes(self):
+        files_api = MagicMock()
+        files_api.get.return_value.execute.return_value = {
+            'id': 'file-1', 'name': 'Movie', 'mimeType': 'video/mp4', 'size': '10', 'md5Checksum': 'abc',
+        }
+        drive_service = MagicMock()
+        drive_service.files.return_value = files_api
+
+        with patch('apps.integrations.services.google_drive.drive_metadata_cache', self.metadata_cache):
+            service = GoogleDriveService(drive_service=drive_service, credentials=MagicMock(), cache_scope=7)
+            self.assertEqual(service.get_media_info('file-1')['version'], 'abc')
+            self.assertEqual(service.get_file_info('file-1')['name'], 'Movie')
+
+            # Another process: empty local LRU, same shared cache
+            self.metadata_cache._local.clear()
+            self.assertEqual(service.get_media_info('file-1')['size'], 10)
+
+        files_api.get.assert_called_once()
+
+    def test_changes_drop_changed_files_and_listings(self):
+        loader = MagicMock(side_effect=lambda: {'version': loader.call_count})
+
+        self.metadata_cache.get_file(1, 'a', loader)
+        self.metadata_cache.get_file(1, 'b', loader)
+        self.metadata_cache.get_listing(1, {'q': 'trashed=false'}, loader)
+        self.metadata_cache.get_file(2, 'a', loader)
+        self.assertEqual(loader.call_count, 4)
+
+        self.metadata_cache.invalidate_files(1, ['a'])
+        self.metadata_cache._local.clear()
+
+        self.assertEqual(self.metadata_cache.get_file(1, 'a', loader), {'version': 5})
+        self.assertEqual(self.metadata_cache.get_file(1, 'b', loader), {'version': 2})
+        self.assertEqual(self.metadata_cache.get_listing(1, {'q': 'trashed=false'}, loader), {'version': 6})
+        self.assertEqual(self.metadata_cache.get_file(2, 'a', loader), {'version': 4})
+
+        self.metadata_cache.invalidate_scope(1)
+        self.assertEqual(self.metadata_cache.get_file(1, 'b', loader), {'version': 7})
+
+    def test_expired_page_token_resets_user_cache(self):
+        user = MagicMock(pk=3)
+        drive_service = MagicMock()
+        drive_service.list_changes.side_effect = GoogleDriveServiceError('gone', status_code=404)
+        drive_service.get_start_page_token.return_value = 'token-2'
+        loader = MagicMock(return_value={'id': 'a'})
+
+        with patch('apps.integrations.tasks.drive_metadata_cache', self.metadata_cache), \
+                patch('apps.integrations.tasks.get_drive_service_for_user', return_value=drive_service):
+            self.metadata_cache.get_file(3, 'a', loader)
+            self.metadata_cache.set_page_token(3, 'token-1')
+
+            self.assertEqual(sync_drive_changes(user), 0)
+
+        self.assertEqual(self.metadata_cache.get_page_token(3), 'token-2')
+        self.metadata_cache.get_file(3, 'a', loader)
+        self.assertEqual(loader.call_count, 2)
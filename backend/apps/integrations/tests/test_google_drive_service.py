@@ -1,3 +1,4 @@
+import threading
 from datetime import timedelta
 from unittest.mock import MagicMock, patch
 
@@ -7,6 +8,7 @@ from django.utils import timezone
 
 from apps.authentication.models import UserProfile
 from apps.integrations.services.google_drive import (
+    DriveClientPool,
     GoogleDriveService,
     GoogleDriveServiceError,
     get_drive_service_for_user,
@@ -383,3 +385,53 @@ class GoogleDriveServiceUnitTests(TestCase):
         credentials.refresh.assert_called_once()
         self.assertEqual(captured['token'], 'refreshed-token')
         self.assertEqual(captured['expiry'], refreshed_expiry)
+
+    def test_clients_sharing_credentials_refresh_stale_token_once(self):
+        credentials = MagicMock()
+        credentials.token = 'stale-token'
+
+        def refresh(_request):
+            credentials.token = 'fresh-token'
+
+        credentials.refresh.side_effect = refresh
+        lock = threading.Lock()
+        first = GoogleDriveService(credentials=credentials, drive_service=MagicMock(), refresh_lock=lock)
+        second = GoogleDriveService(credentials=credentials, drive_service=MagicMock(), refresh_lock=lock)
+
+        first.refresh_credentials(stale_token='stale-token')
+        second.refresh_credentials(stale_token='stale-token')
+
+        credentials.refresh.assert_called_once()
+
+
+class DriveClientPoolTests(TestCase):
+    @patch('apps.integrations.services.google_drive.GoogleDriveService')
+    def test_clients_are_reused_per_user_until_tokens_change(self, service_cls):
+        service_cls.side_effect = lambda **kwargs: MagicMock(credentials=kwargs['credentials'] or MagicMock())
+        pool = DriveClientPool()
+
+        first = pool.get(1, 'token', 'refresh')
+        self.assertIs(pool.get(1, 'token', 'refresh'), first)
+        self.assertEqual(service_cls.call_count, 1)
+
+        reconnected = pool.get(1, 'token-2', 'refresh-2')
+        self.assertIsNot(reconnected, first)
+
+        other_user = pool.get(2, 'token', 'refresh')
+        self.assertIsNot(other_user, reconnected)
+        self.assertEqual(service_cls.call_count, 3)
+
+    @patch('apps.integrations.services.google_drive.GoogleDriveService')
+    def test_threads_get_own_clients_with_shared_credentials(self, service_cls):
+        service_cls.side_effect = lambda **kwargs: MagicMock(credentials=kwargs['credentials'] or MagicMock())
+        pool = DriveClientPool()
+        main = pool.get(1, 'token', 'refresh')
+
+        results = []
+        worker = threading.Thread(target=lambda: results.append(pool.get(1, 'token', 'refresh')))
+        worker.start()
+        worker.join()
+
+        self.assertIsNot(results[0], main)
+        self.assertIs(results[0].credentials, main.credentials)
+        self.assertIs(service_cls.call_args.kwargs['refresh_lock'], service_cls.call_args_list[0].kwargs['refresh_lock'])
@@ -20,7 +20,7 @@ from shared.responses import StandardResponse
 from shared.api_documentation import api_response_documentation
 from shared.integrations import integration_manager, IntegrationType
 from apps.authentication.views import GoogleDriveAuthView
-from apps.integrations.services import GoogleDriveService, get_drive_service_for_user
+from apps.integrations.services import GoogleDriveService, drive_client_pool, get_drive_service_for_user
 from .models import UserServiceConnection, ExternalService
 from .serializers import IntegrationStatusResponseSerializer, IntegrationManagementResponseSerializer
 
@@ -870,6 +870,7 @@ def disconnect_service(request, connection_id):
 
     profile = _get_or_create_profile(request.user)
     if connection.service and connection.service.name == 'google_drive':
+        drive_client_pool.evict(request.user.pk)
         profile_updates = []
         if profile.google_drive_connected:
             profile.google_drive_connected = False
@@ -12,6 +12,7 @@ from django.utils import timezone
 from django.db.models import Q, Count
 from drf_spectacular.utils import extend_schema
 from datetime import timedelta
+from shared.pagination import NotificationPagination
 from shared.permissions import IsAdminUser
 from .models import Notification, NotificationPreferences, NotificationTemplate, NotificationDelivery
 from .serializers import (
@@ -27,6 +28,7 @@ class NotificationListView(generics.ListAPIView):
     
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = NotificationPagination
     
     def get_queryset(self):
         # Handle schema generation when there's no user
@@ -63,7 +65,7 @@ class NotificationListView(generics.ListAPIView):
             except ValueError:
                 pass
         
-        return queryset.order_by('-created_at')
+        return queryset.order_by('-created_at', '-id')
 
 
 class NotificationDetailView(generics.RetrieveAPIView):
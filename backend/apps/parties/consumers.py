@@ -10,13 +10,19 @@ from channels.db import database_sync_to_async
 from django.contrib.auth.models import AnonymousUser
 from django.contrib.auth import get_user_model
 from django.utils import timezone
+
+from shared.services.party_access_service import party_access_service
+from shared.services.user_card_service import user_card_service
+from shared.websocket_broadcast import BatchedBroadcastMixin, frame_event, party_broadcaster
 from .models import WatchParty, PartyParticipant, PartyReaction
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
 
+USER_CARD_FIELDS = ('id', 'username', 'first_name', 'last_name', 'avatar')
+
 
-class PartyConsumer(AsyncWebsocketConsumer):
+class PartyConsumer(BatchedBroadcastMixin, AsyncWebsocketConsumer):
     """
     WebSocket consumer for watch party functionality
     
@@ -88,12 +94,12 @@ class PartyConsumer(AsyncWebsocketConsumer):
             # Notify others that user joined
             await self.channel_layer.group_send(
                 self.party_group_name,
-                {
+                frame_event('user_joined', {
                     'type': 'user_joined',
                     'user': await self.get_user_data(self.user),
                     'timestamp': timezone.now().isoformat(),
                     'participant_count': await self.get_participant_count()
-                }
+                })
             )
             
             logger.info(f"User {self.user.id} connected to party {self.party_id}")
@@ -113,12 +119,12 @@ class PartyConsumer(AsyncWebsocketConsumer):
                 # Notify others that user left
                 await self.channel_layer.group_send(
                     self.party_group_name,
-                    {
+                    frame_event('user_left', {
                         'type': 'user_left',
                         'user': await self.get_user_data(self.user),
                         'timestamp': timezone.now().isoformat(),
                         'participant_count': await self.get_participant_count()
-                    }
+                    })
                 )
                 
                 # Leave party group
@@ -194,13 +200,13 @@ class PartyConsumer(AsyncWebsocketConsumer):
             # Broadcast control to all participants
             await self.channel_layer.group_send(
                 self.party_group_name,
-                {
-                    'type': 'video_control_broadcast',
+                frame_event('video_control_broadcast', {
+                    'type': 'video_control',
                     'action': action,
                     'video_time': video_time,
                     'timestamp': timestamp or timezone.now().isoformat(),
                     'user': await self.get_user_data(self.user)
-                }
+                })
             )
             
         except Exception as e:
@@ -238,11 +244,12 @@ class PartyConsumer(AsyncWebsocketConsumer):
                 self.user, self.party, emoji, video_timestamp, x_position, y_position
             )
             
-            # Broadcast reaction to all participants
-            await self.channel_layer.group_send(
+            # Broadcast reaction to all participants (batched fan-out)
+            await party_broadcaster.publish(
+                self.channel_layer,
                 self.party_group_name,
-                {
-                    'type': 'reaction_broadcast',
+                frame_event('reaction_broadcast', {
+                    'type': 'reaction',
                     'reaction': {
                         'id': str(reaction.id),
                         'emoji': emoji,
@@ -252,7 +259,8 @@ class PartyConsumer(AsyncWebsocketConsumer):
                         'user': await self.get_user_data(self.user),
                         'created_at': reaction.created_at.isoformat()
                     }
-                }
+                }),
+                ephemeral=True,
             )
             
         except Exception as e:
@@ -277,14 +285,14 @@ class PartyConsumer(AsyncWebsocketConsumer):
             # Broadcast chat message to all participants
             await self.channel_layer.group_send(
                 self.party_group_name,
-                {
-                    'type': 'chat_message_broadcast',
+                frame_event('chat_message_broadcast', {
+                    'type': 'chat_message',
                     'message': {
                         'content': content,
                         'user': await self.get_user_data(self.user),
                         'timestamp': timezone.now().isoformat()
                     }
-                }
+                })
             )
             
         except Exception as e:
@@ -294,15 +302,19 @@ class PartyConsumer(AsyncWebsocketConsumer):
         """Handle typing indicators"""
         is_typing = data.get('is_typing', False)
         
-        # Broadcast typing status to all participants except sender
-        await self.channel_layer.group_send(
+        # Broadcast typing status to all participants except sender; repeated
+        # updates from the same user within one window collapse to the latest
+        await party_broadcaster.publish(
+            self.channel_layer,
             self.party_group_name,
-            {
-                'type': 'typing_indicator',
+            frame_event('typing_indicator', {
+                'type': 'typing',
                 'user': await self.get_user_data(self.user),
                 'is_typing': is_typing,
                 'timestamp': timezone.now().isoformat()
-            }
+            }, sender_id=str(self.user.id)),
+            ephemeral=True,
+            coalesce_key=f"typing:{self.user.id}",
         )
     
     async def handle_ping(self):
@@ -313,58 +325,22 @@ class PartyConsumer(AsyncWebsocketConsumer):
         }))
     
     # Group message handlers
-    async def video_control_broadcast(self, event):
-        """Send video control to WebSocket"""
-        await self.send(text_data=json.dumps({
-            'type': 'video_control',
-            'action': event['action'],
-            'video_time': event['video_time'],
-            'timestamp': event['timestamp'],
-            'user': event['user']
-        }))
+    # Payloads are encoded once by the sender; handlers forward the frame as-is.
+    async def forward_frame(self, event):
+        """Forward a pre-encoded broadcast frame to the WebSocket"""
+        await self.send(text_data=event['frame'])
     
-    async def reaction_broadcast(self, event):
-        """Send reaction to WebSocket"""
-        await self.send(text_data=json.dumps({
-            'type': 'reaction',
-            'reaction': event['reaction']
-        }))
-    
-    async def chat_message_broadcast(self, event):
-        """Send chat message to WebSocket"""
-        await self.send(text_data=json.dumps({
-            'type': 'chat_message',
-            'message': event['message']
-        }))
+    video_control_broadcast = forward_frame
+    reaction_broadcast = forward_frame
+    chat_message_broadcast = forward_frame
+    user_joined = forward_frame
+    user_left = forward_frame
     
     async def typing_indicator(self, event):
         """Send typing indicator to WebSocket"""
         # Don't send typing indicator to the user who is typing
-        if event['user']['id'] != str(self.user.id):
-            await self.send(text_data=json.dumps({
-                'type': 'typing',
-                'user': event['user'],
-                'is_typing': event['is_typing'],
-                'timestamp': event['timestamp']
-            }))
-    
-    async def user_joined(self, event):
-        """Send user joined notification to WebSocket"""
-        await self.send(text_data=json.dumps({
-            'type': 'user_joined',
-            'user': event['user'],
-            'timestamp': event['timestamp'],
-            'participant_count': event['participant_count']
-        }))
-    
-    async def user_left(self, event):
-        """Send user left notification to WebSocket"""
-        await self.send(text_data=json.dumps({
-            'type': 'user_left',
-            'user': event['user'],
-            'timestamp': event['timestamp'],
-            'participant_count': event['participant_count']
-        }))
+        if event['sender_id'] != str(self.user.id):
+            await self.send(text_data=event['frame'])
     
     async def party_update(self, event):
         """Send party state update to WebSocket"""
@@ -383,10 +359,8 @@ class PartyConsumer(AsyncWebsocketConsumer):
     @database_sync_to_async
     def check_user_access(self, user, party):
         """Check if user has access to the party"""
-        return (
-            party.host == user or 
-            party.participants.filter(user=user, is_active=True).exists()
-        )
+        access = party_access_service.lookup(party.id, user.id)
+        return access.allows(require_active=True, allow_public=False)
     
     @database_sync_to_async
     def check_control_permission(self, user, party):
@@ -447,16 +421,9 @@ class PartyConsumer(AsyncWebsocketConsumer):
             y_position=y_position
         )
     
-    @database_sync_to_async
-    def get_user_data(self, user):
-        """Get serialized user data"""
-        return {
-            'id': str(user.id),
-            'username': user.username,
-            'first_name': user.first_name,
-            'last_name': user.last_name,
-            'avatar': user.avatar.url if user.avatar else None
-        }
+    async def get_user_data(self, user):
+        """Get serialized user data from the cached user card"""
+        return await user_card_service.aget_card(user, USER_CARD_FIELDS)
     
     @database_sync_to_async
     def get_party_state(self):
@@ -532,11 +499,11 @@ class PartyLobbyConsumer(AsyncWebsocketConsumer):
             # Notify others that user joined lobby
             await self.channel_layer.group_send(
                 self.lobby_group_name,
-                {
-                    'type': 'user_joined_lobby',
+                frame_event('user_joined_lobby', {
+                    'type': 'user_joined',
                     'user': await self.get_user_data(self.user),
                     'timestamp': timezone.now().isoformat()
-                }
+                })
             )
             
             logger.info(f"User {self.user.id} joined lobby for party {self.party_id}")
@@ -552,11 +519,11 @@ class PartyLobbyConsumer(AsyncWebsocketConsumer):
                 # Notify others that user left lobby
                 await self.channel_layer.group_send(
                     self.lobby_group_name,
-                    {
-                        'type': 'user_left_lobby',
+                    frame_event('user_left_lobby', {
+                        'type': 'user_left',
                         'user': await self.get_user_data(self.user),
                         'timestamp': timezone.now().isoformat()
-                    }
+                    })
                 )
                 
                 # Leave lobby group
@@ -606,14 +573,14 @@ class PartyLobbyConsumer(AsyncWebsocketConsumer):
         # Broadcast chat message to all lobby participants
         await self.channel_layer.group_send(
             self.lobby_group_name,
-            {
-                'type': 'lobby_chat_broadcast',
+            frame_event('lobby_chat_broadcast', {
+                'type': 'chat_message',
                 'message': {
                     'content': content,
                     'user': await self.get_user_data(self.user),
                     'timestamp': timezone.now().isoformat()
                 }
-            }
+            })
         )
     
     async def handle_ready_status(self, data):
@@ -623,12 +590,12 @@ class PartyLobbyConsumer(AsyncWebsocketConsumer):
         # Broadcast ready status to all lobby participants
         await self.channel_layer.group_send(
             self.lobby_group_name,
-            {
-                'type': 'ready_status_broadcast',
+            frame_event('ready_status_broadcast', {
+                'type': 'ready_status',
                 'user': await self.get_user_data(self.user),
                 'is_ready': is_ready,
                 'timestamp': timezone.now().isoformat()
-            }
+            })
         )
     
     async def handle_ping(self):
@@ -639,37 +606,14 @@ class PartyLobbyConsumer(AsyncWebsocketConsumer):
         }))
     
     # Group message handlers
-    async def user_joined_lobby(self, event):
-        """Send user joined lobby notification"""
-        await self.send(text_data=json.dumps({
-            'type': 'user_joined',
-            'user': event['user'],
-            'timestamp': event['timestamp']
-        }))
+    async def forward_frame(self, event):
+        """Forward a pre-encoded broadcast frame to the WebSocket"""
+        await self.send(text_data=event['frame'])
     
-    async def user_left_lobby(self, event):
-        """Send user left lobby notification"""
-        await self.send(text_data=json.dumps({
-            'type': 'user_left',
-            'user': event['user'],
-            'timestamp': event['timestamp']
-        }))
-    
-    async def lobby_chat_broadcast(self, event):
-        """Send lobby chat message"""
-        await self.send(text_data=json.dumps({
-            'type': 'chat_message',
-            'message': event['message']
-        }))
-    
-    async def ready_status_broadcast(self, event):
-        """Send ready status update"""
-        await self.send(text_data=json.dumps({
-            'type': 'ready_status',
-            'user': event['user'],
-            'is_ready': event['is_ready'],
-            'timestamp': event['timestamp']
-        }))
+    user_joined_lobby = forward_frame
+    user_left_lobby = forward_frame
+    lobby_chat_broadcast = forward_frame
+    ready_status_broadcast = forward_frame
     
     async def party_started(self, event):
         """Send party started notification"""
@@ -688,22 +632,11 @@ class PartyLobbyConsumer(AsyncWebsocketConsumer):
     @database_sync_to_async
     def check_user_access(self, user, party):
         """Check if user has access to the party lobby"""
-        return (
-            party.host == user or 
-            party.participants.filter(user=user).exists() or
-            party.visibility == 'public'
-        )
+        return party_access_service.lookup(party.id, user.id).allows()
     
-    @database_sync_to_async
-    def get_user_data(self, user):
-        """Get serialized user data"""
-        return {
-            'id': str(user.id),
-            'username': user.username,
-            'first_name': user.first_name,
-            'last_name': user.last_name,
-            'avatar': user.avatar.url if user.avatar else None
-        }
+    async def get_user_data(self, user):
+        """Get serialized user data from the cached user card"""
+        return await user_card_service.aget_card(user, USER_CARD_FIELDS)
     
     @database_sync_to_async
     def get_lobby_state(self):
@@ -27,6 +27,7 @@ from .serializers import (
     PartyParticipantSerializer
 )
 from shared.permissions import IsHostOrReadOnly
+from shared.services.party_access_service import party_access_service
 
 
 class WatchPartyViewSet(ModelViewSet):
@@ -78,6 +79,16 @@ class WatchPartyViewSet(ModelViewSet):
             Q(visibility='friends', host__id__in=friend_user_ids)
         ).distinct()
     
+    def perform_update(self, serializer):
+        party = serializer.save()
+        # Visibility or host may have changed
+        party_access_service.invalidate(party.id)
+    
+    def perform_destroy(self, instance):
+        party_id = instance.id
+        instance.delete()
+        party_access_service.invalidate(party_id)
+    
     @action(detail=True, methods=['post'])
     def join(self, request, pk=None):
         """Join a watch party"""
@@ -106,6 +117,8 @@ class WatchPartyViewSet(ModelViewSet):
                 participant.status = 'pending' if party.require_approval else 'approved'
                 participant.save()
         
+        party_access_service.set_participant(party.id, user.id)
+        
         # Set status based on party settings
         if party.require_approval and user != party.host:
             participant.status = 'pending'
@@ -126,6 +139,7 @@ class WatchPartyViewSet(ModelViewSet):
             participant.status = 'left'
             participant.left_at = timezone.now()
             participant.save()
+            party_access_service.set_participant(party.id, user.id, is_active=False)
             
             return Response({'message': 'Successfully left party'})
         
@@ -621,6 +635,7 @@ class PartyInvitationViewSet(ModelViewSet):
             user=invitation.invitee,
             defaults={'is_active': True, 'status': 'approved'}
         )
+        party_access_service.set_participant(invitation.party_id, invitation.invitee_id)
         
         return Response({'message': 'Invitation accepted'})
     
@@ -674,6 +689,7 @@ class PartyInvitationViewSet(ModelViewSet):
         if not created:
             participant.is_active = True
             participant.save()
+        party_access_service.set_participant(party.id, user.id)
         
         return Response({'message': 'Successfully joined party'}, status=status.HTTP_200_OK)
     
@@ -732,7 +748,9 @@ class PartyInvitationViewSet(ModelViewSet):
                 return Response({'error': 'Cannot kick yourself'}, status=status.HTTP_400_BAD_REQUEST)
             
             participant.is_active = False
+            participant.status = 'kicked'
             participant.save()
+            party_access_service.remove_participant(party.id, participant.user_id)
             
             # TODO: Send notification to kicked user
             # TODO: Broadcast to WebSocket that user was kicked
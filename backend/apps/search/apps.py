@@ -0,0 +1,13 @@
+# Search app
+from django.apps import AppConfig
+
+
+class SearchConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.search'
+
+    def ready(self):
+        from .autocomplete import connect_autocomplete_signals
+        from .indexing import connect_search_index_signals
+        connect_search_index_signals()
+        connect_autocomplete_signals()
@@ -0,0 +1,500 @@
+"""
+Prefix completion index for search autocomplete
+"""
+
+import heapq
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from shared.redis_client import get_redis_client, make_cache_key
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = 'autocomplete:generation'
+DIRTY_KEY = 'autocomplete:dirty'
+ALL = 'all'
+TRENDING = 'trending'
+
+Entry = Tuple[float, Dict[str, Any]]
+
+
+def normalize(text: Any) -> str:
+    return ' '.join(str(text).lower().split())
+
+
+def _deletes(value: str) -> set:
+    return {value[:i] + value[i + 1:] for i in range(len(value))}
+
+
+class AutocompleteIndex:
+    """
+    Completion buckets for ``SearchSuggestionsView``.
+
+    Every prefix (of the whole text and of each later word) maps to a bucket
+    holding the top ``AUTOCOMPLETE_BUCKET_SIZE`` entries by weight, where the
+    weight is the suggestion's popularity and clicks plus its recent
+    ``TrendingQuery`` counts. Typos are handled symspell-style: prefixes of the
+    leading words also land in single-deletion buckets, so a query one edit
+    away from an indexed prefix is answered with a handful of extra bucket
+    reads instead of a scan. Buckets live in Redis sorted sets (the Django
+    cache without Redis) under a generation number, so a full rebuild swaps
+    in atomically. Between rebuilds, saving or deleting a suggestion or
+    trending query queues its text and ``refresh_autocomplete_terms`` upserts
+    or removes the queued entries in the live generation.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._generation: Optional[str] = None
+        self._generation_read_at = 0.0
+
+    @property
+    def max_prefix(self) -> int:
+        return getattr(settings, 'AUTOCOMPLETE_MAX_PREFIX', 20)
+
+    @property
+    def fuzzy_min(self) -> int:
+        return getattr(settings, 'AUTOCOMPLETE_FUZZY_MIN_LENGTH', 4)
+
+    @property
+    def fuzzy_max(self) -> int:
+        return getattr(settings, 'AUTOCOMPLETE_FUZZY_MAX_LENGTH', 12)
+
+    @property
+    def bucket_size(self) -> int:
+        return getattr(settings, 'AUTOCOMPLETE_BUCKET_SIZE', 20)
+
+    @property
+    def max_terms(self) -> int:
+        return getattr(settings, 'AUTOCOMPLETE_MAX_TERMS', 10000)
+
+    @property
+    def trending_days(self) -> int:
+        return getattr(settings, 'AUTOCOMPLETE_TRENDING_DAYS', 7)
+
+    @property
+    def ttl(self) -> int:
+        return getattr(settings, 'AUTOCOMPLETE_CACHE_TTL', 3 * 86400)
+
+    # ------------------------------------------------------------------
+    # Bucket layout
+    # ------------------------------------------------------------------
+    def prefix_buckets(self, text: str) -> set:
+        buckets = set()
+        start = 0
+        for word in text.split(' '):
+            suffix = text[start:]
+            for length in range(2, min(len(suffix), self.max_prefix) + 1):
+                buckets.add('p:' + suffix[:length])
+            start += len(word) + 1
+        return buckets
+
+    def fuzzy_buckets(self, text: str) -> set:
+        buckets = set()
+        for length in range(self.fuzzy_min, min(len(text), self.fuzzy_max + 1) + 1):
+            for deleted in _deletes(text[:length]):
+                buckets.add('d:' + deleted)
+        return buckets
+
+    def query_buckets(self, text: str, fuzzy: bool = True) -> Tuple[List[str], List[str]]:
+        """Exact prefix bucket plus the buckets of everything one edit away"""
+        exact = ['p:' + text]
+        if not fuzzy or not self.fuzzy_min <= len(text) <= self.fuzzy_max:
+            return exact, []
+        near = ['d:' + text]
+        for deleted in sorted(_deletes(text)):
+            near += ['p:' + deleted, 'd:' + deleted]
+        return exact, near
+
+    def build(self, entries: Dict[str, Entry]) -> Dict[str, List[Tuple[str, float]]]:
+        """Top-k members per bucket key for ``entries``"""
+        buckets = defaultdict(list)
+        for member, (score, _payload) in entries.items():
+            for key in self._entry_keys(member):
+                buckets[key].append((member, score))
+        return {
+            key: heapq.nlargest(self.bucket_size, members, key=lambda item: item[1])
+            for key, members in buckets.items()
+        }
+
+    def _entry_keys(self, member: str) -> set:
+        entry_type, text = member.split(':', 1)
+        keys = set()
+        for bucket in self.prefix_buckets(text):
+            keys.add(f"{ALL}:{bucket}")
+            keys.add(f"{entry_type}:{bucket}")
+        for bucket in self.fuzzy_buckets(text):
+            keys.add(f"{ALL}:{bucket}")
+        return keys
+
+    # ------------------------------------------------------------------
+    # Source data
+    # ------------------------------------------------------------------
+    def load_entries(self, texts: Optional[Iterable[str]] = None) -> Dict[str, Entry]:
+        """Weighted entries from active suggestions and recent trending queries"""
+        from .models import SearchSuggestion, TrendingQuery
+
+        since = timezone.now().date() - timedelta(days=self.trending_days)
+        trending_queries = TrendingQuery.objects.filter(period='daily', date__gte=since)
+        suggestions = SearchSuggestion.objects.filter(is_active=True)
+        if texts is not None:
+            lowered = list({str(text).lower() for text in texts})
+            trending_queries = trending_queries.annotate(lowered=Lower('query')).filter(lowered__in=lowered)
+            suggestions = suggestions.annotate(lowered=Lower('text')).filter(lowered__in=lowered)
+
+        trending = defaultdict(int)
+        for query, search_count in trending_queries.values_list('query', 'search_count').iterator():
+            text = normalize(query)
+            if text:
+                trending[text] += search_count
+
+        entries: Dict[str, Entry] = {}
+        covered = set()
+        for suggestion in suggestions.order_by('-popularity_score', '-click_count')[:self.max_terms].iterator():
+            text = normalize(suggestion.text)
+            if not text:
+                continue
+            covered.add(text)
+            score = suggestion.popularity_score + suggestion.click_count + trending.get(text, 0)
+            entries[f"{suggestion.suggestion_type}:{text}"] = (score, {
+                'id': str(suggestion.id),
+                'text': suggestion.text,
+                'type': suggestion.suggestion_type,
+                'popularity_score': suggestion.popularity_score,
+                'click_count': suggestion.click_count,
+                'metadata': suggestion.metadata,
+            })
+
+        for text, search_count in trending.items():
+            if text not in covered:
+                entries[f"{TRENDING}:{text}"] = (float(search_count), {
+                    'text': text,
+                    'type': TRENDING,
+                    'popularity_score': search_count,
+                    'metadata': {'search_count': search_count},
+                })
+
+        if len(entries) > self.max_terms:
+            kept = heapq.nlargest(self.max_terms, entries.items(), key=lambda item: item[1][0])
+            entries = dict(kept)
+        return entries
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+    def rebuild(self) -> int:
+        """Build a fresh generation from the database and switch reads to it"""
+        entries = self.load_entries()
+        generation = str(int(time.time() * 1000))
+        previous = self._read_generation()
+
+        self._write_generation_data(generation, self.build(entries), entries)
+        self._write_generation(generation)
+        if previous and previous != generation:
+            self._drop_generation(previous)
+        return len(entries)
+
+    def refresh_terms(self, texts: Iterable[str]) -> int:
+        """
+        Upsert the entries for ``texts`` into the live generation and drop the
+        ones whose suggestion was deactivated, deleted or retyped
+        """
+        from .models import SearchSuggestion
+
+        generation = self._read_generation()
+        if generation is None:
+            return self.rebuild()
+        texts = list(texts)
+        entries = self.load_entries(texts)
+        if entries:
+            self._upsert(generation, entries)
+
+        entry_types = {entry_type for entry_type, _label in SearchSuggestion.SUGGESTION_TYPES} | {TRENDING}
+        stale = [
+            f"{entry_type}:{text}"
+            for text in {normalize(text) for text in texts} if text
+            for entry_type in sorted(entry_types)
+            if f"{entry_type}:{text}" not in entries
+        ]
+        self._remove(generation, stale)
+        return len(entries)
+
+    def mark_dirty(self, text: Any) -> None:
+        """Queue ``text`` for the next ``refresh_autocomplete_terms`` run"""
+        value = str(text).strip().lower()
+        if not value:
+            return
+        client = get_redis_client()
+        if client is not None:
+            try:
+                client.sadd(make_cache_key(DIRTY_KEY), value)
+                return
+            except Exception as exc:
+                logger.warning(f"Failed to queue autocomplete term {value!r}: {exc}")
+        with self._lock:
+            dirty = set(cache.get(DIRTY_KEY) or [])
+            dirty.add(value)
+            cache.set(DIRTY_KEY, dirty, timeout=None)
+
+    def pop_dirty(self, batch_size: int) -> List[str]:
+        """Take up to ``batch_size`` queued texts"""
+        client = get_redis_client()
+        if client is not None:
+            try:
+                texts = client.spop(make_cache_key(DIRTY_KEY), batch_size) or []
+                return [value.decode() if isinstance(value, bytes) else value for value in texts]
+            except Exception as exc:
+                logger.warning(f"Failed to read autocomplete queue: {exc}")
+        with self._lock:
+            dirty = list(cache.get(DIRTY_KEY) or [])
+            batch, rest = dirty[:batch_size], dirty[batch_size:]
+            cache.set(DIRTY_KEY, set(rest), timeout=None)
+            return batch
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+    def complete(self, query: str, suggestion_type: str = ALL, limit: int = 10,
+                 fuzzy: bool = True) -> Optional[List[Dict[str, Any]]]:
+        """
+        Top ``limit`` completions for ``query``; exact prefix matches rank
+        ahead of typo matches. Returns ``None`` while no index is built.
+        """
+        generation = self._current_generation()
+        if generation is None:
+            return None
+
+        full_text = normalize(query)
+        text = full_text[:self.max_prefix]
+        exact, near = self.query_buckets(text, fuzzy)
+        keys = [f"{suggestion_type}:{bucket}" for bucket in exact] + [f"{ALL}:{bucket}" for bucket in near]
+        ranked = self._read_buckets(generation, keys)
+
+        members = [member for member, _score in ranked[0]]
+        near_hits = sorted((hit for hits in ranked[1:] for hit in hits), key=lambda item: -item[1])
+        for member, _score in near_hits:
+            if suggestion_type != ALL and not member.startswith(suggestion_type + ':'):
+                continue
+            if member not in members:
+                members.append(member)
+
+        # Payloads are read a batch at a time until ``limit`` survive deduplication and filtering
+        results = []
+        seen = set()
+        batch_size = max(limit * 2, 1)
+        for start in range(0, len(members), batch_size):
+            batch = members[start:start + batch_size]
+            payloads = self._read_payloads(generation, batch)
+            for member in batch:
+                payload = payloads.get(member)
+                if payload is None:
+                    continue
+                candidate = normalize(payload['text'])
+                if candidate in seen or (len(full_text) > self.max_prefix and full_text not in candidate):
+                    continue
+                seen.add(candidate)
+                results.append(payload)
+                if len(results) >= limit:
+                    return results
+        return results
+
+    # ------------------------------------------------------------------
+    # Backends
+    # ------------------------------------------------------------------
+    def _key(self, generation: str, name: str) -> str:
+        return f"autocomplete:{generation}:{quote(name)}"
+
+    def _current_generation(self) -> Optional[str]:
+        """Generation pointer, re-read at most once a second per process"""
+        now = time.monotonic()
+        if now - self._generation_read_at > 1.0:
+            self._generation = self._read_generation()
+            self._generation_read_at = now
+        return self._generation
+
+    def _read_generation(self) -> Optional[str]:
+        client = get_redis_client()
+        if client is not None:
+            try:
+                value = client.get(make_cache_key(GENERATION_KEY))
+                return value.decode() if isinstance(value, bytes) else value
+            except Exception as exc:
+                logger.warning(f"Autocomplete generation read failed, using cache: {exc}")
+        return cache.get(GENERATION_KEY)
+
+    def _write_generation(self, generation: str) -> None:
+        self._generation, self._generation_read_at = generation, time.monotonic()
+        client = get_redis_client()
+        if client is not None:
+            try:
+                client.set(make_cache_key(GENERATION_KEY), generation)
+                return
+            except Exception as exc:
+                logger.warning(f"Autocomplete generation write failed, using cache: {exc}")
+        cache.set(GENERATION_KEY, generation, timeout=self.ttl)
+
+    def _write_generation_data(self, generation: str, buckets: Dict[str, List[Tuple[str, float]]],
+                               entries: Dict[str, Entry]) -> None:
+        payloads = {member: json.dumps(payload) for member, (_score, payload) in entries.items()}
+        client = get_redis_client()
+        if client is not None:
+            try:
+                pipe = client.pipeline(transaction=False)
+                for index, (key, members) in enumerate(buckets.items(), start=1):
+                    pipe.zadd(make_cache_key(self._key(generation, key)), dict(members))
+                    if index % 1000 == 0:
+                        pipe.execute()
+                if payloads:
+                    pipe.hset(make_cache_key(self._key(generation, 'payloads')), mapping=payloads)
+                pipe.execute()
+                return
+            except Exception as exc:
+                logger.warning(f"Autocomplete index write failed, using cache: {exc}")
+
+        values = {self._key(generation, key): members for key, members in buckets.items()}
+        values.update({self._key(generation, 'payload:' + member): payload for member, payload in payloads.items()})
+        cache.set_many(values, timeout=self.ttl)
+
+    def _upsert(self, generation: str, entries: Dict[str, Entry]) -> None:
+        client = get_redis_client()
+        if client is not None:
+            try:
+                pipe = client.pipeline(transaction=False)
+                for member, (score, payload) in entries.items():
+                    pipe.hset(make_cache_key(self._key(generation, 'payloads')), member, json.dumps(payload))
+                    for key in self._entry_keys(member):
+                        redis_key = make_cache_key(self._key(generation, key))
+                        pipe.zadd(redis_key, {member: score})
+                        pipe.zremrangebyrank(redis_key, 0, -(self.bucket_size + 1))
+                pipe.execute()
+                return
+            except Exception as exc:
+                logger.warning(f"Autocomplete index update failed, using cache: {exc}")
+
+        with self._lock:
+            for member, (score, payload) in entries.items():
+                keys = [self._key(generation, key) for key in self._entry_keys(member)]
+                current = cache.get_many(keys)
+                updated = {}
+                for key in keys:
+                    members = [item for item in current.get(key, []) if item[0] != member]
+                    members.append((member, score))
+                    updated[key] = heapq.nlargest(self.bucket_size, members, key=lambda item: item[1])
+                updated[self._key(generation, 'payload:' + member)] = json.dumps(payload)
+                cache.set_many(updated, timeout=self.ttl)
+
+    def _remove(self, generation: str, members: List[str]) -> None:
+        """Delete ``members`` from their buckets and payloads; absent members are a no-op"""
+        if not members:
+            return
+        client = get_redis_client()
+        if client is not None:
+            try:
+                pipe = client.pipeline(transaction=False)
+                pipe.hdel(make_cache_key(self._key(generation, 'payloads')), *members)
+                for member in members:
+                    for key in self._entry_keys(member):
+                        pipe.zrem(make_cache_key(self._key(generation, key)), member)
+                pipe.execute()
+                return
+            except Exception as exc:
+                logger.warning(f"Autocomplete index removal failed, using cache: {exc}")
+
+        with self._lock:
+            for member in members:
+                keys = [self._key(generation, key) for key in self._entry_keys(member)]
+                updated = {
+                    key: [item for item in bucket if item[0] != member]
+                    for key, bucket in cache.get_many(keys).items()
+                    if any(item[0] == member for item in bucket)
+                }
+                if updated:
+                    cache.set_many(updated, timeout=self.ttl)
+                cache.delete(self._key(generation, 'payload:' + member))
+
+    def _read_buckets(self, generation: str, keys: List[str]) -> List[List[Tuple[str, float]]]:
+        client = get_redis_client()
+        if client is not None:
+            try:
+                pipe = client.pipeline(transaction=False)
+                for key in keys:
+                    pipe.zrevrange(make_cache_key(self._key(generation, key)), 0, self.bucket_size - 1,
+                                   withscores=True)
+                return [
+                    [(member.decode() if isinstance(member, bytes) else member, score) for member, score in hits]
+                    for hits in pipe.execute()
+                ]
+            except Exception as exc:
+                logger.warning(f"Autocomplete lookup failed, using cache: {exc}")
+
+        found = cache.get_many([self._key(generation, key) for key in keys])
+        return [found.get(self._key(generation, key), []) for key in keys]
+
+    def _read_payloads(self, generation: str, members: List[str]) -> Dict[str, Dict[str, Any]]:
+        if not members:
+            return {}
+        client = get_redis_client()
+        if client is not None:
+            try:
+                values = client.hmget(make_cache_key(self._key(generation, 'payloads')), members)
+                return {member: json.loads(value) for member, value in zip(members, values) if value}
+            except Exception as exc:
+                logger.warning(f"Autocomplete payload read failed, using cache: {exc}")
+
+        found = cache.get_many([self._key(generation, 'payload:' + member) for member in members])
+        return {
+            member: json.loads(found[self._key(generation, 'payload:' + member)])
+            for member in members if self._key(generation, 'payload:' + member) in found
+        }
+
+    def _drop_generation(self, generation: str) -> None:
+        """Delete a superseded generation (cache fallback entries simply expire)"""
+        client = get_redis_client()
+        if client is None:
+            return
+        try:
+            batch = []
+            for key in client.scan_iter(match=make_cache_key(self._key(generation, '')) + '*', count=1000):
+                batch.append(key)
+                if len(batch) >= 1000:
+                    client.unlink(*batch)
+                    batch = []
+            if batch:
+                client.unlink(*batch)
+        except Exception as exc:
+            logger.warning(f"Failed to drop autocomplete generation {generation}: {exc}")
+
+
+# Global index instance
+autocomplete_index = AutocompleteIndex()
+
+
+# Signal receivers
+def _queue_suggestion(sender, instance, **kwargs):
+    autocomplete_index.mark_dirty(instance.text)
+
+
+def _queue_trending_query(sender, instance, **kwargs):
+    autocomplete_index.mark_dirty(instance.query)
+
+
+def connect_autocomplete_signals() -> None:
+    from django.db.models.signals import post_delete, post_save
+
+    from .models import SearchSuggestion, TrendingQuery
+
+    post_save.connect(_queue_suggestion, sender=SearchSuggestion, dispatch_uid='autocomplete_suggestion_save')
+    post_delete.connect(_queue_suggestion, sender=SearchSuggestion, dispatch_uid='autocomplete_suggestion_delete')
+    post_save.connect(_queue_trending_query, sender=TrendingQuery, dispatch_uid='autocomplete_trending_save')
+    post_delete.connect(_queue_trending_query, sender=TrendingQuery, dispatch_uid='autocomplete_trending_delete')
@@ -0,0 +1,126 @@
+"""
+Pluggable query backends for the SearchDocument index
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.db.models import Count, F, Q, Value, Window
+from django.db.models.functions import RowNumber
+from django.utils.module_loading import import_string
+
+from .models import SearchDocument
+
+SORT_ORDERINGS = {
+    'date': ('-source_created_at',),
+    'popularity': ('-popularity', '-source_created_at'),
+    'alphabetical': ('title',),
+}
+
+
+@dataclass
+class SearchHits:
+    """Ranked object ids per document type plus the total match count per type"""
+    ids: Dict[str, List[str]] = field(default_factory=dict)
+    counts: Dict[str, int] = field(default_factory=dict)
+
+
+class BaseSearchBackend:
+    """Interface every search backend implements"""
+
+    def search(self, query: str, doc_types: Sequence[str], sort_by: str = 'relevance',
+               since=None, limit: int = 10, offset: int = 0,
+               exclude: Optional[Dict[str, Sequence[str]]] = None) -> SearchHits:
+        """Return one page of ranked ids for each of ``doc_types``"""
+        raise NotImplementedError
+
+    def refresh_vectors(self, doc_type: str, object_ids: Sequence[str]) -> None:
+        """Recompute any derived index data after documents were written"""
+
+    def base_queryset(self, doc_types: Sequence[str], since=None, exclude=None):
+        queryset = SearchDocument.objects.filter(doc_type__in=doc_types, is_searchable=True)
+        if since is not None:
+            queryset = queryset.filter(source_created_at__gte=since)
+        for doc_type, object_ids in (exclude or {}).items():
+            queryset = queryset.exclude(doc_type=doc_type, object_id__in=[str(i) for i in object_ids])
+        return queryset
+
+    def collect(self, matches, doc_types: Sequence[str], ordering: Sequence, limit: int, offset: int) -> SearchHits:
+        """Page every type in one statement with ROW_NUMBER() OVER (PARTITION BY doc_type)"""
+        hits = SearchHits(ids={doc_type: [] for doc_type in doc_types}, counts={doc_type: 0 for doc_type in doc_types})
+
+        for row in matches.values('doc_type').annotate(total=Count('id')).order_by():
+            hits.counts[row['doc_type']] = row['total']
+
+        ranked = matches.annotate(
+            position=Window(RowNumber(), partition_by=[F('doc_type')], order_by=list(ordering))
+        ).filter(position__gt=offset, position__lte=offset + limit).order_by('doc_type', 'position')
+        for doc_type, object_id in ranked.values_list('doc_type', 'object_id'):
+            hits.ids[doc_type].append(object_id)
+        return hits
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    Ranked search over the stored ``search_vector`` (GIN) with trigram
+    similarity on titles (GIN ``gin_trgm_ops``) for partial words and typos
+    """
+
+    config = 'english'
+
+    def search(self, query, doc_types, sort_by='relevance', since=None, limit=10, offset=0, exclude=None):
+        threshold = getattr(settings, 'SEARCH_TRIGRAM_THRESHOLD', 0.3)
+        search_query = SearchQuery(query, config=self.config, search_type='websearch')
+
+        matches = self.base_queryset(doc_types, since, exclude).annotate(
+            similarity=TrigramSimilarity('title', query),
+        ).filter(Q(search_vector=search_query) | Q(similarity__gte=threshold))
+
+        if sort_by in SORT_ORDERINGS:
+            ordering = [F(name[1:]).desc() if name.startswith('-') else F(name).asc()
+                        for name in SORT_ORDERINGS[sort_by]]
+        else:
+            matches = matches.annotate(
+                rank=SearchRank(F('search_vector'), search_query) + F('similarity') * Value(0.5)
+            )
+            ordering = [F('rank').desc(), F('popularity').desc()]
+
+        return self.collect(matches, doc_types, ordering, limit, offset)
+
+    def refresh_vectors(self, doc_type, object_ids):
+        SearchDocument.objects.filter(doc_type=doc_type, object_id__in=object_ids).update(
+            search_vector=(
+                SearchVector('title', weight='A', config=self.config)
+                + SearchVector('body', weight='B', config=self.config)
+            )
+        )
+
+
+class DatabaseSearchBackend(BaseSearchBackend):
+    """Portable substring matching on the index table (development databases)"""
+
+    def search(self, query, doc_types, sort_by='relevance', since=None, limit=10, offset=0, exclude=None):
+        matches = self.base_queryset(doc_types, since, exclude).filter(
+            Q(title__icontains=query) | Q(body__icontains=query)
+        )
+        names = SORT_ORDERINGS.get(sort_by, ('-popularity', '-source_created_at'))
+        ordering = [F(name[1:]).desc() if name.startswith('-') else F(name).asc() for name in names]
+        return self.collect(matches, doc_types, ordering, limit, offset)
+
+
+_backend: Optional[BaseSearchBackend] = None
+
+
+def get_search_backend() -> BaseSearchBackend:
+    """Backend configured by ``SEARCH_BACKEND`` (defaults by database vendor)"""
+    global _backend
+    if _backend is None:
+        path = getattr(settings, 'SEARCH_BACKEND', None)
+        if path:
+            _backend = import_string(path)()
+        else:
+            from django.db import connection
+            _backend = PostgresSearchBackend() if connection.vendor == 'postgresql' else DatabaseSearchBackend()
+    return _backend
@@ -0,0 +1,190 @@
+"""
+Maintenance of the SearchDocument index for users, videos and watch parties
+"""
+
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from shared.redis_client import get_redis_client, make_cache_key
+
+logger = logging.getLogger(__name__)
+
+DOC_TYPES = ('user', 'video', 'party')
+DIRTY_KEY = 'search_index:dirty:{doc_type}'
+BACKFILL_LOCK_KEY = 'search_index:backfill'
+
+_lock = threading.Lock()
+
+
+def source_queryset(doc_type: str):
+    """Queryset of the indexed source objects for ``doc_type``"""
+    if doc_type == 'user':
+        return apps.get_model('authentication', 'User').objects.all()
+    if doc_type == 'video':
+        return apps.get_model('videos', 'Video').objects.select_related('uploader')
+    if doc_type == 'party':
+        return apps.get_model('parties', 'WatchParty').objects.annotate(
+            active_participants=Count('participants', filter=Q(participants__is_active=True))
+        )
+    raise ValueError(f"Unknown search document type: {doc_type}")
+
+
+def build_document(doc_type: str, instance) -> Dict[str, Any]:
+    """Field values of the SearchDocument row for ``instance``"""
+    if doc_type == 'user':
+        return {
+            'title': f"{instance.first_name} {instance.last_name}".strip() or instance.email.split('@')[0],
+            'body': '',
+            'popularity': 0.0,
+            'is_searchable': instance.is_active,
+            'source_created_at': instance.date_joined,
+        }
+    if doc_type == 'video':
+        uploader = instance.uploader
+        return {
+            'title': instance.title,
+            'body': ' '.join(filter(None, [instance.description, uploader.first_name, uploader.last_name])),
+            'popularity': float(instance.view_count),
+            'is_searchable': instance.status == 'ready' and instance.visibility == 'public',
+            'source_created_at': instance.created_at,
+        }
+    if doc_type == 'party':
+        return {
+            'title': instance.title,
+            'body': instance.description,
+            'popularity': float(getattr(instance, 'active_participants', 0)),
+            'is_searchable': instance.status in ('scheduled', 'live') and instance.allow_public_search,
+            'source_created_at': instance.created_at,
+        }
+    raise ValueError(f"Unknown search document type: {doc_type}")
+
+
+def mark_dirty(doc_type: str, object_id: Any) -> None:
+    """Queue an object for re-indexing by the next ``refresh_search_index`` run"""
+    key = DIRTY_KEY.format(doc_type=doc_type)
+    client = get_redis_client()
+    if client is not None:
+        try:
+            client.sadd(make_cache_key(key), str(object_id))
+            return
+        except Exception as e:
+            logger.warning(f"Failed to queue search document {doc_type}:{object_id}: {str(e)}")
+    with _lock:
+        dirty = set(cache.get(key) or [])
+        dirty.add(str(object_id))
+        cache.set(key, dirty, timeout=None)
+
+
+def pop_dirty(doc_type: str, batch_size: int) -> List[str]:
+    """Take up to ``batch_size`` queued ids for ``doc_type``"""
+    key = DIRTY_KEY.format(doc_type=doc_type)
+    client = get_redis_client()
+    if client is not None:
+        try:
+            ids = client.spop(make_cache_key(key), batch_size) or []
+            return [value.decode() if isinstance(value, bytes) else value for value in ids]
+        except Exception as e:
+            logger.warning(f"Failed to read search index queue for {doc_type}: {str(e)}")
+    with _lock:
+        dirty = list(cache.get(key) or [])
+        batch, rest = dirty[:batch_size], dirty[batch_size:]
+        cache.set(key, set(rest), timeout=None)
+        return batch
+
+
+def index_objects(doc_type: str, object_ids: Optional[Iterable[Any]] = None) -> int:
+    """
+    Upsert documents for ``object_ids`` (or every object) and drop documents
+    whose source rows no longer exist. Returns the number of documents written.
+    """
+    from .backends import get_search_backend
+    SearchDocument = apps.get_model('search', 'SearchDocument')
+
+    queryset = source_queryset(doc_type)
+    if object_ids is not None:
+        object_ids = [str(object_id) for object_id in object_ids]
+        queryset = queryset.filter(pk__in=object_ids)
+
+    documents = []
+    found = set()
+    for instance in queryset.iterator(chunk_size=500):
+        found.add(str(instance.pk))
+        documents.append(SearchDocument(doc_type=doc_type, object_id=str(instance.pk),
+                                        **build_document(doc_type, instance)))
+
+    if object_ids is not None:
+        missing = set(object_ids) - found
+        if missing:
+            SearchDocument.objects.filter(doc_type=doc_type, object_id__in=missing).delete()
+
+    if not documents:
+        return 0
+
+    SearchDocument.objects.bulk_create(
+        documents,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['doc_type', 'object_id'],
+        update_fields=['title', 'body', 'popularity', 'is_searchable', 'source_created_at', 'updated_at'],
+    )
+    get_search_backend().refresh_vectors(doc_type, [document.object_id for document in documents])
+    return len(documents)
+
+
+def rebuild(doc_types: Iterable[str] = DOC_TYPES) -> Dict[str, int]:
+    """Index every object of ``doc_types``; returns the documents written per type"""
+    return {doc_type: index_objects(doc_type) for doc_type in doc_types}
+
+
+def backfill_if_empty() -> Optional[Dict[str, int]]:
+    """
+    Build the whole index when it has no documents at all (a fresh deploy or
+    a wiped table), since signals only queue objects saved after that point.
+    Returns the documents written, or ``None`` when nothing needed doing.
+    """
+    SearchDocument = apps.get_model('search', 'SearchDocument')
+    if SearchDocument.objects.exists():
+        return None
+    # One worker backfills; overlapping refresh runs skip until it has written something
+    if not cache.add(BACKFILL_LOCK_KEY, 1, timeout=3600):
+        return None
+    try:
+        return rebuild()
+    finally:
+        cache.delete(BACKFILL_LOCK_KEY)
+
+
+# Signal receivers
+def _queue_user(sender, instance, **kwargs):
+    mark_dirty('user', instance.pk)
+
+
+def _queue_video(sender, instance, **kwargs):
+    mark_dirty('video', instance.pk)
+
+
+def _queue_party(sender, instance, **kwargs):
+    mark_dirty('party', instance.pk)
+
+
+def _queue_participant_party(sender, instance, **kwargs):
+    mark_dirty('party', instance.party_id)
+
+
+def connect_search_index_signals() -> None:
+    from django.db.models.signals import post_delete, post_save
+
+    senders = [
+        (apps.get_model('authentication', 'User'), _queue_user, 'user'),
+        (apps.get_model('videos', 'Video'), _queue_video, 'video'),
+        (apps.get_model('parties', 'WatchParty'), _queue_party, 'party'),
+        (apps.get_model('parties', 'PartyParticipant'), _queue_participant_party, 'participant'),
+    ]
+    for sender, receiver, name in senders:
+        post_save.connect(receiver, sender=sender, dispatch_uid=f'search_index_{name}_save')
+        post_delete.connect(receiver, sender=sender, dispatch_uid=f'search_index_{name}_delete')
@@ -0,0 +1,78 @@
+# Generated by Django 5.0.14 on 2026-10-17 09:12
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.utils.timezone
+import uuid
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("search", "0001_initial"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.CreateModel(
+            name="SearchDocument",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "doc_type",
+                    models.CharField(
+                        choices=[
+                            ("user", "User"),
+                            ("video", "Video"),
+                            ("party", "Watch Party"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("object_id", models.CharField(max_length=64)),
+                ("title", models.CharField(max_length=300)),
+                ("body", models.TextField(blank=True)),
+                (
+                    "search_vector",
+                    django.contrib.postgres.search.SearchVectorField(
+                        editable=False, null=True
+                    ),
+                ),
+                ("popularity", models.FloatField(default=0.0)),
+                ("is_searchable", models.BooleanField(default=True)),
+                (
+                    "source_created_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "db_table": "search_documents",
+                "indexes": [
+                    models.Index(
+                        fields=["doc_type", "is_searchable", "-source_created_at"],
+                        name="search_docu_doc_typ_594dbc_idx",
+                    ),
+                    django.contrib.postgres.indexes.GinIndex(
+                        fields=["search_vector"], name="search_documents_vector_gin"
+                    ),
+                    django.contrib.postgres.indexes.GinIndex(
+                        fields=["title"],
+                        name="search_documents_title_trgm",
+                        opclasses=["gin_trgm_ops"],
+                    ),
+                ],
+                "unique_together": {("doc_type", "object_id")},
+            },
+        ),
+    ]
@@ -7,6 +7,7 @@ from django.db import models
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 
 User = get_user_model()
 
@@ -184,3 +185,36 @@ class SearchAnalytics(models.Model):
         
     def __str__(self):
         return f"Search Analytics: {self.date}"
+
+
+class SearchDocument(models.Model):
+    """Denormalized, pre-tokenized search index entry for a user, video or party"""
+    
+    DOC_TYPES = [
+        ('user', 'User'),
+        ('video', 'Video'),
+        ('party', 'Watch Party'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    doc_type = models.CharField(max_length=20, choices=DOC_TYPES)
+    object_id = models.CharField(max_length=64)
+    title = models.CharField(max_length=300)
+    body = models.TextField(blank=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+    popularity = models.FloatField(default=0.0)
+    is_searchable = models.BooleanField(default=True)
+    source_created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'search_documents'
+        unique_together = ('doc_type', 'object_id')
+        indexes = [
+            models.Index(fields=['doc_type', 'is_searchable', '-source_created_at']),
+            GinIndex(fields=['search_vector'], name='search_documents_vector_gin'),
+            GinIndex(fields=['title'], name='search_documents_title_trgm', opclasses=['gin_trgm_ops']),
+        ]
+        
+    def __str__(self):
+        return f"{self.doc_type}:{self.object_id} {self.title}"
@@ -0,0 +1,94 @@
+"""
+Search index background tasks
+"""
+
+from celery import shared_task
+from django.conf import settings
+import logging
+
+from shared.observability import observability
+from .autocomplete import autocomplete_index
+from .indexing import DOC_TYPES, backfill_if_empty, index_objects, mark_dirty, pop_dirty, rebuild
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, max_retries=3)
+def refresh_search_index(self):
+    """Re-index objects queued by model signals since the last run"""
+    batch_size = getattr(settings, 'SEARCH_INDEX_BATCH_SIZE', 500)
+    indexed = 0
+    
+    backfilled = backfill_if_empty()
+    if backfilled is not None:
+        logger.info(f"Backfilled empty search index: {backfilled}")
+        indexed += sum(backfilled.values())
+    
+    for doc_type in DOC_TYPES:
+        while True:
+            object_ids = pop_dirty(doc_type, batch_size)
+            if not object_ids:
+                break
+            try:
+                with observability.span("search.index.refresh", tags={"doc_type": doc_type}):
+                    indexed += index_objects(doc_type, object_ids)
+            except Exception as exc:
+                # Put the batch back so the retry picks it up
+                for object_id in object_ids:
+                    mark_dirty(doc_type, object_id)
+                logger.error(f"Failed to refresh {doc_type} search documents: {exc}")
+                raise self.retry(exc=exc, countdown=30 * (self.request.retries + 1))
+
+    observability.record_metric("search.index.refreshed_documents", indexed)
+    return indexed
+
+
+@shared_task(bind=True, max_retries=3)
+def rebuild_search_index(self, doc_type=None):
+    """Backfill the whole index (or one document type)"""
+    try:
+        totals = rebuild([doc_type] if doc_type else DOC_TYPES)
+        logger.info(f"Rebuilt search index: {totals}")
+        return totals
+
+    except Exception as exc:
+        logger.error(f"Failed to rebuild search index: {exc}")
+        raise self.retry(exc=exc, countdown=300)
+
+
+@shared_task(bind=True, max_retries=3)
+def rebuild_autocomplete_index(self):
+    """Rebuild the autocomplete index from suggestions and recent trending queries"""
+    try:
+        with observability.span("search.autocomplete.rebuild"):
+            entries = autocomplete_index.rebuild()
+        observability.record_metric("search.autocomplete.entries", entries)
+        logger.info(f"Rebuilt autocomplete index with {entries} entries")
+        return entries
+
+    except Exception as exc:
+        logger.error(f"Failed to rebuild autocomplete index: {exc}")
+        raise self.retry(exc=exc, countdown=300)
+
+
+@shared_task(bind=True, max_retries=3)
+def refresh_autocomplete_terms(self):
+    """Upsert or remove autocomplete entries for suggestions and queries changed since the last run"""
+    batch_size = getattr(settings, 'SEARCH_INDEX_BATCH_SIZE', 500)
+    refreshed = 0
+    while True:
+        texts = autocomplete_index.pop_dirty(batch_size)
+        if not texts:
+            break
+        try:
+            with observability.span("search.autocomplete.refresh"):
+                refreshed += autocomplete_index.refresh_terms(texts)
+        except Exception as exc:
+            # Put the batch back so the retry picks it up
+            for text in texts:
+                autocomplete_index.mark_dirty(text)
+            logger.error(f"Failed to refresh autocomplete terms: {exc}")
+            raise self.retry(exc=exc, countdown=30 * (self.request.retries + 1))
+
+    observability.record_metric("search.autocomplete.refreshed_entries", refreshed)
+    return refreshed
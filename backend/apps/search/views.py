@@ -8,14 +8,23 @@ from rest_framework import status
 from django.db.models import Q, Count, F
 from django.apps import apps
 from django.utils import timezone
-from django.contrib.postgres.search import SearchVector, SearchQuery, SearchRank
 from django.core.cache import cache
 from drf_spectacular.utils import extend_schema
 from datetime import timedelta
 import time
 
 from shared.responses import StandardResponse
+from .autocomplete import autocomplete_index
+from .backends import SearchHits, get_search_backend
 from .models import SearchQuery as SearchQueryModel, SavedSearch, TrendingQuery, SearchSuggestion, SearchAnalytics
+from .tasks import rebuild_autocomplete_index
+
+
+SEARCH_TYPES = {
+    'users': 'user',
+    'videos': 'video',
+    'parties': 'party',
+}
 
 
 class GlobalSearchView(APIView):
@@ -56,179 +65,47 @@ class GlobalSearchView(APIView):
         if cached_result:
             return StandardResponse.success(data=cached_result)
         
-        # Get models
-        User = apps.get_model('authentication', 'User')
-        Video = apps.get_model('videos', 'Video')
-        WatchParty = apps.get_model('parties', 'WatchParty')
-        
+        if search_type == 'all':
+            doc_types = list(SEARCH_TYPES.values())
+        else:
+            doc_types = [SEARCH_TYPES[search_type]] if search_type in SEARCH_TYPES else []
+
         # Apply date filters
-        date_filter_q = Q()
+        since = None
         if date_filter != 'all':
             now = timezone.now()
             if date_filter == 'today':
-                date_filter_q = Q(created_at__date=now.date())
+                since = now.replace(hour=0, minute=0, second=0, microsecond=0)
             elif date_filter == 'week':
-                date_filter_q = Q(created_at__gte=now - timedelta(days=7))
+                since = now - timedelta(days=7)
             elif date_filter == 'month':
-                date_filter_q = Q(created_at__gte=now - timedelta(days=30))
+                since = now - timedelta(days=30)
             elif date_filter == 'year':
-                date_filter_q = Q(created_at__gte=now - timedelta(days=365))
-        
+                since = now - timedelta(days=365)
+
+        # One ranked pass over the index returns every requested type's page and count
+        hits = SearchHits()
+        if doc_types:
+            hits = get_search_backend().search(
+                query,
+                doc_types,
+                sort_by=sort_by,
+                since=since,
+                limit=limit,
+                offset=offset,
+                exclude={'user': [request.user.id]},
+            )
+
         results = {}
-        total_results = 0
-        
-        # Search users (excluding current user)
-        if search_type in ['all', 'users']:
-            users_q = Q(
-                Q(username__icontains=query) | 
-                Q(first_name__icontains=query) |
-                Q(last_name__icontains=query),
-                is_active=True
-            ) & date_filter_q
-            
-            users_queryset = User.objects.filter(users_q).exclude(id=request.user.id)
-            
-            if sort_by == 'alphabetical':
-                users_queryset = users_queryset.order_by('username')
-            elif sort_by == 'date':
-                users_queryset = users_queryset.order_by('-date_joined')
-            else:  # relevance
-                users_queryset = users_queryset.order_by('-is_active', 'username')
-            
-            users = users_queryset[offset:offset + limit]
-            users_count = users_queryset.count()
-            total_results += users_count
-            
-            users_data = []
-            for user in users:
-                users_data.append({
-                    'id': user.id,
-                    'username': user.username,
-                    'name': user.get_full_name(),
-                    'profile_picture': user.profile_picture.url if user.profile_picture else None,
-                    'is_online': getattr(user, 'is_online', False),
-                    'followers_count': getattr(user, 'followers_count', 0),
-                    'date_joined': user.date_joined,
-                })
-            
-            results['users'] = {
-                'items': users_data,
-                'count': users_count,
-                'has_more': users_count > offset + limit
-            }
-        
-        # Search videos with full-text search
-        if search_type in ['all', 'videos']:
-            videos_q = Q(
-                Q(title__icontains=query) | 
-                Q(description__icontains=query) |
-                Q(tags__icontains=query),
-                status='ready'
-            ) & date_filter_q
-            
-            if category:
-                videos_q &= Q(category__icontains=category)
-                
-            videos_queryset = Video.objects.filter(videos_q).select_related('uploader')
-            
-            if sort_by == 'popularity':
-                videos_queryset = videos_queryset.order_by('-view_count', '-created_at')
-            elif sort_by == 'date':
-                videos_queryset = videos_queryset.order_by('-created_at')
-            elif sort_by == 'alphabetical':
-                videos_queryset = videos_queryset.order_by('title')
-            else:  # relevance - use PostgreSQL full-text search if available
-                try:
-                    # Use PostgreSQL full-text search for better relevance
-                    search_vector = SearchVector('title', weight='A') + SearchVector('description', weight='B')
-                    search_query = SearchQuery(query)
-                    videos_queryset = videos_queryset.annotate(
-                        search=search_vector,
-                        rank=SearchRank(search_vector, search_query)
-                    ).filter(search=search_query).order_by('-rank', '-view_count')
-                except:
-                    # Fallback to simple ordering
-                    videos_queryset = videos_queryset.order_by('-view_count', '-created_at')
-            
-            videos = videos_queryset[offset:offset + limit]
-            videos_count = videos_queryset.count()
-            total_results += videos_count
-            
-            videos_data = []
-            for video in videos:
-                videos_data.append({
-                    'id': video.id,
-                    'title': video.title,
-                    'description': video.description[:200] + '...' if len(video.description) > 200 else video.description,
-                    'thumbnail': video.thumbnail.url if video.thumbnail else None,
-                    'duration': video.duration,
-                    'uploaded_by': {
-                        'id': video.uploader.id,
-                        'username': video.uploader.username,
-                        'name': video.uploader.get_full_name(),
-                    },
-                    'created_at': video.created_at,
-                    'views': getattr(video, 'view_count', 0),
-                    'likes': getattr(video, 'likes_count', 0),
-                    'category': getattr(video, 'category', ''),
-                    'tags': getattr(video, 'tags', []),
-                })
-            
-            results['videos'] = {
-                'items': videos_data,
-                'count': videos_count,
-                'has_more': videos_count > offset + limit
-            }
-        
-        # Search parties
-        if search_type in ['all', 'parties']:
-            parties_q = Q(
-                Q(title__icontains=query) | 
-                Q(description__icontains=query),
-                status__in=['scheduled', 'live']
-            ) & date_filter_q
-            
-            parties_queryset = WatchParty.objects.filter(parties_q).select_related('host')
-            
-            if sort_by == 'popularity':
-                parties_queryset = parties_queryset.annotate(
-                    participant_count=Count('participants')
-                ).order_by('-participant_count', '-created_at')
-            elif sort_by == 'date':
-                parties_queryset = parties_queryset.order_by('-created_at')
-            elif sort_by == 'alphabetical':
-                parties_queryset = parties_queryset.order_by('title')
-            else:  # relevance
-                parties_queryset = parties_queryset.order_by('-created_at')
-            
-            parties = parties_queryset[offset:offset + limit]
-            parties_count = parties_queryset.count()
-            total_results += parties_count
-            
-            parties_data = []
-            for party in parties:
-                participant_count = party.participants.count()
-                parties_data.append({
-                    'id': party.id,
-                    'title': party.title,
-                    'description': party.description[:200] + '...' if len(party.description) > 200 else party.description,
-                    'host': {
-                        'id': party.host.id,
-                        'username': party.host.username,
-                        'name': party.host.get_full_name(),
-                    },
-                    'is_public': party.visibility == 'public',
-                    'is_live': party.status == 'live',
-                    'participant_count': participant_count,
-                    'max_participants': getattr(party, 'max_participants', None),
-                    'created_at': party.created_at,
-                    'scheduled_start': getattr(party, 'scheduled_start', None),
-                })
-            
-            results['parties'] = {
-                'items': parties_data,
-                'count': parties_count,
-                'has_more': parties_count > offset + limit
+        total_results = sum(hits.counts.values())
+        for result_key, doc_type in SEARCH_TYPES.items():
+            if doc_type not in doc_types:
+                continue
+            count = hits.counts.get(doc_type, 0)
+            results[result_key] = {
+                'items': self.hydrate(doc_type, hits.ids.get(doc_type, [])),
+                'count': count,
+                'has_more': count > offset + limit
             }
         
         # Calculate search duration
@@ -277,6 +154,77 @@ class GlobalSearchView(APIView):
             message=f"Found {total_results} results for '{query}'"
         )
     
+    def hydrate(self, doc_type, object_ids):
+        """Serialize one page of hits with a single bounded query, keeping rank order"""
+        if not object_ids:
+            return []
+
+        if doc_type == 'user':
+            User = apps.get_model('authentication', 'User')
+            objects = User.objects.filter(id__in=object_ids)
+            serialize = self.serialize_user
+        elif doc_type == 'video':
+            Video = apps.get_model('videos', 'Video')
+            objects = Video.objects.filter(id__in=object_ids).select_related('uploader')
+            serialize = self.serialize_video
+        else:
+            WatchParty = apps.get_model('parties', 'WatchParty')
+            objects = WatchParty.objects.filter(id__in=object_ids).select_related('host').annotate(
+                participant_count=Count('participants')
+            )
+            serialize = self.serialize_party
+
+        by_id = {str(obj.id): obj for obj in objects}
+        return [serialize(by_id[object_id]) for object_id in object_ids if object_id in by_id]
+
+    def serialize_user(self, user):
+        return {
+            'id': user.id,
+            'username': getattr(user, 'username', None),
+            'name': user.get_full_name(),
+            'profile_picture': user.profile_picture.url if user.profile_picture else None,
+            'is_online': getattr(user, 'is_online', False),
+            'followers_count': getattr(user, 'followers_count', 0),
+            'date_joined': user.date_joined,
+        }
+
+    def serialize_video(self, video):
+        return {
+            'id': video.id,
+            'title': video.title,
+            'description': video.description[:200] + '...' if len(video.description) > 200 else video.description,
+            'thumbnail': video.thumbnail.url if video.thumbnail else None,
+            'duration': video.duration,
+            'uploaded_by': {
+                'id': video.uploader.id,
+                'username': getattr(video.uploader, 'username', None),
+                'name': video.uploader.get_full_name(),
+            },
+            'created_at': video.created_at,
+            'views': getattr(video, 'view_count', 0),
+            'likes': getattr(video, 'likes_count', 0),
+            'category': getattr(video, 'category', ''),
+            'tags': getattr(video, 'tags', []),
+        }
+
+    def serialize_party(self, party):
+        return {
+            'id': party.id,
+            'title': party.title,
+            'description': party.description[:200] + '...' if len(party.description) > 200 else party.description,
+            'host': {
+                'id': party.host.id,
+                'username': getattr(party.host, 'username', None),
+                'name': party.host.get_full_name(),
+            },
+            'is_public': party.visibility == 'public',
+            'is_live': party.status == 'live',
+            'participant_count': party.participant_count,
+            'max_participants': getattr(party, 'max_participants', None),
+            'created_at': party.created_at,
+            'scheduled_start': getattr(party, 'scheduled_start', None),
+        }
+
     def get_client_ip(self, request):
         """Get client IP address"""
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
@@ -353,6 +301,18 @@ class SearchSuggestionsView(APIView):
                         message="No trending suggestions available"
                     )
             
+            fuzzy = request.GET.get('fuzzy', 'true').lower() != 'false'
+            completions = autocomplete_index.complete(query, suggestion_type, limit=limit, fuzzy=fuzzy)
+            if completions is not None:
+                return StandardResponse.success(
+                    data={'suggestions': completions},
+                    message=f"Found {len(completions)} suggestions"
+                )
+
+            # Index not built yet: build it in the background and answer from the table
+            if cache.add('autocomplete:rebuild_queued', True, timeout=300):
+                rebuild_autocomplete_index.delay()
+
             # Get matching suggestions
             suggestions_q = Q(text__icontains=query, is_active=True)
             
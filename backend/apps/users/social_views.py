@@ -7,6 +7,7 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django.contrib.auth import get_user_model
 
+from shared.pagination import ActivityFeedPagination
 from shared.services.social_service import social_service
 
 User = get_user_model()
@@ -105,11 +106,14 @@ def search_users(request):
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def activity_feed(request):
-    """Get activity feed"""
-    limit = int(request.GET.get('limit', 50))
-    feed = social_service.get_activity_feed(request.user, limit)
+    """Get activity feed, paged with (created_at, id) cursors"""
+    paginator = ActivityFeedPagination()
+    activities = paginator.paginate_queryset(
+        social_service.get_activity_feed_queryset(request.user), request
+    )
+    feed = social_service.serialize_activities(activities, current_user=request.user)
     
-    return Response({'activities': feed})
+    return paginator.get_paginated_response(feed)
 
 
 @api_view(['GET'])
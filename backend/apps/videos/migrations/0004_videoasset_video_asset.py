@@ -0,0 +1,81 @@
+# Generated by Django 5.0.14 on 2026-10-17 10:00
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("videos", "0003_videoprocessing_videostreamingurl_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VideoAsset",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "content_hash",
+                    models.CharField(
+                        max_length=64, unique=True, verbose_name="SHA-256"
+                    ),
+                ),
+                (
+                    "file_size",
+                    models.BigIntegerField(verbose_name="File Size (bytes)"),
+                ),
+                (
+                    "storage_key",
+                    models.CharField(
+                        blank=True, max_length=500, verbose_name="Storage Key"
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("processing", "Processing"),
+                            ("ready", "Ready"),
+                            ("failed", "Failed"),
+                        ],
+                        default="processing",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "metadata",
+                    models.JSONField(
+                        blank=True, default=dict, verbose_name="Derived Metadata"
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Video Asset",
+                "verbose_name_plural": "Video Assets",
+                "db_table": "video_assets",
+            },
+        ),
+        migrations.AddField(
+            model_name="video",
+            name="asset",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="videos",
+                to="videos.videoasset",
+            ),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.14 on 2026-10-17 07:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("videos", "0004_videoasset_video_asset"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="videoupload",
+            name="completed_parts",
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name="videoupload",
+            name="multipart_upload_id",
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name="videoupload",
+            name="part_size",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="videoupload",
+            name="storage_key",
+            field=models.CharField(blank=True, max_length=500),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.14 on 2026-10-17 07:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("videos", "0005_videoupload_multipart"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="video",
+            name="metadata",
+            field=models.JSONField(
+                blank=True, default=dict, verbose_name="Processing Metadata"
+            ),
+        ),
+        migrations.AddField(
+            model_name="video",
+            name="optimized",
+            field=models.BooleanField(default=False, verbose_name="Variants Created"),
+        ),
+        migrations.AddField(
+            model_name="video",
+            name="preview_url",
+            field=models.URLField(
+                blank=True, max_length=500, null=True, verbose_name="Preview Clip URL"
+            ),
+        ),
+        migrations.AddField(
+            model_name="video",
+            name="processed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
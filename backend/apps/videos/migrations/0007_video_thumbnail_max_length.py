@@ -0,0 +1,20 @@
+# Generated by Django 5.0.14 on 2026-10-17 08:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("videos", "0006_video_processing_fields"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="video",
+            name="thumbnail",
+            field=models.ImageField(
+                blank=True, max_length=500, null=True, upload_to="thumbnails/%Y/%m/%d/"
+            ),
+        ),
+    ]
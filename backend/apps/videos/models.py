@@ -48,7 +48,7 @@ class Video(models.Model):
         validators=[FileExtensionValidator(allowed_extensions=['mp4', 'avi', 'mov', 'mkv', 'webm'])],
         verbose_name='Video File'
     )
-    thumbnail = models.ImageField(upload_to='thumbnails/%Y/%m/%d/', null=True, blank=True)
+    thumbnail = models.ImageField(upload_to='thumbnails/%Y/%m/%d/', max_length=500, null=True, blank=True)
     duration = models.DurationField(null=True, blank=True, verbose_name='Duration')
     file_size = models.BigIntegerField(null=True, blank=True, verbose_name='File Size (bytes)')
     
@@ -62,12 +62,21 @@ class Video(models.Model):
     gdrive_download_url = models.URLField(blank=True, verbose_name='Google Drive Download URL')
     gdrive_mime_type = models.CharField(max_length=100, blank=True, verbose_name='Google Drive MIME Type')
     
+    # Content-addressed original shared with identical uploads
+    asset = models.ForeignKey('VideoAsset', null=True, blank=True, on_delete=models.SET_NULL, related_name='videos')
+    
     # Metadata
     resolution = models.CharField(max_length=20, blank=True, verbose_name='Resolution')
     codec = models.CharField(max_length=50, blank=True, verbose_name='Video Codec')
     bitrate = models.IntegerField(null=True, blank=True, verbose_name='Bitrate (kbps)')
     fps = models.FloatField(null=True, blank=True, verbose_name='Frame Rate')
     
+    # Processing results: probe details, thumbnails, variants and streaming manifests
+    metadata = models.JSONField(default=dict, blank=True, verbose_name='Processing Metadata')
+    preview_url = models.URLField(max_length=500, null=True, blank=True, verbose_name='Preview Clip URL')
+    optimized = models.BooleanField(default=False, verbose_name='Variants Created')
+    processed_at = models.DateTimeField(null=True, blank=True)
+    
     # Settings
     visibility = models.CharField(max_length=20, choices=VISIBILITY_CHOICES, default='private')
     allow_download = models.BooleanField(default=False, verbose_name='Allow Download')
@@ -96,6 +105,17 @@ class Video(models.Model):
         
     def __str__(self):
         return self.title
+    
+    @property
+    def video_url(self):
+        """Where processing reads the source from: a local path, a storage URL or the external source"""
+        if self.file:
+            try:
+                return self.file.path
+            except NotImplementedError:
+                # Remote storage backends only expose URLs
+                return self.file.url
+        return self.source_url or self.gdrive_download_url
 
 
 class VideoLike(models.Model):
@@ -178,6 +198,12 @@ class VideoUpload(models.Model):
     file_size = models.BigIntegerField()
     upload_url = models.URLField(blank=True)
     
+    # Resumable multipart upload straight to object storage
+    storage_key = models.CharField(max_length=500, blank=True)
+    multipart_upload_id = models.CharField(max_length=255, blank=True)
+    part_size = models.BigIntegerField(null=True, blank=True)
+    completed_parts = models.JSONField(default=list, blank=True)  # [{"part_number", "etag", "size"}]
+    
     # Progress tracking
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     progress_percentage = models.FloatField(default=0.0)
@@ -291,3 +317,33 @@ class VideoStreamingUrl(models.Model):
         if self.max_access_count and self.access_count >= self.max_access_count:
             return False
         return True
+
+
+class VideoAsset(models.Model):
+    """Uploaded video content indexed by its SHA-256, shared by every identical upload"""
+    
+    STATUS_CHOICES = [
+        ('processing', 'Processing'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    content_hash = models.CharField(max_length=64, unique=True, verbose_name='SHA-256')
+    file_size = models.BigIntegerField(verbose_name='File Size (bytes)')
+    storage_key = models.CharField(max_length=500, blank=True, verbose_name='Storage Key')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='processing')
+    
+    # Derived data (probe results, thumbnails, sprite, preview, variants, streaming manifests)
+    metadata = models.JSONField(default=dict, blank=True, verbose_name='Derived Metadata')
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'video_assets'
+        verbose_name = 'Video Asset'
+        verbose_name_plural = 'Video Assets'
+        
+    def __str__(self):
+        return f"Asset {self.content_hash[:12]} ({self.status})"
@@ -8,14 +8,19 @@ from django.conf import settings
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
 import os
+import shutil
 import subprocess
 import tempfile
 import logging
-import json
+import mimetypes
+from datetime import timedelta
 from typing import Optional, Dict, Any
 from botocore.exceptions import ClientError
 
-from shared.aws import get_boto3_session
+from shared.services.media_inspection_service import media_inspection_service
+from shared.services.multipart_upload_service import multipart_upload_service
+from shared.services.video_dedup_service import video_dedup_service
+from shared.services.video_transcode_service import TranscodeRun, video_transcode_service
 
 from .models import Video
 from apps.analytics.models import AnalyticsEvent
@@ -23,6 +28,13 @@ from apps.integrations.services.google_drive import get_drive_service_for_user
 
 logger = logging.getLogger(__name__)
 
+STREAMING_CONTENT_TYPES = {
+    '.m3u8': 'application/vnd.apple.mpegurl',
+    '.m4s': 'video/iso.segment',
+    '.mpd': 'application/dash+xml',
+    '.json': 'application/json',
+}
+
 
 @shared_task
 def process_video_upload(video_id):
@@ -30,43 +42,35 @@ def process_video_upload(video_id):
     try:
         video = Video.objects.get(id=video_id)
         
+        # An identical upload finished while this one was queued
+        if video.asset and video.asset.status == 'ready':
+            video_dedup_service.apply(video, video.asset)
+            return f"Reused processed duplicate for video {video.title}"
+        
         if not video.video_url:
             logger.error(f"Video {video_id} has no video URL")
             return f"Error: No video URL for video {video_id}"
         
-        # Extract metadata
-        metadata = extract_video_metadata(video.video_url)
-        if metadata:
-            video.duration = metadata.get('duration', 0)
-            video.file_size = metadata.get('file_size', 0)
-            
-            # Update video metadata
-            if 'width' in metadata and 'height' in metadata:
-                video.metadata = {
-                    'width': metadata['width'],
-                    'height': metadata['height'],
-                    'codec': metadata.get('codec', ''),
-                    'bitrate': metadata.get('bitrate', 0),
-                    'fps': metadata.get('fps', 0)
-                }
-        
-        # Generate thumbnail
-        thumbnail_url = generate_video_thumbnail(video.video_url)
-        if thumbnail_url:
-            video.thumbnail = thumbnail_url
+        # Probe, thumbnails, scrub sprite and preview from one read of the source
+        inspection = inspect_video_media(video.video_url, content_hash(video))
+        if inspection:
+            apply_media_inspection(video, inspection)
         
         # Update status
         video.status = 'ready'
         video.processed_at = timezone.now()
         video.save()
         
+        # Identical uploads waiting on this one get the same results
+        video_dedup_service.publish(video)
+        
         # Log analytics event
         AnalyticsEvent.objects.create(
             user=video.uploader,
             event_type='video_upload',
             event_data={
                 'video_id': str(video.id),
-                'duration': video.duration,
+                'duration': video.duration.total_seconds() if video.duration else None,
                 'file_size': video.file_size
             }
         )
@@ -84,11 +88,64 @@ def process_video_upload(video_id):
             video = Video.objects.get(id=video_id)
             video.status = 'failed'
             video.save()
+            # Identical uploads are not failed with it; one of them takes over
+            successor = video_dedup_service.release(video)
+            if successor:
+                process_video_upload.delay(str(successor.id))
         except:
             pass
         return f"Error: {str(e)}"
 
 
+def content_hash(video: Video) -> Optional[str]:
+    """SHA-256 of an uploaded video's content, computed while it streamed in"""
+    return video.asset.content_hash if video.asset else None
+
+
+def inspect_video_media(video_url: str, source_hash: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Inspect a video once (cached by content hash) and store its derived images and preview"""
+    try:
+        def upload(path, name):
+            # Derived files are addressed by fingerprint, so duplicate uploads share them
+            return upload_to_storage_backend(path, f"videos/media/{name}")
+        
+        return media_inspection_service.inspect(video_url, upload, content_hash=source_hash)
+        
+    except Exception as e:
+        logger.error(f"Error inspecting video {video_url}: {str(e)}")
+        return None
+
+
+def apply_media_inspection(video: Video, inspection: Dict[str, Any]) -> None:
+    """Copy an inspection result onto the video (caller saves)"""
+    metadata = inspection['metadata']
+    video.duration = timedelta(seconds=metadata['duration'])
+    video.file_size = metadata['file_size'] or video.file_size
+    if metadata['width'] and metadata['height']:
+        video.resolution = f"{metadata['width']}x{metadata['height']}"
+    video.codec = metadata['codec']
+    video.bitrate = metadata['bitrate'] // 1000 or None
+    video.fps = metadata['fps'] or None
+    
+    if inspection['thumbnails']:
+        video.thumbnail = inspection['thumbnails'][0]
+    if inspection['preview']:
+        video.preview_url = inspection['preview']
+    
+    if not video.metadata:
+        video.metadata = {}
+    video.metadata.update({
+        'width': metadata['width'],
+        'height': metadata['height'],
+        'codec': metadata['codec'],
+        'bitrate': metadata['bitrate'],
+        'fps': metadata['fps'],
+        'fingerprint': inspection['fingerprint'],
+        'thumbnails': inspection['thumbnails'],
+        'sprite': inspection['sprite'],
+    })
+
+
 @shared_task(bind=True, max_retries=3, default_retry_delay=60)
 def extract_duration_fallback(self, video_id):
     """Fallback task to extract duration for videos that failed initial extraction"""
@@ -286,201 +343,46 @@ def download_video_partial(video_url: str, max_bytes: int = 10485760) -> Optiona
 
 def extract_metadata_from_file(file_path: str) -> Optional[Dict[str, Any]]:
     """Extract metadata from video file using ffprobe"""
-    try:
-        # Use ffprobe to extract metadata
-        cmd = [
-            'ffprobe',
-            '-v', 'quiet',
-            '-print_format', 'json',
-            '-show_format',
-            '-show_streams',
-            file_path
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-        
-        if result.returncode != 0:
-            logger.error(f"ffprobe failed: {result.stderr}")
-            return None
-        
-        metadata = json.loads(result.stdout)
-        
-        # Extract relevant information
-        format_info = metadata.get('format', {})
-        video_stream = None
-        
-        for stream in metadata.get('streams', []):
-            if stream.get('codec_type') == 'video':
-                video_stream = stream
-                break
-        
-        if not video_stream:
-            logger.warning(f"No video stream found in file")
-            return None
-        
-        # Parse frame rate
-        fps = 0
-        fps_str = video_stream.get('r_frame_rate', '0/1')
-        try:
-            if '/' in fps_str:
-                num, denom = fps_str.split('/')
-                fps = int(num) / int(denom) if int(denom) != 0 else 0
-        except:
-            pass
-        
-        extracted_metadata = {
-            'duration': int(float(format_info.get('duration', 0))),
-            'file_size': int(format_info.get('size', 0)),
-            'width': video_stream.get('width', 0),
-            'height': video_stream.get('height', 0),
-            'codec': video_stream.get('codec_name', ''),
-            'bitrate': int(video_stream.get('bit_rate', 0)),
-            'fps': round(fps, 2)
-        }
-        
-        return extracted_metadata
-        
-    except subprocess.TimeoutExpired:
-        logger.error(f"ffprobe timeout")
-        return None
-    except Exception as e:
-        logger.error(f"Error extracting metadata: {str(e)}")
-        return None
+    metadata = media_inspection_service.probe(file_path)
+    if metadata:
+        metadata['duration'] = int(metadata['duration'])
+    return metadata
 
 
 def extract_video_metadata(video_url: str) -> Optional[Dict[str, Any]]:
-    """Extract metadata from video file using ffprobe"""
-    try:
-        # Download video to temporary file if it's a URL
-        temp_file = None
-        if video_url.startswith('http'):
-            temp_file = download_video_temp(video_url)
-            if not temp_file:
-                return None
-            video_path = temp_file
-        else:
-            video_path = video_url
-        
-        # Use ffprobe to extract metadata
-        cmd = [
-            'ffprobe',
-            '-v', 'quiet',
-            '-print_format', 'json',
-            '-show_format',
-            '-show_streams',
-            video_path
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-        
-        if result.returncode != 0:
-            logger.error(f"ffprobe failed for {video_url}: {result.stderr}")
-            return None
-        
-        metadata = json.loads(result.stdout)
-        
-        # Extract relevant information
-        format_info = metadata.get('format', {})
-        video_stream = None
-        
-        for stream in metadata.get('streams', []):
-            if stream.get('codec_type') == 'video':
-                video_stream = stream
-                break
-        
-        if not video_stream:
-            logger.error(f"No video stream found in {video_url}")
-            return None
-        
-        extracted_metadata = {
-            'duration': int(float(format_info.get('duration', 0))),
-            'file_size': int(format_info.get('size', 0)),
-            'width': video_stream.get('width', 0),
-            'height': video_stream.get('height', 0),
-            'codec': video_stream.get('codec_name', ''),
-            'bitrate': int(video_stream.get('bit_rate', 0)),
-            'fps': eval(video_stream.get('r_frame_rate', '0/1'))
-        }
-        
-        # Clean up temporary file
-        if temp_file and os.path.exists(temp_file):
-            os.unlink(temp_file)
-        
-        return extracted_metadata
-        
-    except subprocess.TimeoutExpired:
-        logger.error(f"ffprobe timeout for {video_url}")
-        return None
-    except Exception as e:
-        logger.error(f"Error extracting metadata from {video_url}: {str(e)}")
-        return None
+    """Extract metadata from a video file or URL (ffprobe reads only the ranges it needs)"""
+    return extract_metadata_from_file(video_url)
 
 
 def generate_video_thumbnail(video_url: str) -> Optional[str]:
     """Generate thumbnail from video file"""
-    try:
-        # Download video to temporary file if it's a URL
-        temp_file = None
-        if video_url.startswith('http'):
-            temp_file = download_video_temp(video_url)
-            if not temp_file:
-                return None
-            video_path = temp_file
-        else:
-            video_path = video_url
-        
-        # Create temporary thumbnail file
-        with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as thumb_file:
-            thumbnail_path = thumb_file.name
-        
-        # Use ffmpeg to generate thumbnail at 10 second mark
-        cmd = [
-            'ffmpeg',
-            '-i', video_path,
-            '-ss', '00:00:10',
-            '-vframes', '1',
-            '-vf', 'scale=320:240',
-            '-y',
-            thumbnail_path
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-        
-        if result.returncode != 0:
-            logger.error(f"ffmpeg thumbnail generation failed for {video_url}: {result.stderr}")
-            return None
-        
-        # Upload thumbnail to storage
-        thumbnail_url = upload_thumbnail_to_storage(thumbnail_path)
-        
-        # Clean up temporary files
-        if os.path.exists(thumbnail_path):
-            os.unlink(thumbnail_path)
-        if temp_file and os.path.exists(temp_file):
-            os.unlink(temp_file)
-        
-        return thumbnail_url
-        
-    except subprocess.TimeoutExpired:
-        logger.error(f"ffmpeg timeout for {video_url}")
-        return None
-    except Exception as e:
-        logger.error(f"Error generating thumbnail for {video_url}: {str(e)}")
-        return None
+    inspection = inspect_video_media(video_url)
+    if inspection and inspection['thumbnails']:
+        return inspection['thumbnails'][0]
+    return None
 
 
-def download_video_temp(video_url: str) -> Optional[str]:
-    """Download video to temporary file for processing"""
+def download_video_temp(video_url: str, destination: Optional[str] = None) -> Optional[str]:
+    """Download video to a temporary file (or ``destination``) for processing"""
     try:
         import requests
         
+        if destination is None:
+            with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as temp_file:
+                destination = temp_file.name
+        
+        # Uploads kept on local storage are read from disk
+        if os.path.isfile(video_url):
+            shutil.copyfile(video_url, destination)
+            return destination
+        
         response = requests.get(video_url, stream=True, timeout=60)
         response.raise_for_status()
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as temp_file:
-            for chunk in response.iter_content(chunk_size=8192):
-                temp_file.write(chunk)
-            return temp_file.name
+        with open(destination, 'wb') as output_file:
+            for chunk in response.iter_content(chunk_size=1024 * 1024):
+                output_file.write(chunk)
+            return destination
             
     except Exception as e:
         logger.error(f"Error downloading video {video_url}: {str(e)}")
@@ -535,53 +437,72 @@ def generate_thumbnail_from_file(video_file_path: str, video_identifier: str) ->
 def upload_thumbnail_to_storage(thumbnail_path: str) -> Optional[str]:
     """Upload thumbnail to configured storage"""
     try:
-        # Generate unique filename
-        filename = f"thumbnails/{timezone.now().strftime('%Y/%m/%d')}/{os.path.basename(thumbnail_path)}"
-        
-        # Upload to storage (S3 or local)
-        if hasattr(settings, 'AWS_STORAGE_BUCKET_NAME') and settings.AWS_STORAGE_BUCKET_NAME:
-            return upload_to_s3(thumbnail_path, filename)
-        else:
-            return upload_to_local_storage(thumbnail_path, filename)
+        # Content-addressed, so an identical thumbnail is stored once
+        return upload_content_addressed(thumbnail_path, 'thumbnails')
             
     except Exception as e:
         logger.error(f"Error uploading thumbnail: {str(e)}")
         return None
 
 
-def upload_to_s3(file_path: str, s3_key: str) -> Optional[str]:
+def upload_content_addressed(file_path: str, prefix: str) -> Optional[str]:
+    """Store a file under its SHA-256, skipping the upload when that object already exists"""
+    content_hash = video_dedup_service.hash_file(file_path)
+    filename = f"{prefix}/{content_hash[:2]}/{content_hash}{os.path.splitext(file_path)[1].lower()}"
+    
+    existing_url = stored_object_url(filename)
+    if existing_url:
+        return existing_url
+    return upload_to_storage_backend(file_path, filename)
+
+
+def stored_object_url(filename: str) -> Optional[str]:
+    """URL of an object already in the configured storage backend, or None"""
+    try:
+        if hasattr(settings, 'AWS_STORAGE_BUCKET_NAME') and settings.AWS_STORAGE_BUCKET_NAME:
+            multipart_upload_service.client.head_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=filename)
+            return s3_object_url(filename)
+        if default_storage.exists(filename):
+            return default_storage.url(filename)
+        return None
+    except ClientError:
+        return None
+
+
+def upload_to_s3(file_path: str, s3_key: str, content_type: str = 'image/jpeg') -> Optional[str]:
     """Upload file to AWS S3"""
     try:
-        s3_client = get_boto3_session().client(
-            's3',
-            region_name=settings.AWS_S3_REGION_NAME
-        )
-        
         bucket_name = settings.AWS_STORAGE_BUCKET_NAME
         
-        # Upload file
-        with open(file_path, 'rb') as file_obj:
-            s3_client.upload_fileobj(
-                file_obj,
-                bucket_name,
-                s3_key,
-                ExtraArgs={'ContentType': 'image/jpeg'}
-            )
-        
-        # Return public URL
-        if hasattr(settings, 'AWS_S3_CUSTOM_DOMAIN') and settings.AWS_S3_CUSTOM_DOMAIN:
-            return f"https://{settings.AWS_S3_CUSTOM_DOMAIN}/{s3_key}"
-        else:
-            return f"https://{bucket_name}.s3.{settings.AWS_S3_REGION_NAME}.amazonaws.com/{s3_key}"
+        # Large files go up as concurrent multipart transfers; failed parts are retried alone
+        multipart_upload_service.client.upload_file(
+            file_path,
+            bucket_name,
+            s3_key,
+            ExtraArgs={'ContentType': content_type},
+            Config=multipart_upload_service.transfer_config()
+        )
+        
+        return s3_object_url(s3_key)
             
     except ClientError as e:
         logger.error(f"AWS S3 upload error: {str(e)}")
         return None
 
 
+def s3_object_url(s3_key: str) -> str:
+    """Public URL of an S3 object"""
+    if hasattr(settings, 'AWS_S3_CUSTOM_DOMAIN') and settings.AWS_S3_CUSTOM_DOMAIN:
+        return f"https://{settings.AWS_S3_CUSTOM_DOMAIN}/{s3_key}"
+    return f"https://{settings.AWS_STORAGE_BUCKET_NAME}.s3.{settings.AWS_S3_REGION_NAME}.amazonaws.com/{s3_key}"
+
+
 def upload_to_local_storage(file_path: str, filename: str) -> Optional[str]:
     """Upload file to local storage"""
     try:
+        # Replace rather than rename, so retried uploads keep the name playlists refer to
+        if default_storage.exists(filename):
+            default_storage.delete(filename)
         with open(file_path, 'rb') as file_obj:
             uploaded_file = default_storage.save(filename, ContentFile(file_obj.read()))
             return default_storage.url(uploaded_file)
@@ -628,11 +549,14 @@ def optimize_video_quality():
         )[:5]  # Process 5 at a time
         
         optimized_count = 0
-        for video in videos_to_optimize:
-            if create_video_variants(video):
-                video.optimized = True
-                video.save()
-                optimized_count += 1
+        with video_transcode_service.upload_executor() as uploads:
+            # Each video's uploads run while the next one encodes
+            runs = [(video, start_video_variants(video, uploads)) for video in videos_to_optimize]
+            for video, run in runs:
+                if run and finish_video_variants(video, run):
+                    video.optimized = True
+                    video.save()
+                    optimized_count += 1
         
         logger.info(f"Optimized {optimized_count} videos")
         return f"Optimized {optimized_count} videos"
@@ -644,103 +568,69 @@ def optimize_video_quality():
 
 def create_video_variants(video: Video) -> bool:
     """Create multiple resolution variants of a video"""
+    with video_transcode_service.upload_executor() as uploads:
+        run = start_video_variants(video, uploads)
+        return bool(run) and finish_video_variants(video, run)
+
+
+def start_video_variants(video: Video, uploads) -> Optional[TranscodeRun]:
+    """Encode and package every rendition of a video and queue the uploads on ``uploads``"""
     try:
         if not video.video_url:
-            return False
+            return None
         
-        # Download original video
-        temp_file = download_video_temp(video.video_url)
-        if not temp_file:
-            return False
-        
-        # Create different quality variants
-        variants = {
-            '720p': {'width': 1280, 'height': 720, 'bitrate': '2000k'},
-            '480p': {'width': 854, 'height': 480, 'bitrate': '1000k'},
-            '360p': {'width': 640, 'height': 360, 'bitrate': '500k'}
-        }
-        
-        variant_urls = {}
-        
-        for quality, settings in variants.items():
-            variant_url = create_video_variant(
-                temp_file, 
-                quality, 
-                settings['width'], 
-                settings['height'], 
-                settings['bitrate']
-            )
-            if variant_url:
-                variant_urls[quality] = variant_url
-        
-        # Update video with variants
-        if variant_urls:
-            if not video.metadata:
-                video.metadata = {}
-            video.metadata['variants'] = variant_urls
-            video.save()
+        def download(destination):
+            return download_video_temp(video.video_url, destination) is not None
+        
+        # Keyed by content when known, so identical uploads share one set of outputs
+        key = video.asset.content_hash if video.asset else str(video.id)
         
-        # Clean up
-        if os.path.exists(temp_file):
-            os.unlink(temp_file)
+        def upload(path, name):
+            # Playlists reference their segments relatively, so every output shares one prefix
+            return upload_to_storage_backend(path, f"videos/variants/{key}/{name}")
         
-        return len(variant_urls) > 0
+        # Work is keyed too, so a failed run resumes where it stopped
+        return video_transcode_service.start(key, download, upload, uploads)
         
     except Exception as e:
         logger.error(f"Error creating video variants for {video.id}: {str(e)}")
-        return False
+        return None
 
 
-def create_video_variant(input_path: str, quality: str, width: int, height: int, bitrate: str) -> Optional[str]:
-    """Create a single video variant"""
+def finish_video_variants(video: Video, run: TranscodeRun) -> bool:
+    """Wait for a video's uploads and record its variants; True once every output is stored"""
     try:
-        with tempfile.NamedTemporaryFile(suffix=f'_{quality}.mp4', delete=False) as output_file:
-            output_path = output_file.name
-        
-        # Use ffmpeg to create variant
-        cmd = [
-            'ffmpeg',
-            '-i', input_path,
-            '-vf', f'scale={width}:{height}',
-            '-b:v', bitrate,
-            '-c:v', 'libx264',
-            '-preset', 'medium',
-            '-crf', '23',
-            '-c:a', 'aac',
-            '-b:a', '128k',
-            '-y',
-            output_path
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)  # 5 minute timeout
-        
-        if result.returncode != 0:
-            logger.error(f"ffmpeg variant creation failed for {quality}: {result.stderr}")
-            return None
+        run.wait()
+        variant_urls = run.variants()
+        streaming = run.manifest()
         
-        # Upload variant to storage
-        filename = f"videos/variants/{timezone.now().strftime('%Y/%m/%d')}/{quality}_{os.path.basename(output_path)}"
-        variant_url = upload_to_storage_backend(output_path, filename)
-        
-        # Clean up
-        if os.path.exists(output_path):
-            os.unlink(output_path)
+        # Update video with variants and, once complete, its adaptive manifests
+        if variant_urls:
+            if not video.metadata:
+                video.metadata = {}
+            video.metadata['variants'] = variant_urls
+            if streaming:
+                video.metadata['streaming'] = streaming
+            video.save()
+            
+            if run.complete:
+                video_dedup_service.publish(video)
         
-        return variant_url
+        return run.complete
         
-    except subprocess.TimeoutExpired:
-        logger.error(f"ffmpeg timeout for variant {quality}")
-        return None
     except Exception as e:
-        logger.error(f"Error creating variant {quality}: {str(e)}")
-        return None
+        logger.error(f"Error storing video variants for {video.id}: {str(e)}")
+        return False
 
 
 def upload_to_storage_backend(file_path: str, filename: str) -> Optional[str]:
     """Upload file to configured storage backend"""
     try:
         if hasattr(settings, 'AWS_STORAGE_BUCKET_NAME') and settings.AWS_STORAGE_BUCKET_NAME:
-            return upload_to_s3(file_path, filename)
+            extension = os.path.splitext(filename)[1]
+            content_type = (STREAMING_CONTENT_TYPES.get(extension) or mimetypes.guess_type(filename)[0]
+                            or 'application/octet-stream')
+            return upload_to_s3(file_path, filename, content_type=content_type)
         else:
             return upload_to_local_storage(file_path, filename)
     except Exception as e:
@@ -760,7 +650,7 @@ def generate_video_preview():
         
         generated_count = 0
         for video in videos:
-            preview_url = create_video_preview(video.video_url)
+            preview_url = create_video_preview(video.video_url, content_hash(video))
             if preview_url:
                 video.preview_url = preview_url
                 video.save()
@@ -774,57 +664,11 @@ def generate_video_preview():
         return f"Error: {str(e)}"
 
 
-def create_video_preview(video_url: str) -> Optional[str]:
+def create_video_preview(video_url: str, source_hash: Optional[str] = None) -> Optional[str]:
     """Create a short preview clip from video"""
-    try:
-        # Download original video
-        temp_file = download_video_temp(video_url)
-        if not temp_file:
-            return None
-        
-        with tempfile.NamedTemporaryFile(suffix='_preview.mp4', delete=False) as preview_file:
-            preview_path = preview_file.name
-        
-        # Create 30-second preview starting from 10% of video duration
-        cmd = [
-            'ffmpeg',
-            '-i', temp_file,
-            '-ss', '10%',
-            '-t', '30',
-            '-vf', 'scale=640:360',
-            '-c:v', 'libx264',
-            '-preset', 'fast',
-            '-crf', '28',
-            '-c:a', 'aac',
-            '-b:a', '64k',
-            '-y',
-            preview_path
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
-        
-        if result.returncode != 0:
-            logger.error(f"ffmpeg preview creation failed: {result.stderr}")
-            return None
-        
-        # Upload preview
-        filename = f"videos/previews/{timezone.now().strftime('%Y/%m/%d')}/preview_{os.path.basename(preview_path)}"
-        preview_url = upload_to_storage_backend(preview_path, filename)
-        
-        # Clean up
-        if os.path.exists(preview_path):
-            os.unlink(preview_path)
-        if os.path.exists(temp_file):
-            os.unlink(temp_file)
-        
-        return preview_url
-        
-    except subprocess.TimeoutExpired:
-        logger.error("ffmpeg timeout for preview creation")
-        return None
-    except Exception as e:
-        logger.error(f"Error creating video preview: {str(e)}")
-        return None
+    # Usually a cache hit: uploads are inspected (preview included) when processed
+    inspection = inspect_video_media(video_url, source_hash)
+    return inspection['preview'] if inspection else None
 
 
 @shared_task
@@ -846,6 +690,9 @@ def cleanup_temporary_files():
                 except Exception:
                     pass
         
+        # Work directories of transcodes that never completed
+        count += video_transcode_service.cleanup(getattr(settings, 'VIDEO_TRANSCODE_WORK_TTL', 86400))
+        
         logger.info(f"Cleaned up {count} temporary files")
         return f"Cleaned up {count} temporary files"
         
@@ -9,6 +9,8 @@ from .views import (
     VideoCommentViewSet,
     VideoUploadView, 
     VideoUploadCompleteView, 
+    VideoMultipartUploadView,
+    VideoMultipartPartsView,
     VideoUploadStatusView, 
     VideoSearchView,
     GoogleDriveMoviesView,
@@ -49,6 +51,8 @@ urlpatterns = [
     # Upload endpoints (specific patterns first)
     path('upload/', VideoUploadView.as_view(), name='upload'),
     path('upload/s3/', S3VideoUploadView.as_view(), name='s3_upload'),
+    path('upload/<uuid:upload_id>/multipart/', VideoMultipartUploadView.as_view(), name='upload_multipart'),
+    path('upload/<uuid:upload_id>/multipart/parts/', VideoMultipartPartsView.as_view(), name='upload_multipart_parts'),
     path('upload/<uuid:upload_id>/complete/', VideoUploadCompleteView.as_view(), name='upload_complete'),
     path('upload/<uuid:upload_id>/status/', VideoUploadStatusView.as_view(), name='upload_status'),
     
@@ -2,10 +2,13 @@
 Video views for Watch Party Backend
 """
 
+import itertools
+import logging
 from datetime import timedelta
 from django.utils import timezone
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db.models import Q, F
-from django.http import FileResponse
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from rest_framework import status, generics, permissions, filters
 from rest_framework.decorators import action, api_view, permission_classes
@@ -28,7 +31,17 @@ from .serializers import (
     VideoUpdateSerializer, VideoCommentSerializer, VideoUploadSerializer,
     VideoUploadCreateSerializer, VideoSearchSerializer
 )
+from shared.exceptions import VideoError
+from shared.pagination import VideoListPagination
 from shared.permissions import IsOwnerOrReadOnly, IsAdminUser
+from shared.services.multipart_upload_service import multipart_upload_service
+from shared.services.party_access_service import party_access_service
+from shared.services.video_dedup_service import video_dedup_service
+from shared.services.video_prefetch_service import video_prefetch_service
+from shared.services.video_service import video_streaming_service
+from shared.services.video_proxy_service import RangeNotSatisfiable, video_proxy_service
+
+logger = logging.getLogger(__name__)
 
 
 class VideoViewSet(ModelViewSet):
@@ -42,6 +55,7 @@ class VideoViewSet(ModelViewSet):
     search_fields = ['title', 'description']
     ordering_fields = ['created_at', 'title', 'view_count', 'like_count']
     ordering = ['-created_at']
+    pagination_class = VideoListPagination
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -278,7 +292,7 @@ class VideoUploadView(generics.GenericAPIView):
         responses={200: VideoUploadCreateSerializer}
     )
     def post(self, request):
-        """Initiate video upload"""
+        """Initiate video upload, or upload the file itself in the same request"""
         serializer = VideoUploadCreateSerializer(data=request.data)
         if serializer.is_valid():
             # Create upload record
@@ -302,6 +316,30 @@ class VideoUploadView(generics.GenericAPIView):
             upload.video = video
             upload.save()
             
+            uploaded_file = request.FILES.get('file')
+            if uploaded_file:
+                # Hashed while the body was parsed; re-read only if that handler is not configured
+                content_hash, file_size = (video_dedup_service.upload_digest(request, 'file')
+                                           or video_dedup_service.hash_upload(uploaded_file))
+                outcome = video_dedup_service.claim(video, content_hash, file_size, uploaded_file)
+                if outcome == 'process':
+                    from .tasks import process_video_upload
+                    process_video_upload.delay(str(video.id))
+                
+                upload.status = 'completed'
+                upload.progress_percentage = 100.0
+                upload.completed_at = timezone.now()
+                upload.save()
+                
+                return Response({
+                    'success': True,
+                    'upload_id': upload.id,
+                    'video_id': video.id,
+                    'message': 'Video uploaded successfully',
+                    'status': video.status,
+                    'duplicate': outcome != 'process'
+                }, status=status.HTTP_201_CREATED)
+            
             return Response({
                 'success': True,
                 'upload_id': upload.id,
@@ -329,20 +367,103 @@ class VideoUploadCompleteView(APIView):
         if upload.status != 'uploading':
             return Response({'error': 'Upload not in progress'}, status=status.HTTP_400_BAD_REQUEST)
         
+        video = upload.video
+        if upload.multipart_upload_id:
+            # Assemble the parts in storage; a client missing some is told which to resend
+            try:
+                key = multipart_upload_service.complete(upload)
+            except VideoError as e:
+                return Response({
+                    'error': str(e),
+                    'upload': multipart_upload_service.status(upload)
+                }, status=status.HTTP_400_BAD_REQUEST)
+            if video:
+                video.file.name = key
+        
         # Mark as completed
         upload.status = 'completed'
         upload.progress_percentage = 100.0
         upload.completed_at = timezone.now()
         upload.save()
         
-        # Update video status
-        if upload.video:
-            upload.video.status = 'processing'
-            upload.video.save()
+        # Update video status; content already known from an identical upload needs no processing
+        if video and video.asset and video.asset.status == 'ready':
+            video_dedup_service.apply(video, video.asset)
+        elif video:
+            video.status = 'processing'
+            video.save()
+            if video.file:
+                from .tasks import process_video_upload
+                process_video_upload.delay(str(video.id))
         
         return Response({'status': 'completed'})
 
 
+class VideoMultipartUploadView(APIView):
+    """Resumable multipart upload straight to storage"""
+    
+    permission_classes = [permissions.IsAuthenticated]
+    
+    @extend_schema(summary="VideoMultipartUploadView GET")
+    def get(self, request, upload_id):
+        """Progress and URLs for the parts still missing, to resume an interrupted upload"""
+        upload = get_object_or_404(VideoUpload, id=upload_id, user=request.user)
+        if not upload.multipart_upload_id:
+            return Response({'error': 'Upload has not been started'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(multipart_upload_service.status(upload))
+    
+    @extend_schema(summary="VideoMultipartUploadView POST")
+    def post(self, request, upload_id):
+        """Start the multipart upload (resumes if already started)"""
+        upload = get_object_or_404(VideoUpload, id=upload_id, user=request.user)
+        if upload.status not in ('pending', 'uploading'):
+            return Response({'error': 'Upload not in progress'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            payload = multipart_upload_service.start(
+                upload, request.data.get('content_type') or 'application/octet-stream'
+            )
+        except VideoError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(payload, status=status.HTTP_201_CREATED)
+    
+    @extend_schema(summary="VideoMultipartUploadView DELETE")
+    def delete(self, request, upload_id):
+        """Abandon the upload and discard its stored parts"""
+        upload = get_object_or_404(VideoUpload, id=upload_id, user=request.user)
+        multipart_upload_service.abort(upload)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class VideoMultipartPartsView(APIView):
+    """Part URLs and part completion for a multipart upload"""
+    
+    permission_classes = [permissions.IsAuthenticated]
+    
+    @extend_schema(summary="VideoMultipartPartsView GET")
+    def get(self, request, upload_id):
+        """Presigned URLs for ?parts=1,2,3, or the next batch of missing parts"""
+        upload = get_object_or_404(VideoUpload, id=upload_id, user=request.user)
+        try:
+            numbers = None
+            if request.GET.get('parts'):
+                numbers = [int(number) for number in request.GET['parts'].split(',')]
+            return Response({'part_urls': multipart_upload_service.part_urls(upload, numbers)})
+        except (ValueError, VideoError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    @extend_schema(summary="VideoMultipartPartsView POST")
+    def post(self, request, upload_id):
+        """Record finished parts: {"parts": [{"part_number": 1, "etag": "..."}]}"""
+        upload = get_object_or_404(VideoUpload, id=upload_id, user=request.user)
+        if not upload.multipart_upload_id or upload.status != 'uploading':
+            return Response({'error': 'Upload not in progress'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            return Response(multipart_upload_service.record_parts(upload, request.data.get('parts') or []))
+        except (KeyError, TypeError, ValueError, VideoError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
 class VideoUploadStatusView(generics.RetrieveAPIView):
     """Get upload status"""
     
@@ -456,14 +577,16 @@ class GoogleDriveMoviesView(APIView):
             # List videos from Google Drive
             videos = drive_service.list_videos(folder_id=folder_id)
             
-            # Convert to our video format and check if already in database
+            # Convert to our video format and check which are already in database
+            existing_ids = dict(
+                Video.objects.filter(
+                    gdrive_file_id__in=[video_data['id'] for video_data in videos],
+                    uploader=request.user
+                ).values_list('gdrive_file_id', 'id')
+            )
             movies = []
             for video_data in videos:
-                # Check if video already exists in our database
-                existing_video = Video.objects.filter(
-                    gdrive_file_id=video_data['id'],
-                    uploader=request.user
-                ).first()
+                existing_video_id = existing_ids.get(video_data['id'])
                 
                 movie_data = {
                     'gdrive_file_id': video_data['id'],
@@ -475,8 +598,8 @@ class GoogleDriveMoviesView(APIView):
                     'resolution': video_data.get('resolution'),
                     'created_time': video_data['created_time'],
                     'modified_time': video_data['modified_time'],
-                    'in_database': existing_video is not None,
-                    'video_id': str(existing_video.id) if existing_video else None
+                    'in_database': existing_video_id is not None,
+                    'video_id': str(existing_video_id) if existing_video_id else None
                 }
                 movies.append(movie_data)
             
@@ -704,14 +827,9 @@ class GoogleDriveMovieDeleteView(APIView):
     def delete(self, request, video_id):
         """Delete a movie from Google Drive and our database"""
         try:
-            from django.core.cache import cache
-            
             # Get video
             video = get_object_or_404(Video, id=video_id, uploader=request.user, source_type='gdrive')
             
-            # Invalidate cache for this video
-            cache.delete(f'video_proxy_{video_id}')
-            
             # Get Drive service
             drive_service = get_drive_service(request.user)
             
@@ -828,23 +946,14 @@ class GoogleDriveMovieStreamView(APIView):
 
 
 class VideoProxyView(APIView):
-    """Proxy video requests to avoid CORS issues with Redis caching"""
+    """Proxy Google Drive video through the chunked range cache to avoid CORS issues"""
     
     permission_classes = [permissions.IsAuthenticated]
     
     @extend_schema(summary="VideoProxyView GET")
     def get(self, request, video_id):
-        """Proxy video stream from Google Drive with token refresh on 401 and Redis caching"""
+        """Serve the requested byte range, fetching only the aligned chunks not cached yet"""
         try:
-            import requests
-            from django.http import StreamingHttpResponse
-            from google.auth.transport.requests import Request as GoogleRequest
-            from django.core.cache import cache
-            import logging
-            import time
-            
-            logger = logging.getLogger(__name__)
-            
             # Get video
             video = get_object_or_404(Video, id=video_id, source_type='gdrive')
             
@@ -877,178 +986,54 @@ class VideoProxyView(APIView):
                     'message': 'Google Drive is not connected. Please reconnect in settings.'
                 }, status=status.HTTP_401_UNAUTHORIZED)
             
-            logger.info(f"Proxying GDrive video {video_id}, file: {video.gdrive_file_id}")
-            
-            # Parse range header if present
-            range_header = request.headers.get('Range', '')
-            start_byte = 0
-            end_byte = None
-            
-            if range_header:
-                # Parse "bytes=start-end" format
-                import re
-                match = re.match(r'bytes=(\d+)-(\d*)', range_header)
-                if match:
-                    start_byte = int(match.group(1))
-                    if match.group(2):
-                        end_byte = int(match.group(2))
-            
-            # Retry logic for token refresh
-            max_retries = 2
-            for attempt in range(max_retries):
+            file_id = video.gdrive_file_id
+            try:
+                # Served from the Drive metadata cache, so seeks skip the metadata call
+                media_info = drive_service.get_media_info(file_id)
+                file_size = media_info['size']
+                
                 try:
-                    # Use Drive API's get_media() method instead of constructing URLs
-                    # This is more reliable and doesn't require embedding tokens in URLs
-                    from googleapiclient.http import MediaIoBaseDownload
-                    from googleapiclient.errors import HttpError as GoogleHttpError
-                    import io
-                    
-                    # Get file metadata to determine content type and size
-                    file_metadata = drive_service.drive_service.files().get(
-                        fileId=video.gdrive_file_id,
-                        fields='mimeType,size'
-                    ).execute()
-                    
-                    content_type = file_metadata.get('mimeType', 'video/mp4')
-                    file_size = int(file_metadata.get('size', 0))
-                    
-                    logger.info(f"GDrive file size: {file_size}, content-type: {content_type}, range: {range_header}")
-                    
-                    # Create media request
-                    media_request = drive_service.drive_service.files().get_media(fileId=video.gdrive_file_id)
-                    
-                    # If range request, add range header to the API request
-                    if range_header:
-                        media_request.headers['Range'] = range_header
-                    
-                    # Execute the request and get the streaming response
-                    http_response = media_request.execute(num_retries=0)
-                    
-                    # For range requests, we need to handle this differently
-                    # The googleapiclient doesn't support streaming with range requests well
-                    # So we'll use a direct HTTP request with proper auth headers
-                    if range_header or start_byte > 0:
-                        # Build URL with proper authentication
-                        auth_headers = {}
-                        drive_service.credentials.apply(auth_headers)
-                        
-                        # Make direct request to Drive API
-                        api_url = f"https://www.googleapis.com/drive/v3/files/{video.gdrive_file_id}?alt=media"
-                        
-                        request_headers = auth_headers.copy()
-                        if range_header:
-                            request_headers['Range'] = range_header
-                        
-                        response = requests.get(api_url, headers=request_headers, stream=True, timeout=30)
-                        
-                        # Check for auth errors
-                        if response.status_code in [401, 403] and attempt < max_retries - 1:
-                            logger.warning(f"Google Drive auth error {response.status_code} for video {video_id}, attempt {attempt + 1}")
-                            
-                            # Refresh token
-                            if drive_service.credentials and drive_service.credentials.refresh_token:
-                                try:
-                                    logger.info(f"Refreshing Google Drive token for user {video.uploader.id}")
-                                    drive_service.credentials.refresh(GoogleRequest())
-                                    
-                                    # Update user profile with new token
-                                    if drive_service.on_credentials_updated:
-                                        drive_service.on_credentials_updated(drive_service.credentials)
-                                    
-                                    logger.info(f"Token refreshed successfully for user {video.uploader.id}")
-                                    
-                                    # Wait a bit before retry
-                                    time.sleep(0.5)
-                                    continue
-                                except Exception as refresh_error:
-                                    logger.error(f"Failed to refresh token: {str(refresh_error)}")
-                                    return Response({
-                                        'error': 'drive_token_expired',
-                                        'message': 'Google Drive access expired. Please reconnect.'
-                                    }, status=status.HTTP_401_UNAUTHORIZED)
-                            else:
-                                return Response({
-                                    'error': 'drive_disconnected',
-                                    'message': 'Google Drive is disconnected. Please reconnect.'
-                                }, status=status.HTTP_401_UNAUTHORIZED)
-                        
-                        # If we got here, request was successful or it's the last retry
-                        if response.status_code not in [200, 206]:
-                            logger.error(f"Google Drive returned status {response.status_code} for video {video_id}")
-                            return Response({
-                                'error': 'video_unavailable',
-                                'message': f'Video unavailable (HTTP {response.status_code})'
-                            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
-                        
-                        # Create streaming response
-                        def generate():
-                            try:
-                                for chunk in response.iter_content(chunk_size=8192):
-                                    if chunk:
-                                        yield chunk
-                            except Exception as stream_error:
-                                logger.error(f"Error streaming video {video_id}: {str(stream_error)}")
-                        
-                        streaming_response = StreamingHttpResponse(
-                            generate(),
-                            content_type=content_type,
-                            status=response.status_code
-                        )
-                        
-                        # Copy relevant headers
-                        for header in ['Content-Length', 'Content-Range', 'Accept-Ranges']:
-                            if header in response.headers:
-                                streaming_response[header] = response.headers[header]
-                    else:
-                        # For non-range requests, use the simpler approach
-                        # Create streaming response from the full download
-                        def generate():
-                            try:
-                                buffer = io.BytesIO()
-                                downloader = MediaIoBaseDownload(buffer, media_request, chunksize=1024*1024)
-                                done = False
-                                while not done:
-                                    status_obj, done = downloader.next_chunk()
-                                    if buffer.tell() > 0:
-                                        buffer.seek(0)
-                                        chunk = buffer.read()
-                                        if chunk:
-                                            yield chunk
-                                        buffer.seek(0)
-                                        buffer.truncate(0)
-                            except Exception as stream_error:
-                                logger.error(f"Error streaming video {video_id}: {str(stream_error)}")
-                        
-                        streaming_response = StreamingHttpResponse(
-                            generate(),
-                            content_type=content_type,
-                            status=200
-                        )
-                        
-                        # Add content length and accept ranges
-                        if file_size:
-                            streaming_response['Content-Length'] = file_size
-                        streaming_response['Accept-Ranges'] = 'bytes'
-                    
-                    # Log successful stream
-                    logger.info(f"Successfully proxying video {video_id} for user {request.user.id}")
-                    
-                    return streaming_response
-                    
-                except requests.exceptions.RequestException as req_error:
-                    if attempt < max_retries - 1:
-                        logger.warning(f"Request error for video {video_id}, retrying: {str(req_error)}")
-                        time.sleep(0.5)
-                        continue
-                    else:
-                        logger.error(f"Request failed after {max_retries} attempts: {str(req_error)}")
-                        raise
-            
-            # If we exhausted all retries
-            return Response({
-                'error': 'stream_failed',
-                'message': 'Failed to stream video after multiple attempts'
-            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+                    byte_range = video_proxy_service.parse_range(request.headers.get('Range', ''), file_size)
+                except RangeNotSatisfiable:
+                    response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+                    response['Content-Range'] = f'bytes */{file_size}'
+                    return response
+                
+                start, end = byte_range or (0, file_size - 1)
+                source_key = f"gdrive:{file_id}:{media_info['version']}"
+                
+                def fetch(first, last):
+                    return drive_service.fetch_range(file_id, first, last)
+                
+                body = video_proxy_service.stream(source_key, file_size, start, end, fetch)
+                # Resolve the first chunk before responding so upstream failures keep their status
+                first_block = next(body, b'')
+            except GoogleDriveServiceError as e:
+                return self.upstream_error_response(video_id, e)
+            
+            # Party players pass ?party=<id> so the next chunks are warmed before anyone asks
+            party_id = self.prefetch_party_id(request.user, video, request.GET.get('party'))
+            if party_id:
+                video_prefetch_service.schedule(
+                    party_id,
+                    source_key,
+                    file_size,
+                    fetch,
+                    duration=video.duration.total_seconds() if video.duration else None,
+                    bitrate_kbps=video.bitrate,
+                )
+            
+            streaming_response = StreamingHttpResponse(
+                itertools.chain([first_block], body),
+                content_type=media_info['mime_type'],
+                status=status.HTTP_206_PARTIAL_CONTENT if byte_range else status.HTTP_200_OK
+            )
+            streaming_response['Content-Length'] = max(end - start + 1, 0)
+            streaming_response['Accept-Ranges'] = 'bytes'
+            if byte_range:
+                streaming_response['Content-Range'] = f'bytes {start}-{end}/{file_size}'
+            
+            return streaming_response
             
         except Exception as e:
             logger.error(f"Unexpected error in VideoProxyView for video {video_id}: {str(e)}")
@@ -1056,6 +1041,34 @@ class VideoProxyView(APIView):
                 'error': 'proxy_error',
                 'message': f'Failed to proxy video: {str(e)}'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    def prefetch_party_id(self, user, video, party_id):
+        """Primary key of the party watching ``video`` that ``user`` hosts or joined, else ``None``"""
+        from apps.parties.models import WatchParty
+        
+        if not party_id:
+            return None
+        try:
+            party_pk = WatchParty.objects.filter(id=party_id, video=video).values_list('id', flat=True).first()
+        except (ValueError, DjangoValidationError):
+            return None
+        if party_pk is None or not party_access_service.lookup(party_pk, user.id).allows(allow_public=False):
+            return None
+        return party_pk
+    
+    def upstream_error_response(self, video_id, error):
+        if error.status_code in (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN):
+            logger.warning(f"Google Drive refused access for video {video_id}: {str(error)}")
+            return Response({
+                'error': 'drive_token_expired',
+                'message': 'Google Drive access expired. Please reconnect.'
+            }, status=status.HTTP_401_UNAUTHORIZED)
+        
+        logger.error(f"Google Drive request failed for video {video_id}: {str(error)}")
+        return Response({
+            'error': 'video_unavailable',
+            'message': f'Video unavailable (HTTP {error.status_code})'
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
 
 # Advanced Video Analytics Endpoints
@@ -1350,33 +1363,26 @@ class VideoQualityVariantsView(APIView):
                     'error': 'Permission denied'
                 }, status=status.HTTP_403_FORBIDDEN)
             
-            # Return available quality variants
+            # Return packaged renditions, each with its HLS playlist and segment index
+            manifest = video_streaming_service.get_adaptive_manifest(video)
             quality_variants = [
                 {
-                    'quality': '360p',
-                    'url': f'/api/videos/{video_id}/stream/?quality=360p',
-                    'available': True  # In a real implementation, check if this quality exists
-                },
-                {
-                    'quality': '480p',
-                    'url': f'/api/videos/{video_id}/stream/?quality=480p',
+                    'quality': rendition['quality'],
+                    'url': rendition.get('playlist') or rendition['mp4'],
+                    'mp4_url': rendition['mp4'],
+                    'segment_index_url': rendition.get('index'),
+                    'resolution': f"{rendition['width']}x{rendition['height']}" if rendition.get('width') else None,
+                    'bandwidth': rendition.get('bandwidth'),
                     'available': True
-                },
-                {
-                    'quality': '720p',
-                    'url': f'/api/videos/{video_id}/stream/?quality=720p',
-                    'available': True
-                },
-                {
-                    'quality': '1080p',
-                    'url': f'/api/videos/{video_id}/stream/?quality=1080p',
-                    'available': video.resolution and 'HD' in str(video.resolution)
                 }
+                for rendition in manifest['renditions']
             ]
             
             return Response({
                 'video_id': str(video.id),
                 'original_quality': getattr(video, 'resolution', 'Unknown'),
+                'hls_manifest': manifest['hls_url'],
+                'dash_manifest': manifest['dash_url'],
                 'quality_variants': quality_variants
             })
             
@@ -2,8 +2,9 @@
 
 import os
 from celery import Celery
-from celery.signals import task_failure, task_postrun, task_prerun
+from celery.signals import before_task_publish, task_failure, task_postrun, task_prerun
 
+from shared import tracing
 from shared.observability import observability
 
 # Set default Django settings
@@ -43,7 +44,9 @@ def instrument_task_prerun(sender=None, task_id=None, task=None, **kwargs):
         delivery_info = getattr(request, "delivery_info", None) or {}
         queue = delivery_info.get("routing_key")
 
-    observability.begin_task(task_id=task_id, task_name=task_name, queue=queue)
+    # Continue the publisher's trace; eager tasks already run inside it
+    parent = tracing.parse_traceparent(getattr(request, tracing.TRACEPARENT_HEADER, None)) if request else None
+    observability.begin_task(task_id=task_id, task_name=task_name, queue=queue, parent=parent)
 
 
 def instrument_task_postrun(sender=None, task_id=None, task=None, retval=None, state=None, **kwargs):
@@ -62,6 +65,14 @@ def instrument_task_failure(sender=None, task_id=None, exception=None, **kwargs)
     observability.fail_task(task_id=task_id, exception=exception)
 
 
+def propagate_trace_context(headers=None, **kwargs):
+    """Carry the current trace into the published task's message headers."""
+
+    if headers is not None:
+        tracing.inject(headers)
+
+
+before_task_publish.connect(propagate_trace_context, weak=False)
 task_prerun.connect(instrument_task_prerun, weak=False)
 task_postrun.connect(instrument_task_postrun, weak=False)
 task_failure.connect(instrument_task_failure, weak=False)
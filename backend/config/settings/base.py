@@ -141,6 +141,8 @@ CACHES = get_cache_config()
 ENABLE_QUERY_LOGGING = DEBUG
 SLOW_QUERY_THRESHOLD_MS = 500
 MAX_QUERIES_PER_REQUEST = 50
+QUERY_PROFILE_SAMPLE_RATE = config('QUERY_PROFILE_SAMPLE_RATE', default=1.0, cast=float)  # requests whose queries are counted and fingerprinted
+N_PLUS_ONE_THRESHOLD = 5  # same query shape this many times in one request is reported as a likely N+1
 USE_CACHE = True
 ENABLE_RATE_LIMITING = True
 ENABLE_PERFORMANCE_MONITORING = True
@@ -217,6 +219,27 @@ USE_CACHE = True
 ENABLE_RATE_LIMITING = True
 ENABLE_PERFORMANCE_MONITORING = True
 
+# In-process telemetry buffers; exporters run on a background thread
+OBSERVABILITY_BUFFER_SIZE = 2048  # recent metrics, events and spans kept each for inspection
+OBSERVABILITY_EXPORT_QUEUE_SIZE = 10000  # records staged for export; oldest dropped beyond this
+OBSERVABILITY_FLUSH_INTERVAL = 1.0  # seconds between batched exports
+OBSERVABILITY_MAX_SERIES = 5000  # instrument series (name + tags); extra tag sets fold into overflow="true"
+# Shared by every worker on a host so /metrics aggregates across processes; wipe on deploy. Empty = this process only.
+OBSERVABILITY_MULTIPROC_DIR = config('OBSERVABILITY_MULTIPROC_DIR', default='')
+OBSERVABILITY_MULTIPROC_INTERVAL = 5.0  # seconds between each process's instrument file writes
+OBSERVABILITY_SCRAPE_TOKEN = config('OBSERVABILITY_SCRAPE_TOKEN', default='')  # bearer token required by /metrics; unset disables the endpoint
+MONITORING_SNAPSHOT_TTL = 300  # seconds a cached collector run stays valid
+TRACING_ENABLED = True  # DB query, cache and outgoing HTTP calls become child spans of the current trace
+TRACE_SAMPLE_RATE = config('TRACE_SAMPLE_RATE', default=0.01, cast=float)  # traces that keep every child span
+TRACE_SLOW_SPAN_MS = 1500  # unsampled traces whose root runs longer keep their child spans anyway (as do errors)
+TRACE_MAX_DEFERRED_SPANS = 256  # child spans an unsampled trace holds back until its root decides
+# Proxy addresses/networks whose incoming traceparent sampled flag is honoured (others are sampled here)
+TRACE_TRUSTED_PROXIES = config(
+    'TRACE_TRUSTED_PROXIES',
+    default='',
+    cast=lambda v: [s.strip() for s in v.split(',') if s.strip()]
+)
+
 # JWT Settings
 from datetime import timedelta
 
@@ -311,12 +334,51 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'apps.authentication.tasks.cleanup_inactive_sessions',
         'schedule': 86400.0,  # Daily
     },
+    'reconcile-presence': {
+        'task': 'shared.background_tasks.reconcile_presence',
+        'schedule': 60.0,  # Every minute
+    },
+    'flush-chat-buffer': {
+        'task': 'shared.background_tasks.flush_chat_buffer',
+        'schedule': 30.0,  # Replays messages left behind by crashed workers
+    },
+    'refresh-search-index': {
+        'task': 'apps.search.tasks.refresh_search_index',
+        'schedule': 60.0,  # Every minute; backfills the whole index while it is empty
+    },
+    'rebuild-search-index': {
+        'task': 'apps.search.tasks.rebuild_search_index',
+        'schedule': 604800.0,  # Weekly; picks up rows changed by bulk updates that bypass signals
+    },
+    'poll-drive-changes': {
+        'task': 'apps.integrations.tasks.poll_drive_changes',
+        'schedule': 60.0,  # Invalidates cached Drive metadata
+    },
+    'rebuild-autocomplete-index': {
+        'task': 'apps.search.tasks.rebuild_autocomplete_index',
+        'schedule': 86400.0,  # Daily; drops stale entries and trims to AUTOCOMPLETE_MAX_TERMS
+    },
+    'refresh-autocomplete-terms': {
+        'task': 'apps.search.tasks.refresh_autocomplete_terms',
+        'schedule': 60.0,  # Applies suggestion and trending query changes since the last run
+    },
+    'refresh-monitoring-snapshot': {
+        'task': 'shared.background_tasks.refresh_monitoring_snapshot',
+        'schedule': 60.0,  # Collector queries run here, never per dashboard request or scrape
+    },
 }
 CELERY_TASK_ROUTES = {
     'shared.background_tasks.process_search_analytics': {'queue': 'analytics'},
     'shared.background_tasks.process_notification_analytics': {'queue': 'analytics'},
     'shared.background_tasks.cleanup_expired_data': {'queue': 'maintenance'},
     'shared.background_tasks.optimize_database_indexes': {'queue': 'maintenance'},
+    'shared.background_tasks.reconcile_presence': {'queue': 'maintenance'},
+    'shared.background_tasks.refresh_monitoring_snapshot': {'queue': 'maintenance'},
+    'apps.search.tasks.refresh_search_index': {'queue': 'maintenance'},
+    'apps.search.tasks.rebuild_search_index': {'queue': 'maintenance'},
+    'apps.search.tasks.rebuild_autocomplete_index': {'queue': 'maintenance'},
+    'apps.search.tasks.refresh_autocomplete_terms': {'queue': 'maintenance'},
+    'apps.integrations.tasks.poll_drive_changes': {'queue': 'maintenance'},
     'apps.authentication.tasks.cleanup_expired_sessions': {'queue': 'maintenance'},
     'apps.authentication.tasks.cleanup_expired_tokens': {'queue': 'maintenance'},
     'apps.authentication.tasks.cleanup_inactive_sessions': {'queue': 'maintenance'},
@@ -351,6 +413,7 @@ AWS_S3_REGION_NAME = config('AWS_S3_REGION_NAME', default='us-east-1')
 AWS_S3_FILE_OVERWRITE = False
 AWS_DEFAULT_ACL = 'private'
 AWS_S3_CUSTOM_DOMAIN = config('AWS_S3_CUSTOM_DOMAIN', default='')
+AWS_S3_ENDPOINT_URL = config('AWS_S3_ENDPOINT_URL', default='')  # S3-compatible stand-in (MinIO, LocalStack) when set
 
 # Stripe Configuration
 STRIPE_PUBLISHABLE_KEY = config('STRIPE_PUBLISHABLE_KEY', default='')
@@ -360,6 +423,11 @@ STRIPE_WEBHOOK_SECRET = config('STRIPE_WEBHOOK_SECRET', default='')
 # Google Drive Configuration
 GOOGLE_DRIVE_CLIENT_ID = config('GOOGLE_DRIVE_CLIENT_ID', default='')
 GOOGLE_DRIVE_CLIENT_SECRET = config('GOOGLE_DRIVE_CLIENT_SECRET', default='')
+GOOGLE_DRIVE_CLIENT_IDLE_TTL = 600  # seconds an unused per-user Drive client is kept
+GOOGLE_DRIVE_CLIENT_POOL_SIZE = 1000  # users with pooled Drive clients per process
+DRIVE_METADATA_CACHE_TTL = 3600  # seconds shared Drive metadata is kept; users idle longer stop being polled
+DRIVE_METADATA_LOCAL_TTL = 15  # seconds a process reuses metadata without asking the shared cache
+DRIVE_METADATA_LOCAL_SIZE = 2048  # per-process metadata entries
 GOOGLE_SERVICE_ACCOUNT_FILE = config('GOOGLE_SERVICE_ACCOUNT_FILE', default='')
 
 # Firebase Configuration for Mobile Push Notifications
@@ -587,6 +655,12 @@ CSRF_COOKIE_SAMESITE = 'None' if config('CSRF_COOKIE_SECURE', default=False, cas
 
 # File Upload Security
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
+# Uploads are hashed as the body streams in, whichever middleware parses it first
+FILE_UPLOAD_HANDLERS = [
+    'shared.services.video_dedup_service.ContentHashUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 DATA_UPLOAD_MAX_NUMBER_FIELDS = 1000
 MAX_REQUEST_SIZE = 500 * 1024 * 1024  # 500MB for video uploads
@@ -628,6 +702,32 @@ VIDEO_UPLOAD_PATH = 'videos/'
 VIDEO_THUMBNAIL_PATH = 'thumbnails/'
 MAX_VIDEO_FILE_SIZE = 500 * 1024 * 1024  # 500MB
 SUPPORTED_VIDEO_FORMATS = ['mp4', 'avi', 'mov', 'wmv', 'flv', 'webm']
+VIDEO_PROXY_CACHE_DIR = config('VIDEO_PROXY_CACHE_DIR', default='')  # empty uses <tmp>/watchparty-video-proxy
+VIDEO_PROXY_CACHE_BYTES = config('VIDEO_PROXY_CACHE_BYTES', default=2 * 1024 * 1024 * 1024, cast=int)
+VIDEO_PROXY_CHUNK_SIZE = 4 * 1024 * 1024  # aligned upstream fetch and cache unit
+VIDEO_PREFETCH_SECONDS = 30  # playback seconds warmed ahead of a party's position
+VIDEO_PREFETCH_WORKERS = 4  # per-process upstream fetch threads
+VIDEO_PREFETCH_MAX_INFLIGHT = 32  # chunks queued or fetching per process
+VIDEO_PREFETCH_INTERVAL = 2.0  # seconds between read-ahead plans for the same party
+VIDEO_TRANSCODE_WORK_DIR = config('VIDEO_TRANSCODE_WORK_DIR', default='')  # empty uses <tmp>/watchparty-transcode
+VIDEO_TRANSCODE_WORK_TTL = 86400  # seconds an unfinished transcode is kept for retries
+VIDEO_TRANSCODE_PRESET = 'medium'
+VIDEO_TRANSCODE_TIMEOUT = 1800  # seconds for the single encode of every rendition
+VIDEO_TRANSCODE_THREADS = 4  # encoder threads per rendition
+VIDEO_TRANSCODE_SLOTS = config('VIDEO_TRANSCODE_SLOTS', default=0, cast=int)  # concurrent encodes per host; 0 sizes by CPU cores
+VIDEO_TRANSCODE_UPLOAD_WORKERS = 3
+VIDEO_SEGMENT_SECONDS = 4  # HLS/DASH segment length; encodes force keyframes on these boundaries
+VIDEO_PACKAGE_DASH = False  # also package a single-file DASH manifest
+VIDEO_PACKAGE_TIMEOUT = 600
+MEDIA_INSPECTION_CACHE_TTL = 30 * 86400  # seconds inspection results are reused for identical sources
+MEDIA_INSPECTION_TIMEOUT = 900
+MEDIA_THUMBNAIL_COUNT = 5
+MEDIA_SPRITE_GRID = (10, 10)  # scrub preview sprite sheet columns x rows
+MEDIA_PREVIEW_SECONDS = 30
+VIDEO_MULTIPART_PART_SIZE = 16 * 1024 * 1024  # client part size; grown for files that would exceed 10,000 parts
+VIDEO_MULTIPART_URL_BATCH = 20  # presigned part URLs handed out per request
+VIDEO_TRANSFER_PART_SIZE = 16 * 1024 * 1024  # server-side multipart chunk and threshold
+VIDEO_TRANSFER_CONCURRENCY = 8  # threads per server-side transfer
 
 # Two-Factor Authentication
 OTP_TOTP_ISSUER = 'WatchParty'
@@ -640,3 +740,27 @@ NOTIFICATION_RETRY_DELAY = 300  # 5 minutes
 # Analytics Configuration
 ANALYTICS_BATCH_SIZE = 1000
 ANALYTICS_RETENTION_DAYS = 365
+
+# Search Configuration
+SEARCH_BACKEND = config('SEARCH_BACKEND', default='')  # dotted path; empty picks Postgres full-text or the portable fallback
+SEARCH_TRIGRAM_THRESHOLD = 0.3  # minimum title similarity for fuzzy matches
+SEARCH_INDEX_BATCH_SIZE = 500  # queued objects re-indexed per query batch
+AUTOCOMPLETE_BUCKET_SIZE = 20  # completions kept per prefix bucket (the endpoint's max limit)
+AUTOCOMPLETE_MAX_TERMS = 10000  # highest-weighted suggestions and trending queries indexed
+AUTOCOMPLETE_TRENDING_DAYS = 7  # days of daily trending counts added to entry weights
+AUTOCOMPLETE_FUZZY_MIN_LENGTH = 4  # shorter queries only match exact prefixes
+AUTOCOMPLETE_FUZZY_MAX_LENGTH = 12
+
+# Real-time Party Configuration
+PARTY_CLOCK_TTL = 3600  # seconds an idle party clock is kept
+PARTY_FANOUT_WINDOW_MS = config('PARTY_FANOUT_WINDOW_MS', default=75, cast=int)  # 0 disables batching
+PARTY_FANOUT_MAX_BATCH = 100  # flush early once a group buffers this many events
+PARTY_FANOUT_BATCH_FRAMES = config('PARTY_FANOUT_BATCH_FRAMES', default=False, cast=bool)  # send {"type": "batch"} frames to clients
+WEBSOCKET_JSON_CODEC = config('WEBSOCKET_JSON_CODEC', default='json')  # 'json' or 'orjson' (optional dependency)
+USER_CARD_TTL = 300  # shared-cache lifetime of WebSocket user cards
+USER_CARD_LOCAL_TTL = 60  # per-process LRU lifetime (bounds staleness across workers)
+USER_CARD_LOCAL_MAX_ENTRIES = 10000
+PRESENCE_TTL = 90  # seconds a connection stays present without a heartbeat
+PARTY_ACL_TTL = 600  # seconds a cached party access list lives between writes
+CHAT_BUFFER_FLUSH_MS = config('CHAT_BUFFER_FLUSH_MS', default=250, cast=int)  # 0 writes each message through
+CHAT_BUFFER_MAX_BATCH = 200  # flush early once a process has buffered this many messages
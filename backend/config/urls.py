@@ -17,6 +17,7 @@ from datetime import timedelta
 from django.utils import timezone
 from django.db.models import Q, Count
 from django.http import JsonResponse
+from shared.health_views import OpenMetricsView
 from shared.serializers import (
     APIRootResponseSerializer, 
     HealthCheckResponseSerializer,
@@ -241,6 +242,7 @@ urlpatterns = [
     # Health check
     path('health/', HealthCheckView.as_view(), name='health_check'),
     path('api/health/', HealthCheckView.as_view(), name='api_health_check'),
+    path('metrics', OpenMetricsView.as_view(), name='openmetrics'),
     
     # Test endpoint
     path('api/test/', TestEndpointView.as_view(), name='test_endpoint'),
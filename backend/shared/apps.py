@@ -0,0 +1,15 @@
+"""
+Shared App Configuration
+"""
+
+from django.apps import AppConfig
+
+
+class SharedConfig(AppConfig):
+    name = 'shared'
+
+    def ready(self):
+        """Hook request query profiling and tracing into database, cache and outgoing HTTP calls"""
+        from shared import query_profiler, tracing
+        query_profiler.install()
+        tracing.install()
@@ -433,6 +433,78 @@ def cleanup_expired_data(self):
         raise self.retry(exc=exc, countdown=60 * (self.request.retries + 1))
 
 
+@shared_task(bind=True, max_retries=3)
+def reconcile_presence(self):
+    """
+    Copy live presence from the Redis registry into the database in batches
+    """
+    try:
+        from apps.chat.models import ChatRoom
+        from apps.parties.models import WatchParty
+        from shared.services.presence_service import presence_service
+
+        synced_rooms = 0
+        with observability.span("presence.reconcile"):
+            for room_id in presence_service.rooms('chat'):
+                member_ids = presence_service.members('chat', room_id)
+                room = ChatRoom.objects.filter(id=room_id).first()
+                if room is not None:
+                    room.active_users.set(member_ids)
+                    synced_rooms += 1
+                if not member_ids:
+                    presence_service.forget_room('chat', room_id)
+
+            for party_id in presence_service.rooms('party'):
+                viewers = presence_service.count('party', party_id)
+                WatchParty.objects.filter(
+                    id=party_id, peak_concurrent_viewers__lt=viewers
+                ).update(peak_concurrent_viewers=viewers)
+                if not viewers:
+                    presence_service.forget_room('party', party_id)
+
+        observability.record_metric("presence.reconciled_rooms", synced_rooms)
+        return synced_rooms
+
+    except Exception as exc:
+        logger.error(f"Error reconciling presence: {exc}")
+        raise self.retry(exc=exc, countdown=60 * (self.request.retries + 1))
+
+
+@shared_task(bind=True, max_retries=3)
+def flush_chat_buffer(self):
+    """
+    Persist chat messages left in the write-behind buffer (e.g. by a crashed worker)
+    """
+    try:
+        from shared.services.chat_buffer_service import chat_message_buffer
+
+        with observability.span("chat.buffer.flush"):
+            written = chat_message_buffer.flush()
+        observability.record_metric("chat.buffer.flushed_messages", written)
+        return written
+
+    except Exception as exc:
+        logger.error(f"Error flushing chat buffer: {exc}")
+        raise self.retry(exc=exc, countdown=10 * (self.request.retries + 1))
+
+
+@shared_task(bind=True, max_retries=3)
+def refresh_monitoring_snapshot(self):
+    """
+    Run the monitoring collectors and cache their results for dashboards and metric scrapes
+    """
+    try:
+        from shared.monitoring import monitoring_engine
+
+        with observability.span("monitoring.snapshot.refresh"):
+            metrics = monitoring_engine.refresh_metrics_snapshot()
+        return len(metrics)
+
+    except Exception as exc:
+        logger.error(f"Error refreshing monitoring snapshot: {exc}")
+        raise self.retry(exc=exc, countdown=10 * (self.request.retries + 1))
+
+
 @shared_task(bind=True, max_retries=3)
 def optimize_database_indexes(self):
     """
@@ -2,6 +2,10 @@
 Enhanced health check views for monitoring deployment status
 """
 
+import hmac
+
+from django.http import HttpResponse
+from django.views import View
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
@@ -113,3 +117,35 @@ class LivenessCheckView(APIView):
     def get(self, request):
         """Simple OK response for liveness"""
         return Response({'status': 'alive'}, status=status.HTTP_200_OK)
+
+
+class OpenMetricsView(View):
+    """
+    Prometheus/OpenMetrics scrape endpoint
+
+    Renders the observability instruments (merged across worker processes when
+    ``OBSERVABILITY_MULTIPROC_DIR`` is set) and the collector values last
+    cached by ``refresh_monitoring_snapshot``. A scrape reads local files and
+    one cache key; it never queries the database. Disabled (404) until
+    ``OBSERVABILITY_SCRAPE_TOKEN`` is set; scrapers send it as a bearer token.
+    """
+
+    def get(self, request):
+        from shared.monitoring import monitoring_engine
+        from shared.observability import observability
+        from shared.observability_exporters import multiprocess_store
+        from shared.observability_openmetrics import CONTENT_TYPE, render
+
+        token = getattr(settings, 'OBSERVABILITY_SCRAPE_TOKEN', '')
+        if not token:
+            return HttpResponse(status=404)
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return HttpResponse(status=401)
+
+        store = multiprocess_store()
+        if store is None:
+            registry = observability.instruments
+        else:
+            store.write(observability.instruments)
+            registry = store.collect()
+        return HttpResponse(render(registry, monitoring_engine.get_metrics_snapshot()), content_type=CONTENT_TYPE)
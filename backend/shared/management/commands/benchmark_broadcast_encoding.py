@@ -0,0 +1,91 @@
+"""
+Micro-benchmark for WebSocket group broadcast encoding cost
+"""
+
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from shared.websocket_broadcast import frame_event, orjson
+
+
+class Command(BaseCommand):
+    help = 'Compare per-recipient CPU for per-socket json.dumps versus serialize-once broadcasts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--members',
+            type=int,
+            default=1000,
+            help='Number of sockets in the simulated group',
+        )
+        parser.add_argument(
+            '--messages',
+            type=int,
+            default=200,
+            help='Number of broadcasts to fan out',
+        )
+
+    def handle(self, *args, **options):
+        members = options['members']
+        messages = options['messages']
+        sender = {
+            'id': '4d6f7e0c-3b1a-4c55-9a51-1f4fbd1c2a90',
+            'username': 'host',
+            'first_name': 'Party',
+            'avatar_url': 'https://cdn.example.com/avatars/host.png',
+        }
+        event = {
+            'type': 'play_command',
+            'current_time': 1234.56,
+            'timestamp': '2025-01-01T20:00:00+00:00',
+            'sender': sender,
+        }
+
+        self.stdout.write(f"Fan-out of {messages} broadcasts to {members} sockets\n")
+
+        def per_recipient():
+            # Previous behaviour: every socket rebuilds the dict and encodes it
+            for _ in range(members):
+                json.dumps({
+                    'type': 'play',
+                    'current_time': event['current_time'],
+                    'timestamp': event['timestamp'],
+                    'sender': event['sender'],
+                })
+
+        def serialize_once():
+            group_event = frame_event('play_command', {
+                'type': 'play',
+                'current_time': event['current_time'],
+                'timestamp': event['timestamp'],
+                'sender': event['sender'],
+            })
+            for _ in range(members):
+                group_event['frame']
+
+        results = [('json.dumps per recipient', self._measure(per_recipient, messages))]
+        with override_settings(WEBSOCKET_JSON_CODEC='json'):
+            results.append(('serialize once (json)', self._measure(serialize_once, messages)))
+        if orjson is not None:
+            with override_settings(WEBSOCKET_JSON_CODEC='orjson'):
+                results.append(('serialize once (orjson)', self._measure(serialize_once, messages)))
+        else:
+            self.stdout.write(self.style.WARNING('orjson not installed; skipping fast codec run'))
+
+        baseline = results[0][1]
+        for label, elapsed in results:
+            per_recipient_us = elapsed / (messages * members) * 1_000_000
+            speedup = baseline / elapsed if elapsed else float('inf')
+            self.stdout.write(
+                f"  {label:<28} {per_recipient_us:8.3f} µs/recipient  ({speedup:6.1f}x)"
+            )
+
+    @staticmethod
+    def _measure(fn, iterations):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        return time.perf_counter() - start
@@ -8,8 +8,8 @@ from typing import Callable
 from django.conf import settings
 from django.core.cache import caches
 from django.db import connection
-from django.utils.deprecation import MiddlewareMixin
 
+from shared import query_profiler
 from shared.observability import observability
 
 logger = logging.getLogger('watchparty.database')
@@ -47,70 +47,112 @@ class CacheOptimizationMiddleware:
         return self.get_response(request)
 
 
-class QueryOptimizationMiddleware(MiddlewareMixin):
-    """Log slow queries when query logging is enabled."""
+def view_name(request) -> str:
+    """Dotted path of the view that handled ``request`` (its class for class-based views)."""
 
-    def __init__(self, get_response: Callable | None = None):  # pragma: no cover - MiddlewareMixin handles call
-        super().__init__(get_response)
-        self.slow_threshold = getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 500)
-        self.log_queries = getattr(settings, 'ENABLE_QUERY_LOGGING', False) or settings.DEBUG
+    resolver_match = getattr(request, 'resolver_match', None)
+    if resolver_match is None:
+        return 'unmatched'
+    view = getattr(resolver_match.func, 'view_class', resolver_match.func)
+    return f"{view.__module__}.{view.__qualname__}"
 
-    def process_response(self, request, response):  # pragma: no cover - exercised via Django middleware hooks
-        if not self.log_queries:
+
+class QueryOptimizationMiddleware:
+    """Report slow queries, timed by the execute-wrapper query profiler (works with DEBUG off)."""
+
+    def __init__(self, get_response: Callable):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with query_profiler.profile() as profile:
+            response = self.get_response(request)
+
+        if profile is None:
             return response
 
-        for query in connection.queries:
-            try:
-                duration_ms = float(query.get('time', 0)) * 1000
-            except (TypeError, ValueError):
-                continue
-
-            if duration_ms >= self.slow_threshold:
-                logger.warning(
-                    "Slow query detected", extra={"sql": query.get('sql', ''), "duration_ms": duration_ms}
-                )
-                observability.record_event(
-                    'database.slow_query',
-                    'Slow query detected',
-                    severity='warning',
-                    tags={
-                        'duration_ms': f"{duration_ms:.2f}",
-                        'path': getattr(request, 'path', 'unknown'),
-                    },
-                )
+        for sql, duration_ms in profile.slow:
+            shape = query_profiler.fingerprint(sql)
+            logger.warning(
+                "Slow query detected", extra={"sql": shape, "duration_ms": duration_ms}
+            )
+            observability.record_event(
+                'database.slow_query',
+                'Slow query detected',
+                severity='warning',
+                tags={
+                    'duration_ms': f"{duration_ms:.2f}",
+                    'path': getattr(request, 'path', 'unknown'),
+                    'view': view_name(request),
+                    'fingerprint': query_profiler.fingerprint_id(shape),
+                },
+            )
         return response
 
 
 class QueryCountLimitMiddleware:
-    """Warn when a request exceeds the configured query budget."""
+    """
+    Record query count and time per request, and flag budget overruns and N+1 shapes.
+
+    Counts come from the execute-wrapper query profiler, so they are real
+    with DEBUG off; requests outside the ``QUERY_PROFILE_SAMPLE_RATE`` sample
+    are not checked.
+    """
 
     def __init__(self, get_response: Callable):
         self.get_response = get_response
         self.max_queries = getattr(settings, 'MAX_QUERIES_PER_REQUEST', None)
+        self.repeat_threshold = getattr(settings, 'N_PLUS_ONE_THRESHOLD', query_profiler.DEFAULT_N_PLUS_ONE_THRESHOLD)
 
     def __call__(self, request):
-        if not self.max_queries:
-            return self.get_response(request)
+        with query_profiler.profile() as profile:
+            start_count = profile.count if profile else 0
+            start_ms = profile.total_ms if profile else 0.0
+            response = self.get_response(request)
 
-        start_count = len(connection.queries)
-        response = self.get_response(request)
-        total_queries = len(connection.queries) - start_count
+        if profile is None:
+            return response
+
+        total_queries = profile.count - start_count
+        view = view_name(request)
+        observability.observe('db.request.queries', total_queries, tags={'view': view})
+        observability.observe('db.request.query_time_ms', profile.total_ms - start_ms, tags={'view': view})
 
-        if total_queries > self.max_queries:
+        if self.max_queries and total_queries > self.max_queries:
             logger.warning(
-                "Query count exceeded budget", extra={"path": request.path, "count": total_queries}
+                "Query count exceeded budget", extra={"path": request.path, "view": view, "count": total_queries}
             )
             response.setdefault('X-Query-Count', str(total_queries))
             observability.record_metric(
                 'database.query_budget_exceeded',
                 total_queries,
-                tags={'path': request.path, 'budget': str(self.max_queries)},
+                tags={'view': view, 'budget': str(self.max_queries)},
             )
             observability.record_event(
                 'database.query_budget_exceeded',
                 'Query count exceeded budget',
                 severity='warning',
-                tags={'path': request.path, 'count': str(total_queries)},
+                tags={'path': request.path, 'view': view, 'count': str(total_queries)},
+            )
+
+        repeated = profile.repeated(self.repeat_threshold)
+        if repeated:
+            query_profiler.record_repeated(view, repeated)
+            shape, count, total_ms = repeated[0]
+            logger.warning(
+                "Repeated query shape (possible N+1)",
+                extra={"path": request.path, "view": view, "sql": shape, "count": count},
+            )
+            observability.record_event(
+                'database.n_plus_one',
+                'Repeated query shape (possible N+1)',
+                severity='warning',
+                tags={
+                    'path': request.path,
+                    'view': view,
+                    'fingerprint': query_profiler.fingerprint_id(shape),
+                    'count': str(count),
+                    'duration_ms': f"{total_ms:.2f}",
+                },
             )
         return response
 
@@ -8,6 +8,7 @@ from typing import Callable
 
 from django.http import HttpRequest, HttpResponse
 
+from shared import tracing
 from shared.observability import observability
 
 logger = logging.getLogger('watchparty.middleware')
@@ -25,10 +26,12 @@ class RequestLoggingMiddleware:
         with observability.span(
             'http.request',
             tags={'method': request.method, 'path': request.path},
+            parent=tracing.extract_request(request),
         ) as span:
             response = self.get_response(request)
             if isinstance(response, HttpResponse):
                 span.add_tag('status_code', response.status_code)
+                response.setdefault('X-Trace-Id', span.trace_id)
                 if response.status_code >= 500:
                     span.set_status('error')
             return response
@@ -84,11 +84,13 @@ class APIPerformanceMiddleware:
         else:
             status_code = getattr(response, 'status_code', 0)
 
+        # Tagged by URL pattern rather than path, so ids do not multiply the series
+        resolver_match = getattr(request, 'resolver_match', None)
         observability.record_metric(
             "http.response_time_ms",
             duration_ms,
             tags={
-                'path': request.path,
+                'route': getattr(resolver_match, 'route', None) or 'unmatched',
                 'method': request.method,
                 'status': str(status_code),
             },
@@ -25,6 +25,7 @@ if TYPE_CHECKING:  # pragma: no cover
 logger = logging.getLogger(__name__)
 
 OBSERVABILITY_CACHE_KEY = "monitoring:observability_snapshot"
+METRICS_SNAPSHOT_CACHE_KEY = "latest_monitoring_metrics"
 
 
 class AlertSeverity(Enum):
@@ -277,13 +278,33 @@ class ApplicationMetricsCollector:
     def get_api_metrics(self) -> Dict[str, float]:
         """Get API performance metrics"""
         try:
-            # Get cached API metrics if available
+            from shared.observability import observability
+            from shared.observability_exporters import multiprocess_store
+            
+            # APIPerformanceMiddleware's response time histogram, merged across the
+            # web workers when they share an instrument directory
+            store = multiprocess_store()
+            if store is None:
+                registry = observability.instruments
+            else:
+                store.write(observability.instruments)
+                registry = store.collect()
+            responses = registry.merged_histogram('http.response_time_ms')
+            errors = sum(
+                histogram.count for histogram in registry.series('histogram', 'http.response_time_ms')
+                if dict(histogram.tags).get('status', '').startswith('5')
+            )
+            minutes = max((time.time() - registry.started_at) / 60, 1.0)
+            stats = responses.snapshot()
             api_metrics = cache.get('api_performance_metrics', {})
             
             return {
-                'api_avg_response_time': api_metrics.get('avg_response_time', 0),
-                'api_requests_per_minute': api_metrics.get('requests_per_minute', 0),
-                'api_error_rate': api_metrics.get('error_rate', 0),
+                'api_avg_response_time': stats['avg'],
+                'api_p50_response_time': stats['p50'],
+                'api_p95_response_time': stats['p95'],
+                'api_p99_response_time': stats['p99'],
+                'api_requests_per_minute': responses.count / minutes,
+                'api_error_rate': (errors / responses.count * 100) if responses.count else 0.0,
                 'api_cache_hit_rate': api_metrics.get('cache_hit_rate', 0),
             }
         except Exception as e:
@@ -583,15 +604,27 @@ class MonitoringEngine:
 
         self._cache_observability_snapshot()
 
-    def get_observability_summary(self) -> Dict[str, float]:
-        """Return aggregated metrics derived from forwarded observability payloads."""
+    def ingest_observability_batch(
+        self,
+        metrics: List["MetricRecord"],
+        events: List["EventRecord"],
+        spans: List["SpanRecord"],
+    ) -> None:
+        """Persist a batch flushed by the observability client, caching the snapshot once."""
 
         with self._observability_lock:
-            metrics = list(self._observability_metrics)
-            events = list(self._observability_events)
-            spans = list(self._observability_spans)
+            self._observability_metrics.extend(metrics)
+            self._observability_events.extend(events)
+            self._observability_spans.extend(spans)
+
+        for event in events:
+            self._maybe_raise_alert_for_event(event)
+        self._cache_observability_snapshot()
+
+    def get_observability_summary(self) -> Dict[str, float]:
+        """Return aggregates maintained by the observability client's instruments."""
 
-        return self._build_observability_summary(metrics, events, spans)
+        return self._build_observability_summary()
 
     def get_recent_observability_payload(self, limit: int = 50) -> Dict[str, Any]:
         """Return serialized observability payloads for dashboards."""
@@ -601,39 +634,55 @@ class MonitoringEngine:
             events = list(self._observability_events)[-limit:]
             spans = list(self._observability_spans)[-limit:]
 
-        summary = self._build_observability_summary(metrics, events, spans)
+        from shared.query_profiler import top_offenders
+
+        summary = self._build_observability_summary()
         return {
             'summary': summary,
+            'query_offenders': top_offenders(),
             'metrics': [self._serialize_metric(metric) for metric in metrics],
             'events': [self._serialize_event(event) for event in events],
             'spans': [self._serialize_span(span) for span in spans],
         }
 
-    def _build_observability_summary(
-        self,
-        metrics: List["MetricRecord"],
-        events: List["EventRecord"],
-        spans: List["SpanRecord"],
-    ) -> Dict[str, float]:
-        if not metrics and not events and not spans:
-            return {}
+    def _build_observability_summary(self) -> Dict[str, float]:
+        from shared.observability import observability
 
-        metric_names = {metric.name for metric in metrics}
-        error_events = [event for event in events if event.severity.lower() in {"error", "critical"}]
-        span_errors = [span for span in spans if span.status not in {"ok", "success"}]
-        total_span_duration = sum(span.duration_ms for span in spans)
+        registry = observability.instruments
+        metric_series = [
+            histogram for histogram in registry.series("histogram")
+            if histogram.name != "span.duration_ms"
+        ]
+        events_total = registry.total("observability.events")
+        spans = registry.merged_histogram("span.duration_ms")
+        if not metric_series and not events_total and not spans.count:
+            return {}
 
-        span_error_rate = (len(span_errors) / len(spans) * 100) if spans else 0.0
-        avg_span_duration = (total_span_duration / len(spans)) if spans else 0.0
+        span_ok = sum(
+            histogram.count for histogram in registry.series("histogram", "span.duration_ms")
+            if dict(histogram.tags).get("status") in {"ok", "success"}
+        )
+        event_errors = registry.total("observability.events", {"severity": "error"}) + registry.total(
+            "observability.events", {"severity": "critical"}
+        )
+        span_stats = spans.snapshot()
+        http_stats = registry.merged_histogram("http.response_time_ms").snapshot()
 
         return {
-            'metrics_total': float(len(metrics)),
-            'metrics_unique': float(len(metric_names)),
-            'events_total': float(len(events)),
-            'event_errors': float(len(error_events)),
-            'spans_total': float(len(spans)),
-            'span_error_rate': float(span_error_rate),
-            'avg_span_duration_ms': float(avg_span_duration),
+            'metrics_total': float(sum(histogram.count for histogram in metric_series)),
+            'metrics_unique': float(len({histogram.name for histogram in metric_series})),
+            'events_total': float(events_total),
+            'event_errors': float(event_errors),
+            'spans_total': float(spans.count),
+            'span_error_rate': float((spans.count - span_ok) / spans.count * 100) if spans.count else 0.0,
+            'avg_span_duration_ms': float(span_stats['avg']),
+            'span_p50_ms': float(span_stats['p50']),
+            'span_p95_ms': float(span_stats['p95']),
+            'span_p99_ms': float(span_stats['p99']),
+            'http_requests_total': float(http_stats['count']),
+            'http_p50_ms': float(http_stats['p50']),
+            'http_p95_ms': float(http_stats['p95']),
+            'http_p99_ms': float(http_stats['p99']),
         }
 
     def _serialize_metric(self, metric: "MetricRecord") -> Dict[str, Any]:
@@ -662,6 +711,8 @@ class MonitoringEngine:
             'start_time': span.start_time.isoformat(),
             'end_time': span.end_time.isoformat(),
             'error': span.error,
+            'trace_id': span.trace_id,
+            'parent_id': span.parent_id,
         }
 
     def _maybe_raise_alert_for_event(self, event: "EventRecord") -> None:
@@ -689,8 +740,15 @@ class MonitoringEngine:
     def _cache_observability_snapshot(self) -> None:
         cache.set(OBSERVABILITY_CACHE_KEY, self.get_recent_observability_payload(limit=25), timeout=300)
 
-    async def collect_all_metrics(self) -> Dict[str, Dict[str, float]]:
-        """Collect all metrics from different sources"""
+    def refresh_metrics_snapshot(self) -> Dict[str, Dict[str, float]]:
+        """
+        Run every collector and cache the result for dashboards and scrapes.
+
+        The database and application collectors issue live ``COUNT(*)`` and
+        ``pg_stat_*`` queries, so this runs on a schedule
+        (``shared.background_tasks.refresh_monitoring_snapshot``) rather than
+        per request; readers use :meth:`get_metrics_snapshot`.
+        """
         try:
             metrics = {
                 'system': {
@@ -715,13 +773,37 @@ class MonitoringEngine:
                 metrics['observability'] = observability_summary
 
             # Store metrics in cache for API access
-            cache.set('latest_monitoring_metrics', metrics, timeout=300)
+            cache.set(
+                METRICS_SNAPSHOT_CACHE_KEY,
+                {'collected_at': time.time(), 'metrics': metrics},
+                timeout=getattr(settings, 'MONITORING_SNAPSHOT_TTL', 300),
+            )
 
             return metrics
         except Exception as e:
             logger.error(f"Failed to collect metrics: {e}")
             return {}
-    
+
+    def get_metrics_snapshot(self) -> Dict[str, Any]:
+        """
+        The last cached collector run (``collected_at`` and ``metrics``), or
+        ``{}``; never queries the database.
+
+        The API block is recomputed at read time: the refresh runs in a
+        Celery worker that serves no HTTP, so its own response time
+        histogram is empty.
+        """
+        snapshot = cache.get(METRICS_SNAPSHOT_CACHE_KEY)
+        if not snapshot:
+            return {}
+        metrics = dict(snapshot.get('metrics') or {})
+        metrics['application'] = {**metrics.get('application', {}), **self.app_collector.get_api_metrics()}
+        return {**snapshot, 'metrics': metrics}
+
+    async def collect_all_metrics(self) -> Dict[str, Dict[str, float]]:
+        """Collect all metrics from different sources"""
+        return self.refresh_metrics_snapshot()
+
     async def check_thresholds(self, metrics: Dict[str, Dict[str, float]]):
         """Check all thresholds and create alerts if needed"""
         for rule in self.monitoring_rules:
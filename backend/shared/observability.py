@@ -1,16 +1,38 @@
 from __future__ import annotations
 
+import atexit
 import logging
+import os
 import threading
 import time
+from collections import deque
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from decimal import Decimal
-from typing import Any, Dict, List, Optional
+from typing import Any, Deque, Dict, List, Optional, Tuple
 from uuid import uuid4
 
+from . import tracing
+from .observability_instruments import Counter, Gauge, Histogram, InstrumentRegistry
+
 logger = logging.getLogger("watchparty.observability")
 
+DEFAULT_BUFFER_SIZE = 2048
+DEFAULT_EXPORT_QUEUE_SIZE = 10000
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_MAX_SERIES = 5000
+
+
+def _setting(name: str, default: Any) -> Any:
+    """Read a Django setting without requiring configured settings (scripts, early imports)."""
+
+    try:
+        from django.conf import settings
+
+        return getattr(settings, name, default)
+    except Exception:
+        return default
+
 
 @dataclass(frozen=True)
 class MetricRecord:
@@ -45,14 +67,22 @@ class SpanRecord:
     end_time: datetime
     tags: Dict[str, str] = field(default_factory=dict)
     error: Optional[str] = None
+    trace_id: Optional[str] = None
+    parent_id: Optional[str] = None
 
 
 class _ActiveSpan:
     """Internal representation of an active span."""
 
-    __slots__ = ("span_id", "name", "start_time", "start_perf", "tags", "status", "error")
+    __slots__ = ("span_id", "name", "start_time", "start_perf", "tags", "status", "error", "trace", "parent_id", "is_root")
 
-    def __init__(self, span_id: str, name: str, tags: Optional[Dict[str, str]] = None):
+    def __init__(
+        self,
+        span_id: str,
+        name: str,
+        tags: Optional[Dict[str, str]] = None,
+        parent: Optional[tracing.SpanContext] = None,
+    ):
         self.span_id = span_id
         self.name = name
         self.start_time = datetime.now(timezone.utc)
@@ -60,6 +90,10 @@ class _ActiveSpan:
         self.tags: Dict[str, str] = dict(tags or {})
         self.status = "in_progress"
         self.error: Optional[str] = None
+        self.trace = parent.trace if parent is not None else tracing.start_trace()
+        self.parent_id = parent.span_id if parent is not None else None
+        # The outermost span of the trace in this process decides what deferred spans to keep
+        self.is_root = parent is None or parent.remote
 
 
 class SpanHandle:
@@ -68,10 +102,18 @@ class SpanHandle:
     def __init__(self, client: "ObservabilityClient", span_id: str):
         self._client = client
         self.span_id = span_id
+        self.context = client.span_context(span_id)
+        self._token = None
 
     def __enter__(self) -> "SpanHandle":
+        # Spans opened inside this block (and automatic child spans) become its children
+        self._token = tracing.activate(self.context)
         return self
 
+    @property
+    def trace_id(self) -> Optional[str]:
+        return self.context.trace.trace_id if self.context else None
+
     def add_tag(self, key: str, value: Any) -> None:
         """Attach an additional tag to the in-flight span."""
 
@@ -83,6 +125,9 @@ class SpanHandle:
         self._client.set_span_status(self.span_id, status)
 
     def __exit__(self, exc_type, exc, tb) -> bool:
+        if self._token is not None:
+            tracing.deactivate(self._token)
+            self._token = None
         if exc is not None:
             self._client.complete_span(self.span_id, status="error", error=str(exc))
             return False
@@ -93,16 +138,53 @@ class SpanHandle:
 
 
 class ObservabilityClient:
-    """Lightweight in-process observability collector used for tests and local runs."""
-
-    def __init__(self) -> None:
+    """In-process observability collector with bounded memory and off-thread export.
+
+    Recent metrics, events and spans are kept in fixed-size ring buffers
+    (``OBSERVABILITY_BUFFER_SIZE`` each) for inspection. Records bound for
+    exporters are staged on a bounded queue (``OBSERVABILITY_EXPORT_QUEUE_SIZE``;
+    the oldest are dropped and counted when it overflows) and a background
+    thread hands them to exporters in batches every
+    ``OBSERVABILITY_FLUSH_INTERVAL`` seconds. Recording is a few atomic deque
+    and dict operations, so the calling thread never blocks on a lock or an
+    exporter's I/O. :meth:`flush` exports synchronously (tests, shutdown).
+
+    Alongside the raw records, every metric is aggregated into a histogram
+    series keyed by name and tags, spans into ``span.duration_ms`` and events
+    into the ``observability.events`` counter, so totals and p50/p95/p99 are
+    read in O(1) memory per series without scanning buffers. Counters and
+    gauges can also be recorded directly with :meth:`increment` and
+    :meth:`set_gauge`. Exporters that define ``export_instruments`` are handed
+    the registry on every flush tick.
+    """
+
+    def __init__(
+        self,
+        buffer_size: Optional[int] = None,
+        export_queue_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+    ) -> None:
+        buffer_size = buffer_size or _setting("OBSERVABILITY_BUFFER_SIZE", DEFAULT_BUFFER_SIZE)
         self._lock = threading.RLock()
-        self._metrics: List[MetricRecord] = []
-        self._events: List[EventRecord] = []
-        self._completed_spans: List[SpanRecord] = []
+        self._metrics: Deque[MetricRecord] = deque(maxlen=buffer_size)
+        self._events: Deque[EventRecord] = deque(maxlen=buffer_size)
+        self._completed_spans: Deque[SpanRecord] = deque(maxlen=buffer_size)
         self._active_spans: Dict[str, _ActiveSpan] = {}
         self._task_spans: Dict[str, str] = {}
-        self._exporters: List[Any] = []
+        self._task_tokens: Dict[str, Any] = {}
+        self._exporters: Tuple[Any, ...] = ()
+        self.instruments = InstrumentRegistry(_setting("OBSERVABILITY_MAX_SERIES", DEFAULT_MAX_SERIES))
+
+        # Export staging: appended by recording threads, drained by the flusher
+        self._pending: Deque[Tuple[str, Any]] = deque(
+            maxlen=export_queue_size or _setting("OBSERVABILITY_EXPORT_QUEUE_SIZE", DEFAULT_EXPORT_QUEUE_SIZE)
+        )
+        self._dropped = 0
+        self._flush_interval = flush_interval or _setting("OBSERVABILITY_FLUSH_INTERVAL", DEFAULT_FLUSH_INTERVAL)
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        self._flusher_pid: Optional[int] = None
 
     # ------------------------------------------------------------------
     # Metric helpers
@@ -114,8 +196,8 @@ class ObservabilityClient:
         metric_tags = self._stringify_tags(tags)
         record = MetricRecord(name=name, value=metric_value, tags=metric_tags)
 
-        with self._lock:
-            self._metrics.append(record)
+        self._metrics.append(record)
+        self.instruments.get("histogram", name, metric_tags).observe(metric_value)
 
         logger.debug(
             "Metric recorded",
@@ -125,13 +207,44 @@ class ObservabilityClient:
         return record
 
     def get_metrics(self, name: Optional[str] = None) -> List[MetricRecord]:
-        with self._lock:
-            metrics = list(self._metrics)
+        metrics = list(self._metrics)
 
         if name is not None:
             metrics = [metric for metric in metrics if metric.name == name]
         return metrics
 
+    # ------------------------------------------------------------------
+    # Instruments
+    # ------------------------------------------------------------------
+    def increment(self, name: str, value: Any = 1, tags: Optional[Dict[str, Any]] = None) -> Counter:
+        """Add ``value`` to a counter."""
+
+        counter = self.instruments.get("counter", name, self._stringify_tags(tags))
+        counter.add(self._coerce_numeric(value))
+        self._ensure_flusher()
+        return counter
+
+    def set_gauge(self, name: str, value: Any, tags: Optional[Dict[str, Any]] = None) -> Gauge:
+        """Set a gauge to ``value``."""
+
+        gauge = self.instruments.get("gauge", name, self._stringify_tags(tags))
+        gauge.set(self._coerce_numeric(value))
+        self._ensure_flusher()
+        return gauge
+
+    def observe(self, name: str, value: Any, tags: Optional[Dict[str, Any]] = None) -> Histogram:
+        """Add a value to a histogram without keeping the individual sample."""
+
+        histogram = self.instruments.get("histogram", name, self._stringify_tags(tags))
+        histogram.observe(self._coerce_numeric(value))
+        self._ensure_flusher()
+        return histogram
+
+    def histogram_summary(self, name: str, where: Optional[Dict[str, Any]] = None) -> Dict[str, float]:
+        """Count, sum, avg, min, max and p50/p95/p99 of histogram ``name`` across matching series."""
+
+        return self.instruments.merged_histogram(name, self._stringify_tags(where)).snapshot()
+
     # ------------------------------------------------------------------
     # Event helpers
     # ------------------------------------------------------------------
@@ -148,8 +261,8 @@ class ObservabilityClient:
         event_tags = self._stringify_tags(tags)
         record = EventRecord(name=name, message=message, severity=severity, tags=event_tags)
 
-        with self._lock:
-            self._events.append(record)
+        self._events.append(record)
+        self.instruments.get("counter", "observability.events", {"event": name, "severity": severity.lower()}).add()
 
         log_fn = logger.error if severity.lower() in {"error", "critical"} else logger.info
         log_fn(
@@ -160,8 +273,7 @@ class ObservabilityClient:
         return record
 
     def get_events(self, name: Optional[str] = None) -> List[EventRecord]:
-        with self._lock:
-            events = list(self._events)
+        events = list(self._events)
 
         if name is not None:
             events = [event for event in events if event.name == name]
@@ -170,15 +282,20 @@ class ObservabilityClient:
     # ------------------------------------------------------------------
     # Span helpers
     # ------------------------------------------------------------------
-    def span(self, name: str, tags: Optional[Dict[str, Any]] = None) -> SpanHandle:
-        span_id = self.start_span(name, tags=tags)
+    def span(
+        self, name: str, tags: Optional[Dict[str, Any]] = None, parent: Optional[tracing.SpanContext] = None
+    ) -> SpanHandle:
+        span_id = self.start_span(name, tags=tags, parent=parent)
         return SpanHandle(self, span_id)
 
-    def start_span(self, name: str, tags: Optional[Dict[str, Any]] = None) -> str:
-        span_id = uuid4().hex
-        active = _ActiveSpan(span_id, name, tags)
-        with self._lock:
-            self._active_spans[span_id] = active
+    def start_span(
+        self, name: str, tags: Optional[Dict[str, Any]] = None, parent: Optional[tracing.SpanContext] = None
+    ) -> str:
+        """Open a span under ``parent``, else the current span, else as the root of a new trace."""
+
+        span_id = tracing.new_span_id()
+        active = _ActiveSpan(span_id, name, tags, parent=parent or tracing.current())
+        self._active_spans[span_id] = active
         logger.debug(
             "Span started",
             extra={"span_name": name, "span_id": span_id, "span_tags": active.tags},
@@ -192,8 +309,7 @@ class ObservabilityClient:
     def _finish_span(
         self, span_id: str, *, status: Optional[str] = None, error: Optional[str] = None
     ) -> Optional[SpanRecord]:
-        with self._lock:
-            active = self._active_spans.pop(span_id, None)
+        active = self._active_spans.pop(span_id, None)
 
         if not active:
             return None
@@ -213,10 +329,25 @@ class ObservabilityClient:
             end_time=end_time,
             tags=dict(active.tags),
             error=active_error,
+            trace_id=active.trace.trace_id,
+            parent_id=active.parent_id,
         )
 
-        with self._lock:
-            self._completed_spans.append(record)
+        trace = active.trace
+        if active_status == "error" or active_error:
+            trace.error = True
+        if active.is_root and trace.deferred:
+            # Unsampled traces keep their detail only when something went wrong or ran slow
+            if trace.error or duration_ms >= tracing.slow_span_ms():
+                self.instruments.get("counter", "trace.tail_sampled", {"span": active.name}).add()
+                for deferred in trace.deferred:
+                    self._emit_span(deferred)
+            trace.deferred = []
+
+        self._emit_span(record)
+        self.instruments.get(
+            "histogram", "span.duration_ms", {"span": active.name, "status": active_status}
+        ).observe(duration_ms)
 
         log_extra = {
             "span_id": span_id,
@@ -230,45 +361,116 @@ class ObservabilityClient:
             logger.error("Span completed with error", extra=log_extra)
         else:
             logger.debug("Span completed", extra=log_extra)
-        self._notify_exporters("export_span", record)
         return record
 
+    def record_child_span(
+        self,
+        name: str,
+        duration_ms: float,
+        *,
+        start_time: datetime,
+        end_time: datetime,
+        tags: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None,
+        parent: Optional[tracing.SpanContext] = None,
+    ) -> Optional[SpanRecord]:
+        """Record an already-finished span (query, cache call, HTTP call) under the current span.
+
+        Sampled traces emit it right away; unsampled ones defer it (up to
+        ``TRACE_MAX_DEFERRED_SPANS``) until their root span decides. Outside a
+        trace nothing is recorded.
+        """
+
+        parent = parent or tracing.current()
+        if parent is None:
+            return None
+
+        trace = parent.trace
+        status = "error" if error else "ok"
+        self.instruments.get("histogram", "span.duration_ms", {"span": name, "status": status}).observe(duration_ms)
+        if error:
+            trace.error = True
+        if not trace.collecting:
+            return None
+
+        record = SpanRecord(
+            span_id=tracing.new_span_id(),
+            name=name,
+            status=status,
+            duration_ms=duration_ms,
+            start_time=start_time,
+            end_time=end_time,
+            tags=self._stringify_tags(tags),
+            error=error,
+            trace_id=trace.trace_id,
+            parent_id=parent.span_id,
+        )
+        if trace.sampled:
+            self._emit_span(record)
+        else:
+            trace.deferred.append(record)
+        return record
+
+    def _emit_span(self, record: SpanRecord) -> None:
+        self._completed_spans.append(record)
+        self._notify_exporters("export_span", record)
+
+    def span_context(self, span_id: str) -> Optional[tracing.SpanContext]:
+        """Trace context of an in-flight span, for activating or propagating it."""
+
+        span = self._active_spans.get(span_id)
+        if span is None:
+            return None
+        return tracing.SpanContext(span.trace, span.span_id)
+
     def add_span_tag(self, span_id: str, key: str, value: Any) -> None:
-        with self._lock:
-            span = self._active_spans.get(span_id)
-            if span:
-                span.tags[str(key)] = str(value)
+        span = self._active_spans.get(span_id)
+        if span:
+            span.tags[str(key)] = str(value)
 
     def set_span_status(self, span_id: str, status: str) -> None:
-        with self._lock:
-            span = self._active_spans.get(span_id)
-            if span:
-                span.status = status.lower()
+        span = self._active_spans.get(span_id)
+        if span:
+            span.status = status.lower()
 
     def get_span_status(self, span_id: str) -> Optional[str]:
-        with self._lock:
-            span = self._active_spans.get(span_id)
-            return span.status if span else None
+        span = self._active_spans.get(span_id)
+        return span.status if span else None
 
     def get_completed_spans(self, name: Optional[str] = None) -> List[SpanRecord]:
-        with self._lock:
-            spans = list(self._completed_spans)
+        spans = list(self._completed_spans)
 
         if name is not None:
             spans = [span for span in spans if span.name == name]
         return spans
 
+    def get_trace(self, trace_id: str) -> List[SpanRecord]:
+        """Completed spans of one trace still in the buffer, in start order (a waterfall)."""
+
+        return sorted(
+            (span for span in self._completed_spans if span.trace_id == trace_id),
+            key=lambda span: span.start_time,
+        )
+
     # ------------------------------------------------------------------
     # Celery helpers
     # ------------------------------------------------------------------
-    def begin_task(self, task_id: Optional[str], task_name: str, queue: Optional[str] = None) -> str:
+    def begin_task(
+        self,
+        task_id: Optional[str],
+        task_name: str,
+        queue: Optional[str] = None,
+        parent: Optional[tracing.SpanContext] = None,
+    ) -> str:
+        """Open the task's span (under ``parent``, e.g. from its message headers) and make it current."""
+
         task_identifier = task_id or uuid4().hex
         tags = {"task_name": task_name}
         if queue:
             tags["queue"] = queue
-        span_id = self.start_span("celery.task", tags=tags)
-        with self._lock:
-            self._task_spans[task_identifier] = span_id
+        span_id = self.start_span("celery.task", tags=tags, parent=parent)
+        self._task_spans[task_identifier] = span_id
+        self._task_tokens[task_identifier] = tracing.activate(self.span_context(span_id))
         self.record_event(
             "celery.task.started",
             f"Task {task_name} started",
@@ -286,8 +488,10 @@ class ObservabilityClient:
     ) -> Optional[SpanRecord]:
         task_identifier = task_id or "unknown"
         status_normalized = status.lower()
-        with self._lock:
-            span_id = self._task_spans.pop(task_identifier, None)
+        span_id = self._task_spans.pop(task_identifier, None)
+        token = self._task_tokens.pop(task_identifier, None)
+        if token is not None:
+            tracing.deactivate(token)
 
         if not span_id:
             return None
@@ -328,12 +532,16 @@ class ObservabilityClient:
     # Utilities
     # ------------------------------------------------------------------
     def reset(self) -> None:
-        with self._lock:
+        with self._flush_lock:
             self._metrics.clear()
             self._events.clear()
             self._completed_spans.clear()
             self._active_spans.clear()
             self._task_spans.clear()
+            self._task_tokens.clear()
+            self._pending.clear()
+            self._dropped = 0
+            self.instruments.reset()
 
     def register_exporter(self, exporter: Any) -> None:
         """Attach an exporter that forwards observability payloads to external sinks."""
@@ -344,7 +552,7 @@ class ObservabilityClient:
         with self._lock:
             if exporter in self._exporters:
                 return
-            self._exporters.append(exporter)
+            self._exporters = self._exporters + (exporter,)
 
     def clear_exporters(self) -> None:
         """Remove all registered exporters.
@@ -354,22 +562,88 @@ class ObservabilityClient:
         """
 
         with self._lock:
-            self._exporters.clear()
+            self._exporters = ()
+
+    # ------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------
+    def flush(self) -> int:
+        """Export everything staged so far on the calling thread; returns the record count."""
+
+        with self._flush_lock:
+            batch: Dict[str, List[Any]] = {"export_metric": [], "export_event": [], "export_span": []}
+            count = 0
+            while True:
+                try:
+                    method_name, payload = self._pending.popleft()
+                except IndexError:
+                    break
+                batch[method_name].append(payload)
+                count += 1
+
+            for exporter in self._exporters:
+                if count:
+                    self._export_batch(exporter, batch)
+                export_instruments = getattr(exporter, "export_instruments", None)
+                if callable(export_instruments):
+                    try:
+                        export_instruments(self.instruments)
+                    except Exception:
+                        logger.exception("Observability exporter %r failed while exporting instruments", exporter)
+            return count
+
+    @property
+    def dropped(self) -> int:
+        """Records discarded because the export queue was full (approximate under contention)."""
+
+        return self._dropped
+
+    def _export_batch(self, exporter: Any, batch: Dict[str, List[Any]]) -> None:
+        export_batch = getattr(exporter, "export_batch", None)
+        try:
+            if callable(export_batch):
+                export_batch(batch["export_metric"], batch["export_event"], batch["export_span"])
+                return
+            for method_name, payloads in batch.items():
+                method = getattr(exporter, method_name, None)
+                if callable(method):
+                    for payload in payloads:
+                        method(payload)
+        except Exception:
+            logger.exception("Observability exporter %r failed while exporting a batch", exporter)
 
     def _notify_exporters(self, method_name: str, payload: Any) -> None:
+        if not self._exporters:
+            return
+        if len(self._pending) == self._pending.maxlen:
+            self._dropped += 1
+        self._pending.append((method_name, payload))
+        self._ensure_flusher()
+
+    def _ensure_flusher(self) -> None:
+        if self._exporters and self._flusher_pid != os.getpid():
+            self._start_flusher()
+
+    def _start_flusher(self) -> None:
+        # Threads do not survive fork, so each worker process starts its own
         with self._lock:
-            exporters = list(self._exporters)
+            if self._flusher_pid == os.getpid():
+                return
+            self._wakeup = threading.Event()
+            self._flusher = threading.Thread(
+                target=self._flush_loop, name="observability-flusher", daemon=True
+            )
+            self._flusher_pid = os.getpid()
+            self._flusher.start()
 
-        for exporter in exporters:
-            method = getattr(exporter, method_name, None)
-            if not callable(method):
-                continue
+    def _flush_loop(self) -> None:
+        while True:
+            self._wakeup.wait(self._flush_interval)
+            self._wakeup.clear()
             try:
-                method(payload)
-            except Exception:
-                logger.exception(
-                    "Observability exporter %r failed while handling %s", exporter, method_name
-                )
+                self.flush()
+            except Exception:  # pragma: no cover - defensive guard
+                logger.exception("Observability flush failed")
 
     @staticmethod
     def _coerce_numeric(value: Any) -> float:
@@ -389,6 +663,7 @@ class ObservabilityClient:
 
 
 observability = ObservabilityClient()
+atexit.register(observability.flush)
 
 try:
     from .observability_exporters import register_default_exporters
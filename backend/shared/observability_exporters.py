@@ -2,13 +2,16 @@
 
 from __future__ import annotations
 
+import atexit
 import logging
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Dict, Optional
 
 from .monitoring import monitoring_engine
+from .observability_openmetrics import MultiprocessInstrumentStore
 
 if TYPE_CHECKING:  # pragma: no cover
     from .observability import EventRecord, MetricRecord, ObservabilityClient, SpanRecord
+    from .observability_instruments import InstrumentRegistry
 
 logger = logging.getLogger("watchparty.observability.exporters")
 
@@ -19,6 +22,12 @@ class MonitoringObservabilityExporter:
     def __init__(self, engine=monitoring_engine) -> None:
         self.engine = engine
 
+    def export_batch(self, metrics, events, spans) -> None:
+        try:
+            self.engine.ingest_observability_batch(metrics, events, spans)
+        except Exception:  # pragma: no cover - defensive guard
+            logger.exception("Failed to forward batch to monitoring engine")
+
     def export_metric(self, metric: "MetricRecord") -> None:
         try:
             self.engine.ingest_observability_metric(metric)
@@ -38,6 +47,43 @@ class MonitoringObservabilityExporter:
             logger.exception("Failed to forward span to monitoring engine")
 
 
+class MultiprocessInstrumentExporter:
+    """Publish this process's instruments to the shared directory read by the metrics scrape."""
+
+    def __init__(self, store: MultiprocessInstrumentStore) -> None:
+        self.store = store
+        self._final_write_registered = False
+
+    def export_instruments(self, registry: "InstrumentRegistry") -> None:
+        if not self._final_write_registered:
+            # Totals recorded since the last periodic write survive a clean shutdown
+            atexit.register(self.store.write, registry, True)
+            self._final_write_registered = True
+        self.store.write(registry)
+
+
+_stores: Dict[str, MultiprocessInstrumentStore] = {}
+
+
+def multiprocess_store() -> Optional[MultiprocessInstrumentStore]:
+    """The shared instrument directory store, or ``None`` when running single-process."""
+
+    from django.conf import settings
+
+    try:
+        directory = getattr(settings, "OBSERVABILITY_MULTIPROC_DIR", "")
+    except Exception:  # settings not configured (scripts, early imports)
+        return None
+    if not directory:
+        return None
+    # One store (and so one writer of this process's file) per directory
+    if directory not in _stores:
+        _stores[directory] = MultiprocessInstrumentStore(
+            directory, interval=getattr(settings, "OBSERVABILITY_MULTIPROC_INTERVAL", 5.0)
+        )
+    return _stores[directory]
+
+
 _default_registered = False
 
 
@@ -50,10 +96,15 @@ def register_default_exporters(client: "ObservabilityClient") -> None:
         return
 
     client.register_exporter(MonitoringObservabilityExporter())
+    store = multiprocess_store()
+    if store is not None:
+        client.register_exporter(MultiprocessInstrumentExporter(store))
     _default_registered = True
 
 
 __all__ = [
     "MonitoringObservabilityExporter",
+    "MultiprocessInstrumentExporter",
+    "multiprocess_store",
     "register_default_exporters",
 ]
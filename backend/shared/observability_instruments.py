@@ -0,0 +1,295 @@
+"""Pre-aggregated metric instruments (counters, gauges, histograms) for the observability client."""
+
+from __future__ import annotations
+
+import math
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+TagKey = Tuple[Tuple[str, str], ...]
+SeriesKey = Tuple[str, str, TagKey]
+
+# Log-linear histogram buckets: each is 4% wider than the previous, so any
+# quantile is reported within about 2% of the true value, from 1µs (in ms)
+# to beyond a day, in at most ~700 buckets per series (sparse in practice).
+HISTOGRAM_MIN = 0.001
+HISTOGRAM_GROWTH = 1.04
+_LOG_GROWTH = math.log(HISTOGRAM_GROWTH)
+
+DEFAULT_QUANTILES = (0.5, 0.95, 0.99)
+OVERFLOW_TAGS: TagKey = (("overflow", "true"),)
+
+
+class Counter:
+    """Monotonic total."""
+
+    kind = "counter"
+    __slots__ = ("name", "tags", "value", "_lock")
+
+    def __init__(self, name: str, tags: TagKey):
+        self.name = name
+        self.tags = tags
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, value: float = 1.0) -> None:
+        with self._lock:
+            self.value += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"value": self.value}
+
+    def state(self) -> float:
+        return self.value
+
+    def merge_state(self, state: float) -> None:
+        self.add(state)
+
+
+class Gauge:
+    """Last value set."""
+
+    kind = "gauge"
+    __slots__ = ("name", "tags", "value")
+
+    def __init__(self, name: str, tags: TagKey):
+        self.name = name
+        self.tags = tags
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"value": self.value}
+
+    def state(self) -> float:
+        return self.value
+
+    def merge_state(self, state: float) -> None:
+        self.set(state)
+
+
+class Histogram:
+    """Distribution of observed values in fixed log-linear buckets."""
+
+    kind = "histogram"
+    __slots__ = ("name", "tags", "count", "sum", "min", "max", "buckets", "_lock")
+
+    def __init__(self, name: str, tags: TagKey = ()):
+        self.name = name
+        self.tags = tags
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.buckets: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def bucket_index(value: float) -> int:
+        if value <= HISTOGRAM_MIN:
+            return 0
+        return int(math.log(value / HISTOGRAM_MIN) / _LOG_GROWTH) + 1
+
+    @staticmethod
+    def bucket_upper_bound(index: int) -> float:
+        return HISTOGRAM_MIN * HISTOGRAM_GROWTH ** index
+
+    def observe(self, value: float) -> None:
+        index = self.bucket_index(value)
+        with self._lock:
+            self.count += 1
+            self.sum += value
+            if value < self.min:
+                self.min = value
+            if value > self.max:
+                self.max = value
+            self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def merge(self, other: "Histogram") -> None:
+        with other._lock:
+            buckets = dict(other.buckets)
+            count, total, low, high = other.count, other.sum, other.min, other.max
+        with self._lock:
+            self.count += count
+            self.sum += total
+            self.min = min(self.min, low)
+            self.max = max(self.max, high)
+            for index, hits in buckets.items():
+                self.buckets[index] = self.buckets.get(index, 0) + hits
+
+    def state(self) -> Dict[str, Any]:
+        """Plain, JSON-serializable copy of the aggregate (see :meth:`merge_state`)."""
+
+        with self._lock:
+            return {
+                "count": self.count,
+                "sum": self.sum,
+                "min": self.min if self.count else None,
+                "max": self.max if self.count else None,
+                "buckets": [[index, hits] for index, hits in self.buckets.items()],
+            }
+
+    def merge_state(self, state: Dict[str, Any]) -> None:
+        if not state["count"]:
+            return
+        with self._lock:
+            self.count += state["count"]
+            self.sum += state["sum"]
+            self.min = min(self.min, state["min"])
+            self.max = max(self.max, state["max"])
+            for index, hits in state["buckets"]:
+                self.buckets[index] = self.buckets.get(index, 0) + hits
+
+    def quantile(self, q: float) -> float:
+        with self._lock:
+            if not self.count:
+                return 0.0
+            buckets = sorted(self.buckets.items())
+            count, low, high = self.count, self.min, self.max
+
+        rank = max(math.ceil(q * count), 1)
+        seen = 0
+        for index, hits in buckets:
+            seen += hits
+            if seen >= rank:
+                if index == 0:
+                    return low
+                # Geometric midpoint of the bucket, never outside what was observed
+                estimate = math.sqrt(self.bucket_upper_bound(index - 1) * self.bucket_upper_bound(index))
+                return min(max(estimate, low), high)
+        return high
+
+    def snapshot(self, quantiles: Iterable[float] = DEFAULT_QUANTILES) -> Dict[str, Any]:
+        snapshot = {
+            "count": self.count,
+            "sum": self.sum,
+            "avg": self.sum / self.count if self.count else 0.0,
+            "min": self.min if self.count else 0.0,
+            "max": self.max if self.count else 0.0,
+        }
+        for q in quantiles:
+            snapshot[f"p{int(q * 100)}"] = self.quantile(q)
+        return snapshot
+
+    def cumulative_buckets(self) -> List[Tuple[float, int]]:
+        """``(upper_bound, cumulative_count)`` for each non-empty bucket, in order."""
+
+        with self._lock:
+            buckets = sorted(self.buckets.items())
+        cumulative = []
+        seen = 0
+        for index, hits in buckets:
+            seen += hits
+            cumulative.append((self.bucket_upper_bound(index), seen))
+        return cumulative
+
+
+class InstrumentRegistry:
+    """
+    Instruments keyed by (kind, name, interned tag set), aggregated in place.
+
+    Lookups of existing series are plain dict reads. Past ``max_series``, new
+    tag combinations fold into one ``overflow="true"`` series per name so a
+    high-cardinality tag cannot grow memory without bound.
+    """
+
+    _types = {"counter": Counter, "gauge": Gauge, "histogram": Histogram}
+
+    def __init__(self, max_series: int = 5000):
+        self.max_series = max_series
+        self.started_at = time.time()
+        self._series: Dict[SeriesKey, Any] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def tag_key(tags: Optional[Dict[str, str]]) -> TagKey:
+        if not tags:
+            return ()
+        return tuple(sorted((sys.intern(key), sys.intern(value)) for key, value in tags.items()))
+
+    def get(self, kind: str, name: str, tags: Optional[Dict[str, str]] = None):
+        key = (kind, name, self.tag_key(tags))
+        instrument = self._series.get(key)
+        if instrument is not None:
+            return instrument
+
+        with self._lock:
+            instrument = self._series.get(key)
+            if instrument is None:
+                if len(self._series) >= self.max_series:
+                    key = (kind, name, OVERFLOW_TAGS)
+                    instrument = self._series.get(key)
+                if instrument is None:
+                    instrument = self._types[kind](sys.intern(name), key[2])
+                    self._series[key] = instrument
+        return instrument
+
+    def series(self, kind: Optional[str] = None, name: Optional[str] = None) -> List[Any]:
+        return [
+            instrument for (series_kind, series_name, _), instrument in list(self._series.items())
+            if (kind is None or series_kind == kind) and (name is None or series_name == name)
+        ]
+
+    def merged_histogram(self, name: str, where: Optional[Dict[str, str]] = None) -> Histogram:
+        """All series of histogram ``name`` whose tags include ``where``, merged."""
+
+        merged = Histogram(name)
+        for histogram in self.series("histogram", name):
+            tags = dict(histogram.tags)
+            if all(tags.get(key) == value for key, value in (where or {}).items()):
+                merged.merge(histogram)
+        return merged
+
+    def total(self, name: str, where: Optional[Dict[str, str]] = None) -> float:
+        """Sum of counter ``name`` over series whose tags include ``where``."""
+
+        total = 0.0
+        for counter in self.series("counter", name):
+            tags = dict(counter.tags)
+            if all(tags.get(key) == value for key, value in (where or {}).items()):
+                total += counter.value
+        return total
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        return [
+            {"name": instrument.name, "type": instrument.kind, "tags": dict(instrument.tags), **instrument.snapshot()}
+            for instrument in self.series()
+        ]
+
+    def dump(self) -> List[List[Any]]:
+        """``[kind, name, tags, state]`` rows for every series, JSON-serializable."""
+
+        return [
+            [instrument.kind, instrument.name, [list(pair) for pair in instrument.tags], instrument.state()]
+            for instrument in self.series()
+        ]
+
+    def merge_rows(self, rows: Iterable[List[Any]], extra_tags: Optional[Dict[str, str]] = None) -> None:
+        """Fold rows produced by :meth:`dump` (possibly in another process) into this registry.
+
+        Counters and histograms add up; gauges take the merged value, so callers
+        usually distinguish them with ``extra_tags`` (e.g. the writer's pid).
+        """
+
+        for kind, name, tags, state in rows:
+            tags = dict(tags)
+            if extra_tags:
+                tags.update(extra_tags)
+            self.get(kind, name, tags).merge_state(state)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+            self.started_at = time.time()
+
+
+__all__ = [
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "InstrumentRegistry",
+]
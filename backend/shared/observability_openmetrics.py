@@ -0,0 +1,288 @@
+"""OpenMetrics rendering of observability instruments, aggregated across worker processes."""
+
+from __future__ import annotations
+
+import glob
+import json
+import logging
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .observability_instruments import Histogram, InstrumentRegistry
+
+logger = logging.getLogger("watchparty.observability.openmetrics")
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+METRIC_PREFIX = "watchparty_"
+
+# Exported bucket bounds: the in-process histograms keep ~4% buckets, which is
+# far too many label values per series for Prometheus, so scrapes roll them up.
+DEFAULT_BUCKETS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+# seq (odd while a write is in progress), payload length
+_HEADER = struct.Struct("<QQ")
+_INITIAL_FILE_SIZE = 64 * 1024
+_READ_ATTEMPTS = 3
+_FILE_PATTERN = "instruments-*.db"
+
+_NAME_INVALID = re.compile(r"[^a-zA-Z0-9_:]")
+_LABEL_INVALID = re.compile(r"[^a-zA-Z0-9_]")
+
+
+class InstrumentFile:
+    """
+    A process's instrument dump in a memory-mapped file.
+
+    One writer at a time per file (``MultiprocessInstrumentStore`` serializes
+    the owning process's flusher and scrape threads) and any number of
+    readers. Writes are guarded by a sequence number that is odd while a
+    write is in progress, so readers retry instead of seeing a torn payload
+    and never take a lock.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+        self._mmap: Optional[mmap.mmap] = None
+        self._size = 0
+        self._seq = 0
+
+    def write(self, payload: bytes) -> None:
+        needed = _HEADER.size + len(payload)
+        if self._mmap is None or needed > self._size:
+            self._remap(max(needed * 2, _INITIAL_FILE_SIZE))
+
+        self._seq += 1
+        _HEADER.pack_into(self._mmap, 0, self._seq, 0)
+        self._mmap[_HEADER.size:needed] = payload
+        self._seq += 1
+        _HEADER.pack_into(self._mmap, 0, self._seq, len(payload))
+
+    def _remap(self, size: int) -> None:
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if self._mmap is not None:
+            self._mmap.close()
+        os.ftruncate(self._fd, size)
+        self._mmap = mmap.mmap(self._fd, size)
+        # Keep the sequence monotonic across reopen so readers never mistake a rewrite
+        self._seq = max(self._seq, _HEADER.unpack_from(self._mmap, 0)[0]) | 1
+        self._seq += 1
+        self._size = size
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    @staticmethod
+    def read(path: str) -> Optional[bytes]:
+        """The last complete payload written to ``path``, or ``None``."""
+
+        for _ in range(_READ_ATTEMPTS):
+            try:
+                with open(path, "rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    if len(mapped) < _HEADER.size:
+                        return None
+                    seq, length = _HEADER.unpack_from(mapped, 0)
+                    if seq % 2 == 0 and _HEADER.size + length <= len(mapped):
+                        payload = mapped[_HEADER.size:_HEADER.size + length]
+                        if _HEADER.unpack_from(mapped, 0)[0] == seq:
+                            return payload
+            except (OSError, ValueError):
+                return None
+        return None
+
+
+class MultiprocessInstrumentStore:
+    """
+    Per-process instrument dumps in a shared directory, merged at scrape time.
+
+    Each gunicorn/daphne/celery process writes its whole registry to
+    ``instruments-<pid>.db`` at most every ``interval`` seconds. Counters and
+    histograms from every file are summed, including files left behind by
+    processes that have exited, so totals stay monotonic across worker
+    restarts; clear the directory when the service is (re)deployed. Gauges
+    are exported per ``pid`` and only from files written within
+    ``stale_after`` seconds. The merged registry's ``started_at`` is the
+    earliest process start, so rates computed from it cover every dump.
+    """
+
+    def __init__(self, directory: str, interval: float = 5.0, stale_after: Optional[float] = None):
+        self.directory = directory
+        self.interval = interval
+        self.stale_after = stale_after if stale_after is not None else interval * 3
+        self._file: Optional[InstrumentFile] = None
+        self._file_pid: Optional[int] = None
+        self._last_write = 0.0
+        # The flusher thread and scrape requests both write this process's file
+        self._lock = threading.Lock()
+
+    def write(self, registry: InstrumentRegistry, force: bool = False) -> bool:
+        with self._lock:
+            now = time.time()
+            if not force and self._file_pid == os.getpid() and now - self._last_write < self.interval:
+                return False
+
+            pid = os.getpid()
+            if self._file_pid != pid:
+                # Forked children must not keep writing into the parent's file
+                os.makedirs(self.directory, exist_ok=True)
+                self._file = InstrumentFile(os.path.join(self.directory, f"instruments-{pid}.db"))
+                self._file_pid = pid
+
+            payload = json.dumps(
+                {"pid": pid, "started_at": registry.started_at, "written_at": now, "rows": registry.dump()},
+                separators=(",", ":"),
+            )
+            self._file.write(payload.encode())
+            self._last_write = now
+            return True
+
+    def collect(self, max_series: int = 100000) -> InstrumentRegistry:
+        """Merge every process's dump into one registry."""
+
+        merged = InstrumentRegistry(max_series)
+        now = time.time()
+        for path in sorted(glob.glob(os.path.join(self.directory, _FILE_PATTERN))):
+            payload = InstrumentFile.read(path)
+            if not payload:
+                continue
+            try:
+                dump = json.loads(payload)
+            except ValueError:
+                logger.warning("Skipping unreadable instrument file %s", path)
+                continue
+
+            merged.started_at = min(merged.started_at, dump.get("started_at", dump["written_at"]))
+            fresh = now - dump["written_at"] <= self.stale_after
+            pid = {"pid": str(dump["pid"])}
+            merged.merge_rows(row for row in dump["rows"] if row[0] != "gauge")
+            if fresh:
+                merged.merge_rows((row for row in dump["rows"] if row[0] == "gauge"), extra_tags=pid)
+        return merged
+
+
+# ----------------------------------------------------------------------
+# Rendering
+# ----------------------------------------------------------------------
+def metric_name(name: str) -> str:
+    return _NAME_INVALID.sub("_", f"{METRIC_PREFIX}{name}")
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(tags: Iterable[Tuple[str, str]], extra: Iterable[Tuple[str, str]] = ()) -> str:
+    pairs = [(_LABEL_INVALID.sub("_", key), value) for key, value in tags]
+    pairs.extend(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in pairs) + "}"
+
+
+def histogram_buckets(histogram: Histogram, bounds: Iterable[float]) -> List[Tuple[float, int]]:
+    """Cumulative counts at each of ``bounds``, from the fine-grained buckets."""
+
+    fine = histogram.cumulative_buckets()
+    result = []
+    position = 0
+    seen = 0
+    for bound in sorted(bounds):
+        while position < len(fine) and fine[position][0] <= bound:
+            seen = fine[position][1]
+            position += 1
+        result.append((bound, seen))
+    return result
+
+
+def render(
+    registry: InstrumentRegistry,
+    snapshot: Optional[Dict[str, Any]] = None,
+    buckets: Iterable[float] = DEFAULT_BUCKETS,
+) -> str:
+    """OpenMetrics text exposition of ``registry`` plus cached collector gauges."""
+
+    families: Dict[Tuple[str, str], List[Any]] = {}
+    for instrument in registry.series():
+        families.setdefault((instrument.kind, instrument.name), []).append(instrument)
+
+    lines: List[str] = []
+    buckets = tuple(sorted(buckets))
+    for (kind, name), instruments in sorted(families.items(), key=lambda item: (item[0][1], item[0][0])):
+        family = metric_name(name)
+        if kind == "counter":
+            family = family[:-len("_total")] if family.endswith("_total") else family
+            lines.append(f"# TYPE {family} counter")
+            for counter in instruments:
+                lines.append(f"{family}_total{_labels(counter.tags)} {_format_value(counter.value)}")
+        elif kind == "gauge":
+            lines.append(f"# TYPE {family} gauge")
+            for gauge in instruments:
+                lines.append(f"{family}{_labels(gauge.tags)} {_format_value(gauge.value)}")
+        else:
+            lines.append(f"# TYPE {family} histogram")
+            for histogram in instruments:
+                for bound, count in histogram_buckets(histogram, buckets):
+                    lines.append(f"{family}_bucket{_labels(histogram.tags, [('le', _format_value(bound))])} {count}")
+                lines.append(f"{family}_bucket{_labels(histogram.tags, [('le', '+Inf')])} {histogram.count}")
+                lines.append(f"{family}_count{_labels(histogram.tags)} {histogram.count}")
+                lines.append(f"{family}_sum{_labels(histogram.tags)} {_format_value(histogram.sum)}")
+
+    if snapshot:
+        lines.extend(_render_snapshot(snapshot))
+
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+def _render_snapshot(snapshot: Dict[str, Any]) -> List[str]:
+    """Gauges for the collector values cached by the monitoring engine's background refresh."""
+
+    lines = []
+    collected_at = snapshot.get("collected_at")
+    if collected_at:
+        family = metric_name("monitoring_snapshot_age_seconds")
+        lines.append(f"# TYPE {family} gauge")
+        lines.append(f"{family} {_format_value(round(max(time.time() - collected_at, 0.0), 3))}")
+
+    for component, values in sorted(snapshot.get("metrics", {}).items()):
+        if component == "observability" or not isinstance(values, dict):
+            # Per-process view; the instruments above already cover it across processes
+            continue
+        for key, value in sorted(values.items()):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            family = metric_name(f"{component}_{key}")
+            lines.append(f"# TYPE {family} gauge")
+            lines.append(f"{family} {_format_value(value)}")
+    return lines
+
+
+__all__ = [
+    "CONTENT_TYPE",
+    "DEFAULT_BUCKETS",
+    "InstrumentFile",
+    "MultiprocessInstrumentStore",
+    "histogram_buckets",
+    "metric_name",
+    "render",
+]
@@ -2,10 +2,17 @@
 Pagination classes for Watch Party Backend
 """
 
-from rest_framework.pagination import PageNumberPagination
-from rest_framework.response import Response
+import base64
+import json
 from collections import OrderedDict
 
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
 
 class StandardResultsSetPagination(PageNumberPagination):
     """
@@ -67,46 +74,197 @@ class SmallResultsSetPagination(PageNumberPagination):
         ]))
 
 
-class ChatMessagePagination(PageNumberPagination):
+class KeysetPagination(BasePagination):
     """
-    Pagination for chat messages - reverse order
+    Keyset (cursor) pagination on a composite ordering such as (created_at, id)
+
+    Pages are selected with ``WHERE (created_at, id) < (:last_created_at, :last_id)``
+    instead of ``OFFSET``, so every page costs the same regardless of depth.
+    The ``next``/``previous`` links carry opaque cursor tokens and ``COUNT(*)``
+    is only run when ``include_count`` is enabled (or ``?include_count=true``).
     """
-    page_size = 50
+    page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
-    ordering = '-created_at'  # Most recent first
+    cursor_query_param = 'cursor'
+    count_query_param = 'include_count'
+    include_count = True
+    results_key = 'results'
+    ordering = ('-created_at', '-id')
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        self.count = queryset.count() if self.should_count(request) else None
+        
+        position, reverse = self.decode_cursor(request, queryset.model)
+        ordering = self._flip(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._after(ordering, position))
+        
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+        
+        # Coming from a cursor means there are rows on the side we came from
+        self.has_next = position is not None if reverse else has_more
+        self.has_previous = has_more if reverse else position is not None
+        self.first_position = self._position(results[0]) if results else None
+        self.last_position = self._position(results[-1]) if results else None
+        return results
     
     def get_paginated_response(self, data):
-        return Response(OrderedDict([
-            ('count', self.page.paginator.count),
+        payload = OrderedDict([
             ('next', self.get_next_link()),
             ('previous', self.get_previous_link()),
-            ('total_pages', self.page.paginator.num_pages),
-            ('current_page', self.page.number),
-            ('page_size', self.page_size),
-            ('has_more', self.get_next_link() is not None),
-            ('results', data)
-        ]))
+        ])
+        if self.count is not None:
+            payload['count'] = self.count
+        payload['page_size'] = self.page_size
+        payload['has_more'] = self.has_next
+        payload[self.results_key] = data
+        return Response(payload)
+    
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+    
+    def should_count(self, request):
+        value = request.query_params.get(self.count_query_param)
+        if value is None:
+            return self.include_count
+        return value.lower() in ('1', 'true', 'yes')
+    
+    def get_ordering(self, queryset):
+        """
+        Use the queryset's own ordering (e.g. from OrderingFilter) when it is made
+        of plain model fields, always ending with the primary key as tie-breaker.
+        """
+        ordering = [field for field in queryset.query.order_by if isinstance(field, str)]
+        if not ordering or len(ordering) != len(queryset.query.order_by):
+            ordering = list(self.ordering)
+        
+        pk_name = queryset.model._meta.pk.name
+        names = [field.lstrip('-') for field in ordering]
+        try:
+            for name in names:
+                queryset.model._meta.get_field('pk' if name == 'pk' else name)
+        except FieldDoesNotExist:
+            ordering, names = list(self.ordering), [field.lstrip('-') for field in self.ordering]
+        
+        if pk_name not in names and 'pk' not in names:
+            ordering.append(('-' if ordering[0].startswith('-') else '') + pk_name)
+        return tuple(ordering)
+    
+    def get_next_link(self):
+        if not self.has_next or self.last_position is None:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param,
+                                   self.encode_cursor(self.last_position, reverse=False))
+    
+    def get_previous_link(self):
+        if not self.has_previous or self.first_position is None:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param,
+                                   self.encode_cursor(self.first_position, reverse=True))
+    
+    def encode_cursor(self, position, reverse=False):
+        token = json.dumps({'p': position, 'r': int(reverse)}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(token.encode('utf-8')).decode('ascii').rstrip('=')
+    
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            token = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+            position = token['p']
+            if len(position) != len(self.ordering):
+                raise ValueError('cursor does not match ordering')
+            values = [
+                self._field(model, field).to_python(value)
+                for field, value in zip(self.ordering, position)
+            ]
+            return values, bool(token.get('r'))
+        except (TypeError, ValueError, KeyError, ValidationError, json.JSONDecodeError):
+            raise NotFound('Invalid cursor')
+    
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Opaque pagination cursor from a previous next/previous link',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Number of results to return per page',
+                'schema': {'type': 'integer'},
+            },
+        ]
+    
+    def _position(self, obj):
+        position = []
+        for field in self.ordering:
+            value = getattr(obj, field.lstrip('-'))
+            position.append(value.isoformat() if hasattr(value, 'isoformat') else
+                            value if isinstance(value, (int, float, str, bool)) or value is None else str(value))
+        return position
+    
+    @staticmethod
+    def _field(model, field):
+        name = field.lstrip('-')
+        return model._meta.pk if name == 'pk' else model._meta.get_field(name)
+    
+    @staticmethod
+    def _flip(ordering):
+        return tuple(field[1:] if field.startswith('-') else '-' + field for field in ordering)
+    
+    @staticmethod
+    def _after(ordering, position):
+        """Rows strictly after ``position`` in ``ordering`` (lexicographic keyset predicate)"""
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+
+class ChatMessagePagination(KeysetPagination):
+    """
+    Keyset pagination for chat history - newest first, ``next`` scrolls back
+    """
+    page_size = 100
+    page_size_query_param = 'limit'
+    max_page_size = 500
+    include_count = False
+    ordering = ('-created_at', '-id')
 
 
-class VideoListPagination(PageNumberPagination):
+class VideoListPagination(KeysetPagination):
     """
-    Pagination for video listings
+    Keyset pagination for video listings
     """
     page_size = 12  # Grid layout friendly
     page_size_query_param = 'page_size'
     max_page_size = 48
-    
-    def get_paginated_response(self, data):
-        return Response(OrderedDict([
-            ('count', self.page.paginator.count),
-            ('next', self.get_next_link()),
-            ('previous', self.get_previous_link()),
-            ('total_pages', self.page.paginator.num_pages),
-            ('current_page', self.page.number),
-            ('page_size', self.page_size),
-            ('results', data)
-        ]))
+    ordering = ('-created_at', '-id')
 
 
 class PartyListPagination(PageNumberPagination):
@@ -129,29 +287,36 @@ class PartyListPagination(PageNumberPagination):
         ]))
 
 
-class NotificationPagination(PageNumberPagination):
+class NotificationPagination(KeysetPagination):
     """
-    Pagination for notifications
+    Keyset pagination for notifications
     """
     page_size = 25
     page_size_query_param = 'page_size'
     max_page_size = 100
-    ordering = '-created_at'
+    ordering = ('-created_at', '-id')
     
     def get_paginated_response(self, data):
-        return Response(OrderedDict([
-            ('count', self.page.paginator.count),
-            ('next', self.get_next_link()),
-            ('previous', self.get_previous_link()),
-            ('total_pages', self.page.paginator.num_pages),
-            ('current_page', self.page.number),
-            ('page_size', self.page_size),
-            ('unread_count', self.get_unread_count()),
-            ('results', data)
-        ]))
+        response = super().get_paginated_response(data)
+        response.data['unread_count'] = self.get_unread_count()
+        response.data.move_to_end('results')
+        return response
     
     def get_unread_count(self):
         """Get count of unread notifications"""
-        # This would be implemented based on your notification model
-        # For now, return 0 as placeholder
-        return 0
+        user = getattr(self.request, 'user', None)
+        if user is None or not user.is_authenticated:
+            return 0
+        return user.notifications.filter(is_read=False).count()
+
+
+class ActivityFeedPagination(KeysetPagination):
+    """
+    Keyset pagination for the social activity feed
+    """
+    page_size = 50
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    include_count = False
+    results_key = 'activities'
+    ordering = ('-created_at', '-id')
@@ -0,0 +1,206 @@
+"""Per-request query profiling that works with ``DEBUG`` off.
+
+``connection.queries`` is only filled when ``DEBUG`` is on, so request-level
+query checks built on it are silent in production. This profiler instead
+hooks every connection with ``execute_wrapper`` and, for requests picked with
+probability ``QUERY_PROFILE_SAMPLE_RATE``, counts and times each query and
+groups it by fingerprint (the SQL with literals and ``IN`` lists normalized).
+A fingerprint repeated ``N_PLUS_ONE_THRESHOLD`` times in one request is the
+shape of an N+1 and is counted per view in ``db.repeated_queries``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import random
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger("watchparty.database")
+
+DEFAULT_SAMPLE_RATE = 1.0
+DEFAULT_N_PLUS_ONE_THRESHOLD = 5
+MAX_SLOW_QUERIES = 20
+MAX_FINGERPRINTS = 5000
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))*\s*\)", re.IGNORECASE)
+_VALUES_ROWS = re.compile(r"(\([^()]*\))(?:\s*,\s*\([^()]*\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _setting(name: str, default: Any) -> Any:
+    try:
+        from django.conf import settings
+
+        return getattr(settings, name, default)
+    except Exception:
+        return default
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(sql: str) -> str:
+    """``sql`` with literals replaced by ``?`` and ``IN``/``VALUES`` lists collapsed."""
+
+    normalized = _STRING_LITERAL.sub("?", sql)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _IN_LIST.sub("IN (...)", normalized)
+    normalized = _VALUES_ROWS.sub(r"\1, ...", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+def fingerprint_id(normalized: str) -> str:
+    return hashlib.blake2b(normalized.encode(), digest_size=6).hexdigest()
+
+
+class QueryProfile:
+    """Queries executed on behalf of one request."""
+
+    __slots__ = ("count", "total_ms", "shapes", "slow", "slow_threshold_ms")
+
+    def __init__(self, slow_threshold_ms: float):
+        self.count = 0
+        self.total_ms = 0.0
+        self.shapes: Dict[str, List[float]] = {}
+        self.slow: List[Tuple[str, float]] = []
+        self.slow_threshold_ms = slow_threshold_ms
+
+    def record(self, sql: str, duration_ms: float) -> None:
+        self.count += 1
+        self.total_ms += duration_ms
+        shape = self.shapes.get(sql)
+        if shape is None:
+            self.shapes[sql] = [1, duration_ms]
+        else:
+            shape[0] += 1
+            shape[1] += duration_ms
+        if duration_ms >= self.slow_threshold_ms and len(self.slow) < MAX_SLOW_QUERIES:
+            self.slow.append((sql, duration_ms))
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int, float]]:
+        """``(fingerprint, count, total_ms)`` of shapes run at least ``threshold`` times, worst first."""
+
+        # Raw SQL is grouped first; fingerprinting only the distinct statements keeps recording cheap
+        by_fingerprint: Dict[str, List[float]] = {}
+        for sql, (count, total_ms) in self.shapes.items():
+            entry = by_fingerprint.setdefault(fingerprint(sql), [0, 0.0])
+            entry[0] += count
+            entry[1] += total_ms
+        repeated = [(shape, int(count), total) for shape, (count, total) in by_fingerprint.items() if count >= threshold]
+        return sorted(repeated, key=lambda item: item[1], reverse=True)
+
+
+_UNSAMPLED = object()
+_active: ContextVar[Any] = ContextVar("watchparty_query_profile", default=None)
+
+# fingerprint id -> normalized SQL, for reading db.repeated_queries series back
+fingerprints: Dict[str, str] = {}
+
+
+def active_profile() -> Optional[QueryProfile]:
+    profile = _active.get()
+    return None if profile is _UNSAMPLED else profile
+
+
+@contextmanager
+def profile() -> Iterator[Optional[QueryProfile]]:
+    """Profile queries in this block; nested blocks share the outermost block's profile (or sampling miss)."""
+
+    existing = _active.get()
+    if existing is not None:
+        yield None if existing is _UNSAMPLED else existing
+        return
+
+    rate = float(_setting("QUERY_PROFILE_SAMPLE_RATE", DEFAULT_SAMPLE_RATE))
+    if rate >= 1.0 or random.random() < rate:
+        current = QueryProfile(_setting("SLOW_QUERY_THRESHOLD_MS", 500))
+    else:
+        current = _UNSAMPLED
+    token = _active.set(current)
+    try:
+        yield None if current is _UNSAMPLED else current
+    finally:
+        _active.reset(token)
+
+
+def profile_query(execute, sql, params, many, context):
+    """``connection.execute_wrapper`` hook timing each query into the active profile."""
+
+    current = _active.get()
+    if current is None or current is _UNSAMPLED:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        current.record(sql, (time.perf_counter() - started) * 1000)
+
+
+def record_repeated(view: str, repeated: List[Tuple[str, int, float]]) -> None:
+    """Count N+1 shapes per (view, fingerprint) in the aggregated metrics."""
+
+    from .observability import observability
+
+    for shape, count, _total_ms in repeated:
+        shape_id = fingerprint_id(shape)
+        if shape_id not in fingerprints and len(fingerprints) < MAX_FINGERPRINTS:
+            fingerprints[shape_id] = shape
+        observability.increment("db.repeated_queries", count, tags={"view": view, "fingerprint": shape_id})
+
+
+def top_offenders(limit: int = 10) -> List[Dict[str, Any]]:
+    """The (view, fingerprint) pairs with the most repeated queries so far."""
+
+    from .observability import observability
+
+    series = sorted(
+        observability.instruments.series("counter", "db.repeated_queries"),
+        key=lambda counter: counter.value,
+        reverse=True,
+    )[:limit]
+    offenders = []
+    for counter in series:
+        tags = dict(counter.tags)
+        offenders.append({
+            "view": tags.get("view"),
+            "fingerprint": tags.get("fingerprint"),
+            "sql": fingerprints.get(tags.get("fingerprint", "")),
+            "queries": counter.value,
+        })
+    return offenders
+
+
+def _add_query_profiler(connection, **kwargs):
+    if profile_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(profile_query)
+
+
+def install() -> None:
+    """Hook the profiler into every database connection."""
+
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+
+    connection_created.connect(_add_query_profiler, dispatch_uid="watchparty.query_profiler")
+    for connection in connections.all(initialized_only=True):
+        _add_query_profiler(connection)
+
+
+__all__ = [
+    "QueryProfile",
+    "active_profile",
+    "fingerprint",
+    "fingerprint_id",
+    "install",
+    "profile",
+    "profile_query",
+    "record_repeated",
+    "top_offenders",
+]
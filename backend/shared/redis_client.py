@@ -0,0 +1,31 @@
+"""Access to the raw Redis client behind the Django cache backends."""
+
+import logging
+from typing import Any, Optional
+
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+
+def get_redis_client(alias: str = 'default') -> Optional[Any]:
+    """
+    Return the raw Redis client used by a ``django_redis`` cache alias.
+
+    Returns ``None`` when the alias is served by another backend (locmem in
+    tests, dummy cache in CI) so callers can fall back to the plain cache API.
+    """
+    backend = caches[alias]
+    if not backend.__class__.__module__.startswith('django_redis'):
+        return None
+
+    try:
+        return backend.client.get_client(write=True)
+    except Exception as exc:  # pragma: no cover - depends on live Redis
+        logger.warning(f"Redis client unavailable for cache alias '{alias}': {exc}")
+        return None
+
+
+def make_cache_key(key: str, alias: str = 'default') -> str:
+    """Build the fully prefixed key the cache alias would use for ``key``."""
+    return caches[alias].make_key(key)
@@ -2,16 +2,40 @@
 
 from .social_service import social_service
 from .video_analytics_service import video_analytics_service
+from .media_inspection_service import media_inspection_service
 from .video_service import video_storage_service, video_processing_service, video_streaming_service
+from .multipart_upload_service import multipart_upload_service
 from .notification_service import notification_service
 from .mobile_push_service import mobile_push_service
+from .chat_buffer_service import chat_message_buffer
+from .party_access_service import party_access_service
+from .party_clock_service import party_clock_service
+from .presence_service import presence_service
+from .user_card_service import user_card_service
+from .video_dedup_service import video_dedup_service
+from .video_packaging_service import video_packaging_service
+from .video_prefetch_service import video_prefetch_service
+from .video_proxy_service import video_proxy_service
+from .video_transcode_service import video_transcode_service
 
 __all__ = [
     "social_service",
     "video_analytics_service", 
+    "media_inspection_service",
     "video_storage_service",
     "video_processing_service", 
     "video_streaming_service",
+    "multipart_upload_service",
     "notification_service",
     "mobile_push_service",
+    "chat_message_buffer",
+    "party_access_service",
+    "party_clock_service",
+    "presence_service",
+    "user_card_service",
+    "video_dedup_service",
+    "video_packaging_service",
+    "video_prefetch_service",
+    "video_proxy_service",
+    "video_transcode_service",
 ]
\ No newline at end of file
@@ -0,0 +1,231 @@
+"""Write-behind buffer for chat messages sent over WebSocket."""
+
+import asyncio
+import json
+import logging
+import threading
+import uuid
+from typing import Any, Dict, List, Optional
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from shared.redis_client import get_redis_client, make_cache_key
+
+logger = logging.getLogger(__name__)
+
+ROOMS_KEY = 'chat_buffer:rooms'
+
+# KEYS: room buffer hash, room index set; ARGV: room id, flushed message ids...
+_ACK_SCRIPT = """
+for i = 2, #ARGV do
+    redis.call('HDEL', KEYS[1], ARGV[i])
+end
+if redis.call('HLEN', KEYS[1]) == 0 then
+    redis.call('SREM', KEYS[2], ARGV[1])
+end
+return redis.call('HLEN', KEYS[1])
+"""
+
+
+class ChatMessageBuffer:
+    """
+    Chat messages are accepted into a buffer and persisted in batches.
+
+    ``append`` assigns the message id and ``created_at`` ordering key, so the
+    message can be broadcast before it reaches the database. Records sit in a
+    Redis hash per room until a flush writes them with ``bulk_create`` and then
+    acknowledges them; a flusher that dies between the two steps is harmless
+    because the ids are fixed and inserts ignore conflicts. Each ASGI process
+    flushes every ``CHAT_BUFFER_FLUSH_MS`` or after ``CHAT_BUFFER_MAX_BATCH``
+    messages, and a periodic task replays anything a crashed worker left behind.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._ack_script = None
+        self._unflushed = 0
+        self._flush_task: Optional[asyncio.Task] = None
+
+    @property
+    def flush_interval(self) -> float:
+        return getattr(settings, 'CHAT_BUFFER_FLUSH_MS', 250) / 1000.0
+
+    @property
+    def max_batch(self) -> int:
+        return getattr(settings, 'CHAT_BUFFER_MAX_BATCH', 200)
+
+    def _key(self, room_id: Any) -> str:
+        return f"chat_buffer:{room_id}"
+
+    def append(self, room_id: Any, user_id: Any, content: str, message_type: str = 'text',
+               reply_to_id: Any = None, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Accept a message and return its buffered record."""
+        record = {
+            'id': str(uuid.uuid4()),
+            'room_id': str(room_id),
+            'user_id': str(user_id) if user_id else None,
+            'content': content,
+            'message_type': message_type,
+            'reply_to_id': str(reply_to_id) if reply_to_id else None,
+            'metadata': metadata or {},
+            'created_at': timezone.now().isoformat(),
+        }
+
+        client = get_redis_client()
+        if client is not None:
+            try:
+                pipe = client.pipeline()
+                pipe.hset(make_cache_key(self._key(room_id)), record['id'], json.dumps(record))
+                pipe.sadd(make_cache_key(ROOMS_KEY), record['room_id'])
+                pipe.execute()
+                return record
+            except Exception as exc:
+                logger.warning(f"Chat buffer append failed for room {room_id}, using cache: {exc}")
+
+        with self._lock:
+            pending = cache.get(self._key(room_id)) or {}
+            pending[record['id']] = record
+            cache.set(self._key(room_id), pending, timeout=None)
+            rooms = set(cache.get(ROOMS_KEY) or [])
+            rooms.add(record['room_id'])
+            cache.set(ROOMS_KEY, rooms, timeout=None)
+        return record
+
+    def pending(self, room_id: Any) -> List[Dict[str, Any]]:
+        """Buffered records for ``room_id`` in creation order."""
+        client = get_redis_client()
+        if client is not None:
+            try:
+                values = client.hvals(make_cache_key(self._key(room_id)))
+                records = [json.loads(value) for value in values]
+                return sorted(records, key=lambda record: record['created_at'])
+            except Exception as exc:
+                logger.warning(f"Chat buffer read failed for room {room_id}, using cache: {exc}")
+        records = list((cache.get(self._key(room_id)) or {}).values())
+        return sorted(records, key=lambda record: record['created_at'])
+
+    def get(self, room_id: Any, message_id: Any) -> Optional[Dict[str, Any]]:
+        """A single buffered record, if it has not been flushed yet."""
+        for record in self.pending(room_id):
+            if record['id'] == str(message_id):
+                return record
+        return None
+
+    def rooms(self) -> List[str]:
+        client = get_redis_client()
+        if client is not None:
+            try:
+                return [room.decode() if isinstance(room, bytes) else room
+                        for room in client.smembers(make_cache_key(ROOMS_KEY))]
+            except Exception as exc:
+                logger.warning(f"Chat buffer room index read failed, using cache: {exc}")
+        return list(cache.get(ROOMS_KEY) or [])
+
+    # ------------------------------------------------------------------
+    # Flushing
+    # ------------------------------------------------------------------
+    def flush(self) -> int:
+        """Persist every buffered message; returns the number written."""
+        self._unflushed = 0
+        return sum(self.flush_room(room_id) for room_id in self.rooms())
+
+    def flush_room(self, room_id: Any) -> int:
+        """Persist ``room_id``'s buffered messages (used to read through the buffer)."""
+        records = self.pending(room_id)
+        if not records:
+            self._ack(room_id, [])
+            return 0
+
+        written = self._persist(records)
+        self._ack(room_id, [record['id'] for record in records])
+        return written
+
+    async def schedule_flush(self) -> None:
+        """Debounced per-process flush, called after each ``append``."""
+        self._unflushed += 1
+        if self.flush_interval <= 0 or self._unflushed >= self.max_batch:
+            await database_sync_to_async(self.flush)()
+            return
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.ensure_future(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        try:
+            await database_sync_to_async(self.flush)()
+        except Exception as exc:
+            logger.error(f"Chat buffer flush failed: {exc}")
+
+    def _persist(self, records: List[Dict[str, Any]]) -> int:
+        from apps.chat.models import ChatMessage
+
+        messages = [self.to_instance(record) for record in records]
+        try:
+            with transaction.atomic():
+                ChatMessage.objects.bulk_create(messages, batch_size=self.max_batch, ignore_conflicts=True)
+            return len(messages)
+        except IntegrityError as exc:
+            # One bad row (deleted user, vanished reply target) must not block the batch
+            logger.warning(f"Chat buffer batch insert failed, retrying row by row: {exc}")
+
+        written = 0
+        for message in messages:
+            try:
+                with transaction.atomic():
+                    ChatMessage.objects.bulk_create([message], ignore_conflicts=True)
+                written += 1
+            except IntegrityError as exc:
+                logger.error(f"Dropping buffered chat message {message.id}: {exc}")
+        return written
+
+    def _ack(self, room_id: Any, message_ids: List[str]) -> None:
+        client = get_redis_client()
+        if client is not None:
+            try:
+                if self._ack_script is None:
+                    self._ack_script = client.register_script(_ACK_SCRIPT)
+                self._ack_script(
+                    keys=[make_cache_key(self._key(room_id)), make_cache_key(ROOMS_KEY)],
+                    args=[str(room_id), *message_ids],
+                )
+                return
+            except Exception as exc:
+                logger.warning(f"Chat buffer ack failed for room {room_id}, using cache: {exc}")
+
+        with self._lock:
+            pending = cache.get(self._key(room_id)) or {}
+            for message_id in message_ids:
+                pending.pop(message_id, None)
+            if pending:
+                cache.set(self._key(room_id), pending, timeout=None)
+                return
+            cache.delete(self._key(room_id))
+            rooms = set(cache.get(ROOMS_KEY) or [])
+            rooms.discard(str(room_id))
+            cache.set(ROOMS_KEY, rooms, timeout=None)
+
+    @staticmethod
+    def to_instance(record: Dict[str, Any]):
+        """Build an unsaved ``ChatMessage`` from a buffered record."""
+        from apps.chat.models import ChatMessage
+
+        return ChatMessage(
+            id=uuid.UUID(record['id']),
+            room_id=record['room_id'],
+            user_id=record['user_id'],
+            content=record['content'],
+            message_type=record['message_type'],
+            reply_to_id=record['reply_to_id'],
+            metadata=record['metadata'],
+            created_at=parse_datetime(record['created_at']),
+            updated_at=parse_datetime(record['created_at']),
+        )
+
+
+# Global service instance
+chat_message_buffer = ChatMessageBuffer()
@@ -0,0 +1,247 @@
+"""One-pass probe, thumbnail, sprite sheet and preview extraction for uploaded video."""
+
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+
+from shared.observability import observability
+from shared.services.video_dedup_service import video_dedup_service
+
+logger = logging.getLogger(__name__)
+
+# upload(local_path, name) -> public URL, or None on failure
+Uploader = Callable[[str, str], Optional[str]]
+
+
+class MediaInspectionError(Exception):
+    """The source could not be read or the extractor failed."""
+
+
+class MediaInspectionService:
+    """
+    Inspects a video once and derives everything the catalogue shows for it.
+
+    A source is identified by the SHA-256 of its full content. Uploads are
+    hashed as they stream in, so callers pass that digest and a re-upload of
+    the same file finds the cached result before anything is downloaded;
+    other sources are downloaded once (remote) or read in place (local) and
+    hashed. Cache misses are probed with ffprobe and decoded by a single
+    ffmpeg run whose filter graph splits the video into evenly spaced
+    thumbnails, one scrub sprite sheet and the preview clip. Results are
+    cached for ``MEDIA_INSPECTION_CACHE_TTL`` seconds under the digest.
+    """
+
+    @property
+    def cache_ttl(self) -> int:
+        return getattr(settings, 'MEDIA_INSPECTION_CACHE_TTL', 30 * 86400)
+
+    @property
+    def thumbnail_count(self) -> int:
+        return getattr(settings, 'MEDIA_THUMBNAIL_COUNT', 5)
+
+    @property
+    def sprite_grid(self) -> Tuple[int, int]:
+        return getattr(settings, 'MEDIA_SPRITE_GRID', (10, 10))
+
+    @property
+    def preview_seconds(self) -> int:
+        return getattr(settings, 'MEDIA_PREVIEW_SECONDS', 30)
+
+    @property
+    def timeout(self) -> int:
+        return getattr(settings, 'MEDIA_INSPECTION_TIMEOUT', 900)
+
+    # ------------------------------------------------------------------
+    # Entry point
+    # ------------------------------------------------------------------
+    def inspect(self, source: str, upload: Uploader, content_hash: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Metadata, thumbnail URLs, sprite sheet and preview URL for ``source``
+        (an http(s) URL or a local path). ``content_hash`` is the SHA-256 of
+        the source when the caller already has it. ``upload`` stores each
+        derived file. Returns ``None`` when the source cannot be probed.
+        """
+        workdir = tempfile.mkdtemp(prefix='media-inspect-')
+        try:
+            local_path = None
+            if content_hash:
+                fingerprint = content_hash
+            else:
+                fingerprint, local_path = self.fingerprint(source, workdir)
+            cache_key = f"media_inspection:{fingerprint}"
+            cached = cache.get(cache_key)
+            if cached is not None:
+                observability.record_metric("media.inspection.cache_hit", 1)
+                return cached
+
+            if local_path is None:
+                local_path = self.local_copy(source, workdir)
+
+            metadata = self.probe(local_path)
+            if metadata is None:
+                return None
+
+            try:
+                outputs = self.extract(local_path, metadata, workdir)
+            except MediaInspectionError as exc:
+                logger.error(f"Media extraction failed for {source}: {exc}")
+                return {'fingerprint': fingerprint, 'metadata': metadata,
+                        'thumbnails': [], 'sprite': None, 'preview': None}
+
+            result = self._store(fingerprint, metadata, outputs, upload)
+            if result['preview'] and result['thumbnails'] and result['sprite']:
+                cache.set(cache_key, result, timeout=self.cache_ttl)
+            return result
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    # ------------------------------------------------------------------
+    # Source access
+    # ------------------------------------------------------------------
+    def fingerprint(self, source: str, workdir: str) -> Tuple[str, str]:
+        """SHA-256 of the full content of ``source`` and a local path to it."""
+        local_path = self.local_copy(source, workdir)
+        return video_dedup_service.hash_file(local_path), local_path
+
+    def local_copy(self, source: str, workdir: str) -> str:
+        """``source`` itself when local, otherwise a download of it inside ``workdir``."""
+        if not source.startswith(('http://', 'https://')):
+            return source
+        return self._download(source, os.path.join(workdir, 'source'))
+
+    def _download(self, source: str, destination: str) -> str:
+        with observability.span("media.inspection.download"):
+            with requests.get(source, stream=True, timeout=60) as response:
+                response.raise_for_status()
+                with open(destination, 'wb') as handle:
+                    for chunk in response.iter_content(chunk_size=1024 * 1024):
+                        handle.write(chunk)
+        return destination
+
+    # ------------------------------------------------------------------
+    # Probe and extraction
+    # ------------------------------------------------------------------
+    def probe(self, path: str) -> Optional[Dict[str, Any]]:
+        """Duration, size and primary video stream details from ffprobe."""
+        command = ['ffprobe', '-v', 'quiet', '-print_format', 'json', '-show_format', '-show_streams', path]
+        try:
+            result = subprocess.run(command, capture_output=True, text=True, timeout=60)
+        except subprocess.TimeoutExpired:
+            logger.error(f"ffprobe timeout for {path}")
+            return None
+        if result.returncode != 0:
+            logger.error(f"ffprobe failed for {path}: {result.stderr}")
+            return None
+        return self.parse_probe(json.loads(result.stdout))
+
+    @staticmethod
+    def parse_probe(probe: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        format_info = probe.get('format', {})
+        streams = probe.get('streams', [])
+        video_stream = next((stream for stream in streams if stream.get('codec_type') == 'video'), None)
+        if not video_stream:
+            logger.warning("No video stream found in file")
+            return None
+
+        fps = 0.0
+        numerator, _, denominator = video_stream.get('r_frame_rate', '0/1').partition('/')
+        try:
+            fps = int(numerator) / int(denominator or 1) if int(denominator or 1) else 0.0
+        except ValueError:
+            pass
+
+        return {
+            'duration': float(format_info.get('duration') or 0),
+            'file_size': int(format_info.get('size') or 0),
+            'width': video_stream.get('width', 0),
+            'height': video_stream.get('height', 0),
+            'codec': video_stream.get('codec_name', ''),
+            'bitrate': int(video_stream.get('bit_rate') or format_info.get('bit_rate') or 0),
+            'fps': round(fps, 2),
+            'has_audio': any(stream.get('codec_type') == 'audio' for stream in streams),
+        }
+
+    def build_command(self, path: str, metadata: Dict[str, Any], workdir: str) -> Tuple[List[str], Dict[str, Any]]:
+        """One ffmpeg run producing thumbnails, the sprite sheet and the preview clip."""
+        duration = max(metadata['duration'], 0.1)
+        count = self.thumbnail_count
+        columns, rows = self.sprite_grid
+        sprite_interval = duration / (columns * rows)
+        preview_length = min(self.preview_seconds, duration)
+        preview_start = min(duration * 0.1, max(duration - preview_length, 0))
+
+        graph = [
+            '[0:v]split=3[thumbs_in][sprite_in][preview_in]',
+            f'[thumbs_in]trim=start={duration / (2 * count):.3f},fps={count}/{duration:.3f},scale=640:-2[thumbs]',
+            f'[sprite_in]fps=1/{sprite_interval:.3f},scale=160:-2,tile={columns}x{rows}[sprite]',
+            f'[preview_in]trim=start={preview_start:.3f}:duration={preview_length:.3f},'
+            f'setpts=PTS-STARTPTS,scale=640:-2[preview]',
+        ]
+        if metadata.get('has_audio'):
+            graph.append(
+                f'[0:a]atrim=start={preview_start:.3f}:duration={preview_length:.3f},asetpts=PTS-STARTPTS[preview_audio]'
+            )
+
+        command = [
+            'ffmpeg', '-hide_banner', '-nostdin', '-y', '-i', path,
+            '-filter_complex', ';'.join(graph),
+            '-map', '[thumbs]', '-frames:v', str(count), '-q:v', '3',
+            os.path.join(workdir, 'thumbnail_%02d.jpg'),
+            '-map', '[sprite]', '-frames:v', '1', '-q:v', '5',
+            os.path.join(workdir, 'sprite.jpg'),
+            '-map', '[preview]',
+        ]
+        if metadata.get('has_audio'):
+            command += ['-map', '[preview_audio]', '-c:a', 'aac', '-b:a', '64k']
+        command += ['-c:v', 'libx264', '-preset', 'fast', '-crf', '28', '-movflags', '+faststart',
+                    os.path.join(workdir, 'preview.mp4')]
+
+        tile_height = 2 * round(80 * metadata['height'] / metadata['width']) if metadata.get('width') else None
+        sprite = {'columns': columns, 'rows': rows, 'interval': round(sprite_interval, 3),
+                  'tile_width': 160, 'tile_height': tile_height}
+        return command, sprite
+
+    def extract(self, path: str, metadata: Dict[str, Any], workdir: str) -> Dict[str, Any]:
+        command, sprite = self.build_command(path, metadata, workdir)
+        with observability.span("media.inspection.extract"):
+            try:
+                result = subprocess.run(command, capture_output=True, text=True, timeout=self.timeout)
+            except subprocess.TimeoutExpired as exc:
+                raise MediaInspectionError(f"ffmpeg timed out after {self.timeout}s") from exc
+        if result.returncode != 0:
+            raise MediaInspectionError(result.stderr[-2000:])
+
+        thumbnails = sorted(name for name in os.listdir(workdir) if name.startswith('thumbnail_'))
+        return {
+            'thumbnails': [os.path.join(workdir, name) for name in thumbnails],
+            'sprite_path': os.path.join(workdir, 'sprite.jpg'),
+            'sprite': sprite,
+            'preview': os.path.join(workdir, 'preview.mp4'),
+        }
+
+    def _store(self, fingerprint: str, metadata: Dict[str, Any], outputs: Dict[str, Any],
+               upload: Uploader) -> Dict[str, Any]:
+        def store(path):
+            return upload(path, f"{fingerprint}/{os.path.basename(path)}") if os.path.exists(path) else None
+
+        thumbnails = [url for url in (store(path) for path in outputs['thumbnails']) if url]
+        sprite_url = store(outputs['sprite_path'])
+        return {
+            'fingerprint': fingerprint,
+            'metadata': metadata,
+            'thumbnails': thumbnails,
+            'sprite': dict(outputs['sprite'], url=sprite_url) if sprite_url else None,
+            'preview': store(outputs['preview']),
+        }
+
+
+# Global service instance
+media_inspection_service = MediaInspectionService()
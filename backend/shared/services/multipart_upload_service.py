@@ -0,0 +1,234 @@
+"""Resumable multipart uploads to object storage, client-side and server-side."""
+
+import logging
+import math
+import uuid
+from typing import Any, Dict, Iterable, List, Optional
+
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import BotoCoreError, ClientError
+from django.conf import settings
+from django.utils import timezone
+
+from shared.aws import get_boto3_session
+from shared.exceptions import VideoError
+from shared.observability import observability
+
+logger = logging.getLogger(__name__)
+
+# S3 limits
+MIN_PART_SIZE = 5 * 1024 * 1024
+MAX_PARTS = 10000
+
+
+class MultipartUploadService:
+    """
+    Drives S3 multipart uploads whose parts clients PUT directly to storage.
+
+    Clients receive presigned part URLs in batches of
+    ``VIDEO_MULTIPART_URL_BATCH`` and report each finished part; the parts
+    are recorded on the ``VideoUpload`` so a client that lost its connection
+    asks for the missing parts and carries on instead of starting over.
+    Storage is authoritative when completing: parts are re-listed from S3,
+    so a part the client uploaded but never reported still counts.
+
+    Server-side uploads (variants, thumbnails) use :meth:`transfer_config`
+    for concurrent multipart transfers. ``AWS_S3_ENDPOINT_URL`` points both
+    at an S3-compatible stand-in such as MinIO for local runs and tests.
+    """
+
+    def __init__(self, client: Any = None):
+        self._client = client
+
+    @property
+    def part_size(self) -> int:
+        return max(getattr(settings, 'VIDEO_MULTIPART_PART_SIZE', 16 * 1024 * 1024), MIN_PART_SIZE)
+
+    @property
+    def url_batch(self) -> int:
+        return getattr(settings, 'VIDEO_MULTIPART_URL_BATCH', 20)
+
+    @property
+    def url_expiration(self) -> int:
+        return getattr(settings, 'VIDEO_UPLOAD_URL_EXPIRATION', 900)
+
+    @property
+    def bucket(self) -> str:
+        bucket = getattr(settings, 'VIDEO_STORAGE_BUCKET', '') or getattr(settings, 'AWS_STORAGE_BUCKET_NAME', '')
+        if not bucket:
+            raise VideoError("Video storage bucket is not configured.")
+        return bucket
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_boto3_session().client(
+                's3',
+                region_name=getattr(settings, 'AWS_S3_REGION_NAME', None),
+                endpoint_url=getattr(settings, 'AWS_S3_ENDPOINT_URL', '') or None,
+            )
+        return self._client
+
+    def transfer_config(self) -> TransferConfig:
+        """Concurrent multipart settings for server-side uploads."""
+        chunk = max(getattr(settings, 'VIDEO_TRANSFER_PART_SIZE', 16 * 1024 * 1024), MIN_PART_SIZE)
+        return TransferConfig(
+            multipart_threshold=chunk,
+            multipart_chunksize=chunk,
+            max_concurrency=getattr(settings, 'VIDEO_TRANSFER_CONCURRENCY', 8),
+            use_threads=True,
+        )
+
+    def plan_part_size(self, file_size: int) -> int:
+        """Configured part size, grown (in MiB steps) when the file would need more than 10,000 parts."""
+        needed = math.ceil(file_size / MAX_PARTS)
+        if needed <= self.part_size:
+            return self.part_size
+        return math.ceil(needed / (1024 * 1024)) * 1024 * 1024
+
+    # ------------------------------------------------------------------
+    # Client-driven uploads
+    # ------------------------------------------------------------------
+    def start(self, upload, content_type: str) -> Dict[str, Any]:
+        """Begin (or resume) the multipart upload for ``upload``."""
+        if upload.multipart_upload_id:
+            return self.status(upload)
+
+        key_prefix = getattr(settings, 'VIDEO_UPLOAD_PREFIX', 'uploads/')
+        key = f"{key_prefix}{uuid.uuid4()}-{upload.filename}"
+        try:
+            response = self.client.create_multipart_upload(Bucket=self.bucket, Key=key, ContentType=content_type)
+        except (ClientError, BotoCoreError) as exc:
+            logger.exception("Failed to start multipart upload for %s", upload.filename)
+            raise VideoError("Unable to start upload.") from exc
+
+        upload.storage_key = key
+        upload.multipart_upload_id = response['UploadId']
+        upload.part_size = self.plan_part_size(upload.file_size)
+        upload.completed_parts = []
+        upload.status = 'uploading'
+        upload.save()
+        observability.record_metric("video.multipart.started", 1)
+        return self.status(upload)
+
+    def part_count(self, upload) -> int:
+        return max(math.ceil(upload.file_size / upload.part_size), 1)
+
+    def missing_parts(self, upload) -> List[int]:
+        done = {part['part_number'] for part in upload.completed_parts}
+        return [number for number in range(1, self.part_count(upload) + 1) if number not in done]
+
+    def part_urls(self, upload, part_numbers: Optional[Iterable[int]] = None) -> List[Dict[str, Any]]:
+        """Presigned PUT URLs for ``part_numbers``, or the next batch of missing parts."""
+        if not upload.multipart_upload_id:
+            raise VideoError("Upload has not been started.")
+
+        count = self.part_count(upload)
+        numbers = list(part_numbers) if part_numbers is not None else self.missing_parts(upload)
+        urls = []
+        for number in numbers[:self.url_batch]:
+            if not 1 <= number <= count:
+                raise VideoError(f"Part {number} is out of range.")
+            urls.append({
+                'part_number': number,
+                'url': self.client.generate_presigned_url(
+                    'upload_part',
+                    Params={'Bucket': self.bucket, 'Key': upload.storage_key,
+                            'UploadId': upload.multipart_upload_id, 'PartNumber': number},
+                    ExpiresIn=self.url_expiration,
+                ),
+                'size': min(upload.part_size, upload.file_size - (number - 1) * upload.part_size),
+            })
+        return urls
+
+    def record_parts(self, upload, parts: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """Record parts the client finished (``part_number`` and ``etag`` each)."""
+        count = self.part_count(upload)
+        recorded = {part['part_number']: part for part in upload.completed_parts}
+        for part in parts:
+            number = int(part['part_number'])
+            if not 1 <= number <= count or not part.get('etag'):
+                raise VideoError(f"Invalid part {part.get('part_number')!r}.")
+            recorded[number] = {
+                'part_number': number,
+                'etag': part['etag'],
+                'size': min(upload.part_size, upload.file_size - (number - 1) * upload.part_size),
+            }
+
+        upload.completed_parts = [recorded[number] for number in sorted(recorded)]
+        uploaded_bytes = sum(part['size'] for part in upload.completed_parts)
+        upload.progress_percentage = round(100.0 * uploaded_bytes / upload.file_size, 2)
+        upload.save(update_fields=['completed_parts', 'progress_percentage', 'updated_at'])
+        return self.status(upload)
+
+    def status(self, upload) -> Dict[str, Any]:
+        missing = self.missing_parts(upload)
+        return {
+            'upload_id': str(upload.id),
+            'key': upload.storage_key,
+            'part_size': upload.part_size,
+            'part_count': self.part_count(upload),
+            'completed_parts': [part['part_number'] for part in upload.completed_parts],
+            'missing_parts': missing,
+            'progress': upload.progress_percentage,
+            'part_urls': self.part_urls(upload, missing) if missing else [],
+        }
+
+    def complete(self, upload) -> str:
+        """Assemble the uploaded parts; returns the object key."""
+        parts = self.list_parts(upload)
+        if len(parts) < self.part_count(upload):
+            upload.completed_parts = parts
+            upload.save(update_fields=['completed_parts', 'updated_at'])
+            raise VideoError(f"Upload is missing parts {self.missing_parts(upload)[:self.url_batch]}.")
+
+        try:
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=upload.storage_key,
+                UploadId=upload.multipart_upload_id,
+                MultipartUpload={'Parts': [{'PartNumber': part['part_number'], 'ETag': part['etag']}
+                                           for part in parts]},
+            )
+        except (ClientError, BotoCoreError) as exc:
+            logger.exception("Failed to complete multipart upload %s", upload.id)
+            raise VideoError("Unable to complete upload.") from exc
+
+        upload.completed_parts = parts
+        upload.progress_percentage = 100.0
+        upload.completed_at = timezone.now()
+        upload.save(update_fields=['completed_parts', 'progress_percentage', 'completed_at', 'updated_at'])
+        observability.record_metric("video.multipart.completed", 1)
+        return upload.storage_key
+
+    def list_parts(self, upload) -> List[Dict[str, Any]]:
+        """Parts storage holds for ``upload``, in order."""
+        parts = []
+        marker = 0
+        try:
+            while True:
+                response = self.client.list_parts(Bucket=self.bucket, Key=upload.storage_key,
+                                                  UploadId=upload.multipart_upload_id, PartNumberMarker=marker)
+                parts += [{'part_number': part['PartNumber'], 'etag': part['ETag'], 'size': part['Size']}
+                          for part in response.get('Parts', [])]
+                if not response.get('IsTruncated'):
+                    return parts
+                marker = response['NextPartNumberMarker']
+        except (ClientError, BotoCoreError) as exc:
+            logger.exception("Failed to list parts of upload %s", upload.id)
+            raise VideoError("Unable to read upload progress.") from exc
+
+    def abort(self, upload) -> None:
+        if not upload.multipart_upload_id:
+            return
+        try:
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=upload.storage_key,
+                                               UploadId=upload.multipart_upload_id)
+        except (ClientError, BotoCoreError) as exc:
+            logger.warning("Failed to abort multipart upload %s: %s", upload.id, exc)
+        upload.status = 'cancelled'
+        upload.save(update_fields=['status', 'updated_at'])
+
+
+# Global service instance
+multipart_upload_service = MultipartUploadService()
@@ -0,0 +1,224 @@
+"""Cached access-control lists for watch party and chat WebSocket connects."""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.core.cache import cache
+
+from shared.redis_client import get_redis_client, make_cache_key
+
+logger = logging.getLogger(__name__)
+
+VISIBILITY_FIELD = ':visibility'
+BAN_PREFIX = 'ban:'
+
+ROLE_HOST = 'host'
+ROLE_ACTIVE = 'active'
+ROLE_INACTIVE = 'inactive'
+
+
+@dataclass
+class PartyAccess:
+    """One user's cached standing in a party."""
+
+    visibility: Optional[str] = None
+    role: Optional[str] = None
+    banned_until: Optional[float] = None
+
+    def allows(self, require_active: bool = False, allow_public: bool = True) -> bool:
+        if self.role in (ROLE_HOST, ROLE_ACTIVE):
+            return True
+        if self.role == ROLE_INACTIVE and not require_active:
+            return True
+        return allow_public and self.visibility == 'public'
+
+    @property
+    def is_banned(self) -> bool:
+        if self.banned_until is None:
+            return False
+        return self.banned_until == 0 or self.banned_until > time.time()
+
+
+class PartyAccessService:
+    """
+    Per-party ACL hash: visibility, each participant's standing and chat bans.
+
+    A connect resolves with a single ``HMGET``; the whole list is loaded from
+    the database in one pass when the hash is missing, and a user absent from a
+    loaded list is looked up individually before being refused. The join,
+    leave, kick and ban views write through so granted entries stay trustworthy.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+
+    @property
+    def ttl(self) -> int:
+        return getattr(settings, 'PARTY_ACL_TTL', 600)
+
+    def _key(self, party_id: Any) -> str:
+        return f"party_acl:{party_id}"
+
+    def lookup(self, party_id: Any, user_id: Any) -> PartyAccess:
+        """Return ``user_id``'s standing in ``party_id``, loading from the DB on a miss."""
+        user_id = str(user_id)
+        visibility, role, banned = self._read(party_id, [VISIBILITY_FIELD, user_id, BAN_PREFIX + user_id])
+
+        if visibility is None:
+            entries = self.load(party_id)
+            if entries is None:
+                return PartyAccess()
+            visibility = entries.get(VISIBILITY_FIELD)
+            role = entries.get(user_id)
+            banned = entries.get(BAN_PREFIX + user_id)
+        elif role is None:
+            role = self._load_participant(party_id, user_id)
+
+        return PartyAccess(
+            visibility=visibility,
+            role=role,
+            banned_until=float(banned) if banned is not None else None,
+        )
+
+    def load(self, party_id: Any) -> Optional[Dict[str, str]]:
+        """Rebuild the ACL for ``party_id`` from the database."""
+        from apps.parties.models import PartyParticipant, WatchParty
+
+        party = WatchParty.objects.filter(id=party_id).values('visibility', 'host_id').first()
+        if party is None:
+            return None
+
+        entries = {VISIBILITY_FIELD: party['visibility']}
+        participants = PartyParticipant.objects.filter(party_id=party_id).exclude(
+            status__in=['kicked', 'rejected']
+        ).values_list('user_id', 'is_active')
+        for user_id, is_active in participants:
+            entries[str(user_id)] = ROLE_ACTIVE if is_active else ROLE_INACTIVE
+        entries[str(party['host_id'])] = ROLE_HOST
+
+        # Chat is an optional app; without it there are no bans to enforce
+        if django_apps.is_installed('apps.chat'):
+            from apps.chat.models import ChatBan
+
+            bans = ChatBan.objects.filter(room__party_id=party_id, is_active=True).values_list('user_id', 'expires_at')
+            for user_id, expires_at in bans:
+                entries[BAN_PREFIX + str(user_id)] = self._ban_value(expires_at)
+
+        self._replace(party_id, entries)
+        return entries
+
+    def set_participant(self, party_id: Any, user_id: Any, is_active: bool = True) -> None:
+        """Record a join (or a leave that keeps lobby access)."""
+        self._write(party_id, {str(user_id): ROLE_ACTIVE if is_active else ROLE_INACTIVE})
+
+    def remove_participant(self, party_id: Any, user_id: Any) -> None:
+        """Revoke a kicked or rejected participant."""
+        self._write(party_id, {str(user_id): None})
+
+    def ban(self, party_id: Any, user_id: Any, expires_at=None) -> None:
+        self._write(party_id, {BAN_PREFIX + str(user_id): self._ban_value(expires_at)})
+
+    def unban(self, party_id: Any, user_id: Any) -> None:
+        self._write(party_id, {BAN_PREFIX + str(user_id): None})
+
+    def invalidate(self, party_id: Any) -> None:
+        """Drop the cached ACL, e.g. after the host or visibility changes."""
+        key = self._key(party_id)
+        client = get_redis_client()
+        if client is not None:
+            try:
+                client.delete(make_cache_key(key))
+                return
+            except Exception as exc:
+                logger.warning(f"Party ACL invalidation failed for {party_id}: {exc}")
+        cache.delete(key)
+
+    def _load_participant(self, party_id: Any, user_id: str) -> Optional[str]:
+        from apps.parties.models import PartyParticipant
+
+        participant = PartyParticipant.objects.filter(party_id=party_id, user_id=user_id).exclude(
+            status__in=['kicked', 'rejected']
+        ).values_list('is_active', flat=True).first()
+        if participant is None:
+            return None
+        role = ROLE_ACTIVE if participant else ROLE_INACTIVE
+        self._write(party_id, {user_id: role})
+        return role
+
+    @staticmethod
+    def _ban_value(expires_at) -> str:
+        return str(expires_at.timestamp()) if expires_at else '0'
+
+    # ------------------------------------------------------------------
+    # Backends
+    # ------------------------------------------------------------------
+    def _read(self, party_id: Any, fields: list) -> list:
+        client = get_redis_client()
+        if client is not None:
+            try:
+                values = client.hmget(make_cache_key(self._key(party_id)), fields)
+                return [value.decode() if isinstance(value, bytes) else value for value in values]
+            except Exception as exc:
+                logger.warning(f"Party ACL read failed for {party_id}, using cache: {exc}")
+        entries = cache.get(self._key(party_id)) or {}
+        return [entries.get(field) for field in fields]
+
+    def _replace(self, party_id: Any, entries: Dict[str, str]) -> None:
+        key = self._key(party_id)
+        client = get_redis_client()
+        if client is not None:
+            try:
+                redis_key = make_cache_key(key)
+                pipe = client.pipeline()
+                pipe.delete(redis_key)
+                pipe.hset(redis_key, mapping=entries)
+                pipe.expire(redis_key, self.ttl)
+                pipe.execute()
+                return
+            except Exception as exc:
+                logger.warning(f"Party ACL store failed for {party_id}, using cache: {exc}")
+        cache.set(key, entries, timeout=self.ttl)
+
+    def _write(self, party_id: Any, changes: Dict[str, Optional[str]]) -> None:
+        """Apply ``changes`` to a cached ACL; a missing ACL is left for the next load."""
+        key = self._key(party_id)
+        client = get_redis_client()
+        if client is not None:
+            try:
+                redis_key = make_cache_key(key)
+                if not client.exists(redis_key):
+                    return
+                pipe = client.pipeline()
+                removed = [field for field, value in changes.items() if value is None]
+                updated = {field: value for field, value in changes.items() if value is not None}
+                if removed:
+                    pipe.hdel(redis_key, *removed)
+                if updated:
+                    pipe.hset(redis_key, mapping=updated)
+                pipe.expire(redis_key, self.ttl)
+                pipe.execute()
+                return
+            except Exception as exc:
+                logger.warning(f"Party ACL update failed for {party_id}, dropping it: {exc}")
+                self.invalidate(party_id)
+                return
+
+        with self._lock:
+            entries = cache.get(key)
+            if entries is None:
+                return
+            for field, value in changes.items():
+                if value is None:
+                    entries.pop(field, None)
+                else:
+                    entries[field] = value
+            cache.set(key, entries, timeout=self.ttl)
+
+
+# Global service instance
+party_access_service = PartyAccessService()
@@ -0,0 +1,241 @@
+"""Authoritative playback clock shared by every WebSocket worker in a party."""
+
+import logging
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from shared.redis_client import get_redis_client, make_cache_key
+
+logger = logging.getLogger(__name__)
+
+CLOCK_FIELDS = ('position', 'rate', 'is_playing', 'epoch', 'duration', 'quality', 'video_id')
+
+# Read the clock hash together with the Redis server time so every worker
+# extrapolates the playback position against the same time source.
+_READ_SCRIPT = """
+local now = redis.call('TIME')
+local fields = redis.call('HGETALL', KEYS[1])
+return {now[1], now[2], fields}
+"""
+
+# Compare-and-set: apply ARGV field/value pairs only when the stored sequence
+# matches ARGV[1] (or ARGV[1] is -1), stamp the epoch with Redis time and bump seq.
+_CAS_SCRIPT = """
+local current = tonumber(redis.call('HGET', KEYS[1], 'seq') or '0')
+local expected = tonumber(ARGV[1])
+if expected >= 0 and current ~= expected then
+    return {0, current}
+end
+local now = redis.call('TIME')
+for i = 3, #ARGV, 2 do
+    redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+redis.call('HSET', KEYS[1], 'epoch', now[1] .. '.' .. string.format('%06d', now[2]))
+redis.call('HSET', KEYS[1], 'seq', current + 1)
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[2]))
+return {1, current + 1}
+"""
+
+
+@dataclass
+class PartyClockState:
+    """Snapshot of a party clock as stored in the shared backend."""
+
+    position: float = 0.0
+    rate: float = 1.0
+    is_playing: bool = False
+    epoch: float = 0.0
+    duration: float = 0.0
+    quality: str = 'auto'
+    video_id: Optional[str] = None
+    seq: int = 0
+    server_time: float = 0.0
+
+    def position_at(self, now: Optional[float] = None) -> float:
+        """Extrapolate the playback position at ``now`` (defaults to read time)."""
+        if not self.is_playing or not self.epoch:
+            return self.position
+
+        now = self.server_time if now is None else now
+        expected = self.position + max(0.0, now - self.epoch) * self.rate
+        if self.duration > 0:
+            expected = min(expected, self.duration)
+        return expected
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class PartyClockService:
+    """
+    One versioned clock record per party.
+
+    Backed by a Redis hash updated through Lua scripts when the default cache
+    is Redis, otherwise by the Django cache guarded with a process lock.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._read_script = None
+        self._cas_script = None
+
+    @property
+    def ttl(self) -> int:
+        return getattr(settings, 'PARTY_CLOCK_TTL', 3600)
+
+    def _key(self, party_id: Any) -> str:
+        return f"party_clock:{party_id}"
+
+    def get(self, party_id: Any) -> PartyClockState:
+        """Return the current clock state in a single backend round trip."""
+        client = get_redis_client()
+        if client is not None:
+            try:
+                return self._redis_get(client, party_id)
+            except Exception as exc:
+                logger.warning(f"Party clock read failed for {party_id}, using cache: {exc}")
+
+        state = PartyClockState(**(cache.get(self._key(party_id)) or {}))
+        state.server_time = time.time()
+        return state
+
+    def compare_and_set(
+        self,
+        party_id: Any,
+        expected_seq: Optional[int] = None,
+        **changes: Any,
+    ) -> Tuple[bool, PartyClockState]:
+        """
+        Apply ``changes`` if the stored sequence still equals ``expected_seq``.
+
+        Passing ``expected_seq=None`` applies unconditionally. Returns whether the
+        write won together with the state observed after the attempt.
+        """
+        unknown = set(changes) - set(CLOCK_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown party clock fields: {', '.join(sorted(unknown))}")
+
+        client = get_redis_client()
+        if client is not None:
+            try:
+                applied = self._redis_cas(client, party_id, expected_seq, changes)
+                return applied, self._redis_get(client, party_id)
+            except Exception as exc:
+                logger.warning(f"Party clock write failed for {party_id}, using cache: {exc}")
+
+        return self._cache_cas(party_id, expected_seq, changes)
+
+    def update(self, party_id: Any, max_attempts: int = 5, **changes: Any) -> PartyClockState:
+        """
+        Apply ``changes`` on top of the latest state, retrying on concurrent writes.
+
+        ``position`` is re-anchored to the extrapolated position unless the caller
+        supplies one, so a rate change or pause keeps the timeline continuous.
+        """
+        state = self.get(party_id)
+        for _ in range(max_attempts):
+            payload = dict(changes)
+            payload.setdefault('position', state.position_at())
+            applied, state = self.compare_and_set(party_id, expected_seq=state.seq, **payload)
+            if applied:
+                return state
+
+        logger.warning(f"Party clock update for {party_id} lost {max_attempts} races, forcing write")
+        payload = dict(changes)
+        payload.setdefault('position', state.position_at())
+        return self.compare_and_set(party_id, **payload)[1]
+
+    def clear(self, party_id: Any) -> None:
+        client = get_redis_client()
+        if client is not None:
+            client.delete(make_cache_key(self._key(party_id)))
+        cache.delete(self._key(party_id))
+
+    # ------------------------------------------------------------------
+    # Redis backend
+    # ------------------------------------------------------------------
+    def _redis_get(self, client, party_id: Any) -> PartyClockState:
+        if self._read_script is None:
+            self._read_script = client.register_script(_READ_SCRIPT)
+
+        seconds, micros, flat = self._read_script(keys=[make_cache_key(self._key(party_id))])
+        raw = {
+            self._decode(flat[i]): self._decode(flat[i + 1])
+            for i in range(0, len(flat), 2)
+        }
+        state = self._from_raw(raw)
+        state.server_time = int(seconds) + int(micros) / 1_000_000
+        return state
+
+    def _redis_cas(self, client, party_id: Any, expected_seq: Optional[int], changes: Dict[str, Any]) -> bool:
+        if self._cas_script is None:
+            self._cas_script = client.register_script(_CAS_SCRIPT)
+
+        args = [-1 if expected_seq is None else int(expected_seq), self.ttl]
+        for field, value in changes.items():
+            args.extend([field, self._encode(value)])
+
+        applied, _seq = self._cas_script(keys=[make_cache_key(self._key(party_id))], args=args)
+        return bool(int(applied))
+
+    # ------------------------------------------------------------------
+    # Cache fallback (single process)
+    # ------------------------------------------------------------------
+    def _cache_cas(
+        self, party_id: Any, expected_seq: Optional[int], changes: Dict[str, Any]
+    ) -> Tuple[bool, PartyClockState]:
+        key = self._key(party_id)
+        with self._lock:
+            stored = cache.get(key) or {}
+            current = PartyClockState(**stored)
+            if expected_seq is not None and current.seq != expected_seq:
+                current.server_time = time.time()
+                return False, current
+
+            now = time.time()
+            stored.update(changes)
+            stored['epoch'] = now
+            stored['seq'] = current.seq + 1
+            stored.pop('server_time', None)
+            cache.set(key, stored, timeout=self.ttl)
+
+        state = PartyClockState(**stored)
+        state.server_time = now
+        return True, state
+
+    # ------------------------------------------------------------------
+    # Encoding helpers
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _decode(value: Any) -> str:
+        return value.decode() if isinstance(value, bytes) else str(value)
+
+    @staticmethod
+    def _encode(value: Any) -> str:
+        if isinstance(value, bool):
+            return '1' if value else '0'
+        if value is None:
+            return ''
+        return str(value)
+
+    @staticmethod
+    def _from_raw(raw: Dict[str, str]) -> PartyClockState:
+        return PartyClockState(
+            position=float(raw.get('position') or 0),
+            rate=float(raw.get('rate') or 1.0),
+            is_playing=raw.get('is_playing') == '1',
+            epoch=float(raw.get('epoch') or 0),
+            duration=float(raw.get('duration') or 0),
+            quality=raw.get('quality') or 'auto',
+            video_id=raw.get('video_id') or None,
+            seq=int(raw.get('seq') or 0),
+        )
+
+
+# Global service instance
+party_clock_service = PartyClockService()
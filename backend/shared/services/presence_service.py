@@ -0,0 +1,208 @@
+"""Live presence registry for chat rooms and watch parties."""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Dict, List
+
+from django.conf import settings
+from django.core.cache import cache
+
+from shared.redis_client import get_redis_client, make_cache_key
+
+logger = logging.getLogger(__name__)
+
+# KEYS: users zset (score = expiry), per-user connection counts hash, room index set
+# ARGV: op, user id, now, expiry, key ttl, room id
+_PRESENCE_SCRIPT = """
+local users, conns, rooms = KEYS[1], KEYS[2], KEYS[3]
+local op, member = ARGV[1], ARGV[2]
+local now, expiry, ttl = tonumber(ARGV[3]), tonumber(ARGV[4]), tonumber(ARGV[5])
+
+if op == 'join' then
+    redis.call('HINCRBY', conns, member, 1)
+    redis.call('ZADD', users, expiry, member)
+    redis.call('SADD', rooms, ARGV[6])
+elseif op == 'leave' then
+    if tonumber(redis.call('HINCRBY', conns, member, -1)) <= 0 then
+        redis.call('HDEL', conns, member)
+        redis.call('ZREM', users, member)
+    end
+elseif op == 'touch' then
+    if redis.call('HEXISTS', conns, member) == 0 then
+        redis.call('HSET', conns, member, 1)
+    end
+    redis.call('ZADD', users, expiry, member)
+end
+
+local expired = redis.call('ZRANGEBYSCORE', users, '-inf', now)
+for _, ghost in ipairs(expired) do
+    redis.call('HDEL', conns, ghost)
+end
+if #expired > 0 then
+    redis.call('ZREMRANGEBYSCORE', users, '-inf', now)
+end
+
+if op ~= 'count' then
+    redis.call('EXPIRE', users, ttl)
+    redis.call('EXPIRE', conns, ttl)
+end
+return redis.call('ZCARD', users)
+"""
+
+
+class PresenceService:
+    """
+    Who is connected to which room, shared across every ASGI worker.
+
+    Each room is a Redis sorted set of user ids scored by heartbeat expiry plus
+    a hash counting open connections per user, so a user with two tabs stays
+    present until both close. Connections that stop heartbeating (worker crash,
+    dropped socket) expire after ``PRESENCE_TTL`` seconds. Without Redis the
+    registry falls back to the Django cache guarded by a process lock.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._script = None
+
+    @property
+    def ttl(self) -> int:
+        return getattr(settings, 'PRESENCE_TTL', 90)
+
+    def _keys(self, scope: str, room_id: Any) -> List[str]:
+        return [
+            f"presence:{scope}:{room_id}:users",
+            f"presence:{scope}:{room_id}:conns",
+            f"presence:{scope}:rooms",
+        ]
+
+    def join(self, scope: str, room_id: Any, user_id: Any) -> int:
+        """Register one connection for ``user_id``; returns the present-user count."""
+        return self._apply('join', scope, room_id, user_id)
+
+    def leave(self, scope: str, room_id: Any, user_id: Any) -> int:
+        """Release one connection for ``user_id``; returns the present-user count."""
+        return self._apply('leave', scope, room_id, user_id)
+
+    def touch(self, scope: str, room_id: Any, user_id: Any) -> int:
+        """Heartbeat: extend ``user_id``'s presence by another TTL."""
+        return self._apply('touch', scope, room_id, user_id)
+
+    def start_keepalive(self, scope: str, room_id: Any, user_id: Any) -> "asyncio.Task":
+        """
+        Refresh a connection's presence from the consumer's event loop.
+
+        Clients are not required to ping, so each open socket keeps itself
+        present; if the worker dies the task dies with it and the entry expires.
+        Cancel the returned task on disconnect.
+        """
+        return asyncio.ensure_future(self._keepalive(scope, room_id, user_id))
+
+    async def _keepalive(self, scope: str, room_id: Any, user_id: Any) -> None:
+        interval = max(self.ttl / 3, 1)
+        while True:
+            await asyncio.sleep(interval)
+            self.touch(scope, room_id, user_id)
+
+    def count(self, scope: str, room_id: Any) -> int:
+        """Number of distinct users present, after expiring ghosts."""
+        return self._apply('count', scope, room_id, '')
+
+    def members(self, scope: str, room_id: Any) -> List[str]:
+        """User ids currently present in the room."""
+        self.count(scope, room_id)
+        client = get_redis_client()
+        if client is not None:
+            try:
+                users_key = make_cache_key(self._keys(scope, room_id)[0])
+                return [self._decode(member) for member in client.zrange(users_key, 0, -1)]
+            except Exception as exc:
+                logger.warning(f"Presence member read failed for {scope}:{room_id}: {exc}")
+        return sorted(self._load(scope, room_id)['users'])
+
+    def rooms(self, scope: str) -> List[str]:
+        """Rooms that have had presence activity since the last reconciliation."""
+        client = get_redis_client()
+        if client is not None:
+            try:
+                rooms_key = make_cache_key(self._keys(scope, '')[2])
+                return [self._decode(room) for room in client.smembers(rooms_key)]
+            except Exception as exc:
+                logger.warning(f"Presence room index read failed for {scope}: {exc}")
+        return list(cache.get(self._keys(scope, '')[2]) or [])
+
+    def forget_room(self, scope: str, room_id: Any) -> None:
+        """Drop an empty room from the reconciliation index."""
+        rooms_key = self._keys(scope, room_id)[2]
+        client = get_redis_client()
+        if client is not None:
+            try:
+                client.srem(make_cache_key(rooms_key), str(room_id))
+                return
+            except Exception as exc:
+                logger.warning(f"Presence room index update failed for {scope}: {exc}")
+        with self._lock:
+            rooms = set(cache.get(rooms_key) or [])
+            rooms.discard(str(room_id))
+            cache.set(rooms_key, rooms, timeout=None)
+
+    # ------------------------------------------------------------------
+    # Backends
+    # ------------------------------------------------------------------
+    def _apply(self, op: str, scope: str, room_id: Any, user_id: Any) -> int:
+        now = time.time()
+        client = get_redis_client()
+        if client is not None:
+            try:
+                if self._script is None:
+                    self._script = client.register_script(_PRESENCE_SCRIPT)
+                keys = [make_cache_key(key) for key in self._keys(scope, room_id)]
+                return int(self._script(
+                    keys=keys,
+                    args=[op, str(user_id), now, now + self.ttl, self.ttl * 2, str(room_id)],
+                ))
+            except Exception as exc:
+                logger.warning(f"Presence {op} failed for {scope}:{room_id}, using cache: {exc}")
+
+        return self._cache_apply(op, scope, room_id, str(user_id), now)
+
+    def _cache_apply(self, op: str, scope: str, room_id: Any, user_id: str, now: float) -> int:
+        users_key, _, rooms_key = self._keys(scope, room_id)
+        with self._lock:
+            state = self._load(scope, room_id)
+            users, conns = state['users'], state['conns']
+
+            if op == 'join':
+                conns[user_id] = conns.get(user_id, 0) + 1
+                users[user_id] = now + self.ttl
+                rooms = set(cache.get(rooms_key) or [])
+                rooms.add(str(room_id))
+                cache.set(rooms_key, rooms, timeout=None)
+            elif op == 'leave':
+                conns[user_id] = conns.get(user_id, 0) - 1
+                if conns[user_id] <= 0:
+                    conns.pop(user_id, None)
+                    users.pop(user_id, None)
+            elif op == 'touch':
+                conns.setdefault(user_id, 1)
+                users[user_id] = now + self.ttl
+
+            for ghost in [uid for uid, expiry in users.items() if expiry <= now]:
+                users.pop(ghost, None)
+                conns.pop(ghost, None)
+
+            cache.set(users_key, state, timeout=self.ttl * 2)
+            return len(users)
+
+    def _load(self, scope: str, room_id: Any) -> Dict[str, Dict[str, Any]]:
+        return cache.get(self._keys(scope, room_id)[0]) or {'users': {}, 'conns': {}}
+
+    @staticmethod
+    def _decode(value: Any) -> str:
+        return value.decode() if isinstance(value, bytes) else str(value)
+
+
+# Global service instance
+presence_service = PresenceService()
@@ -265,21 +265,28 @@ class SocialService:
     def get_activity_feed(self, user: User, limit: int = 50) -> List[Dict[str, Any]]:
         """Return combined activity feed for user and accepted friends."""
 
+        activities = self.get_activity_feed_queryset(user)[:limit]
+        return self.serialize_activities(activities, current_user=user)
+
+    def get_activity_feed_queryset(self, user: User):
+        """Activities of ``user`` and accepted friends, newest first (keyset-pageable)."""
+
         friend_ids = self._get_related_user_ids(user, statuses={"accepted"})
         actor_ids = list(friend_ids | {user.id})
 
-        activities = (
+        return (
             UserActivity.objects.select_related("user")
             .filter(user_id__in=actor_ids)
-            .order_by("-created_at")[:limit]
+            .order_by("-created_at", "-id")
         )
 
+    def serialize_activities(self, activities, current_user: User) -> List[Dict[str, Any]]:
         feed: List[Dict[str, Any]] = []
         for activity in activities:
             feed.append(
                 {
                     "id": str(activity.id),
-                    "user": self._serialize_user(activity.user, current_user=user),
+                    "user": self._serialize_user(activity.user, current_user=current_user),
                     "activity_type": activity.activity_type,
                     "description": activity.description,
                     "object_type": activity.object_type,
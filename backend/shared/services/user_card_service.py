@@ -0,0 +1,133 @@
+"""Cached public identity cards used as the ``user``/``sender`` field in WebSocket payloads."""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+CARD_FIELDS = ('id', 'username', 'first_name', 'last_name', 'full_name', 'avatar', 'is_premium')
+
+
+class UserCardService:
+    """
+    Two-level store of user cards keyed by user id.
+
+    A bounded process-local LRU answers repeat lookups without a cache round
+    trip or a thread-pool hop; the shared cache lets workers reuse cards built
+    elsewhere. Cards are dropped from both levels on ``post_save`` of the user
+    model, and local entries also expire after ``USER_CARD_LOCAL_TTL``.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._local: "OrderedDict[str, tuple]" = OrderedDict()
+
+    @property
+    def max_local_entries(self) -> int:
+        return getattr(settings, 'USER_CARD_LOCAL_MAX_ENTRIES', 10000)
+
+    @property
+    def local_ttl(self) -> int:
+        return getattr(settings, 'USER_CARD_LOCAL_TTL', 60)
+
+    @property
+    def shared_ttl(self) -> int:
+        return getattr(settings, 'USER_CARD_TTL', 300)
+
+    def _key(self, user_id: Any) -> str:
+        return f"user_card:{user_id}"
+
+    def get_card(self, user, fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Return the card for ``user``, optionally projected to ``fields``."""
+        user_id = str(user.id)
+        card = self._get_local(user_id)
+        if card is None:
+            card = cache.get(self._key(user_id))
+            if card is None:
+                card = self.build_card(user)
+                cache.set(self._key(user_id), card, timeout=self.shared_ttl)
+            self._set_local(user_id, card)
+        return self.project(card, fields)
+
+    async def aget_card(self, user, fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Async variant that only leaves the event loop on a local miss."""
+        card = self._get_local(str(user.id))
+        if card is not None:
+            return self.project(card, fields)
+        return await database_sync_to_async(self.get_card)(user, fields)
+
+    def invalidate(self, user_id: Any) -> None:
+        user_id = str(user_id)
+        with self._lock:
+            self._local.pop(user_id, None)
+        cache.delete(self._key(user_id))
+
+    def clear_local(self) -> None:
+        with self._lock:
+            self._local.clear()
+
+    @staticmethod
+    def build_card(user) -> Dict[str, Any]:
+        avatar = getattr(user, 'avatar', None)
+        return {
+            'id': str(user.id),
+            'username': getattr(user, 'username', None),
+            'first_name': user.first_name,
+            'last_name': user.last_name,
+            'full_name': getattr(user, 'full_name', f"{user.first_name} {user.last_name}".strip()),
+            'avatar': avatar.url if avatar else None,
+            'is_premium': getattr(user, 'is_premium', False),
+        }
+
+    @staticmethod
+    def project(card: Dict[str, Any], fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        if fields is None:
+            return dict(card)
+        return {field: card.get(field) for field in fields}
+
+    def _get_local(self, user_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._local.get(user_id)
+            if entry is None:
+                return None
+            card, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._local[user_id]
+                return None
+            self._local.move_to_end(user_id)
+            return card
+
+    def _set_local(self, user_id: str, card: Dict[str, Any]) -> None:
+        with self._lock:
+            self._local[user_id] = (card, time.monotonic() + self.local_ttl)
+            self._local.move_to_end(user_id)
+            while len(self._local) > self.max_local_entries:
+                self._local.popitem(last=False)
+
+
+def invalidate_user_card(sender, instance, **kwargs):
+    """Signal receiver dropping a user's cached card after it changes."""
+    try:
+        user_card_service.invalidate(instance.pk)
+    except Exception as e:  # pragma: no cover - cache outages must not break saves
+        logger.warning(f"Failed to invalidate user card for {instance.pk}: {str(e)}")
+
+
+def connect_user_card_signals() -> None:
+    from django.contrib.auth import get_user_model
+    from django.db.models.signals import post_delete, post_save
+
+    user_model = get_user_model()
+    post_save.connect(invalidate_user_card, sender=user_model, dispatch_uid='user_card_post_save')
+    post_delete.connect(invalidate_user_card, sender=user_model, dispatch_uid='user_card_post_delete')
+
+
+# Global service instance
+user_card_service = UserCardService()
@@ -0,0 +1,218 @@
+"""Content-addressed storage and reuse of uploaded videos and their derived assets."""
+
+import hashlib
+import logging
+import os
+from datetime import timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import FileUploadHandler
+from django.utils import timezone
+
+from shared.observability import observability
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Video fields copied between a video and its asset
+ASSET_FIELDS = ('file_size', 'resolution', 'codec', 'bitrate', 'fps')
+
+# Derived entries of ``video.metadata`` shared through the asset
+ASSET_METADATA_KEYS = ('width', 'height', 'fingerprint', 'thumbnails', 'sprite', 'variants', 'streaming')
+
+
+class ContentHashUploadHandler(FileUploadHandler):
+    """
+    Hashes each uploaded file as Django streams the request body, then hands
+    every chunk on unchanged to the next handler, so the digest costs no
+    second read of the file.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.digests: Dict[str, Tuple[str, int]] = {}
+        self._hash = None
+        self._size = 0
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self._hash = hashlib.sha256()
+        self._size = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self._hash.update(raw_data)
+        self._size += len(raw_data)
+        return raw_data
+
+    def file_complete(self, file_size):
+        self.digests[self.field_name] = (self._hash.hexdigest(), self._size)
+        return None
+
+
+class VideoDedupService:
+    """
+    Stores each distinct upload once, under a key derived from its SHA-256,
+    and records what processing derived from it on a ``VideoAsset``.
+
+    A repeated upload links the new video to the existing asset: if the asset
+    is ready the video is ready immediately with the same metadata, thumbnail,
+    variants and manifests; if the first copy is still processing the video
+    waits and is filled in when that copy publishes its results.
+    """
+
+    @staticmethod
+    def upload_digest(request, field_name: str) -> Optional[Tuple[str, int]]:
+        """
+        ``(sha256, size)`` of the file uploaded as ``field_name``, taken from
+        the ``ContentHashUploadHandler`` in ``FILE_UPLOAD_HANDLERS``.
+        """
+        for handler in request.upload_handlers:
+            if isinstance(handler, ContentHashUploadHandler) and field_name in handler.digests:
+                return handler.digests[field_name]
+        return None
+
+    @staticmethod
+    def hash_upload(uploaded_file) -> Tuple[str, int]:
+        digest = hashlib.sha256()
+        for chunk in uploaded_file.chunks(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+        uploaded_file.seek(0)
+        return digest.hexdigest(), uploaded_file.size
+
+    @staticmethod
+    def hash_file(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as handle:
+            for chunk in iter(lambda: handle.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def storage_key(content_hash: str, filename: str) -> str:
+        extension = os.path.splitext(filename)[1].lower()
+        return f"videos/originals/{content_hash[:2]}/{content_hash}{extension}"
+
+    def claim(self, video, content_hash: str, file_size: int, uploaded_file) -> str:
+        """
+        Attach ``video`` to the asset for ``content_hash``. Returns ``'ready'``
+        when an identical upload already finished processing, ``'waiting'``
+        when one is still processing, and ``'process'`` when this upload was
+        stored and the caller should queue processing.
+        """
+        from apps.videos.models import VideoAsset
+
+        asset, created = VideoAsset.objects.get_or_create(
+            content_hash=content_hash,
+            defaults={'file_size': file_size},
+        )
+        video.asset = asset
+        video.file_size = file_size
+        if asset.storage_key:
+            # Duplicates share the stored original
+            video.file.name = asset.storage_key
+
+        if asset.status == 'ready':
+            observability.record_metric("video.dedup.hit", 1, tags={"state": "ready"})
+            self.apply(video, asset)
+            return 'ready'
+
+        if asset.status == 'processing' and not created:
+            observability.record_metric("video.dedup.hit", 1, tags={"state": "waiting"})
+            video.status = 'processing'
+            video.save()
+            return 'waiting'
+
+        # First copy, or the previous one failed: store the bytes (once) and process
+        observability.record_metric("video.dedup.miss", 1)
+        key = self.storage_key(content_hash, uploaded_file.name)
+        if not default_storage.exists(key):
+            key = default_storage.save(key, uploaded_file)
+        asset.storage_key = key
+        asset.status = 'processing'
+        asset.save(update_fields=['storage_key', 'status', 'updated_at'])
+
+        video.file.name = key
+        video.status = 'processing'
+        video.save()
+        return 'process'
+
+    def apply(self, video, asset) -> None:
+        """Give ``video`` everything derived from its asset and mark it ready."""
+        data = asset.metadata
+        for field in ASSET_FIELDS:
+            if data.get(field) is not None:
+                setattr(video, field, data[field])
+        if data.get('duration') is not None:
+            video.duration = timedelta(seconds=data['duration'])
+        if data.get('thumbnail'):
+            video.thumbnail = data['thumbnail']
+        if data.get('preview_url'):
+            video.preview_url = data['preview_url']
+
+        metadata = dict(video.metadata or {})
+        metadata.update({key: data[key] for key in ASSET_METADATA_KEYS if key in data})
+        video.metadata = metadata
+        video.optimized = 'streaming' in data
+        video.status = 'ready'
+        video.processed_at = timezone.now()
+        video.save()
+
+    def publish(self, video) -> int:
+        """
+        Record what processing ``video`` derived on its asset and pass it on
+        to the duplicates waiting for it. Returns how many were updated.
+        """
+        asset = video.asset
+        if asset is None:
+            return 0
+
+        asset.metadata = self.snapshot(video, asset.metadata)
+        asset.status = 'ready'
+        asset.save(update_fields=['metadata', 'status', 'updated_at'])
+
+        updated = 0
+        for duplicate in asset.videos.exclude(id=video.id).filter(status__in=['processing', 'ready']):
+            self.apply(duplicate, asset)
+            updated += 1
+        return updated
+
+    def release(self, video):
+        """
+        Stop processing ``video``'s asset after ``video`` failed. Its
+        duplicates are not failed with it: the oldest one still waiting is
+        returned for the caller to process instead, and with none waiting the
+        asset is left for the next identical upload to process.
+        """
+        asset = video.asset
+        if asset is None or asset.status != 'processing':
+            return None
+
+        successor = asset.videos.filter(status='processing').exclude(id=video.id).order_by('created_at').first()
+        if successor is None:
+            asset.status = 'failed'
+            asset.save(update_fields=['status', 'updated_at'])
+        return successor
+
+    @staticmethod
+    def snapshot(video, previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        data = dict(previous or {})
+        for field in ASSET_FIELDS:
+            value = getattr(video, field, None)
+            if value is not None:
+                data[field] = value
+        if video.duration is not None:
+            data['duration'] = video.duration.total_seconds()
+        if video.thumbnail:
+            data['thumbnail'] = video.thumbnail.name
+        if video.preview_url:
+            data['preview_url'] = video.preview_url
+
+        metadata = video.metadata or {}
+        data.update({key: metadata[key] for key in ASSET_METADATA_KEYS if key in metadata})
+        return data
+
+
+# Global service instance
+video_dedup_service = VideoDedupService()
@@ -0,0 +1,196 @@
+"""HLS/DASH packaging of encoded renditions into byte-range addressed segments."""
+
+import json
+import logging
+import os
+import re
+import subprocess
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+BYTERANGE_PATTERN = re.compile(r'^(\d+)(?:@(\d+))?$')
+ATTRIBUTE_PATTERN = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+
+
+class PackagingError(Exception):
+    """The packager failed or produced an unreadable playlist."""
+
+
+class VideoPackagingService:
+    """
+    Remuxes encoded renditions (no re-encode) into fragmented MP4 for
+    adaptive streaming.
+
+    Each rendition becomes a single ``.m4s`` file whose HLS media playlist
+    addresses every ``VIDEO_SEGMENT_SECONDS`` segment by byte range, so the
+    storage layout stays one object per rendition while players fetch small
+    ranges and can switch quality at any segment boundary. The media
+    playlists are also parsed into a JSON segment index (time, offset,
+    length) for clients that do their own range requests. With
+    ``VIDEO_PACKAGE_DASH`` enabled the same renditions are packaged into a
+    single-file DASH manifest as well.
+    """
+
+    @property
+    def segment_seconds(self) -> int:
+        return getattr(settings, 'VIDEO_SEGMENT_SECONDS', 4)
+
+    @property
+    def dash_enabled(self) -> bool:
+        return getattr(settings, 'VIDEO_PACKAGE_DASH', False)
+
+    @property
+    def timeout(self) -> int:
+        return getattr(settings, 'VIDEO_PACKAGE_TIMEOUT', 600)
+
+    def package(self, workdir: str, renditions: Sequence[Tuple[str, str]]) -> Dict[str, Any]:
+        """
+        Package ``(name, mp4_path)`` renditions under ``workdir`` in one
+        ffmpeg run. Returns per-rendition details for the master playlist.
+        """
+        os.makedirs(os.path.join(workdir, 'hls'), exist_ok=True)
+        if self.dash_enabled:
+            os.makedirs(os.path.join(workdir, 'dash'), exist_ok=True)
+
+        command = self.build_command(workdir, renditions)
+        try:
+            result = subprocess.run(command, capture_output=True, text=True, timeout=self.timeout)
+        except subprocess.TimeoutExpired as exc:
+            raise PackagingError(f"packager timed out after {self.timeout}s") from exc
+        if result.returncode != 0:
+            raise PackagingError(result.stderr[-2000:])
+
+        details = []
+        for name, path in renditions:
+            playlist_path = os.path.join(workdir, 'hls', f'{name}.m3u8')
+            with open(playlist_path) as handle:
+                index = self.segment_index(handle.read())
+            with open(os.path.join(workdir, 'hls', f'{name}.json'), 'w') as handle:
+                json.dump(index, handle)
+
+            width, height = self.probe_dimensions(path)
+            details.append({
+                'name': name,
+                'width': width,
+                'height': height,
+                'segments': len(index['segments']),
+                **self.bandwidth(index),
+            })
+
+        with open(os.path.join(workdir, 'hls', 'master.m3u8'), 'w') as handle:
+            handle.write(self.master_playlist(details))
+        return {'renditions': details, 'dash': self.dash_enabled}
+
+    def build_command(self, workdir: str, renditions: Sequence[Tuple[str, str]]) -> List[str]:
+        """Stream-copy every rendition into HLS (and optionally DASH) outputs."""
+        command = ['ffmpeg', '-hide_banner', '-nostdin', '-y']
+        for _name, path in renditions:
+            command += ['-i', path]
+
+        for index, (name, _path) in enumerate(renditions):
+            command += [
+                '-map', f'{index}:v', '-map', f'{index}:a?', '-c', 'copy',
+                '-f', 'hls',
+                '-hls_time', str(self.segment_seconds),
+                '-hls_playlist_type', 'vod',
+                '-hls_segment_type', 'fmp4',
+                '-hls_flags', 'single_file+independent_segments',
+                '-hls_segment_filename', os.path.join(workdir, 'hls', f'{name}.m4s'),
+                os.path.join(workdir, 'hls', f'{name}.m3u8'),
+            ]
+
+        if self.dash_enabled:
+            for index in range(len(renditions)):
+                command += ['-map', f'{index}:v']
+            command += [
+                '-map', '0:a?', '-c', 'copy',
+                '-f', 'dash',
+                '-single_file', '1',
+                '-seg_duration', str(self.segment_seconds),
+                '-adaptation_sets', 'id=0,streams=v id=1,streams=a',
+                os.path.join(workdir, 'dash', 'manifest.mpd'),
+            ]
+        return command
+
+    @staticmethod
+    def segment_index(playlist: str) -> Dict[str, Any]:
+        """Byte ranges of the init section and each segment of a single-file HLS media playlist."""
+        index: Dict[str, Any] = {'uri': None, 'init': None, 'segments': []}
+        start = 0.0
+        duration: Optional[float] = None
+        byterange: Optional[Tuple[int, Optional[int]]] = None
+        next_offset = 0
+
+        for line in (raw.strip() for raw in playlist.splitlines()):
+            if line.startswith('#EXT-X-MAP:'):
+                attributes = {key: value.strip('"') for key, value in ATTRIBUTE_PATTERN.findall(line[11:])}
+                index['uri'] = attributes.get('URI')
+                if 'BYTERANGE' in attributes:
+                    length, offset = _parse_byterange(attributes['BYTERANGE'])
+                    index['init'] = {'offset': offset or 0, 'length': length}
+                    next_offset = (offset or 0) + length
+            elif line.startswith('#EXTINF:'):
+                duration = float(line[8:].split(',', 1)[0])
+            elif line.startswith('#EXT-X-BYTERANGE:'):
+                byterange = _parse_byterange(line[17:])
+            elif line and not line.startswith('#'):
+                if duration is None or byterange is None:
+                    raise PackagingError(f"Segment {line} has no duration or byte range")
+                length, offset = byterange
+                offset = next_offset if offset is None else offset
+                index['uri'] = index['uri'] or line
+                index['segments'].append({
+                    'start': round(start, 6), 'duration': duration, 'offset': offset, 'length': length,
+                })
+                start += duration
+                next_offset = offset + length
+                duration = byterange = None
+        return index
+
+    @staticmethod
+    def bandwidth(index: Dict[str, Any]) -> Dict[str, int]:
+        """Peak and average bits per second over a rendition's segments."""
+        segments = [segment for segment in index['segments'] if segment['duration'] > 0]
+        if not segments:
+            return {'bandwidth': 0, 'average_bandwidth': 0}
+        peak = max(segment['length'] * 8 / segment['duration'] for segment in segments)
+        total_seconds = sum(segment['duration'] for segment in segments)
+        average = sum(segment['length'] for segment in segments) * 8 / total_seconds
+        return {'bandwidth': int(peak), 'average_bandwidth': int(average)}
+
+    @staticmethod
+    def master_playlist(renditions: Sequence[Dict[str, Any]]) -> str:
+        lines = ['#EXTM3U', '#EXT-X-VERSION:7', '#EXT-X-INDEPENDENT-SEGMENTS']
+        for rendition in sorted(renditions, key=lambda item: item['bandwidth'], reverse=True):
+            attributes = f"BANDWIDTH={rendition['bandwidth']},AVERAGE-BANDWIDTH={rendition['average_bandwidth']}"
+            if rendition.get('width') and rendition.get('height'):
+                attributes += f",RESOLUTION={rendition['width']}x{rendition['height']}"
+            lines += [f'#EXT-X-STREAM-INF:{attributes}', f"{rendition['name']}.m3u8"]
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def probe_dimensions(path: str) -> Tuple[Optional[int], Optional[int]]:
+        command = ['ffprobe', '-v', 'error', '-select_streams', 'v:0',
+                   '-show_entries', 'stream=width,height', '-of', 'json', path]
+        try:
+            result = subprocess.run(command, capture_output=True, text=True, timeout=30)
+            stream = json.loads(result.stdout)['streams'][0]
+            return int(stream['width']), int(stream['height'])
+        except Exception as exc:
+            logger.warning(f"Could not probe dimensions of {path}: {exc}")
+            return None, None
+
+
+def _parse_byterange(value: str) -> Tuple[int, Optional[int]]:
+    match = BYTERANGE_PATTERN.match(value.strip())
+    if not match:
+        raise PackagingError(f"Invalid byte range {value!r}")
+    length, offset = match.groups()
+    return int(length), int(offset) if offset is not None else None
+
+
+# Global service instance
+video_packaging_service = VideoPackagingService()
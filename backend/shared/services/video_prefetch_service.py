@@ -0,0 +1,165 @@
+"""Read-ahead of proxied party video into the chunk cache."""
+
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection
+
+from shared.services.party_clock_service import party_clock_service
+from shared.services.video_proxy_service import Fetcher, video_proxy_service
+
+logger = logging.getLogger(__name__)
+
+
+class VideoPrefetchService:
+    """
+    Warms the proxy chunk cache ahead of a party's playback position.
+
+    Everyone in a party requests nearly the same byte offsets within seconds
+    of each other, so when a proxied request names its party the scheduler
+    reads the authoritative clock, maps the position to bytes with the
+    video's average byte rate and fetches the next ``VIDEO_PREFETCH_SECONDS``
+    of chunks on a small thread pool. Each chunk has at most one in-flight
+    warm per process; requests that miss a chunk being warmed wait on its
+    lock file (see ``VideoProxyService``) instead of going upstream again.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._executor_lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._inflight: Dict[Tuple[str, int], Future] = {}
+        self._last_planned: Dict[Tuple[str, str], float] = {}
+
+    @property
+    def window_seconds(self) -> float:
+        return getattr(settings, 'VIDEO_PREFETCH_SECONDS', 30)
+
+    @property
+    def workers(self) -> int:
+        return getattr(settings, 'VIDEO_PREFETCH_WORKERS', 4)
+
+    @property
+    def max_inflight(self) -> int:
+        return getattr(settings, 'VIDEO_PREFETCH_MAX_INFLIGHT', 32)
+
+    @property
+    def min_interval(self) -> float:
+        return getattr(settings, 'VIDEO_PREFETCH_INTERVAL', 2.0)
+
+    @staticmethod
+    def byte_rate(size: int, duration: Optional[float] = None, bitrate_kbps: Optional[int] = None) -> Optional[float]:
+        """Average bytes per second of playback, from size/duration or the stored bitrate."""
+        if size and duration:
+            return size / duration
+        if bitrate_kbps:
+            return bitrate_kbps * 1000 / 8
+        return None
+
+    def plan(self, size: int, position: float, is_playing: bool, byte_rate: float) -> List[int]:
+        """Chunk indices covering the playback window from ``position``."""
+        if size <= 0:
+            return []
+        start = min(int(position * byte_rate), size - 1)
+        if is_playing:
+            end = start + int(self.window_seconds * byte_rate)
+        else:
+            # Paused (typically right after a seek): everyone resumes from this chunk
+            end = start
+        end = min(end, size - 1)
+        chunk_size = video_proxy_service.chunk_size
+        return list(range(start // chunk_size, end // chunk_size + 1))
+
+    def party_position(self, party_id: Any) -> Optional[Tuple[float, bool]]:
+        """Current position and play state from the live clock, else the stored party row."""
+        clock = party_clock_service.get(party_id)
+        if clock.epoch or clock.seq:
+            return clock.position_at(), clock.is_playing
+
+        from apps.parties.models import WatchParty
+
+        party = WatchParty.objects.filter(id=party_id).values('current_timestamp', 'is_playing').first()
+        if party is None:
+            return None
+        return party['current_timestamp'].total_seconds(), party['is_playing']
+
+    def schedule(self, party_id: Any, source_key: str, size: int, fetch: Fetcher,
+                 duration: Optional[float] = None, bitrate_kbps: Optional[int] = None) -> bool:
+        """
+        Queue read-ahead for ``party_id``; cheap to call on every proxied
+        request since each party and source is planned at most once per
+        ``VIDEO_PREFETCH_INTERVAL``. Returns whether a plan was queued.
+        """
+        rate = self.byte_rate(size, duration, bitrate_kbps)
+        if not rate:
+            return False
+
+        now = time.monotonic()
+        key = (str(party_id), source_key)
+        with self._lock:
+            if now - self._last_planned.get(key, 0.0) < self.min_interval:
+                return False
+            self._last_planned[key] = now
+            if len(self._last_planned) > 10000:
+                cutoff = now - self.min_interval
+                self._last_planned = {k: t for k, t in self._last_planned.items() if t >= cutoff}
+
+        self._get_executor().submit(self._run, self._plan_and_warm, party_id, source_key, size, fetch, rate)
+        return True
+
+    def warm(self, source_key: str, index: int, size: int, fetch: Fetcher) -> Optional[Future]:
+        """Fetch one chunk in the background unless it is cached or already in flight."""
+        key = (source_key, index)
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future
+            if len(self._inflight) >= self.max_inflight or video_proxy_service.has_chunk(source_key, index):
+                return None
+            future = self._get_executor().submit(self._run, self._warm_chunk, source_key, index, size, fetch)
+            self._inflight[key] = future
+        future.add_done_callback(lambda _future: self._release(key))
+        return future
+
+    def _plan_and_warm(self, party_id: Any, source_key: str, size: int, fetch: Fetcher, rate: float) -> int:
+        position = self.party_position(party_id)
+        if position is None:
+            return 0
+        queued = 0
+        for index in self.plan(size, position[0], position[1], rate):
+            if self.warm(source_key, index, size, fetch) is not None:
+                queued += 1
+        return queued
+
+    @staticmethod
+    def _warm_chunk(source_key: str, index: int, size: int, fetch: Fetcher) -> None:
+        with video_proxy_service.open_chunk(source_key, index, size, fetch):
+            pass
+
+    @staticmethod
+    def _run(func, *args):
+        try:
+            return func(*args)
+        except Exception as exc:
+            logger.warning(f"Video prefetch failed: {exc}")
+        finally:
+            # Pool threads must not keep their own database connections open
+            connection.close()
+
+    def _release(self, key: Tuple[str, int]) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='video-prefetch')
+            return self._executor
+
+
+# Global service instance
+video_prefetch_service = VideoPrefetchService()
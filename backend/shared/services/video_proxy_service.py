@@ -0,0 +1,245 @@
+"""Byte-range proxy engine with an on-disk chunk cache for remote video."""
+
+import fcntl
+import hashlib
+import logging
+import mmap
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# fetch(first_byte, last_byte) -> bytes, both offsets inclusive
+Fetcher = Callable[[int, int], bytes]
+
+
+class RangeNotSatisfiable(Exception):
+    """The requested byte range lies outside the file."""
+
+
+class VideoProxyService:
+    """
+    Serves byte ranges of remote files through fixed-size aligned chunks.
+
+    Chunk ``i`` of a source covers bytes ``[i * VIDEO_PROXY_CHUNK_SIZE,
+    (i + 1) * VIDEO_PROXY_CHUNK_SIZE)`` and is kept as one segment file under
+    ``VIDEO_PROXY_CACHE_DIR``, which is memory-mapped for reads. A miss takes
+    a lock file for that chunk, so concurrent requests from every worker on
+    the host wait for one upstream fetch and then read its result. Reads bump
+    the file's mtime; once the directory exceeds ``VIDEO_PROXY_CACHE_BYTES``
+    the least recently read chunks are evicted.
+    """
+
+    def __init__(self) -> None:
+        self._trim_lock = threading.Lock()
+        self._written_since_trim = 0
+
+    @property
+    def chunk_size(self) -> int:
+        return getattr(settings, 'VIDEO_PROXY_CHUNK_SIZE', 4 * 1024 * 1024)
+
+    @property
+    def cache_dir(self) -> str:
+        return getattr(settings, 'VIDEO_PROXY_CACHE_DIR', None) or os.path.join(
+            tempfile.gettempdir(), 'watchparty-video-proxy'
+        )
+
+    @property
+    def cache_bytes(self) -> int:
+        return getattr(settings, 'VIDEO_PROXY_CACHE_BYTES', 2 * 1024 * 1024 * 1024)
+
+    @property
+    def block_size(self) -> int:
+        return getattr(settings, 'VIDEO_PROXY_STREAM_BLOCK_SIZE', 256 * 1024)
+
+    # ------------------------------------------------------------------
+    # Ranges
+    # ------------------------------------------------------------------
+    @staticmethod
+    def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+        """
+        Resolve a ``Range`` header to inclusive offsets. Returns ``None`` when
+        the whole file should be sent (no header, or a form we do not serve
+        such as multiple ranges).
+        """
+        match = RANGE_PATTERN.match((header or '').strip())
+        if not match or match.groups() == ('', ''):
+            return None
+
+        first, last = match.groups()
+        if first == '':
+            length = int(last)
+            if length == 0 or size == 0:
+                raise RangeNotSatisfiable(header)
+            return max(size - length, 0), size - 1
+
+        start = int(first)
+        end = int(last) if last else size - 1
+        if start >= size or end < start:
+            raise RangeNotSatisfiable(header)
+        return start, min(end, size - 1)
+
+    def chunk_bounds(self, index: int, size: int) -> Tuple[int, int]:
+        """Inclusive byte offsets covered by chunk ``index`` of a ``size``-byte file."""
+        first = index * self.chunk_size
+        return first, min(first + self.chunk_size, size) - 1
+
+    def stream(self, source_key: str, size: int, start: int, end: int, fetch: Fetcher) -> Iterator[bytes]:
+        """Yield bytes ``start``..``end`` (inclusive) of ``source_key``."""
+        index = start // self.chunk_size
+        while start <= end:
+            chunk_start = index * self.chunk_size
+            with self.open_chunk(source_key, index, size, fetch) as data:
+                stop = min(end - chunk_start + 1, len(data))
+                for position in range(start - chunk_start, stop, self.block_size):
+                    yield data[position:min(position + self.block_size, stop)]
+            index += 1
+            start = index * self.chunk_size
+
+    # ------------------------------------------------------------------
+    # Chunks
+    # ------------------------------------------------------------------
+    @contextmanager
+    def open_chunk(self, source_key: str, index: int, size: int, fetch: Fetcher):
+        """Chunk contents as a read-only mapping (or bytes when the cache is unusable)."""
+        path = self._chunk_path(source_key, index)
+        mapped = self._map(path)
+        data = None
+        if mapped is None:
+            data = self._fill(path, index, size, fetch)
+            if data is None:
+                mapped = self._map(path)
+            if mapped is None and data is None:
+                # Evicted between the fill and the read
+                data = fetch(*self.chunk_bounds(index, size))
+        try:
+            yield mapped if mapped is not None else data
+        finally:
+            if mapped is not None:
+                mapped.close()
+
+    def has_chunk(self, source_key: str, index: int) -> bool:
+        return os.path.exists(self._chunk_path(source_key, index))
+
+    def _chunk_path(self, source_key: str, index: int) -> str:
+        digest = hashlib.sha1(source_key.encode()).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], digest, f"{index}.chunk")
+
+    def _map(self, path: str) -> Optional[mmap.mmap]:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            return None
+        try:
+            mapped = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        finally:
+            os.close(fd)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return mapped
+
+    def _fill(self, path: str, index: int, size: int, fetch: Fetcher) -> Optional[bytes]:
+        """
+        Fetch and store a missing chunk. Returns the bytes when this call went
+        upstream, ``None`` when another request stored the chunk meanwhile.
+        """
+        bounds = self.chunk_bounds(index, size)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            lock_file = open(path + '.lock', 'a+b')
+        except OSError as exc:
+            logger.warning(f"Video proxy cache unavailable, streaming uncached: {exc}")
+            return fetch(*bounds)
+
+        with lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                if os.path.exists(path):
+                    return None
+                data = fetch(*bounds)
+                self._store(path, data)
+                return data
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _store(self, path: str, data: bytes) -> None:
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, 'wb') as handle:
+                handle.write(data)
+            os.replace(temp_path, path)
+        except OSError as exc:
+            logger.warning(f"Failed to cache video chunk {path}: {exc}")
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return
+
+        self._written_since_trim += len(data)
+        if self._written_since_trim >= self.cache_bytes // 20:
+            self.trim()
+
+    # ------------------------------------------------------------------
+    # Eviction
+    # ------------------------------------------------------------------
+    def trim(self) -> int:
+        """Evict least recently read chunks down to 90% of the byte budget; returns bytes freed."""
+        if not self._trim_lock.acquire(blocking=False):
+            return 0
+        try:
+            self._written_since_trim = 0
+            now = time.time()
+            chunks = []
+            total = 0
+            for directory, _subdirs, files in os.walk(self.cache_dir):
+                for name in files:
+                    path = os.path.join(directory, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    if name.endswith('.chunk'):
+                        chunks.append((stat.st_mtime, stat.st_size, path))
+                        total += stat.st_size
+                    elif name.endswith('.tmp') and now - stat.st_mtime > 600:
+                        self._remove(path)
+                    elif name.endswith('.lock') and now - stat.st_mtime > 3600:
+                        self._remove(path)
+
+            freed = 0
+            target = int(self.cache_bytes * 0.9)
+            if total > self.cache_bytes:
+                for _mtime, chunk_size, path in sorted(chunks):
+                    if total - freed <= target:
+                        break
+                    if self._remove(path):
+                        freed += chunk_size
+            return freed
+        finally:
+            self._trim_lock.release()
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+
+# Global service instance
+video_proxy_service = VideoProxyService()
@@ -165,10 +165,44 @@ class VideoStreamingService:
         logger.info(f"Getting streaming URL for video {video_id}")
         return f"https://example.com/stream/{video_id}"
 
-    def get_adaptive_manifest(self, video_id: str) -> Dict[str, Any]:
-        """Get adaptive streaming manifest."""
-        logger.info(f"Getting adaptive manifest for video {video_id}")
-        return {"manifest_url": f"https://example.com/manifest/{video_id}"}
+    def get_adaptive_manifest(self, video_id: Any) -> Dict[str, Any]:
+        """
+        Get adaptive streaming manifests (HLS master playlist, optional DASH
+        MPD and per-rendition byte-range segment indexes) for a video or
+        video id. Videos not packaged yet list their progressive variants.
+        """
+        from apps.videos.models import Video
+
+        video = video_id
+        if not isinstance(video, Video):
+            video = Video.objects.filter(id=video_id).first()
+            if video is None:
+                raise VideoError("Video not found.")
+
+        metadata = video.metadata or {}
+        if not metadata.get("streaming") and video.asset_id:
+            # Identical uploads share the manifests packaged for their asset
+            metadata = video.asset.metadata
+        streaming = metadata.get("streaming")
+        if streaming:
+            return {
+                "manifest_url": streaming["hls"],
+                "hls_url": streaming["hls"],
+                "dash_url": streaming.get("dash"),
+                "segment_seconds": streaming.get("segment_seconds"),
+                "renditions": streaming["renditions"],
+            }
+
+        return {
+            "manifest_url": None,
+            "hls_url": None,
+            "dash_url": None,
+            "segment_seconds": None,
+            "renditions": [
+                {"quality": quality, "mp4": url}
+                for quality, url in (metadata.get("variants") or {}).items()
+            ],
+        }
 
     def generate_streaming_url(
         self,
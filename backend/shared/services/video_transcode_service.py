@@ -0,0 +1,408 @@
+"""Single-pass multi-rendition transcoding and packaging with resumable per-source work directories."""
+
+import fcntl
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+
+from shared.observability import observability
+from shared.services.video_packaging_service import PackagingError, video_packaging_service
+
+logger = logging.getLogger(__name__)
+
+# download(destination_path) -> whether the source was written
+Downloader = Callable[[str], bool]
+# upload(local_path, name relative to the job) -> public URL, or None on failure
+Uploader = Callable[[str, str], Optional[str]]
+
+
+@dataclass(frozen=True)
+class Rendition:
+    """One output of the encode ladder."""
+
+    name: str
+    width: int
+    height: int
+    video_bitrate: str
+    audio_bitrate: str = '128k'
+
+
+DEFAULT_RENDITIONS = (
+    Rendition('720p', 1280, 720, '2000k'),
+    Rendition('480p', 854, 480, '1000k'),
+    Rendition('360p', 640, 360, '500k'),
+)
+
+
+class TranscodeError(Exception):
+    """The encoder failed or timed out."""
+
+
+class TranscodeJob:
+    """
+    Work directory and progress of one source, kept until every output is
+    uploaded so a retried task skips the download, the encode, the packaging
+    and any uploads that already finished.
+    """
+
+    def __init__(self, workdir: str) -> None:
+        self.workdir = workdir
+        self._lock = threading.Lock()
+        self.state: Dict[str, Any] = {'encoded': [], 'packaged': None, 'files': [], 'uploaded': {}}
+        try:
+            with open(self._state_path) as handle:
+                self.state.update(json.load(handle))
+        except (OSError, ValueError):
+            pass
+
+    @property
+    def _state_path(self) -> str:
+        return os.path.join(self.workdir, 'state.json')
+
+    @property
+    def source_path(self) -> str:
+        return os.path.join(self.workdir, 'source')
+
+    def output_path(self, rendition: Rendition) -> str:
+        return os.path.join(self.workdir, f'{rendition.name}.mp4')
+
+    @property
+    def uploaded(self) -> Dict[str, str]:
+        return dict(self.state['uploaded'])
+
+    def is_encoded(self, rendition: Rendition) -> bool:
+        return rendition.name in self.state['encoded'] and os.path.exists(self.output_path(rendition))
+
+    def mark_encoded(self, renditions: Sequence[Rendition]) -> None:
+        with self._lock:
+            self.state['encoded'] = sorted(set(self.state['encoded']) | {r.name for r in renditions})
+            self._save()
+
+    @property
+    def is_packaged(self) -> bool:
+        """Packaged, with every output not uploaded yet still on disk."""
+        if self.state['packaged'] is None:
+            return False
+        uploaded = self.state['uploaded']
+        return all(os.path.exists(os.path.join(self.workdir, name))
+                   for name in self.state['files'] if name not in uploaded)
+
+    def mark_packaged(self, details: Dict[str, Any], files: List[str]) -> None:
+        with self._lock:
+            self.state['packaged'] = details
+            self.state['files'] = files
+            self._save()
+
+    def mark_uploaded(self, name: str, url: str) -> None:
+        with self._lock:
+            self.state['uploaded'][name] = url
+            self._save()
+
+    def _save(self) -> None:
+        temp_path = f'{self._state_path}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'w') as handle:
+            json.dump(self.state, handle)
+        os.replace(temp_path, self._state_path)
+
+
+@dataclass
+class TranscodeRun:
+    """Uploads of one job still in flight; ``wait`` returns the URL of every uploaded output."""
+
+    job: TranscodeJob
+    uploads: List[Future] = field(default_factory=list)
+
+    def wait(self) -> Dict[str, str]:
+        for future in self.uploads:
+            future.result()
+        if self.complete:
+            shutil.rmtree(self.job.workdir, ignore_errors=True)
+        return self.job.uploaded
+
+    @property
+    def complete(self) -> bool:
+        uploaded = self.job.uploaded
+        return self.job.state['packaged'] is not None and all(name in uploaded for name in self.job.state['files'])
+
+    def variants(self) -> Dict[str, str]:
+        """Progressive MP4 URL per rendition."""
+        packaged = self.job.state['packaged'] or {'renditions': []}
+        uploaded = self.job.uploaded
+        return {
+            rendition['name']: uploaded[f"{rendition['name']}.mp4"]
+            for rendition in packaged['renditions'] if f"{rendition['name']}.mp4" in uploaded
+        }
+
+    def manifest(self) -> Optional[Dict[str, Any]]:
+        """Adaptive streaming details for the video record, once every output is uploaded."""
+        if not self.complete:
+            return None
+        packaged = self.job.state['packaged']
+        uploaded = self.job.uploaded
+        return {
+            'hls': uploaded['hls/master.m3u8'],
+            'dash': uploaded.get('dash/manifest.mpd'),
+            'segment_seconds': video_packaging_service.segment_seconds,
+            'renditions': [
+                {
+                    'quality': rendition['name'],
+                    'width': rendition['width'],
+                    'height': rendition['height'],
+                    'bandwidth': rendition['bandwidth'],
+                    'average_bandwidth': rendition['average_bandwidth'],
+                    'segments': rendition['segments'],
+                    'playlist': uploaded[f"hls/{rendition['name']}.m3u8"],
+                    'media': uploaded[f"hls/{rendition['name']}.m4s"],
+                    'index': uploaded[f"hls/{rendition['name']}.json"],
+                    'mp4': uploaded[f"{rendition['name']}.mp4"],
+                }
+                for rendition in packaged['renditions']
+            ],
+        }
+
+
+class VideoTranscodeService:
+    """
+    Encodes every rendition of a source in one ffmpeg run, then packages
+    them for adaptive streaming (see ``VideoPackagingService``).
+
+    The source is decoded once and a ``split`` filter feeds one scaler and
+    encoder per rendition, so the ladder costs one decode instead of one per
+    output. Encodes take one of ``VIDEO_TRANSCODE_SLOTS`` host-wide slots
+    (lock files shared by every worker process), defaulting to as many
+    concurrent encodes as the CPU cores fit at ``VIDEO_TRANSCODE_THREADS``
+    threads each. Finished renditions upload on a thread pool, which callers
+    processing several videos share so one video uploads while the next one
+    encodes. Keyframes are forced on segment boundaries so every rendition
+    switches cleanly. Each stage reports its duration and bytes per second.
+    """
+
+    @property
+    def work_dir(self) -> str:
+        return getattr(settings, 'VIDEO_TRANSCODE_WORK_DIR', None) or os.path.join(
+            tempfile.gettempdir(), 'watchparty-transcode'
+        )
+
+    @property
+    def renditions(self) -> Tuple[Rendition, ...]:
+        configured = getattr(settings, 'VIDEO_VARIANT_RENDITIONS', None)
+        if not configured:
+            return DEFAULT_RENDITIONS
+        return tuple(Rendition(name, **options) for name, options in configured.items())
+
+    @property
+    def preset(self) -> str:
+        return getattr(settings, 'VIDEO_TRANSCODE_PRESET', 'medium')
+
+    @property
+    def timeout(self) -> int:
+        return getattr(settings, 'VIDEO_TRANSCODE_TIMEOUT', 1800)
+
+    @property
+    def threads(self) -> int:
+        return getattr(settings, 'VIDEO_TRANSCODE_THREADS', 4)
+
+    @property
+    def slots(self) -> int:
+        return getattr(settings, 'VIDEO_TRANSCODE_SLOTS', None) or max(1, (os.cpu_count() or 1) // self.threads)
+
+    @property
+    def upload_workers(self) -> int:
+        return getattr(settings, 'VIDEO_TRANSCODE_UPLOAD_WORKERS', 3)
+
+    def upload_executor(self) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(max_workers=self.upload_workers, thread_name_prefix='video-variant-upload')
+
+    def job(self, key: str) -> TranscodeJob:
+        workdir = os.path.join(self.work_dir, key)
+        os.makedirs(workdir, exist_ok=True)
+        return TranscodeJob(workdir)
+
+    # ------------------------------------------------------------------
+    # Pipeline
+    # ------------------------------------------------------------------
+    def start(self, key: str, download: Downloader, upload: Uploader,
+              executor: ThreadPoolExecutor) -> Optional[TranscodeRun]:
+        """
+        Download (unless already present), encode and package whatever is
+        missing and queue the outputs not uploaded yet on ``executor``.
+        Returns ``None`` when the source could not be prepared, encoded or
+        packaged; the work directory is kept so the next attempt resumes.
+        """
+        job = self.job(key)
+        run = TranscodeRun(job)
+
+        if not job.is_packaged:
+            renditions = self.renditions
+            to_encode = [r for r in renditions if not job.is_encoded(r)]
+            try:
+                if to_encode:
+                    if not self.prepare_source(job, download):
+                        return None
+                    self.encode(job, to_encode)
+                self.package(job, renditions)
+            except (TranscodeError, PackagingError) as exc:
+                logger.error(f"Transcode of {key} failed: {exc}")
+                return None
+
+        uploaded = job.uploaded
+        run.uploads = [executor.submit(self._upload, job, name, upload)
+                       for name in job.state['files'] if name not in uploaded]
+        return run
+
+    def prepare_source(self, job: TranscodeJob, download: Downloader) -> bool:
+        if os.path.exists(job.source_path):
+            return True
+        partial_path = job.source_path + '.part'
+        with self._stage('download') as stage:
+            if not download(partial_path):
+                return False
+            stage['bytes'] = os.path.getsize(partial_path)
+        os.replace(partial_path, job.source_path)
+        return True
+
+    def encode(self, job: TranscodeJob, renditions: Sequence[Rendition]) -> None:
+        outputs = [(rendition, job.output_path(rendition) + '.part.mp4') for rendition in renditions]
+        command = self.build_command(job.source_path, outputs)
+
+        with self.slot(), self._stage('encode') as stage:
+            stage['bytes'] = os.path.getsize(job.source_path)
+            try:
+                result = subprocess.run(command, capture_output=True, text=True, timeout=self.timeout)
+            except subprocess.TimeoutExpired as exc:
+                raise TranscodeError(f"ffmpeg timed out after {self.timeout}s") from exc
+            if result.returncode != 0:
+                raise TranscodeError(result.stderr[-2000:])
+
+        for rendition, partial_path in outputs:
+            os.replace(partial_path, job.output_path(rendition))
+        job.mark_encoded(renditions)
+
+    def package(self, job: TranscodeJob, renditions: Sequence[Rendition]) -> None:
+        with self._stage('package') as stage:
+            stage['bytes'] = sum(os.path.getsize(job.output_path(r)) for r in renditions)
+            details = video_packaging_service.package(
+                job.workdir, [(rendition.name, job.output_path(rendition)) for rendition in renditions]
+            )
+
+        files = [os.path.basename(job.output_path(rendition)) for rendition in renditions]
+        for directory in ('hls', 'dash'):
+            root = os.path.join(job.workdir, directory)
+            if os.path.isdir(root):
+                files += sorted(f'{directory}/{name}' for name in os.listdir(root))
+        job.mark_packaged(details, files)
+
+    def build_command(self, source_path: str, outputs: Sequence[Tuple[Rendition, str]]) -> List[str]:
+        """One ffmpeg invocation: decode once, ``split`` the video, scale and encode per output."""
+        labels = [f'[s{index}]' for index in range(len(outputs))]
+        graph = [f"[0:v]split={len(outputs)}{''.join(labels)}"]
+        for index, (rendition, _path) in enumerate(outputs):
+            graph.append(
+                f"{labels[index]}scale=w={rendition.width}:h={rendition.height}"
+                f":force_original_aspect_ratio=decrease:force_divisible_by=2[v{index}]"
+            )
+
+        command = ['ffmpeg', '-hide_banner', '-nostdin', '-y', '-i', source_path,
+                   '-filter_complex', ';'.join(graph)]
+        for index, (rendition, path) in enumerate(outputs):
+            bufsize = f"{int(rendition.video_bitrate.rstrip('k')) * 2}k"
+            command += [
+                '-map', f'[v{index}]',
+                '-map', '0:a?',
+                '-c:v', 'libx264',
+                '-preset', self.preset,
+                '-crf', '23',
+                '-maxrate', rendition.video_bitrate,
+                '-bufsize', bufsize,
+                '-force_key_frames', f'expr:gte(t,n_forced*{video_packaging_service.segment_seconds})',
+                '-threads', str(self.threads),
+                '-c:a', 'aac',
+                '-b:a', rendition.audio_bitrate,
+                '-movflags', '+faststart',
+                path,
+            ]
+        return command
+
+    def _upload(self, job: TranscodeJob, name: str, upload: Uploader) -> Optional[str]:
+        path = os.path.join(job.workdir, name)
+        with self._stage('upload') as stage:
+            stage['bytes'] = os.path.getsize(path)
+            url = upload(path, name)
+        if url:
+            job.mark_uploaded(name, url)
+        else:
+            logger.error(f"Upload of {name} from {job.workdir} failed")
+        return url
+
+    # ------------------------------------------------------------------
+    # Concurrency and housekeeping
+    # ------------------------------------------------------------------
+    @contextmanager
+    def slot(self) -> Iterator[int]:
+        """Hold one of the host-wide encode slots for the duration of the block."""
+        slot_dir = os.path.join(self.work_dir, '.slots')
+        os.makedirs(slot_dir, exist_ok=True)
+        handles = [open(os.path.join(slot_dir, f'{index}.lock'), 'a+b') for index in range(self.slots)]
+        try:
+            while True:
+                for index, handle in enumerate(handles):
+                    try:
+                        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        continue
+                    try:
+                        yield index
+                    finally:
+                        fcntl.flock(handle, fcntl.LOCK_UN)
+                    return
+                time.sleep(1.0)
+        finally:
+            for handle in handles:
+                handle.close()
+
+    def cleanup(self, max_age: float) -> int:
+        """Remove work directories untouched for ``max_age`` seconds; returns how many."""
+        removed = 0
+        cutoff = time.time() - max_age
+        try:
+            names = os.listdir(self.work_dir)
+        except OSError:
+            return 0
+        for name in names:
+            path = os.path.join(self.work_dir, name)
+            if name.startswith('.') or not os.path.isdir(path):
+                continue
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    shutil.rmtree(path)
+                    removed += 1
+            except OSError:
+                continue
+        return removed
+
+    @contextmanager
+    def _stage(self, stage: str, **tags):
+        tags = {'stage': stage, **tags}
+        details: Dict[str, Any] = {}
+        started = time.perf_counter()
+        with observability.span(f"video.transcode.{stage}", tags=tags):
+            yield details
+        elapsed = time.perf_counter() - started
+        observability.record_metric("video.transcode.stage_seconds", elapsed, tags=tags)
+        if details.get('bytes') and elapsed > 0:
+            observability.record_metric("video.transcode.stage_bytes_per_second", details['bytes'] / elapsed, tags=tags)
+
+
+# Global service instance
+video_transcode_service = VideoTranscodeService()
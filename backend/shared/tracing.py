@@ -0,0 +1,359 @@
+"""Sampled request tracing: trace context, propagation and automatic child spans.
+
+Spans opened with :meth:`ObservabilityClient.span` carry a trace id and their
+parent's span id, taken from a context variable, so everything done on behalf
+of one HTTP request or Celery task forms one tree. Whether a trace collects
+the high-volume automatic spans (database queries, cache calls, outgoing HTTP)
+is decided once at its root with probability ``TRACE_SAMPLE_RATE``. Unsampled
+traces hold a bounded number of those spans back and emit them only if the
+trace fails or its root runs longer than ``TRACE_SLOW_SPAN_MS``, so errors and
+slow requests always come with a full waterfall.
+
+Context crosses process boundaries as a W3C ``traceparent`` header: incoming
+HTTP requests continue the caller's trace, outgoing ``requests`` calls and
+published Celery tasks carry it onwards. An HTTP caller's trace id is kept for
+correlation, but its sampled flag is only honoured from ``TRACE_TRUSTED_PROXIES``;
+anyone else would otherwise be able to force every span of their requests to
+be recorded.
+"""
+
+from __future__ import annotations
+
+import ipaddress
+import logging
+import random
+import re
+import secrets
+import time
+from contextvars import ContextVar, Token
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache, wraps
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+logger = logging.getLogger("watchparty.tracing")
+
+TRACEPARENT_HEADER = "traceparent"
+DEFAULT_SAMPLE_RATE = 0.01
+DEFAULT_SLOW_SPAN_MS = 1500.0
+DEFAULT_MAX_DEFERRED_SPANS = 256
+SQL_MAX_LENGTH = 1000
+
+CACHE_METHODS = (
+    "get", "set", "add", "delete", "touch", "has_key", "incr", "decr",
+    "get_many", "set_many", "delete_many",
+)
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+def _setting(name: str, default: Any) -> Any:
+    try:
+        from django.conf import settings
+
+        return getattr(settings, name, default)
+    except Exception:
+        return default
+
+
+def new_trace_id() -> str:
+    return secrets.token_hex(16)
+
+
+def new_span_id() -> str:
+    return secrets.token_hex(8)
+
+
+class Trace:
+    """State shared by every span of one trace within this process."""
+
+    __slots__ = ("trace_id", "sampled", "error", "deferred", "max_deferred")
+
+    def __init__(self, trace_id: str, sampled: bool, max_deferred: int = DEFAULT_MAX_DEFERRED_SPANS):
+        self.trace_id = trace_id
+        self.sampled = sampled
+        self.error = False
+        self.deferred: List[Any] = []
+        self.max_deferred = max_deferred
+
+    @property
+    def collecting(self) -> bool:
+        """Whether automatic child spans are worth building for this trace."""
+
+        return self.sampled or len(self.deferred) < self.max_deferred
+
+
+@dataclass(frozen=True)
+class SpanContext:
+    """The span new work is attributed to; ``remote`` when it lives in another process."""
+
+    trace: Trace
+    span_id: str
+    remote: bool = False
+
+
+_current: ContextVar[Optional[SpanContext]] = ContextVar("watchparty_span_context", default=None)
+
+
+def current() -> Optional[SpanContext]:
+    return _current.get()
+
+
+def activate(context: Optional[SpanContext]) -> Token:
+    return _current.set(context)
+
+
+def deactivate(token: Token) -> None:
+    try:
+        _current.reset(token)
+    except ValueError:
+        # Token from another context (e.g. a signal fired on a different thread)
+        _current.set(None)
+
+
+def sample_rate() -> float:
+    return float(_setting("TRACE_SAMPLE_RATE", DEFAULT_SAMPLE_RATE))
+
+
+def start_trace(sampled: Optional[bool] = None, trace_id: Optional[str] = None) -> Trace:
+    if sampled is None:
+        sampled = random.random() < sample_rate()
+    return Trace(
+        trace_id or new_trace_id(),
+        sampled,
+        max_deferred=_setting("TRACE_MAX_DEFERRED_SPANS", DEFAULT_MAX_DEFERRED_SPANS),
+    )
+
+
+def slow_span_ms() -> float:
+    return float(_setting("TRACE_SLOW_SPAN_MS", DEFAULT_SLOW_SPAN_MS))
+
+
+# ----------------------------------------------------------------------
+# Propagation
+# ----------------------------------------------------------------------
+def format_traceparent(context: SpanContext) -> str:
+    flags = "01" if context.trace.sampled else "00"
+    return f"00-{context.trace.trace_id}-{context.span_id}-{flags}"
+
+
+def parse_traceparent(value: Optional[str], trust_sampled: bool = True) -> Optional[SpanContext]:
+    """Remote parent from a ``traceparent`` value; sampling is decided here unless ``trust_sampled``."""
+
+    match = _TRACEPARENT.match((value or "").strip().lower())
+    if not match:
+        return None
+    trace_id, span_id, flags = match.groups()
+    if trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    sampled = bool(int(flags, 16) & 1) if trust_sampled else None
+    trace = start_trace(sampled=sampled, trace_id=trace_id)
+    return SpanContext(trace, span_id, remote=True)
+
+
+def inject(headers: Dict[str, Any], context: Optional[SpanContext] = None) -> Dict[str, Any]:
+    """Add the ``traceparent`` header for ``context`` (default: the current span) to ``headers``."""
+
+    context = context or current()
+    if context is not None:
+        headers[TRACEPARENT_HEADER] = format_traceparent(context)
+    return headers
+
+
+def extract(headers: Optional[Mapping[str, Any]], trust_sampled: bool = True) -> Optional[SpanContext]:
+    if not headers:
+        return None
+    return parse_traceparent(headers.get(TRACEPARENT_HEADER), trust_sampled=trust_sampled)
+
+
+@lru_cache(maxsize=8)
+def _networks(proxies: Tuple[str, ...]) -> Tuple[Any, ...]:
+    networks = []
+    for proxy in proxies:
+        try:
+            networks.append(ipaddress.ip_network(proxy, strict=False))
+        except ValueError:
+            logger.warning("Ignoring invalid TRACE_TRUSTED_PROXIES entry %r", proxy)
+    return tuple(networks)
+
+
+def is_trusted_proxy(address: Optional[str]) -> bool:
+    """Whether ``address`` (a ``REMOTE_ADDR``) is listed in ``TRACE_TRUSTED_PROXIES``."""
+
+    proxies = tuple(_setting("TRACE_TRUSTED_PROXIES", ()))
+    if not address or not proxies:
+        return False
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in _networks(proxies))
+
+
+def extract_request(request) -> Optional[SpanContext]:
+    """Remote parent of an incoming HTTP request, honouring its sampled flag only from a trusted proxy."""
+
+    return extract(request.headers, trust_sampled=is_trusted_proxy(request.META.get("REMOTE_ADDR")))
+
+
+# ----------------------------------------------------------------------
+# Automatic child spans
+# ----------------------------------------------------------------------
+def _record(name: str, started: float, start_time: datetime, tags: Dict[str, Any], error: Optional[BaseException]) -> None:
+    from .observability import observability
+
+    duration_ms = (time.perf_counter() - started) * 1000
+    observability.record_child_span(
+        name,
+        duration_ms,
+        start_time=start_time,
+        end_time=start_time + timedelta(milliseconds=duration_ms),
+        tags=tags,
+        error=str(error) if error is not None else None,
+    )
+
+
+def trace_query(execute, sql, params, many, context):
+    """``connection.execute_wrapper`` hook recording each query as a ``db.query`` span."""
+
+    span_context = _current.get()
+    if span_context is None or not span_context.trace.collecting:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    start_time = datetime.now(timezone.utc)
+    error = None
+    try:
+        return execute(sql, params, many, context)
+    except Exception as exc:
+        error = exc
+        raise
+    finally:
+        _record("db.query", started, start_time, {
+            "db.alias": context["connection"].alias,
+            "db.statement": sql[:SQL_MAX_LENGTH],
+            "db.many": many,
+        }, error)
+
+
+def _traced_cache_method(name: str, method):
+    @wraps(method)
+    def traced(self, *args, **kwargs):
+        span_context = _current.get()
+        if span_context is None or not span_context.trace.collecting:
+            return method(self, *args, **kwargs)
+
+        started = time.perf_counter()
+        start_time = datetime.now(timezone.utc)
+        error = None
+        try:
+            return method(self, *args, **kwargs)
+        except Exception as exc:
+            error = exc
+            raise
+        finally:
+            _record(f"cache.{name}", started, start_time, {"cache.backend": type(self).__name__}, error)
+
+    traced.__traced__ = True
+    return traced
+
+
+def _traced_send(send):
+    @wraps(send)
+    def traced(self, request, **kwargs):
+        span_context = _current.get()
+        if span_context is None:
+            return send(self, request, **kwargs)
+
+        inject(request.headers, span_context)
+        if not span_context.trace.collecting:
+            return send(self, request, **kwargs)
+
+        from urllib.parse import urlsplit
+
+        started = time.perf_counter()
+        start_time = datetime.now(timezone.utc)
+        # Host only: paths and query strings may carry tokens
+        tags = {"http.method": request.method, "http.host": urlsplit(request.url).netloc}
+        error = None
+        try:
+            response = send(self, request, **kwargs)
+            tags["http.status_code"] = response.status_code
+            return response
+        except Exception as exc:
+            error = exc
+            raise
+        finally:
+            _record("http.client", started, start_time, tags, error)
+
+    traced.__traced__ = True
+    return traced
+
+
+def _add_query_tracer(connection, **kwargs):
+    if trace_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(trace_query)
+
+
+def install_database_tracing() -> None:
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+
+    connection_created.connect(_add_query_tracer, dispatch_uid="watchparty.tracing.queries")
+    for connection in connections.all(initialized_only=True):
+        _add_query_tracer(connection)
+
+
+def install_cache_tracing() -> None:
+    from django.core.cache import caches
+
+    for alias in caches:
+        backend_class = type(caches[alias])
+        for name in CACHE_METHODS:
+            method = getattr(backend_class, name, None)
+            if method is None or getattr(method, "__traced__", False):
+                continue
+            setattr(backend_class, name, _traced_cache_method(name, method))
+
+
+def install_http_tracing() -> None:
+    try:
+        import requests
+    except ImportError:  # pragma: no cover - optional dependency
+        return
+
+    if not getattr(requests.Session.send, "__traced__", False):
+        requests.Session.send = _traced_send(requests.Session.send)
+
+
+def install() -> None:
+    """Hook automatic child spans into the ORM, the cache backends and ``requests``."""
+
+    if not _setting("TRACING_ENABLED", True):
+        return
+    for installer in (install_database_tracing, install_cache_tracing, install_http_tracing):
+        try:
+            installer()
+        except Exception:  # pragma: no cover - defensive guard
+            logger.exception("Failed to install %s", installer.__name__)
+
+
+__all__ = [
+    "SpanContext",
+    "TRACEPARENT_HEADER",
+    "Trace",
+    "activate",
+    "current",
+    "deactivate",
+    "extract",
+    "extract_request",
+    "format_traceparent",
+    "inject",
+    "install",
+    "is_trusted_proxy",
+    "new_span_id",
+    "new_trace_id",
+    "parse_traceparent",
+    "start_trace",
+    "trace_query",
+]
@@ -0,0 +1,193 @@
+"""
+Fan-out helpers for WebSocket group broadcasts.
+
+Broadcast payloads are encoded once at the sender into a text frame carried in
+the group event, so group handlers forward it verbatim instead of re-encoding
+per recipient. Ephemeral events (reactions, typing, presence) are buffered per
+group for a short window and delivered as one ``broadcast_batch`` group event,
+while control messages keep an immediate ``group_send`` path.
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+from channels.consumer import get_handler_name
+from django.conf import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+BATCH_EVENT_TYPE = 'broadcast_batch'
+
+
+def _encode_json(payload: Any) -> str:
+    return json.dumps(payload)
+
+
+def _encode_orjson(payload: Any) -> str:
+    return orjson.dumps(payload).decode()
+
+
+_CODECS = {
+    'json': _encode_json,
+    'orjson': _encode_orjson if orjson is not None else _encode_json,
+}
+
+
+def encode_frame(payload: Dict[str, Any]) -> str:
+    """
+    Encode a client payload into a WebSocket text frame.
+
+    Uses the codec named by ``WEBSOCKET_JSON_CODEC`` (``json`` or ``orjson``);
+    ``orjson`` silently falls back to the standard library when not installed.
+    """
+    codec = _CODECS.get(getattr(settings, 'WEBSOCKET_JSON_CODEC', 'json'), _encode_json)
+    return codec(payload)
+
+
+def frame_event(event_type: str, payload: Dict[str, Any], **routing: Any) -> Dict[str, Any]:
+    """Build a group event carrying ``payload`` pre-encoded as ``frame``."""
+    return {'type': event_type, 'frame': encode_frame(payload), **routing}
+
+
+class _PendingBatch:
+    """Events buffered for one group until the window closes."""
+
+    __slots__ = ('channel_layer', 'events', 'task')
+
+    def __init__(self, channel_layer):
+        self.channel_layer = channel_layer
+        self.events: "OrderedDict[Hashable, Dict[str, Any]]" = OrderedDict()
+        self.task: Optional[asyncio.Task] = None
+
+
+class PartyBroadcastAggregator:
+    """Per-process outbound aggregator keyed by channel-layer group name."""
+
+    def __init__(self) -> None:
+        self._pending: Dict[str, _PendingBatch] = {}
+        self._sequence = itertools.count()
+
+    @property
+    def window_seconds(self) -> float:
+        return getattr(settings, 'PARTY_FANOUT_WINDOW_MS', 75) / 1000.0
+
+    @property
+    def max_batch_size(self) -> int:
+        return getattr(settings, 'PARTY_FANOUT_MAX_BATCH', 100)
+
+    async def publish(
+        self,
+        channel_layer,
+        group: str,
+        event: Dict[str, Any],
+        ephemeral: bool = False,
+        coalesce_key: Optional[Hashable] = None,
+    ) -> None:
+        """
+        Send ``event`` to ``group``.
+
+        Non-ephemeral events are sent immediately. Ephemeral events are buffered;
+        a later event with the same ``coalesce_key`` replaces the earlier one.
+        """
+        if not ephemeral or self.window_seconds <= 0:
+            await channel_layer.group_send(group, event)
+            return
+
+        batch = self._pending.get(group)
+        if batch is None:
+            batch = self._pending[group] = _PendingBatch(channel_layer)
+            batch.task = asyncio.create_task(self._flush_later(group, batch))
+
+        key = coalesce_key if coalesce_key is not None else next(self._sequence)
+        # Re-insert so a coalesced event keeps its latest position in the batch
+        batch.events.pop(key, None)
+        batch.events[key] = event
+
+        if len(batch.events) >= self.max_batch_size:
+            batch.task.cancel()
+            await self.flush(group)
+
+    async def flush(self, group: str) -> None:
+        """Deliver everything buffered for ``group`` now."""
+        batch = self._pending.pop(group, None)
+        if batch is None or not batch.events:
+            return
+
+        events = list(batch.events.values())
+        try:
+            if len(events) == 1:
+                await batch.channel_layer.group_send(group, events[0])
+            else:
+                await batch.channel_layer.group_send(group, {
+                    'type': BATCH_EVENT_TYPE,
+                    'events': events,
+                })
+        except Exception as e:
+            logger.error(f"Failed to flush {len(events)} batched events to {group}: {str(e)}")
+
+    async def flush_all(self) -> None:
+        for group in list(self._pending):
+            batch = self._pending.get(group)
+            if batch and batch.task:
+                batch.task.cancel()
+            await self.flush(group)
+
+    async def _flush_later(self, group: str, batch: _PendingBatch) -> None:
+        try:
+            await asyncio.sleep(self.window_seconds)
+        except asyncio.CancelledError:
+            return
+        if self._pending.get(group) is batch:
+            await self.flush(group)
+
+
+class BatchedBroadcastMixin:
+    """
+    Consumer mixin that unpacks ``broadcast_batch`` group events.
+
+    Each inner event is dispatched to its regular handler. With
+    ``PARTY_FANOUT_BATCH_FRAMES`` enabled, the frames those handlers produce are
+    joined into a single ``{"type": "batch", "messages": [...]}`` frame.
+    """
+
+    _batch_frames = None
+
+    async def broadcast_batch(self, event):
+        """Dispatch a coalesced batch of group events to this socket"""
+        frames = []
+        if getattr(settings, 'PARTY_FANOUT_BATCH_FRAMES', False):
+            self._batch_frames = frames
+
+        try:
+            for inner in event['events']:
+                handler = getattr(self, get_handler_name(inner), None)
+                if handler is None:
+                    logger.warning(f"No handler for batched event type: {inner.get('type')}")
+                    continue
+                await handler(inner)
+        finally:
+            self._batch_frames = None
+
+        if len(frames) == 1:
+            await self.send(text_data=frames[0])
+        elif frames:
+            await self.send(text_data='{"type": "batch", "messages": [' + ', '.join(frames) + ']}')
+
+    async def send(self, text_data=None, bytes_data=None, close=False):
+        if self._batch_frames is not None and text_data is not None and not close:
+            self._batch_frames.append(text_data)
+            return
+        await super().send(text_data=text_data, bytes_data=bytes_data, close=close)
+
+
+# Global aggregator instance (one per worker process / event loop)
+party_broadcaster = PartyBroadcastAggregator()
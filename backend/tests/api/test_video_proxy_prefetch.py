@@ -0,0 +1,37 @@
+"""Party read-ahead requested through the video proxy."""
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from apps.parties.models import PartyParticipant
+from apps.videos.views import VideoProxyView
+
+
+class ProxyPrefetchPartyTests(TestCase):
+    """Only a party playing the video, asked for by its host or a participant, gets read-ahead."""
+
+    def setUp(self):
+        from tests.factories import UserFactory, VideoFactory, WatchPartyFactory
+
+        cache.clear()
+        self.party = WatchPartyFactory()
+        self.video = self.party.video
+        self.guest = UserFactory()
+        PartyParticipant.objects.create(party=self.party, user=self.guest, status='approved')
+        self.stranger = UserFactory()
+        self.other_video = VideoFactory(uploader=self.party.host)
+        self.view = VideoProxyView()
+
+    def resolve(self, user, video, party_id):
+        return self.view.prefetch_party_id(user, video, party_id)
+
+    def test_host_and_participants_resolve_to_the_party(self):
+        self.assertEqual(self.resolve(self.party.host, self.video, str(self.party.id)), self.party.id)
+        self.assertEqual(self.resolve(self.guest, self.video, str(self.party.id)), self.party.id)
+
+    def test_outsiders_other_videos_and_made_up_ids_are_ignored(self):
+        self.assertIsNone(self.resolve(self.stranger, self.video, str(self.party.id)))
+        self.assertIsNone(self.resolve(self.guest, self.other_video, str(self.party.id)))
+        self.assertIsNone(self.resolve(self.guest, self.video, 'not-a-uuid'))
+        self.assertIsNone(self.resolve(self.guest, self.video, '00000000-0000-0000-0000-000000000000'))
+        self.assertIsNone(self.resolve(self.guest, self.video, None))
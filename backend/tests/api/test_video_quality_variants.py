@@ -0,0 +1,65 @@
+"""Quality variants served from the renditions stored on a video."""
+
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+STREAMING = {
+    "hls": "https://cdn.example.com/v/hls/master.m3u8",
+    "dash": "https://cdn.example.com/v/dash/manifest.mpd",
+    "segment_seconds": 4,
+    "renditions": [
+        {
+            "quality": "720p", "width": 1280, "height": 720, "bandwidth": 3000000,
+            "playlist": "https://cdn.example.com/v/hls/720p.m3u8",
+            "index": "https://cdn.example.com/v/hls/720p.json",
+            "mp4": "https://cdn.example.com/v/720p.mp4",
+        },
+    ],
+}
+
+
+class VideoQualityVariantsTests(TestCase):
+    """The endpoint reads ``Video.metadata`` written by the variant tasks."""
+
+    client_class = APIClient
+
+    def setUp(self):
+        from tests.factories import VideoFactory
+
+        self.video = VideoFactory(resolution="1920x1080")
+
+    def get_variants(self):
+        return self.client.get(reverse("videos:quality_variants", args=[self.video.id]))
+
+    def test_packaged_renditions_are_listed_with_manifests(self):
+        self.video.metadata = {"variants": {"720p": STREAMING["renditions"][0]["mp4"]}, "streaming": STREAMING}
+        self.video.save()
+
+        response = self.get_variants()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["hls_manifest"], STREAMING["hls"])
+        self.assertEqual(response.data["dash_manifest"], STREAMING["dash"])
+        self.assertEqual(response.data["quality_variants"], [{
+            "quality": "720p",
+            "url": "https://cdn.example.com/v/hls/720p.m3u8",
+            "mp4_url": "https://cdn.example.com/v/720p.mp4",
+            "segment_index_url": "https://cdn.example.com/v/hls/720p.json",
+            "resolution": "1280x720",
+            "bandwidth": 3000000,
+            "available": True,
+        }])
+
+    def test_unpackaged_variants_fall_back_to_progressive_files(self):
+        self.video.metadata = {"variants": {"480p": "https://cdn.example.com/v/480p.mp4"}}
+        self.video.save()
+
+        response = self.get_variants()
+
+        self.assertIsNone(response.data["hls_manifest"])
+        self.assertEqual(
+            [(variant["quality"], variant["url"]) for variant in response.data["quality_variants"]],
+            [("480p", "https://cdn.example.com/v/480p.mp4")],
+        )
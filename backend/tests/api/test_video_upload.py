@@ -0,0 +1,56 @@
+"""Video uploads through the production middleware stack."""
+
+import hashlib
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.videos.models import Video
+from config.settings import base
+
+
+class VideoUploadMiddlewareTests(TestCase):
+    """Middleware that reads ``request.FILES`` first must not break upload hashing."""
+
+    client_class = APIClient
+
+    def setUp(self):
+        from tests.factories import UserFactory
+
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, True)
+        overrides = override_settings(MIDDLEWARE=base.MIDDLEWARE, MEDIA_ROOT=media_root, AWS_STORAGE_BUCKET_NAME='')
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self.client.force_authenticate(user=UserFactory())
+        self.url = reverse('videos:upload')
+
+    def form(self, **extra):
+        return dict(title='Feature', filename='movie.mp4', file_size=1024, content_type='video/mp4', **extra)
+
+    def test_initiate_without_a_file(self):
+        response = self.client.post(self.url, self.form(), format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['status'], 'ready_for_upload')
+
+    def test_uploaded_file_is_stored_under_its_hash(self):
+        content = b'frame' * 1000
+        upload = SimpleUploadedFile('movie.mp4', content, content_type='video/mp4')
+
+        with patch('apps.videos.tasks.process_video_upload.delay') as delay:
+            response = self.client.post(self.url, self.form(file=upload), format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        video = Video.objects.get(id=response.data['video_id'])
+        content_hash = hashlib.sha256(content).hexdigest()
+        self.assertEqual(video.asset.content_hash, content_hash)
+        self.assertEqual(video.file.name, f'videos/originals/{content_hash[:2]}/{content_hash}.mp4')
+        delay.assert_called_once_with(str(video.id))
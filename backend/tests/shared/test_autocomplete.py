@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import sys
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from apps.search.autocomplete import AutocompleteIndex
+
+SUGGESTION_TYPES = [('query', 'Query'), ('hashtag', 'Hashtag'), ('user', 'User'), ('trending', 'Trending')]
+
+
+def entry(entry_type, text, score):
+    return f"{entry_type}:{text.lower()}", (score, {'text': text, 'type': entry_type, 'popularity_score': score})
+
+
+class AutocompleteIndexTests(SimpleTestCase):
+    """Validate prefix buckets, typo tolerance and incremental upserts on the cache backend."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        patcher = mock.patch('apps.search.autocomplete.get_redis_client', return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        # apps.search is not installed under the test settings
+        models = SimpleNamespace(SearchSuggestion=SimpleNamespace(SUGGESTION_TYPES=SUGGESTION_TYPES))
+        patcher = mock.patch.dict(sys.modules, {'apps.search.models': models})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.index = AutocompleteIndex()
+        self.entries = dict([
+            entry('query', 'Harry Potter', 50),
+            entry('query', 'Harbor Lights', 80),
+            entry('hashtag', 'Harvest', 10),
+            entry('trending', 'Harry Potter', 5),
+        ])
+        self.index._write_generation_data('1', self.index.build(self.entries), self.entries)
+        self.index._write_generation('1')
+
+    def texts(self, *args, **kwargs):
+        return [item['text'] for item in self.index.complete(*args, **kwargs)]
+
+    def test_prefix_matches_are_ranked_by_weight_and_deduplicated(self):
+        self.assertEqual(self.texts('har'), ['Harbor Lights', 'Harry Potter', 'Harvest'])
+        self.assertEqual(self.texts('har', suggestion_type='hashtag'), ['Harvest'])
+        self.assertEqual(self.texts('pott'), ['Harry Potter'])
+
+    def test_single_typo_is_tolerated_after_exact_matches(self):
+        self.assertEqual(self.texts('hsrry'), ['Harry Potter'])
+        self.assertEqual(self.texts('harrry pot'), ['Harry Potter'])
+        self.assertEqual(self.texts('hsrrx pot'), [])
+        self.assertEqual(self.texts('hsrry', fuzzy=False), [])
+
+    def test_upsert_reweights_live_generation(self):
+        self.index._upsert('1', dict([entry('hashtag', 'Harvest', 500)]))
+        self.assertEqual(self.texts('har', limit=1), ['Harvest'])
+
+    def test_missing_index_reports_none(self):
+        cache.clear()
+        self.assertIsNone(AutocompleteIndex().complete('har'))
+
+    def test_limit_is_filled_past_duplicates_and_missing_payloads(self):
+        cache.clear()
+        entries = dict(entry(kind, 'Hark', 90) for kind in ('query', 'hashtag', 'trending', 'user'))
+        entries.update([entry('query', 'Harm', 20), entry('query', 'Hart', 10)])
+        self.index._write_generation_data('2', self.index.build(entries), entries)
+        self.index._write_generation('2')
+
+        # The first ``limit * 2`` members are all the same text
+        self.assertEqual(self.texts('har', limit=2), ['Hark', 'Harm'])
+
+    def test_queued_terms_are_upserted_by_refresh(self):
+        self.index.mark_dirty('  Harpoon ')
+        self.index.mark_dirty('harpoon')
+        texts = self.index.pop_dirty(10)
+        self.assertEqual(texts, ['harpoon'])
+        self.assertEqual(self.index.pop_dirty(10), [])
+
+        with mock.patch.object(self.index, 'load_entries', return_value=dict([entry('query', 'Harpoon', 900)])):
+            self.assertEqual(self.index.refresh_terms(texts), 1)
+        self.assertEqual(self.texts('harp', fuzzy=False), ['Harpoon'])
+
+    def test_refresh_drops_withdrawn_suggestions(self):
+        # 'Harvest' was deactivated or deleted; 'Harry Potter' lost its trending counts
+        with mock.patch.object(self.index, 'load_entries', return_value=dict([entry('query', 'Harry Potter', 50)])):
+            self.assertEqual(self.index.refresh_terms(['harvest', 'harry potter']), 1)
+
+        self.assertEqual(self.texts('har'), ['Harbor Lights', 'Harry Potter'])
+        self.assertEqual(self.texts('harv', fuzzy=False), [])
+        self.assertEqual(self.texts('har', suggestion_type='trending'), [])
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from shared.services.chat_buffer_service import ChatMessageBuffer
+
+
+class ChatMessageBufferTests(SimpleTestCase):
+    """Validate the write-behind chat buffer without touching the database."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.buffer = ChatMessageBuffer()
+        # Flushes hop threads via database_sync_to_async, which would touch DB connections
+        patcher = mock.patch('shared.services.chat_buffer_service.database_sync_to_async', sync_to_async)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_append_assigns_id_and_ordering_key(self):
+        first = self.buffer.append('room-1', 'u1', 'hello')
+        second = self.buffer.append('room-1', 'u2', 'hi', reply_to_id=first['id'])
+
+        self.assertNotEqual(first['id'], second['id'])
+        self.assertEqual([r['id'] for r in self.buffer.pending('room-1')], [first['id'], second['id']])
+        self.assertEqual(self.buffer.get('room-1', second['id'])['reply_to_id'], first['id'])
+        self.assertEqual(self.buffer.rooms(), ['room-1'])
+
+    def test_flush_persists_then_acknowledges(self):
+        self.buffer.append('room-1', 'u1', 'a')
+        self.buffer.append('room-2', 'u1', 'b')
+
+        with mock.patch.object(self.buffer, '_persist', side_effect=len) as persist:
+            written = self.buffer.flush()
+
+        self.assertEqual(written, 2)
+        self.assertEqual(persist.call_count, 2)
+        self.assertEqual(self.buffer.pending('room-1'), [])
+        self.assertEqual(self.buffer.rooms(), [])
+
+    def test_failed_persist_keeps_messages_for_replay(self):
+        record = self.buffer.append('room-1', 'u1', 'a')
+
+        with mock.patch.object(self.buffer, '_persist', side_effect=RuntimeError('db down')):
+            with self.assertRaises(RuntimeError):
+                self.buffer.flush_room('room-1')
+
+        self.assertEqual(self.buffer.get('room-1', record['id'])['content'], 'a')
+
+    @override_settings(CHAT_BUFFER_FLUSH_MS=0)
+    def test_zero_interval_writes_through(self):
+        with mock.patch.object(self.buffer, 'flush') as flush:
+            async_to_sync(self.buffer.schedule_flush)()
+        flush.assert_called_once_with()
+
+    @override_settings(CHAT_BUFFER_FLUSH_MS=10000, CHAT_BUFFER_MAX_BATCH=2)
+    def test_full_batch_flushes_early(self):
+        async def _run():
+            await self.buffer.schedule_flush()
+            self.assertEqual(flush.call_count, 0)
+            await self.buffer.schedule_flush()
+            self.buffer._flush_task.cancel()
+
+        with mock.patch.object(self.buffer, 'flush') as flush:
+            async_to_sync(_run)()
+        flush.assert_called_once_with()
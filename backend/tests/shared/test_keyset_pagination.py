@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import uuid
+from datetime import datetime, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.test import SimpleTestCase
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from shared.pagination import KeysetPagination
+
+
+class DateJoinedPagination(KeysetPagination):
+    ordering = ('-date_joined', '-id')
+
+
+class KeysetPaginationTests(SimpleTestCase):
+    """Validate cursor handling of the keyset paginator without a database."""
+
+    def setUp(self):
+        super().setUp()
+        self.factory = APIRequestFactory()
+        self.paginator = DateJoinedPagination()
+        self.model = get_user_model()
+        self.paginator.ordering = self.paginator.get_ordering(self.model.objects.all())
+
+    def request(self, **params):
+        return Request(self.factory.get('/api/users/', params))
+
+    def test_cursor_round_trip_restores_typed_values(self):
+        joined = datetime(2025, 1, 2, 3, 4, 5, tzinfo=dt_timezone.utc)
+        user_id = uuid.uuid4()
+        token = self.paginator.encode_cursor([joined.isoformat(), str(user_id)], reverse=True)
+
+        position, reverse = self.paginator.decode_cursor(self.request(cursor=token), self.model)
+
+        self.assertEqual(position, [joined, user_id])
+        self.assertTrue(reverse)
+
+    def test_tampered_cursor_is_rejected(self):
+        with self.assertRaises(NotFound):
+            self.paginator.decode_cursor(self.request(cursor='not-a-cursor'), self.model)
+
+    def test_keyset_predicate_is_lexicographic(self):
+        predicate = KeysetPagination._after(('-date_joined', '-id'), ['t', 'i'])
+
+        expected = Q() | (Q() & Q(date_joined__lt='t')) | (Q(date_joined='t') & Q(id__lt='i'))
+        self.assertEqual(predicate, expected)
+
+    def test_queryset_ordering_gets_primary_key_tie_breaker(self):
+        ordering = self.paginator.get_ordering(self.model.objects.order_by('email'))
+
+        self.assertEqual(ordering, ('email', 'id'))
+
+    def test_unknown_ordering_falls_back_to_default(self):
+        ordering = self.paginator.get_ordering(self.model.objects.order_by('groups__name'))
+
+        self.assertEqual(ordering, ('-date_joined', '-id'))
+
+    def test_count_is_optional(self):
+        self.paginator.include_count = False
+        self.assertFalse(self.paginator.should_count(self.request()))
+        self.assertTrue(self.paginator.should_count(self.request(include_count='true')))
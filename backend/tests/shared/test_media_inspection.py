@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from shared.services.media_inspection_service import MediaInspectionService
+
+PROBE = {
+    'format': {'duration': '100.0', 'size': '4096', 'bit_rate': '800000'},
+    'streams': [
+        {'codec_type': 'video', 'codec_name': 'h264', 'width': 1920, 'height': 1080, 'r_frame_rate': '30000/1001'},
+        {'codec_type': 'audio', 'codec_name': 'aac'},
+    ],
+}
+
+
+@override_settings(MEDIA_THUMBNAIL_COUNT=2, MEDIA_SPRITE_GRID=(2, 2))
+class MediaInspectionServiceTests(SimpleTestCase):
+    """Validate the single extraction pass and the fingerprint cache in front of it."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.workdir, True)
+        self.source = os.path.join(self.workdir, 'movie.mp4')
+        with open(self.source, 'wb') as handle:
+            handle.write(b'x' * 100)
+        self.service = MediaInspectionService()
+        self.commands = []
+        self.uploads = []
+
+    def upload(self, path, name):
+        self.uploads.append(name)
+        return f'https://cdn.example.com/{name}'
+
+    def fake_run(self, command, **kwargs):
+        self.commands.append(command[0])
+        if command[0] == 'ffprobe':
+            return subprocess.CompletedProcess(command, 0, json.dumps(PROBE), '')
+        outdir = os.path.dirname(command[-1])
+        for name in ('thumbnail_01.jpg', 'thumbnail_02.jpg', 'sprite.jpg', 'preview.mp4'):
+            with open(os.path.join(outdir, name), 'wb') as handle:
+                handle.write(b'out')
+        return subprocess.CompletedProcess(command, 0, '', '')
+
+    def test_parse_probe_reads_primary_video_stream(self):
+        metadata = MediaInspectionService.parse_probe(PROBE)
+
+        self.assertEqual(metadata['duration'], 100.0)
+        self.assertEqual(metadata['fps'], 29.97)
+        self.assertEqual(metadata['bitrate'], 800000)
+        self.assertTrue(metadata['has_audio'])
+        self.assertIsNone(MediaInspectionService.parse_probe({'streams': [{'codec_type': 'audio'}]}))
+
+    def test_build_command_splits_one_decode_into_every_output(self):
+        metadata = MediaInspectionService.parse_probe(PROBE)
+
+        command, sprite = self.service.build_command('/in/movie.mp4', metadata, '/work')
+
+        self.assertEqual(command.count('-i'), 1)
+        graph = command[command.index('-filter_complex') + 1]
+        self.assertIn('split=3', graph)
+        self.assertIn('tile=2x2', graph)
+        self.assertIn('[0:a]atrim=start=10.000:duration=30.000', graph)
+        self.assertEqual(sprite['interval'], 25.0)
+        self.assertEqual(sprite['tile_height'], 90)
+
+    def test_identical_source_is_served_from_cache(self):
+        copy = os.path.join(self.workdir, 'copy.mp4')
+        shutil.copy(self.source, copy)
+
+        with patch('shared.services.media_inspection_service.subprocess.run', side_effect=self.fake_run):
+            first = self.service.inspect(self.source, self.upload)
+            second = self.service.inspect(copy, self.upload)
+
+        self.assertEqual(self.commands, ['ffprobe', 'ffmpeg'])
+        self.assertEqual(second, first)
+        self.assertEqual(len(first['thumbnails']), 2)
+        self.assertEqual(first['sprite']['url'], f"https://cdn.example.com/{first['fingerprint']}/sprite.jpg")
+        self.assertEqual(len(self.uploads), 4)
+
+    def test_sources_differing_only_in_the_middle_are_inspected_separately(self):
+        altered = os.path.join(self.workdir, 'altered.mp4')
+        with open(altered, 'wb') as handle:
+            handle.write(b'x' * 50 + b'y' + b'x' * 49)
+
+        with patch('shared.services.media_inspection_service.subprocess.run', side_effect=self.fake_run):
+            first = self.service.inspect(self.source, self.upload)
+            second = self.service.inspect(altered, self.upload)
+
+        self.assertEqual(self.commands, ['ffprobe', 'ffmpeg', 'ffprobe', 'ffmpeg'])
+        self.assertEqual(first['fingerprint'], hashlib.sha256(b'x' * 100).hexdigest())
+        self.assertNotEqual(second['fingerprint'], first['fingerprint'])
+
+    def test_known_content_hash_finds_the_cached_result_without_reading_the_source(self):
+        with patch('shared.services.media_inspection_service.subprocess.run', side_effect=self.fake_run):
+            first = self.service.inspect(self.source, self.upload)
+
+        with patch.object(self.service, 'local_copy') as local_copy:
+            second = self.service.inspect('https://cdn.example.com/copy.mp4', self.upload,
+                                          content_hash=first['fingerprint'])
+
+        local_copy.assert_not_called()
+        self.assertEqual(second, first)
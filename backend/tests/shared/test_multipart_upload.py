@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import boto3
+from botocore.stub import ANY, Stubber
+from django.test import SimpleTestCase, override_settings
+
+from shared.exceptions import VideoError
+from shared.services.multipart_upload_service import MultipartUploadService
+
+MIB = 1024 * 1024
+
+
+@override_settings(VIDEO_STORAGE_BUCKET='videos', VIDEO_MULTIPART_PART_SIZE=5 * MIB, VIDEO_MULTIPART_URL_BATCH=2)
+class MultipartUploadServiceTests(SimpleTestCase):
+    """Validate resumable multipart uploads against a local S3 endpoint."""
+
+    def setUp(self):
+        super().setUp()
+        client = boto3.client('s3', region_name='us-east-1', endpoint_url='http://localhost:9000',
+                              aws_access_key_id='local', aws_secret_access_key='local')
+        self.stubber = Stubber(client)
+        self.stubber.activate()
+        self.addCleanup(self.stubber.deactivate)
+        self.service = MultipartUploadService(client=client)
+        self.upload = SimpleNamespace(id='upload-1', filename='movie.mp4', file_size=12 * MIB, status='pending',
+                                      storage_key='', multipart_upload_id='', part_size=None,
+                                      completed_parts=[], progress_percentage=0.0, completed_at=None,
+                                      save=MagicMock())
+
+    def start(self):
+        self.stubber.add_response('create_multipart_upload', {'UploadId': 'mpu-1'},
+                                  {'Bucket': 'videos', 'Key': ANY, 'ContentType': 'video/mp4'})
+        return self.service.start(self.upload, 'video/mp4')
+
+    def test_start_hands_out_first_batch_of_part_urls(self):
+        payload = self.start()
+
+        self.assertEqual(self.upload.status, 'uploading')
+        self.assertEqual(payload['part_count'], 3)
+        self.assertEqual(payload['missing_parts'], [1, 2, 3])
+        self.assertEqual([part['part_number'] for part in payload['part_urls']], [1, 2])
+        self.assertTrue(payload['part_urls'][0]['url'].startswith('http://localhost:9000/videos/'))
+        self.assertIn('uploadId=mpu-1', payload['part_urls'][1]['url'])
+
+        # Resuming later does not start a second upload
+        self.assertEqual(self.service.start(self.upload, 'video/mp4')['missing_parts'], [1, 2, 3])
+        self.stubber.assert_no_pending_responses()
+
+    def test_resume_continues_with_missing_parts_and_storage_decides_completion(self):
+        self.start()
+        status = self.service.record_parts(self.upload, [{'part_number': 1, 'etag': '"a"'}])
+        self.assertEqual(status['missing_parts'], [2, 3])
+        self.assertEqual([part['part_number'] for part in status['part_urls']], [2, 3])
+        self.assertEqual(status['part_urls'][1]['size'], 2 * MIB)
+        self.assertAlmostEqual(self.upload.progress_percentage, 41.67)
+
+        # Part 2 reached storage but the client dropped before reporting it
+        self.stubber.add_response('list_parts', {
+            'Parts': [{'PartNumber': 1, 'ETag': '"a"', 'Size': 5 * MIB},
+                      {'PartNumber': 2, 'ETag': '"b"', 'Size': 5 * MIB}],
+            'IsTruncated': False,
+        })
+        with self.assertRaises(VideoError):
+            self.service.complete(self.upload)
+        self.assertEqual(self.service.missing_parts(self.upload), [3])
+
+        self.service.record_parts(self.upload, [{'part_number': 3, 'etag': '"c"'}])
+        self.stubber.add_response('list_parts', {
+            'Parts': [{'PartNumber': 1, 'ETag': '"a"', 'Size': 5 * MIB},
+                      {'PartNumber': 2, 'ETag': '"b"', 'Size': 5 * MIB}],
+            'IsTruncated': True, 'NextPartNumberMarker': 2,
+        })
+        self.stubber.add_response('list_parts', {
+            'Parts': [{'PartNumber': 3, 'ETag': '"c"', 'Size': 2 * MIB}], 'IsTruncated': False,
+        }, {'Bucket': 'videos', 'Key': ANY, 'UploadId': 'mpu-1', 'PartNumberMarker': 2})
+        self.stubber.add_response('complete_multipart_upload', {}, {
+            'Bucket': 'videos', 'Key': self.upload.storage_key, 'UploadId': 'mpu-1',
+            'MultipartUpload': {'Parts': [{'PartNumber': 1, 'ETag': '"a"'}, {'PartNumber': 2, 'ETag': '"b"'},
+                                          {'PartNumber': 3, 'ETag': '"c"'}]},
+        })
+
+        self.assertEqual(self.service.complete(self.upload), self.upload.storage_key)
+        self.assertEqual(self.upload.progress_percentage, 100.0)
+        self.stubber.assert_no_pending_responses()
+
+    def test_part_size_grows_to_stay_within_part_limit(self):
+        self.assertEqual(self.service.plan_part_size(100 * MIB), 5 * MIB)
+        self.assertEqual(self.service.plan_part_size(100 * 1024 * MIB), 11 * MIB)
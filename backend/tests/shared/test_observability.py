@@ -3,7 +3,8 @@ from __future__ import annotations
 from io import StringIO
 
 import asyncio
-from unittest.mock import patch
+import threading
+from unittest.mock import MagicMock, patch
 
 from django.core.management import call_command
 from django.http import HttpResponse
@@ -17,7 +18,7 @@ from config.celery import (
 from shared.middleware.database_optimization import CacheOptimizationMiddleware
 from shared.middleware.enhanced_middleware import RequestLoggingMiddleware
 from shared.middleware.performance_middleware import APIPerformanceMiddleware
-from shared.observability import observability
+from shared.observability import ObservabilityClient, observability
 from shared.monitoring import monitoring_engine
 
 
@@ -128,6 +129,7 @@ class ObservabilityInstrumentationTests(SimpleTestCase):
         )
         with observability.span("test.span", tags={"component": "tests"}):
             pass
+        observability.flush()
 
         payload = monitoring_engine.get_recent_observability_payload()
         self.assertEqual(len(payload['metrics']), 1)
@@ -150,6 +152,7 @@ class ObservabilityInstrumentationTests(SimpleTestCase):
             severity="error",
             tags={"component": "tests"},
         )
+        observability.flush()
 
         summary = monitoring_engine.get_observability_summary()
         self.assertGreaterEqual(summary.get('events_total', 0), 1.0)
@@ -169,6 +172,43 @@ class ObservabilityInstrumentationTests(SimpleTestCase):
         self.assertIn('observability', metrics)
 
 
+class ObservabilityBufferTests(SimpleTestCase):
+    """Bounded storage and batched, off-thread export."""
+
+    def test_records_are_bounded_and_exported_in_batches(self):
+        client = ObservabilityClient(buffer_size=3, export_queue_size=4, flush_interval=3600)
+        exporter = MagicMock(spec=["export_batch"])
+        client.register_exporter(exporter)
+
+        for value in range(6):
+            client.record_metric("unit.metric", value)
+        client.record_event("unit.event", "hello")
+
+        self.assertEqual([metric.value for metric in client.get_metrics()], [3.0, 4.0, 5.0])
+        exporter.export_batch.assert_not_called()
+        self.assertEqual(client.dropped, 3)
+
+        self.assertEqual(client.flush(), 4)
+        metrics, events, spans = exporter.export_batch.call_args.args
+        self.assertEqual([metric.value for metric in metrics], [3.0, 4.0, 5.0])
+        self.assertEqual([event.name for event in events], ["unit.event"])
+        self.assertEqual(spans, [])
+        self.assertEqual(client.flush(), 0)
+        exporter.export_batch.assert_called_once()
+
+    def test_background_flusher_exports_without_explicit_flush(self):
+        client = ObservabilityClient(flush_interval=0.01)
+        exported = threading.Event()
+        exporter = MagicMock(spec=["export_metric"])
+        exporter.export_metric.side_effect = lambda metric: exported.set()
+        client.register_exporter(exporter)
+
+        client.record_metric("unit.metric", 1)
+
+        self.assertTrue(exported.wait(5))
+        self.assertNotEqual(client._flusher.ident, threading.get_ident())
+
+
 class ObservabilityManagementCommandTests(TestCase):
     """Ensure the verification command exercises cache and Celery plumbing."""
 
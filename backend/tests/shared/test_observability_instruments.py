@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from shared.monitoring import METRICS_SNAPSHOT_CACHE_KEY, ApplicationMetricsCollector, monitoring_engine
+from shared.observability import ObservabilityClient, observability
+from shared.observability_openmetrics import InstrumentFile
+from shared.observability_instruments import Histogram, InstrumentRegistry
+
+
+class HistogramTests(SimpleTestCase):
+    """Fixed-bucket histograms report quantiles within the bucket error."""
+
+    def test_quantiles_stay_within_two_percent(self):
+        rng = random.Random(7)
+        values = sorted(rng.lognormvariate(3, 1) for _ in range(20000))
+        histogram = Histogram("latency")
+        for value in values:
+            histogram.observe(value)
+
+        for q in (0.5, 0.95, 0.99):
+            exact = values[int(q * len(values)) - 1]
+            self.assertAlmostEqual(histogram.quantile(q) / exact, 1.0, delta=0.021)
+        self.assertEqual(histogram.count, 20000)
+        self.assertLess(len(histogram.buckets), 400)
+
+    def test_registry_caps_series_cardinality(self):
+        registry = InstrumentRegistry(max_series=3)
+        for user_id in range(10):
+            registry.get("counter", "logins", {"user": str(user_id)}).add()
+
+        # Three regular series plus the shared overflow series
+        self.assertEqual(len(registry.series()), 4)
+        self.assertEqual(registry.total("logins"), 10)
+        self.assertEqual(registry.total("logins", {"overflow": "true"}), 7)
+
+
+class ObservabilityInstrumentTests(SimpleTestCase):
+    """Metrics, spans and events aggregate into instruments as they are recorded."""
+
+    def test_samples_spans_and_events_aggregate_per_series(self):
+        client = ObservabilityClient()
+        for value in (10, 20, 30, 40):
+            client.record_metric("http.response_time_ms", value, tags={"method": "GET", "status": "200"})
+        client.record_metric("http.response_time_ms", 900, tags={"method": "POST", "status": "500"})
+        client.increment("cache.hits", tags={"backend": "redis"})
+        client.set_gauge("queue.depth", 7)
+        client.record_event("job.failed", "boom", severity="error")
+        with client.span("unit.work"):
+            pass
+
+        gets = client.histogram_summary("http.response_time_ms", where={"method": "GET"})
+        self.assertEqual(gets["count"], 4)
+        self.assertAlmostEqual(gets["p50"], 20, delta=0.5)
+        self.assertEqual(client.histogram_summary("http.response_time_ms")["max"], 900)
+        self.assertEqual(client.instruments.total("observability.events", {"severity": "error"}), 1)
+        self.assertEqual(client.histogram_summary("span.duration_ms")["count"], 1)
+        kinds = {(item["name"], item["type"]) for item in client.instruments.snapshot()}
+        self.assertIn(("cache.hits", "counter"), kinds)
+        self.assertIn(("queue.depth", "gauge"), kinds)
+
+    def test_api_metrics_report_latency_percentiles(self):
+        observability.reset()
+        monitoring_engine.clear_observability_streams()
+        for value in range(1, 101):
+            observability.record_metric("http.response_time_ms", value, tags={"status": "200"})
+        observability.record_metric("http.response_time_ms", 5000, tags={"status": "503"})
+
+        metrics = ApplicationMetricsCollector().get_api_metrics()
+
+        self.assertAlmostEqual(metrics["api_p95_response_time"], 95, delta=2)
+        self.assertAlmostEqual(metrics["api_error_rate"], 100 / 101, places=3)
+        self.assertGreater(metrics["api_p99_response_time"], 98)
+        summary = monitoring_engine.get_observability_summary()
+        self.assertEqual(summary["http_requests_total"], 101)
+        observability.reset()
+
+    def test_cached_snapshot_reports_api_metrics_of_the_web_workers(self):
+        # The snapshot is refreshed by a Celery worker that never records HTTP responses
+        observability.reset()
+        self.addCleanup(observability.reset)
+        self.addCleanup(cache.delete, METRICS_SNAPSHOT_CACHE_KEY)
+        cache.set(METRICS_SNAPSHOT_CACHE_KEY, {
+            'collected_at': time.time(),
+            'metrics': {'application': {'active_parties': 4, 'api_p95_response_time': 0}},
+        })
+        web_worker = ObservabilityClient()
+        for value in range(1, 101):
+            web_worker.record_metric("http.response_time_ms", value, tags={"status": "200"})
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        instrument_file = InstrumentFile(os.path.join(directory, "instruments-99999.db"))
+        instrument_file.write(json.dumps({"pid": 99999, "started_at": time.time() - 120, "written_at": time.time(),
+                                          "rows": web_worker.instruments.dump()}).encode())
+        instrument_file.close()
+
+        with override_settings(OBSERVABILITY_MULTIPROC_DIR=directory):
+            application = monitoring_engine.get_metrics_snapshot()['metrics']['application']
+
+        self.assertEqual(application['active_parties'], 4)
+        self.assertAlmostEqual(application['api_p95_response_time'], 95, delta=2)
+        self.assertAlmostEqual(application['api_requests_per_minute'], 50, delta=1)
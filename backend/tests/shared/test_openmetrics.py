@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from shared.health_views import OpenMetricsView
+from shared.monitoring import METRICS_SNAPSHOT_CACHE_KEY, monitoring_engine
+from shared.observability import ObservabilityClient, observability
+from shared.observability_openmetrics import InstrumentFile, MultiprocessInstrumentStore, render
+
+
+class OpenMetricsRenderTests(SimpleTestCase):
+    """Instruments render as OpenMetrics families."""
+
+    def test_counters_gauges_and_histograms_render_as_families(self):
+        client = ObservabilityClient()
+        client.increment("cache.hits_total", 3, tags={"backend": "redis"})
+        client.set_gauge("queue.depth", 7)
+        for value in (0.5, 4, 40, 400):
+            client.observe("http.response_time_ms", value, tags={"route": 'api/videos/<uuid:pk>/', "status": "200"})
+
+        text = render(client.instruments, buckets=(1, 50))
+        lines = text.splitlines()
+
+        self.assertIn("# TYPE watchparty_cache_hits counter", lines)
+        self.assertIn('watchparty_cache_hits_total{backend="redis"} 3', lines)
+        self.assertIn("watchparty_queue_depth 7", lines)
+        labels = 'route="api/videos/<uuid:pk>/",status="200"'
+        self.assertIn(f'watchparty_http_response_time_ms_bucket{{{labels},le="1"}} 1', lines)
+        self.assertIn(f'watchparty_http_response_time_ms_bucket{{{labels},le="50"}} 3', lines)
+        self.assertIn(f'watchparty_http_response_time_ms_bucket{{{labels},le="+Inf"}} 4', lines)
+        self.assertIn(f'watchparty_http_response_time_ms_count{{{labels}}} 4', lines)
+        self.assertEqual(lines[-1], "# EOF")
+
+
+class MultiprocessInstrumentStoreTests(SimpleTestCase):
+    """Per-process dumps in a shared directory merge into one view."""
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+
+    def write_other_process(self, pid, rows, written_at):
+        instrument_file = InstrumentFile(os.path.join(self.directory, f"instruments-{pid}.db"))
+        instrument_file.write(json.dumps({"pid": pid, "written_at": written_at, "rows": rows}).encode())
+        instrument_file.close()
+
+    def test_counters_and_histograms_sum_and_stale_gauges_drop(self):
+        client = ObservabilityClient()
+        client.increment("logins", 2)
+        client.set_gauge("connections", 5)
+        client.observe("latency", 10)
+        store = MultiprocessInstrumentStore(self.directory, interval=60)
+        self.assertTrue(store.write(client.instruments))
+        self.assertFalse(store.write(client.instruments))
+
+        other = ObservabilityClient()
+        other.increment("logins", 3)
+        other.set_gauge("connections", 9)
+        other.observe("latency", 30)
+        self.write_other_process(99998, other.instruments.dump(), time.time())
+        self.write_other_process(99999, other.instruments.dump(), time.time() - 3600)
+
+        merged = store.collect()
+
+        self.assertEqual(merged.total("logins"), 8)
+        self.assertEqual(merged.merged_histogram("latency").count, 3)
+        gauges = {dict(gauge.tags)["pid"]: gauge.value for gauge in merged.series("gauge", "connections")}
+        self.assertEqual(gauges, {str(os.getpid()): 5, "99998": 9})
+
+    def test_merged_registry_starts_at_the_earliest_process(self):
+        self.write_other_process(99998, [], time.time())
+        instrument_file = InstrumentFile(os.path.join(self.directory, "instruments-99999.db"))
+        instrument_file.write(json.dumps({"pid": 99999, "started_at": 1000.0, "written_at": time.time(),
+                                          "rows": []}).encode())
+        instrument_file.close()
+
+        self.assertEqual(MultiprocessInstrumentStore(self.directory).collect().started_at, 1000.0)
+
+    def test_concurrent_writes_leave_a_readable_file(self):
+        client = ObservabilityClient()
+        store = MultiprocessInstrumentStore(self.directory)
+
+        def write(count):
+            for value in range(200):
+                client.increment(f"writes.{count}.{value}")
+                store.write(client.instruments, force=True)
+
+        threads = [threading.Thread(target=write, args=(count,)) for count in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(store.collect().series("counter")), 800)
+
+    def test_growing_payload_remaps_the_file(self):
+        instrument_file = InstrumentFile(os.path.join(self.directory, "instruments-1.db"))
+        instrument_file.write(b"small")
+        instrument_file.write(b"x" * 200000)
+
+        self.assertEqual(InstrumentFile.read(instrument_file.path), b"x" * 200000)
+        instrument_file.close()
+
+
+@override_settings(OBSERVABILITY_SCRAPE_TOKEN="scrape-secret", OBSERVABILITY_MULTIPROC_DIR="")
+class OpenMetricsViewTests(SimpleTestCase):
+    """The scrape endpoint serves cached values and never touches the database."""
+
+    def setUp(self):
+        super().setUp()
+        observability.reset()
+        self.factory = RequestFactory()
+        self.addCleanup(cache.delete, METRICS_SNAPSHOT_CACHE_KEY)
+
+    def test_scrape_renders_instruments_and_cached_collectors(self):
+        observability.increment("party.joins", tags={"source": "web"})
+        cache.set(METRICS_SNAPSHOT_CACHE_KEY, {
+            'collected_at': time.time() - 30,
+            'metrics': {'database': {'db_active_connections': 12}, 'application': {'active_parties': 4}},
+        })
+
+        with patch.object(monitoring_engine.database_collector, 'get_connection_metrics') as collector:
+            response = OpenMetricsView.as_view()(
+                self.factory.get("/metrics", HTTP_AUTHORIZATION="Bearer scrape-secret")
+            )
+
+        collector.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("application/openmetrics-text"))
+        body = response.content.decode()
+        self.assertIn('watchparty_party_joins_total{source="web"} 1', body)
+        self.assertIn("watchparty_database_db_active_connections 12", body)
+        self.assertIn("watchparty_application_active_parties 4", body)
+        observability.reset()
+
+    def test_scrape_requires_token_when_configured(self):
+        response = OpenMetricsView.as_view()(self.factory.get("/metrics"))
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(OBSERVABILITY_SCRAPE_TOKEN="")
+    def test_scrape_is_disabled_without_a_token(self):
+        response = OpenMetricsView.as_view()(self.factory.get("/metrics"))
+        self.assertEqual(response.status_code, 404)
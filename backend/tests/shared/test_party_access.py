@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from shared.services.party_access_service import (
+    VISIBILITY_FIELD,
+    PartyAccess,
+    PartyAccessService,
+)
+
+
+class PartyAccessServiceTests(SimpleTestCase):
+    """Validate the cached party ACL consulted on WebSocket connects."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.service = PartyAccessService()
+        self.service._replace('p1', {
+            VISIBILITY_FIELD: 'private',
+            'host': 'host',
+            'u1': 'active',
+            'u2': 'inactive',
+        })
+
+    def test_cached_entries_answer_without_database(self):
+        with mock.patch.object(self.service, 'load') as load, \
+                mock.patch.object(self.service, '_load_participant') as load_participant:
+            host = self.service.lookup('p1', 'host')
+            active = self.service.lookup('p1', 'u1')
+            inactive = self.service.lookup('p1', 'u2')
+
+        load.assert_not_called()
+        load_participant.assert_not_called()
+        self.assertTrue(host.allows(require_active=True, allow_public=False))
+        self.assertTrue(active.allows(require_active=True))
+        self.assertTrue(inactive.allows())
+        self.assertFalse(inactive.allows(require_active=True))
+
+    def test_unknown_user_falls_back_to_single_row_lookup(self):
+        with mock.patch.object(self.service, '_load_participant', return_value=None) as load_participant:
+            access = self.service.lookup('p1', 'stranger')
+
+        load_participant.assert_called_once_with('p1', 'stranger')
+        self.assertFalse(access.allows())
+
+    def test_missing_acl_is_loaded_once(self):
+        entries = {VISIBILITY_FIELD: 'public'}
+        with mock.patch.object(self.service, 'load', return_value=entries) as load:
+            access = self.service.lookup('p2', 'u9')
+
+        load.assert_called_once_with('p2')
+        self.assertTrue(access.allows())
+        self.assertFalse(access.allows(allow_public=False))
+
+    def test_kick_and_ban_write_through(self):
+        self.service.remove_participant('p1', 'u1')
+        self.service.ban('p1', 'u2')
+
+        with mock.patch.object(self.service, '_load_participant', return_value=None):
+            self.assertFalse(self.service.lookup('p1', 'u1').allows())
+        self.assertTrue(self.service.lookup('p1', 'u2').is_banned)
+
+        self.service.unban('p1', 'u2')
+        self.assertFalse(self.service.lookup('p1', 'u2').is_banned)
+
+    def test_writes_do_not_create_partial_acl(self):
+        self.service.set_participant('p3', 'u1')
+        self.assertIsNone(cache.get('party_acl:p3'))
+
+    def test_expired_ban_no_longer_applies(self):
+        self.assertFalse(PartyAccess(banned_until=time.time() - 1).is_banned)
+        self.assertTrue(PartyAccess(banned_until=0).is_banned)
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from shared.services.party_clock_service import PartyClockService, PartyClockState
+
+
+class PartyClockServiceTests(SimpleTestCase):
+    """Exercise the cache-backed party clock used when Redis is unavailable."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.clock = PartyClockService()
+
+    def test_update_bumps_sequence_and_persists_fields(self):
+        state = self.clock.update("party-1", position=12.5, is_playing=True, rate=1.5)
+
+        self.assertEqual(state.seq, 1)
+        self.assertTrue(state.is_playing)
+        self.assertEqual(state.rate, 1.5)
+
+        reread = self.clock.get("party-1")
+        self.assertEqual(reread.seq, 1)
+        self.assertEqual(reread.position, 12.5)
+
+    def test_compare_and_set_rejects_stale_sequence(self):
+        self.clock.update("party-1", position=5)
+
+        applied, state = self.clock.compare_and_set("party-1", expected_seq=0, position=99)
+
+        self.assertFalse(applied)
+        self.assertEqual(state.position, 5)
+        self.assertEqual(state.seq, 1)
+
+    def test_position_is_extrapolated_from_epoch(self):
+        with patch("shared.services.party_clock_service.time.time", return_value=1000.0):
+            self.clock.update("party-1", position=10, is_playing=True, rate=2.0)
+
+        with patch("shared.services.party_clock_service.time.time", return_value=1003.0):
+            state = self.clock.get("party-1")
+
+        self.assertAlmostEqual(state.position_at(), 16.0)
+
+    def test_pause_reanchors_position(self):
+        with patch("shared.services.party_clock_service.time.time", return_value=1000.0):
+            self.clock.update("party-1", position=0, is_playing=True)
+
+        with patch("shared.services.party_clock_service.time.time", return_value=1004.0):
+            state = self.clock.update("party-1", is_playing=False)
+
+        self.assertFalse(state.is_playing)
+        self.assertAlmostEqual(state.position, 4.0)
+
+    def test_position_is_clamped_to_duration(self):
+        state = PartyClockState(position=50, is_playing=True, epoch=10, duration=55, server_time=20)
+        self.assertEqual(state.position_at(), 55)
+
+    def test_unknown_fields_are_rejected(self):
+        with self.assertRaises(ValueError):
+            self.clock.compare_and_set("party-1", bogus=True)
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from shared.services.presence_service import PresenceService
+
+
+@override_settings(PRESENCE_TTL=30)
+class PresenceServiceTests(SimpleTestCase):
+    """Validate the cache-backed presence registry used by WebSocket consumers."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.service = PresenceService()
+
+    def test_user_with_two_connections_stays_until_both_leave(self):
+        self.assertEqual(self.service.join('chat', 'r1', 'u1'), 1)
+        self.assertEqual(self.service.join('chat', 'r1', 'u1'), 1)
+        self.assertEqual(self.service.join('chat', 'r1', 'u2'), 2)
+
+        self.assertEqual(self.service.leave('chat', 'r1', 'u1'), 2)
+        self.assertEqual(self.service.leave('chat', 'r1', 'u1'), 1)
+        self.assertEqual(self.service.members('chat', 'r1'), ['u2'])
+
+    def test_silent_connections_expire(self):
+        with mock.patch('shared.services.presence_service.time.time', return_value=1000.0):
+            self.service.join('party', 'p1', 'u1')
+            self.service.join('party', 'p1', 'u2')
+        with mock.patch('shared.services.presence_service.time.time', return_value=1020.0):
+            self.service.touch('party', 'p1', 'u2')
+        with mock.patch('shared.services.presence_service.time.time', return_value=1040.0):
+            self.assertEqual(self.service.count('party', 'p1'), 1)
+            self.assertEqual(self.service.members('party', 'p1'), ['u2'])
+
+    def test_room_index_tracks_active_rooms(self):
+        self.service.join('chat', 'r1', 'u1')
+        self.service.join('chat', 'r2', 'u1')
+        self.assertEqual(sorted(self.service.rooms('chat')), ['r1', 'r2'])
+
+        self.service.forget_room('chat', 'r1')
+        self.assertEqual(self.service.rooms('chat'), ['r2'])
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from shared import query_profiler
+from shared.middleware.database_optimization import QueryCountLimitMiddleware, QueryOptimizationMiddleware
+from shared.observability import observability
+
+
+def run_query(sql):
+    return query_profiler.profile_query(lambda *args: "rows", sql, None, False, {"connection": None})
+
+
+class SearchView:
+    pass
+
+
+@override_settings(DEBUG=False, MAX_QUERIES_PER_REQUEST=5, N_PLUS_ONE_THRESHOLD=3, QUERY_PROFILE_SAMPLE_RATE=1.0)
+class QueryProfilerTests(SimpleTestCase):
+    """Query budgets and N+1 detection from the execute wrapper, with DEBUG off."""
+
+    def setUp(self):
+        super().setUp()
+        observability.reset()
+        self.addCleanup(observability.reset)
+        self.request = RequestFactory().get("/api/search/")
+        self.request.resolver_match = SimpleNamespace(func=SimpleNamespace(view_class=SearchView))
+
+    def test_fingerprint_normalizes_literals_and_lists(self):
+        self.assertEqual(
+            query_profiler.fingerprint("SELECT * FROM \"t1\" WHERE name = 'it''s' AND id IN (%s, %s, %s) LIMIT 21"),
+            "SELECT * FROM \"t1\" WHERE name = ? AND id IN (...) LIMIT ?",
+        )
+        self.assertEqual(
+            query_profiler.fingerprint("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)"),
+            "INSERT INTO t (a, b) VALUES (%s, %s), ...",
+        )
+
+    def test_budget_and_repeated_shapes_are_recorded_per_view(self):
+        def view(request):
+            run_query("SELECT 1 FROM parties")
+            for party_id in range(6):
+                run_query(f"SELECT COUNT(*) FROM participants WHERE party_id = {party_id}")
+            return HttpResponse("ok")
+
+        middleware = QueryOptimizationMiddleware(QueryCountLimitMiddleware(view))
+        response = middleware(self.request)
+
+        view_path = f"{SearchView.__module__}.SearchView"
+        self.assertEqual(response["X-Query-Count"], "7")
+        self.assertEqual(observability.histogram_summary("db.request.queries", where={"view": view_path})["max"], 7)
+        offender = query_profiler.top_offenders()[0]
+        self.assertEqual(offender["view"], view_path)
+        self.assertEqual(offender["queries"], 6)
+        self.assertEqual(offender["sql"], "SELECT COUNT(*) FROM participants WHERE party_id = ?")
+        self.assertEqual(len(observability.get_events("database.n_plus_one")), 1)
+        self.assertEqual(len(observability.get_events("database.query_budget_exceeded")), 1)
+
+    @override_settings(QUERY_PROFILE_SAMPLE_RATE=0.0)
+    def test_unsampled_requests_are_not_profiled(self):
+        def view(request):
+            for _ in range(10):
+                run_query("SELECT 1")
+            return HttpResponse("ok")
+
+        response = QueryCountLimitMiddleware(view)(self.request)
+
+        self.assertFalse(response.has_header("X-Query-Count"))
+        self.assertIsNone(query_profiler.active_profile())
+        self.assertEqual(observability.histogram_summary("db.request.queries")["count"], 0)
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_slow_queries_are_reported_without_debug(self):
+        def view(request):
+            run_query("SELECT * FROM videos WHERE id = 42")
+            return HttpResponse("ok")
+
+        QueryOptimizationMiddleware(view)(self.request)
+
+        event = observability.get_events("database.slow_query")[0]
+        shape = "SELECT * FROM videos WHERE id = ?"
+        self.assertEqual(event.tags["fingerprint"], query_profiler.fingerprint_id(shape))
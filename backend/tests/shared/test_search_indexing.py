@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from django.utils import timezone
+
+from apps.search import indexing
+
+
+class SearchIndexingTests(SimpleTestCase):
+    """Validate search document building and the re-index queue."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        patcher = mock.patch('apps.search.indexing.get_redis_client', return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_only_public_ready_videos_are_searchable(self):
+        uploader = SimpleNamespace(first_name='Ada', last_name='Lovelace')
+        video = SimpleNamespace(title='Engines', description='Analytical', uploader=uploader, view_count=7,
+                                status='ready', visibility='public', created_at=timezone.now())
+
+        document = indexing.build_document('video', video)
+        self.assertTrue(document['is_searchable'])
+        self.assertEqual(document['popularity'], 7.0)
+        self.assertIn('Lovelace', document['body'])
+
+        video.visibility = 'private'
+        self.assertFalse(indexing.build_document('video', video)['is_searchable'])
+
+    def test_user_title_falls_back_to_email(self):
+        user = SimpleNamespace(first_name='', last_name='', email='ada@example.com', is_active=True,
+                               date_joined=timezone.now())
+        self.assertEqual(indexing.build_document('user', user)['title'], 'ada')
+
+    def test_dirty_queue_deduplicates_and_drains_in_batches(self):
+        for object_id in (1, 2, 2, 3):
+            indexing.mark_dirty('party', object_id)
+
+        first = indexing.pop_dirty('party', 2)
+        second = indexing.pop_dirty('party', 2)
+        self.assertEqual(len(first), 2)
+        self.assertEqual(sorted(first + second), ['1', '2', '3'])
+        self.assertEqual(indexing.pop_dirty('party', 2), [])
+
+    def test_refresh_backfills_an_empty_index_once(self):
+        from apps.search.tasks import refresh_search_index
+
+        search_document = mock.Mock()
+        search_document.objects.exists.side_effect = [False, True]
+        documents = mock.patch.object(indexing.apps, 'get_model', return_value=search_document)
+        with documents, mock.patch('apps.search.indexing.index_objects', return_value=3) as index_objects:
+            self.assertEqual(refresh_search_index(), 9)
+            self.assertEqual(refresh_search_index(), 0)
+
+        self.assertEqual([call.args for call in index_objects.call_args_list], [('user',), ('video',), ('party',)])
+        self.assertIsNone(cache.get(indexing.BACKFILL_LOCK_KEY))
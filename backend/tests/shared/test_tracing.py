@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import requests
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from config.celery import instrument_task_postrun, instrument_task_prerun, propagate_trace_context
+from shared import tracing
+from shared.middleware.enhanced_middleware import RequestLoggingMiddleware
+from shared.observability import observability
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+def run_query(sql):
+    connection = SimpleNamespace(alias="default")
+    return tracing.trace_query(lambda *args: "rows", sql, None, False, {"connection": connection})
+
+
+class TracingTests(SimpleTestCase):
+    """Spans form sampled trees across queries, cache calls, HTTP and Celery."""
+
+    def setUp(self):
+        super().setUp()
+        observability.reset()
+        self.addCleanup(observability.reset)
+
+    def spans(self):
+        return {span.name: span for span in observability.get_completed_spans()}
+
+    @override_settings(TRACE_SAMPLE_RATE=1.0)
+    def test_sampled_trace_links_explicit_and_automatic_spans(self):
+        with observability.span("unit.request") as root:
+            with observability.span("unit.step"):
+                run_query("SELECT 1")
+                cache.get("tracing-test")
+
+        self.assertIsNone(tracing.current())
+        spans = self.spans()
+        self.assertEqual({span.trace_id for span in spans.values()}, {root.trace_id})
+        self.assertIsNone(spans["unit.request"].parent_id)
+        self.assertEqual(spans["unit.step"].parent_id, spans["unit.request"].span_id)
+        self.assertEqual(spans["db.query"].parent_id, spans["unit.step"].span_id)
+        self.assertEqual(spans["db.query"].tags["db.statement"], "SELECT 1")
+        self.assertEqual(spans["cache.get"].parent_id, spans["unit.step"].span_id)
+        self.assertEqual([span.name for span in observability.get_trace(root.trace_id)][0], "unit.request")
+
+    @override_settings(TRACE_SAMPLE_RATE=0.0)
+    def test_unsampled_traces_keep_child_spans_only_on_error(self):
+        with observability.span("unit.ok"):
+            run_query("SELECT 1")
+        self.assertNotIn("db.query", self.spans())
+
+        with self.assertRaises(ValueError):
+            with observability.span("unit.failing"):
+                run_query("SELECT 2")
+                raise ValueError("boom")
+
+        spans = self.spans()
+        self.assertEqual(spans["db.query"].tags["db.statement"], "SELECT 2")
+        self.assertEqual(spans["db.query"].trace_id, spans["unit.failing"].trace_id)
+        self.assertEqual(observability.instruments.total("trace.tail_sampled"), 1)
+        # Aggregates cover every query, sampled or not
+        self.assertEqual(observability.histogram_summary("span.duration_ms", where={"span": "db.query"})["count"], 2)
+
+    @override_settings(TRACE_SAMPLE_RATE=1.0)
+    def test_outgoing_http_carries_traceparent(self):
+        response = requests.Response()
+        response.status_code = 204
+        with patch("requests.adapters.HTTPAdapter.send", return_value=response) as send:
+            with observability.span("unit.request") as root:
+                requests.get("https://api.example.com/v1/items?token=secret")
+
+        sent = send.call_args[0][0]
+        context = tracing.parse_traceparent(sent.headers["traceparent"])
+        http_span = self.spans()["http.client"]
+        self.assertEqual(context.trace.trace_id, root.trace_id)
+        self.assertEqual(context.span_id, self.spans()["unit.request"].span_id)
+        self.assertEqual(http_span.tags, {"http.method": "GET", "http.host": "api.example.com", "http.status_code": "204"})
+
+    def test_celery_tasks_continue_the_publishing_trace(self):
+        headers = {}
+        with observability.span("unit.request") as root:
+            propagate_trace_context(headers=headers)
+
+        task = SimpleNamespace(name="unit.task", request=SimpleNamespace(delivery_info={}, traceparent=headers["traceparent"]))
+        instrument_task_prerun(task_id="task-1", task=task)
+        self.assertEqual(tracing.current().trace.trace_id, root.trace_id)
+        instrument_task_postrun(task_id="task-1", task=task, state="SUCCESS")
+
+        self.assertIsNone(tracing.current())
+        self.assertEqual(self.spans()["celery.task"].trace_id, root.trace_id)
+        self.assertEqual(self.spans()["celery.task"].parent_id, self.spans()["unit.request"].span_id)
+
+    @override_settings(TRACE_SAMPLE_RATE=0.0, TRACE_TRUSTED_PROXIES=[])
+    def test_requests_continue_incoming_trace_but_sample_locally(self):
+        sampled = []
+        middleware = RequestLoggingMiddleware(lambda request: sampled.append(tracing.current().trace.sampled)
+                                              or HttpResponse("ok"))
+        request = RequestFactory().get("/api/search/", HTTP_TRACEPARENT=f"00-{TRACE_ID}-{PARENT_ID}-01")
+
+        response = middleware(request)
+
+        span = self.spans()["http.request"]
+        self.assertEqual(response["X-Trace-Id"], TRACE_ID)
+        self.assertEqual((span.trace_id, span.parent_id), (TRACE_ID, PARENT_ID))
+        self.assertEqual(sampled, [False])
+
+    @override_settings(TRACE_SAMPLE_RATE=0.0, TRACE_TRUSTED_PROXIES=["10.0.0.0/8"])
+    def test_trusted_proxies_decide_sampling(self):
+        sampled = []
+        middleware = RequestLoggingMiddleware(lambda request: sampled.append(tracing.current().trace.sampled)
+                                              or HttpResponse("ok"))
+
+        middleware(RequestFactory().get("/", HTTP_TRACEPARENT=f"00-{TRACE_ID}-{PARENT_ID}-01", REMOTE_ADDR="10.1.2.3"))
+        middleware(RequestFactory().get("/", HTTP_TRACEPARENT=f"00-{TRACE_ID}-{PARENT_ID}-01", REMOTE_ADDR="192.0.2.1"))
+
+        self.assertEqual(sampled, [True, False])
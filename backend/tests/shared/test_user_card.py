@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import uuid
+from types import SimpleNamespace
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from shared.services.user_card_service import UserCardService, invalidate_user_card
+
+
+def make_user(first_name="Ada", **extra):
+    return SimpleNamespace(
+        id=uuid.uuid4(),
+        pk=None,
+        first_name=first_name,
+        last_name="Lovelace",
+        full_name=f"{first_name} Lovelace",
+        avatar=None,
+        is_premium=False,
+        **extra,
+    )
+
+
+class UserCardServiceTests(SimpleTestCase):
+    """Validate the two-level user card cache used by WebSocket consumers."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.service = UserCardService()
+
+    def test_card_is_projected_to_requested_fields(self):
+        user = make_user()
+        card = self.service.get_card(user, ("id", "first_name", "avatar"))
+
+        self.assertEqual(card, {"id": str(user.id), "first_name": "Ada", "avatar": None})
+
+    def test_local_hit_does_not_rebuild_card(self):
+        user = make_user()
+        self.service.get_card(user)
+        user.first_name = "Changed"
+
+        self.assertEqual(self.service.get_card(user)["first_name"], "Ada")
+        self.assertEqual(async_to_sync(self.service.aget_card)(user)["first_name"], "Ada")
+
+    def test_invalidation_drops_local_and_shared_copies(self):
+        user = make_user()
+        self.service.get_card(user)
+        user.first_name = "Changed"
+
+        self.service.invalidate(user.id)
+
+        self.assertIsNone(cache.get(f"user_card:{user.id}"))
+        self.assertEqual(self.service.get_card(user)["first_name"], "Changed")
+
+    def test_signal_receiver_invalidates_global_service(self):
+        from shared.services.user_card_service import user_card_service
+
+        user = make_user()
+        user.pk = user.id
+        user_card_service.get_card(user)
+        user.first_name = "Saved"
+
+        invalidate_user_card(sender=None, instance=user)
+
+        self.assertEqual(user_card_service.get_card(user)["first_name"], "Saved")
+        user_card_service.invalidate(user.id)
+
+    @override_settings(USER_CARD_LOCAL_MAX_ENTRIES=2)
+    def test_local_store_is_bounded(self):
+        users = [make_user(first_name=f"user{i}") for i in range(3)]
+        for user in users:
+            self.service.get_card(user)
+
+        self.assertEqual(len(self.service._local), 2)
+        self.assertNotIn(str(users[0].id), self.service._local)
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import hashlib
+import io
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import MemoryFileUploadHandler
+from django.http.multipartparser import MultiPartParser
+from django.test import SimpleTestCase
+
+from shared.services.video_dedup_service import ContentHashUploadHandler, VideoDedupService
+
+
+class VideoDedupServiceTests(SimpleTestCase):
+    """Validate streaming upload hashing and reuse of processed duplicates."""
+
+    def setUp(self):
+        super().setUp()
+        self.service = VideoDedupService()
+
+    def test_upload_is_hashed_while_the_body_is_parsed(self):
+        content = b'frame' * 50000
+        boundary = 'BoUnDaRy'
+        body = (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="movie.mp4"\r\n'
+            'Content-Type: video/mp4\r\n\r\n'
+        ).encode() + content + f'\r\n--{boundary}--\r\n'.encode()
+        hasher = ContentHashUploadHandler()
+        parser = MultiPartParser(
+            {'CONTENT_TYPE': f'multipart/form-data; boundary={boundary}', 'CONTENT_LENGTH': len(body)},
+            io.BytesIO(body),
+            [hasher, MemoryFileUploadHandler()],
+        )
+
+        _data, files = parser.parse()
+
+        self.assertEqual(files['file'].read(), content)
+        self.assertEqual(hasher.digests['file'], (hashlib.sha256(content).hexdigest(), len(content)))
+
+    def test_duplicate_of_ready_asset_skips_storage_and_processing(self):
+        asset = MagicMock(status='ready', metadata={
+            'duration': 90.0, 'resolution': '1920x1080', 'codec': 'h264', 'thumbnail': 'thumbnails/ab/abc.jpg',
+            'streaming': {'hls': 'https://cdn.example.com/master.m3u8'}, 'variants': {'720p': 'v.mp4'},
+        })
+        video = MagicMock(metadata=None)
+
+        with patch('apps.videos.models.VideoAsset.objects.get_or_create', return_value=(asset, False)), \
+                patch('shared.services.video_dedup_service.default_storage') as storage:
+            outcome = self.service.claim(video, 'abc', 1024, SimpleUploadedFile('movie.mp4', b'x'))
+
+        self.assertEqual(outcome, 'ready')
+        storage.save.assert_not_called()
+        self.assertEqual(video.status, 'ready')
+        self.assertEqual(video.duration, timedelta(seconds=90))
+        self.assertEqual(video.thumbnail, 'thumbnails/ab/abc.jpg')
+        self.assertEqual(video.metadata['streaming']['hls'], 'https://cdn.example.com/master.m3u8')
+        self.assertTrue(video.optimized)
+
+    def test_first_upload_is_stored_under_its_hash(self):
+        asset = MagicMock(status='processing')
+        video = MagicMock()
+
+        with patch('apps.videos.models.VideoAsset.objects.get_or_create', return_value=(asset, True)), \
+                patch('shared.services.video_dedup_service.default_storage') as storage:
+            storage.exists.return_value = False
+            storage.save.side_effect = lambda key, _file: key
+            outcome = self.service.claim(video, 'abcdef', 1024, SimpleUploadedFile('Movie.MP4', b'x'))
+
+        self.assertEqual(outcome, 'process')
+        self.assertEqual(asset.storage_key, 'videos/originals/ab/abcdef.mp4')
+        self.assertEqual(video.file.name, 'videos/originals/ab/abcdef.mp4')
+        self.assertEqual(video.status, 'processing')
+
+    def test_publish_fills_in_waiting_duplicates(self):
+        waiting = MagicMock(metadata=None)
+        asset = MagicMock(metadata={})
+        asset.videos.exclude.return_value.filter.return_value = [waiting]
+        video = MagicMock(asset=asset, file_size=1024, resolution='1280x720', codec='h264', bitrate=900, fps=25.0,
+                          duration=timedelta(seconds=30), preview_url=None,
+                          metadata={'thumbnails': ['t1.jpg'], 'sprite': {'url': 's.jpg'}})
+        video.thumbnail.name = 'thumbnails/t1.jpg'
+
+        self.assertEqual(self.service.publish(video), 1)
+
+        self.assertEqual(asset.status, 'ready')
+        self.assertEqual(asset.metadata['duration'], 30.0)
+        self.assertEqual(waiting.resolution, '1280x720')
+        self.assertEqual(waiting.metadata['sprite'], {'url': 's.jpg'})
+        self.assertEqual(waiting.status, 'ready')
+        self.assertFalse(waiting.optimized)
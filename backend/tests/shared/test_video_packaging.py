@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from django.test import SimpleTestCase
+
+from shared.services.video_packaging_service import VideoPackagingService
+
+MEDIA_PLAYLIST = """#EXTM3U
+#EXT-X-VERSION:7
+#EXT-X-TARGETDURATION:4
+#EXT-X-MEDIA-SEQUENCE:0
+#EXT-X-PLAYLIST-TYPE:VOD
+#EXT-X-INDEPENDENT-SEGMENTS
+#EXT-X-MAP:URI="720p.m4s",BYTERANGE="812@0"
+#EXTINF:4.000000,
+#EXT-X-BYTERANGE:100000@812
+720p.m4s
+#EXTINF:4.000000,
+#EXT-X-BYTERANGE:200000
+720p.m4s
+#EXTINF:2.000000,
+#EXT-X-BYTERANGE:50000@300812
+720p.m4s
+#EXT-X-ENDLIST
+"""
+
+
+class VideoPackagingServiceTests(SimpleTestCase):
+    """Validate the byte-range segment index and master playlist built from packaged renditions."""
+
+    def test_segment_index_resolves_byte_ranges(self):
+        index = VideoPackagingService.segment_index(MEDIA_PLAYLIST)
+
+        self.assertEqual(index['uri'], '720p.m4s')
+        self.assertEqual(index['init'], {'offset': 0, 'length': 812})
+        self.assertEqual(index['segments'], [
+            {'start': 0.0, 'duration': 4.0, 'offset': 812, 'length': 100000},
+            {'start': 4.0, 'duration': 4.0, 'offset': 100812, 'length': 200000},
+            {'start': 8.0, 'duration': 2.0, 'offset': 300812, 'length': 50000},
+        ])
+        self.assertEqual(VideoPackagingService.bandwidth(index), {'bandwidth': 400000, 'average_bandwidth': 280000})
+
+    def test_master_playlist_lists_renditions_by_bandwidth(self):
+        playlist = VideoPackagingService.master_playlist([
+            {'name': '360p', 'width': 640, 'height': 360, 'bandwidth': 600000, 'average_bandwidth': 500000},
+            {'name': '720p', 'width': 1280, 'height': 720, 'bandwidth': 2400000, 'average_bandwidth': 2000000},
+        ])
+
+        lines = playlist.splitlines()
+        self.assertEqual(lines[0], '#EXTM3U')
+        self.assertEqual(lines[3], '#EXT-X-STREAM-INF:BANDWIDTH=2400000,AVERAGE-BANDWIDTH=2000000,RESOLUTION=1280x720')
+        self.assertEqual(lines[4], '720p.m3u8')
+        self.assertEqual(lines[6], '360p.m3u8')
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from shared.services.video_prefetch_service import VideoPrefetchService
+from shared.services.video_proxy_service import video_proxy_service
+
+SIZE = 1000
+
+
+class VideoPrefetchServiceTests(SimpleTestCase):
+    """Validate party read-ahead planning and in-flight coalescing."""
+
+    def setUp(self):
+        super().setUp()
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, True)
+        overrides = override_settings(
+            VIDEO_PROXY_CACHE_DIR=cache_dir,
+            VIDEO_PROXY_CHUNK_SIZE=100,
+            VIDEO_PREFETCH_SECONDS=3,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.service = VideoPrefetchService()
+        self.fetches = []
+        self.release = threading.Event()
+
+    def fetch(self, first, last):
+        self.release.wait(5)
+        self.fetches.append((first, last))
+        return b'x' * (last - first + 1)
+
+    def test_plan_maps_position_to_chunk_window(self):
+        rate = VideoPrefetchService.byte_rate(SIZE, duration=20)
+        self.assertEqual(rate, 50)
+        self.assertEqual(self.service.plan(SIZE, 5, True, rate), [2, 3, 4])
+        self.assertEqual(self.service.plan(SIZE, 5, False, rate), [2])
+        self.assertEqual(self.service.plan(SIZE, 19.9, True, rate), [9])
+        self.assertEqual(VideoPrefetchService.byte_rate(SIZE, bitrate_kbps=8), 1000)
+
+    def test_concurrent_warms_share_one_fetch(self):
+        first = self.service.warm('video:v1', 4, SIZE, self.fetch)
+        second = self.service.warm('video:v1', 4, SIZE, self.fetch)
+        self.assertIs(first, second)
+
+        self.release.set()
+        first.result(5)
+        self.assertEqual(self.fetches, [(400, 499)])
+        self.assertTrue(video_proxy_service.has_chunk('video:v1', 4))
+        self.assertIsNone(self.service.warm('video:v1', 4, SIZE, self.fetch))
+
+    def test_schedule_warms_ahead_of_party_clock_once_per_interval(self):
+        self.release.set()
+        with mock.patch.object(self.service, 'party_position', return_value=(5.0, True)):
+            self.assertTrue(self.service.schedule('p1', 'video:v2', SIZE, self.fetch, duration=20))
+            self.assertFalse(self.service.schedule('p1', 'video:v2', SIZE, self.fetch, duration=20))
+            deadline = time.monotonic() + 5
+            while len(self.fetches) < 3 and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+        self.assertEqual(sorted(self.fetches), [(200, 299), (300, 399), (400, 499)])
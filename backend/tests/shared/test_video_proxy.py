@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+
+from shared.services.video_proxy_service import RangeNotSatisfiable, VideoProxyService
+
+PAYLOAD = bytes(range(256)) * 4  # 1024 bytes
+
+
+class VideoProxyServiceTests(SimpleTestCase):
+    """Validate range parsing and the on-disk chunk cache behind VideoProxyView."""
+
+    def setUp(self):
+        super().setUp()
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, True)
+        overrides = override_settings(
+            VIDEO_PROXY_CACHE_DIR=self.cache_dir,
+            VIDEO_PROXY_CHUNK_SIZE=100,
+            VIDEO_PROXY_STREAM_BLOCK_SIZE=32,
+            VIDEO_PROXY_CACHE_BYTES=10_000,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.service = VideoProxyService()
+        self.fetches = []
+
+    def fetch(self, first, last):
+        self.fetches.append((first, last))
+        return PAYLOAD[first:last + 1]
+
+    def read(self, start, end, key='video:v1'):
+        return b''.join(self.service.stream(key, len(PAYLOAD), start, end, self.fetch))
+
+    def test_parse_range_forms(self):
+        parse = VideoProxyService.parse_range
+        self.assertIsNone(parse('', 1024))
+        self.assertIsNone(parse('bytes=0-1,5-9', 1024))
+        self.assertEqual(parse('bytes=100-', 1024), (100, 1023))
+        self.assertEqual(parse('bytes=100-5000', 1024), (100, 1023))
+        self.assertEqual(parse('bytes=-24', 1024), (1000, 1023))
+        with self.assertRaises(RangeNotSatisfiable):
+            parse('bytes=1024-', 1024)
+
+    def test_range_spanning_chunks_fetches_aligned_chunks_once(self):
+        self.assertEqual(self.read(150, 420), PAYLOAD[150:421])
+        self.assertEqual(self.fetches, [(100, 199), (200, 299), (300, 399), (400, 499)])
+
+        self.assertEqual(self.read(180, 260), PAYLOAD[180:261])
+        self.assertEqual(len(self.fetches), 4)
+
+        self.assertEqual(self.read(1000, 1023), PAYLOAD[1000:])
+        self.assertEqual(self.fetches[-1], (1000, 1023))
+
+    def test_trim_evicts_least_recently_read_chunks(self):
+        self.read(0, 399)
+        os.utime(self.service._chunk_path('video:v1', 1), (0, 0))
+
+        with override_settings(VIDEO_PROXY_CACHE_BYTES=300):
+            self.assertEqual(self.service.trim(), 200)
+
+        self.assertFalse(self.service.has_chunk('video:v1', 1))
+        self.assertEqual(sum(self.service.has_chunk('video:v1', index) for index in range(4)), 2)
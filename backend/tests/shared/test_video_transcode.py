@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+import tempfile
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+
+from shared.services.video_transcode_service import DEFAULT_RENDITIONS, VideoTranscodeService
+
+
+class VideoTranscodeServiceTests(SimpleTestCase):
+    """Validate the single-pass encode command and resumable variant pipeline."""
+
+    def setUp(self):
+        super().setUp()
+        self.work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.work_dir, True)
+        overrides = override_settings(VIDEO_TRANSCODE_WORK_DIR=self.work_dir, VIDEO_TRANSCODE_SLOTS=1)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.service = VideoTranscodeService()
+        self.executor = self.service.upload_executor()
+        self.addCleanup(self.executor.shutdown)
+        self.downloads = []
+        self.uploads = []
+        self.encodes = []
+        self.packages = []
+        self.failing_uploads = set()
+        packaging = patch('shared.services.video_transcode_service.video_packaging_service.package',
+                          side_effect=self.fake_package)
+        packaging.start()
+        self.addCleanup(packaging.stop)
+
+    def download(self, destination):
+        self.downloads.append(destination)
+        with open(destination, 'wb') as handle:
+            handle.write(b'source')
+        return True
+
+    def upload(self, path, name):
+        self.uploads.append(name)
+        if name in self.failing_uploads:
+            return None
+        return f'https://cdn.example.com/{name}'
+
+    def fake_package(self, workdir, renditions):
+        self.packages.append([name for name, _path in renditions])
+        os.makedirs(os.path.join(workdir, 'hls'), exist_ok=True)
+        details = []
+        for name, _path in renditions:
+            for extension in ('m3u8', 'm4s', 'json'):
+                with open(os.path.join(workdir, 'hls', f'{name}.{extension}'), 'w') as handle:
+                    handle.write(name)
+            details.append({'name': name, 'width': 1, 'height': 1, 'segments': 1,
+                            'bandwidth': 8, 'average_bandwidth': 8})
+        with open(os.path.join(workdir, 'hls', 'master.m3u8'), 'w') as handle:
+            handle.write('#EXTM3U')
+        return {'renditions': details, 'dash': False}
+
+    def fake_ffmpeg(self, command, **kwargs):
+        self.encodes.append(command)
+        for argument in command:
+            if argument.endswith('.part.mp4'):
+                with open(argument, 'wb') as handle:
+                    handle.write(b'encoded')
+        return subprocess.CompletedProcess(command, 0, '', '')
+
+    def test_build_command_decodes_once_for_every_rendition(self):
+        outputs = [(rendition, f'/out/{rendition.name}.mp4') for rendition in DEFAULT_RENDITIONS]
+
+        command = self.service.build_command('/in/source', outputs)
+
+        self.assertEqual(command.count('-i'), 1)
+        graph = command[command.index('-filter_complex') + 1]
+        self.assertTrue(graph.startswith('[0:v]split=3[s0][s1][s2]'))
+        self.assertIn('[s0]scale=w=1280:h=720', graph)
+        self.assertEqual(command[-1], '/out/360p.mp4')
+        self.assertEqual(command.count('-map'), 6)
+        self.assertIn('expr:gte(t,n_forced*4)', command)
+
+    def test_retry_resumes_with_missing_uploads_only(self):
+        self.failing_uploads = {'480p.mp4', 'hls/480p.m4s'}
+        with patch('shared.services.video_transcode_service.subprocess.run', side_effect=self.fake_ffmpeg):
+            run = self.service.start('video-1', self.download, self.upload, self.executor)
+            self.assertEqual(len(run.wait()), 11)
+            self.assertFalse(run.complete)
+            self.assertIsNone(run.manifest())
+
+            self.failing_uploads = set()
+            retry = self.service.start('video-1', self.download, self.upload, self.executor)
+            uploaded = retry.wait()
+
+        self.assertTrue(retry.complete)
+        self.assertEqual(len(uploaded), 13)
+        self.assertEqual(len(self.downloads), 1)
+        self.assertEqual(len(self.encodes), 1)
+        self.assertEqual(len(self.packages), 1)
+        self.assertEqual(len(self.uploads), 15)
+        self.assertEqual(retry.variants()['480p'], 'https://cdn.example.com/480p.mp4')
+        manifest = retry.manifest()
+        self.assertEqual(manifest['hls'], 'https://cdn.example.com/hls/master.m3u8')
+        self.assertEqual(manifest['renditions'][1]['media'], 'https://cdn.example.com/hls/480p.m4s')
+        self.assertFalse(os.path.exists(os.path.join(self.work_dir, 'video-1')))
+
+    def test_failed_encode_keeps_source_for_retry(self):
+        failed = subprocess.CompletedProcess([], 1, '', 'boom')
+        with patch('shared.services.video_transcode_service.subprocess.run', return_value=failed):
+            self.assertIsNone(self.service.start('video-2', self.download, self.upload, self.executor))
+
+        with patch('shared.services.video_transcode_service.subprocess.run', side_effect=self.fake_ffmpeg):
+            run = self.service.start('video-2', self.download, self.upload, self.executor)
+            self.assertTrue(run.wait())
+
+        self.assertEqual(len(self.downloads), 1)
+        self.assertEqual(len(self.encodes), 1)
+        self.assertTrue(run.complete)
@@ -0,0 +1,81 @@
+"""Batch analytics event processing against the database."""
+
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.analytics.models import AnalyticsEvent, PartyAnalytics, UserSession, WatchTime
+from apps.analytics.tasks import process_analytics_events
+
+
+@override_settings(ANALYTICS_BATCH_SIZE=4)
+class ProcessAnalyticsEventsTests(TestCase):
+    """Aggregate pending events in chunks with set-based writes."""
+
+    def setUp(self):
+        from tests.factories import UserFactory, WatchPartyFactory
+
+        self.user = UserFactory()
+        self.party = WatchPartyFactory(host=self.user)
+        self.video = self.party.video
+        self.start = timezone.now() - timedelta(minutes=30)
+        self.sequence = 0
+
+    def event(self, event_type, **data):
+        from tests.factories import AnalyticsEventFactory
+
+        self.sequence += 1
+        return AnalyticsEventFactory(
+            user=self.user, party=self.party, event_type=event_type, event_data=data,
+            timestamp=self.start + timedelta(seconds=self.sequence),
+        )
+
+    def test_events_are_folded_into_aggregates_and_marked_processed(self):
+        video_id, party_id = str(self.video.id), str(self.party.id)
+        WatchTime.objects.create(user=self.user, video=self.video, party=self.party, total_watch_time=100)
+        self.event('video_play', video_id=video_id, party_id=party_id, position=10)
+        self.event('video_pause', video_id=video_id, party_id=party_id, position=70, watch_duration=60)
+        self.event('video_pause', video_id=video_id, party_id=party_id, position=75, watch_duration=0)
+        self.event('video_play', video_id=video_id, position=5)
+        self.event('party_join', party_id=party_id)
+        self.event('party_join', party_id=party_id)
+        self.event('chat_message', party_id=party_id)
+        self.event('party_leave', party_id=party_id, session_duration=120)
+        self.event('party_leave', party_id=party_id, session_duration=30)
+        self.event('user_login', session_id='abc')
+        self.event('user_logout', session_id='abc')
+        missing = self.event('chat_message', party_id='00000000-0000-0000-0000-000000000000')
+
+        # Three chunks of four events; the count depends on the chunk, not on each event
+        with self.assertNumQueries(26):
+            self.assertEqual(process_analytics_events(), 'Processed 11 events')
+
+        in_party = WatchTime.objects.get(user=self.user, video=self.video, party=self.party)
+        self.assertEqual((in_party.total_watch_time, in_party.last_position), (160, 70))
+        solo = WatchTime.objects.get(user=self.user, video=self.video, party__isnull=True)
+        self.assertEqual((solo.total_watch_time, solo.last_position), (0, 5))
+
+        analytics = PartyAnalytics.objects.get(party=self.party)
+        self.assertEqual((analytics.total_participants, analytics.total_messages), (2, 1))
+        self.assertAlmostEqual(analytics.avg_session_duration, (120 * 2 + 30) / 3)
+
+        session = UserSession.objects.get(session_id='abc')
+        self.assertEqual(session.duration, 1)
+
+        self.assertEqual(list(AnalyticsEvent.objects.filter(processed=False)), [missing])
+
+    def test_malformed_event_does_not_hold_back_its_chunk(self):
+        video_id, party_id = str(self.video.id), str(self.party.id)
+        self.event('video_play', video_id=video_id, party_id=party_id, position=10)
+        self.event('video_pause', video_id=video_id, party_id=party_id, position=70, watch_duration=60)
+        malformed = self.event('video_pause', video_id=video_id, party_id=party_id, position=80,
+                               watch_duration='ten')
+        self.event('party_join', party_id=party_id)
+
+        self.assertEqual(process_analytics_events(), 'Processed 3 events')
+
+        watch_time = WatchTime.objects.get(user=self.user, video=self.video, party=self.party)
+        self.assertEqual((watch_time.total_watch_time, watch_time.last_position), (60, 70))
+        self.assertEqual(PartyAnalytics.objects.get(party=self.party).total_participants, 1)
+        self.assertEqual(list(AnalyticsEvent.objects.filter(processed=False)), [malformed])
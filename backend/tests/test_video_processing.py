@@ -0,0 +1,86 @@
+"""Upload processing persisted on real video rows."""
+
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+
+from apps.videos.models import Video, VideoAsset
+from apps.videos.tasks import process_video_upload
+
+CONTENT_HASH = 'ab' * 32
+MEDIA_URL = f'https://watch-party-media.s3.us-east-1.amazonaws.com/videos/media/{CONTENT_HASH}'
+
+INSPECTION = {
+    'fingerprint': CONTENT_HASH,
+    'metadata': {'duration': 90.0, 'file_size': 2048, 'width': 1280, 'height': 720,
+                 'codec': 'h264', 'bitrate': 900000, 'fps': 25.0, 'has_audio': True},
+    'thumbnails': [f'{MEDIA_URL}/thumbnail_01.jpg'],
+    'sprite': {'columns': 10, 'rows': 10, 'url': f'{MEDIA_URL}/sprite.jpg'},
+    'preview': f'{MEDIA_URL}/preview.mp4',
+}
+
+
+class ProcessVideoUploadTests(TestCase):
+    """Inspection results are saved on the video and keyed by the upload's content hash."""
+
+    def setUp(self):
+        from tests.factories import VideoFactory
+
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, True)
+        overrides = override_settings(MEDIA_ROOT=media_root, AWS_STORAGE_BUCKET_NAME='')
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self.asset = VideoAsset.objects.create(content_hash=CONTENT_HASH, file_size=2048)
+        self.video = VideoFactory(status='processing', asset=self.asset, duration=None)
+        self.video.file.save('movie.mp4', ContentFile(b'source bytes'))
+
+    def test_inspection_is_saved_on_the_video(self):
+        with patch('apps.videos.tasks.media_inspection_service.inspect', return_value=INSPECTION) as inspect:
+            process_video_upload(self.video.id)
+
+        video = Video.objects.get(id=self.video.id)
+        self.assertEqual(inspect.call_args[0][0], self.video.file.path)
+        self.assertEqual(inspect.call_args[1]['content_hash'], CONTENT_HASH)
+        self.assertEqual(video.status, 'ready')
+        self.assertIsNotNone(video.processed_at)
+        self.assertEqual(video.resolution, '1280x720')
+        self.assertEqual(video.preview_url, INSPECTION['preview'])
+        self.assertEqual(video.thumbnail.name, INSPECTION['thumbnails'][0])
+        # SQLite does not enforce lengths, so check the stored URL fits the column
+        self.assertLessEqual(len(video.thumbnail.name), Video._meta.get_field('thumbnail').max_length)
+        self.assertEqual(video.metadata['fingerprint'], CONTENT_HASH)
+        self.assertEqual(video.metadata['sprite'], INSPECTION['sprite'])
+        self.asset.refresh_from_db()
+        self.assertEqual(self.asset.status, 'ready')
+        self.assertEqual(self.asset.metadata['preview_url'], INSPECTION['preview'])
+
+    def test_pipeline_failure_hands_the_asset_to_a_waiting_duplicate(self):
+        from tests.factories import VideoFactory
+
+        waiting = VideoFactory(status='processing', asset=self.asset)
+
+        with patch('apps.videos.tasks.media_inspection_service.inspect', return_value=INSPECTION), \
+                patch('apps.videos.tasks.apply_media_inspection', side_effect=RuntimeError('boom')), \
+                patch('apps.videos.tasks.process_video_upload.delay') as delay:
+            process_video_upload(self.video.id)
+
+        self.assertEqual(Video.objects.get(id=self.video.id).status, 'failed')
+        self.assertEqual(Video.objects.get(id=waiting.id).status, 'processing')
+        self.asset.refresh_from_db()
+        self.assertEqual(self.asset.status, 'processing')
+        delay.assert_called_once_with(str(waiting.id))
+
+    def test_pipeline_failure_without_duplicates_frees_the_asset(self):
+        with patch('apps.videos.tasks.media_inspection_service.inspect', return_value=INSPECTION), \
+                patch('apps.videos.tasks.apply_media_inspection', side_effect=RuntimeError('boom')), \
+                patch('apps.videos.tasks.process_video_upload.delay') as delay:
+            process_video_upload(self.video.id)
+
+        delay.assert_not_called()
+        self.asset.refresh_from_db()
+        self.assertEqual(self.asset.status, 'failed')
@@ -0,0 +1,64 @@
+"""Rendition creation persisted on real video rows."""
+
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+
+from apps.videos.models import Video
+from apps.videos.tasks import optimize_video_quality
+
+
+class FakeRun:
+    complete = True
+
+    def wait(self):
+        return ['720p.mp4', 'hls/master.m3u8']
+
+    def variants(self):
+        return {'720p': 'https://cdn.example.com/720p.mp4'}
+
+    def manifest(self):
+        return {'hls': 'https://cdn.example.com/hls/master.m3u8', 'dash': None, 'segment_seconds': 4,
+                'renditions': [{'name': '720p', 'playlist': 'https://cdn.example.com/hls/720p.m3u8'}]}
+
+
+class OptimizeVideoQualityTests(TestCase):
+    """Variants and manifests land in ``Video.metadata`` and the video is marked optimized."""
+
+    def setUp(self):
+        from tests.factories import VideoFactory
+
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, True)
+        overrides = override_settings(MEDIA_ROOT=media_root, AWS_STORAGE_BUCKET_NAME='')
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self.video = VideoFactory(status='ready')
+        self.video.file.save('movie.mp4', ContentFile(b'source bytes'))
+
+    def test_variants_are_saved_on_the_video(self):
+        downloaded = []
+
+        def start(key, download, upload, uploads):
+            work_dir = tempfile.mkdtemp()
+            self.addCleanup(shutil.rmtree, work_dir, True)
+            destination = os.path.join(work_dir, 'source')
+            self.assertTrue(download(destination))
+            with open(destination, 'rb') as handle:
+                downloaded.append(handle.read())
+            return FakeRun()
+
+        with patch('apps.videos.tasks.video_transcode_service.start', side_effect=start):
+            optimize_video_quality()
+
+        video = Video.objects.get(id=self.video.id)
+        self.assertEqual(downloaded, [b'source bytes'])
+        self.assertTrue(video.optimized)
+        self.assertEqual(video.metadata['variants'], {'720p': 'https://cdn.example.com/720p.mp4'})
+        self.assertEqual(video.metadata['streaming']['hls'], 'https://cdn.example.com/hls/master.m3u8')
+        self.assertFalse(Video.objects.filter(status='ready', optimized=False).exists())
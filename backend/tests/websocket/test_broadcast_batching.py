@@ -0,0 +1,132 @@
+"""Unit tests for the coalescing party broadcast aggregator."""
+
+import json
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, override_settings
+
+from shared.websocket_broadcast import (
+    BATCH_EVENT_TYPE,
+    BatchedBroadcastMixin,
+    PartyBroadcastAggregator,
+    encode_frame,
+    frame_event,
+)
+
+
+class RecordingChannelLayer:
+    def __init__(self):
+        self.sent = []
+
+    async def group_send(self, group, event):
+        self.sent.append((group, event))
+
+
+class _BaseConsumer:
+    def __init__(self):
+        self.frames = []
+
+    async def send(self, text_data=None, bytes_data=None, close=False):
+        self.frames.append(text_data)
+
+
+class RecordingConsumer(BatchedBroadcastMixin, _BaseConsumer):
+    async def reaction_broadcast(self, event):
+        await self.send(text_data=json.dumps({'type': 'reaction', 'emoji': event['emoji']}))
+
+
+@override_settings(PARTY_FANOUT_WINDOW_MS=50, PARTY_FANOUT_MAX_BATCH=100)
+class PartyBroadcastAggregatorTests(SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.layer = RecordingChannelLayer()
+        self.aggregator = PartyBroadcastAggregator()
+
+    def test_control_messages_bypass_the_buffer(self):
+        async def _run():
+            await self.aggregator.publish(self.layer, 'party_1', {'type': 'play_command'})
+
+        async_to_sync(_run)()
+        self.assertEqual(self.layer.sent, [('party_1', {'type': 'play_command'})])
+
+    def test_ephemeral_events_are_batched_and_coalesced(self):
+        async def _run():
+            publish = self.aggregator.publish
+            await publish(self.layer, 'party_1', {'type': 'typing_indicator', 'is_typing': True},
+                          ephemeral=True, coalesce_key='typing:1')
+            await publish(self.layer, 'party_1', {'type': 'reaction_broadcast', 'emoji': 'a'}, ephemeral=True)
+            await publish(self.layer, 'party_1', {'type': 'typing_indicator', 'is_typing': False},
+                          ephemeral=True, coalesce_key='typing:1')
+            self.assertEqual(self.layer.sent, [])
+            await self.aggregator.flush_all()
+
+        async_to_sync(_run)()
+
+        self.assertEqual(len(self.layer.sent), 1)
+        group, event = self.layer.sent[0]
+        self.assertEqual(group, 'party_1')
+        self.assertEqual(event['type'], BATCH_EVENT_TYPE)
+        self.assertEqual(
+            [inner['type'] for inner in event['events']],
+            ['reaction_broadcast', 'typing_indicator'],
+        )
+        self.assertFalse(event['events'][1]['is_typing'])
+
+    @override_settings(PARTY_FANOUT_MAX_BATCH=2)
+    def test_full_buffer_flushes_early(self):
+        async def _run():
+            for emoji in ('a', 'b'):
+                await self.aggregator.publish(
+                    self.layer, 'party_1', {'type': 'reaction_broadcast', 'emoji': emoji}, ephemeral=True
+                )
+
+        async_to_sync(_run)()
+        self.assertEqual(len(self.layer.sent), 1)
+        self.assertEqual(len(self.layer.sent[0][1]['events']), 2)
+
+    @override_settings(PARTY_FANOUT_BATCH_FRAMES=True)
+    def test_mixin_joins_batch_into_single_frame(self):
+        consumer = RecordingConsumer()
+        batch = {
+            'type': BATCH_EVENT_TYPE,
+            'events': [
+                {'type': 'reaction_broadcast', 'emoji': 'a'},
+                {'type': 'reaction_broadcast', 'emoji': 'b'},
+            ],
+        }
+
+        async_to_sync(consumer.broadcast_batch)(batch)
+
+        self.assertEqual(len(consumer.frames), 1)
+        frame = json.loads(consumer.frames[0])
+        self.assertEqual(frame['type'], 'batch')
+        self.assertEqual([m['emoji'] for m in frame['messages']], ['a', 'b'])
+
+    def test_mixin_sends_frames_individually_by_default(self):
+        consumer = RecordingConsumer()
+        async_to_sync(consumer.broadcast_batch)({
+            'type': BATCH_EVENT_TYPE,
+            'events': [
+                {'type': 'reaction_broadcast', 'emoji': 'a'},
+                {'type': 'reaction_broadcast', 'emoji': 'b'},
+            ],
+        })
+        self.assertEqual(len(consumer.frames), 2)
+
+
+class FrameEncodingTests(SimpleTestCase):
+
+    def test_frame_event_carries_encoded_payload(self):
+        event = frame_event('play_command', {'type': 'play', 'current_time': 1.5}, sender_id='7')
+
+        self.assertEqual(event['type'], 'play_command')
+        self.assertEqual(event['sender_id'], '7')
+        self.assertEqual(json.loads(event['frame']), {'type': 'play', 'current_time': 1.5})
+
+    @override_settings(WEBSOCKET_JSON_CODEC='orjson')
+    def test_fast_codec_produces_equivalent_text_frames(self):
+        frame = encode_frame({'type': 'reaction', 'emoji': '\U0001f389'})
+
+        self.assertIsInstance(frame, str)
+        self.assertEqual(json.loads(frame), {'type': 'reaction', 'emoji': '\U0001f389'})
@@ -0,0 +1,49 @@
+"""Party presence held only by sockets that actually joined."""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from apps.chat.enhanced_party_consumer import EnhancedPartyConsumer
+from shared.services.presence_service import presence_service
+
+
+class PartyPresenceTests(SimpleTestCase):
+    """A rejected socket must not release the presence of the user's other tabs."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        patcher = patch('shared.services.presence_service.get_redis_client', return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        presence_service.join('party', 'party-1', 'u1')
+
+    def consumer(self):
+        consumer = EnhancedPartyConsumer()
+        consumer.party_id = 'party-1'
+        consumer.party_group_name = 'enhanced_party_party-1'
+        consumer.user = SimpleNamespace(id='u1', username='u1')
+        consumer.channel_name = 'channel-2'
+        consumer.channel_layer = AsyncMock()
+        consumer.broadcast_to_party = AsyncMock()
+        consumer.serialize_user = AsyncMock(return_value={'id': 'u1'})
+        return consumer
+
+    def test_rejected_socket_leaves_presence_alone(self):
+        async_to_sync(self.consumer().disconnect)(4003)
+
+        self.assertEqual(presence_service.members('party', 'party-1'), ['u1'])
+
+    def test_joined_socket_releases_only_its_own_connection(self):
+        presence_service.join('party', 'party-1', 'u1')
+        consumer = self.consumer()
+        consumer.presence_joined = True
+
+        async_to_sync(consumer.disconnect)(1000)
+        async_to_sync(consumer.disconnect)(1000)
+
+        self.assertEqual(presence_service.members('party', 'party-1'), ['u1'])
@@ -0,0 +1,45 @@
+"""Video control messages applied to the shared party clock."""
+
+from unittest.mock import AsyncMock, patch
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from apps.chat.enhanced_party_consumer import EnhancedPartyConsumer
+from shared.services.party_clock_service import party_clock_service
+
+
+class VideoControlTests(SimpleTestCase):
+    """Play, pause and seek only move the clock to positions the client sent."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.consumer = EnhancedPartyConsumer()
+        self.consumer.party_id = 'party-1'
+        self.consumer.is_host = True
+        self.consumer.broadcast_to_party = AsyncMock()
+        self.consumer.serialize_user = AsyncMock(return_value={'id': '1'})
+
+    def control(self, handler, data):
+        async_to_sync(handler)(data, timestamp=None)
+        return self.consumer.broadcast_to_party.await_args[0][0]['data']
+
+    def test_pause_without_position_keeps_the_clock_position(self):
+        with patch('shared.services.party_clock_service.time.time') as clock:
+            clock.return_value = 1000.0
+            self.control(self.consumer.handle_video_play, {'current_time': 30})
+            clock.return_value = 1005.0
+            broadcast = self.control(self.consumer.handle_video_pause, {})
+            position = party_clock_service.get('party-1').position
+
+        self.assertAlmostEqual(position, 35.0)
+        self.assertAlmostEqual(broadcast['current_time'], 35.0)
+        self.assertFalse(broadcast['is_playing'])
+
+    def test_seek_moves_the_clock_to_the_sent_position(self):
+        self.control(self.consumer.handle_video_seek, {'current_time': 80})
+        self.control(self.consumer.handle_video_seek, {})
+
+        self.assertEqual(party_clock_service.get('party-1').position, 80)